@@ -0,0 +1,112 @@
+# GUI frame time while telemetry streams in: the GUI thread redraws a 10 s egram strip of the live window
+# at 60 frames a second while a simulated pacemaker (its own process) streams at a high sample rate.
+# Compared: no telemetry, the link decoded on a thread of the GUI process with filtering on the GUI
+# thread (DeviceBridge -> Telemetry.append_samples), and the link, decoding and filtering in the
+# acquisition child (ProcessBridge -> shared-memory rings -> Telemetry.pull). Frame interval
+# percentiles, frames later than two periods, and samples that reached the recording.
+# Run: python DCM/bench/bench_acquisition.py [--rate 16000 --seconds 10]
+import os, sys, time, argparse, subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+SRC = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")) # DCM sources
+sys.path.insert(0, SRC)
+import numpy as np # noqa: E402
+from PySide6 import QtCore, QtGui, QtWidgets # noqa: E402
+
+FRAME_MS = 16 # 60 Hz redraw
+STRIP_S = 10.0 # seconds of egram drawn per frame
+
+
+def simulator(rate: int): # child process serving one device; returns (process, port path)
+    sim = subprocess.Popen([sys.executable, os.path.join(SRC, "sim", "pacemaker.py"), "--rate", str(rate)],
+                           stdout=subprocess.PIPE, text=True)
+    return sim, sim.stdout.readline().split()[1]
+
+
+def frames(app, telemetry, seconds: float) -> np.ndarray: # frame intervals in ms while redrawing the strip
+    from dialogs.report_charts import EgramStrip
+    image = QtGui.QImage(1200, 240, QtGui.QImage.Format_ARGB32)
+    stamps = []
+
+    def frame():
+        stamps.append(time.perf_counter())
+        e = telemetry.egram
+        n = int(STRIP_S * e.sampling_rate)
+        strip = EgramStrip(e.time[-n:], e.atrial[-n:], e.ventricular[-n:]) # lists in-process, ring views from the child
+        image.fill(QtCore.Qt.white)
+        painter = QtGui.QPainter(image)
+        strip.paint(painter, QtCore.QRectF(0, 0, 1200, 240))
+        painter.end()
+
+    timer = QtCore.QTimer()
+    timer.setTimerType(QtCore.Qt.PreciseTimer)
+    timer.timeout.connect(frame)
+    timer.start(FRAME_MS)
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec()
+    timer.stop()
+    return np.diff(stamps) * 1e3
+
+
+def run(app, how: str, path: str, rate: int, seconds: float):
+    from core.telemetry import Telemetry
+    tel = Telemetry(live_window_s=60.0)
+    tel.egram.sampling_rate = rate
+    bridge = None
+    if how == "thread":
+        from core import transport, frames as wire
+        from utility.device_bridge import DeviceBridge
+        bridge = DeviceBridge(transport.identify(path))
+        def on_frame(f):
+            if f.type == wire.EGRAM:
+                start, r, a, v = wire.decode_egram(f.payload)
+                tel.append_samples((start + np.arange(len(a))) / r, a, v, r)
+        bridge.stream.connect(on_frame)
+    elif how == "process":
+        from utility.device_bridge import ProcessBridge
+        bridge = ProcessBridge(path, max_rate=rate)
+        tel.attach(bridge.rings)
+        bridge.samplesReady.connect(tel.pull)
+    if bridge:
+        bridge.call("stream", True)
+        loop = QtCore.QEventLoop()
+        QtCore.QTimer.singleShot(1500, loop.quit) # filters settle, live window starts filling
+        loop.exec()
+    before = tel.samples
+    t0 = time.perf_counter()
+    dt = frames(app, tel, seconds)
+    wall = time.perf_counter() - t0
+    got = tel.samples - before
+    if bridge:
+        bridge.call("stream", False).result(2.0)
+        tel.detach()
+        bridge.close()
+    return dt, got / (rate * wall) if bridge else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="GUI frame time under telemetry load")
+    ap.add_argument("--rate", type=int, default=16000, help="egram samples per second per channel")
+    ap.add_argument("--seconds", type=float, default=10.0, help="measured seconds per case")
+    a = ap.parse_args()
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    print(f"{a.rate} Hz stream, {STRIP_S:g} s strip redrawn every {FRAME_MS} ms, {a.seconds:g} s per case, {os.cpu_count()} cpu(s)")
+    print(f"{'':>30} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'late':>6} {'samples':>8}")
+    for how, label in (("none", "no telemetry"), ("thread", "decode thread + GUI filtering"),
+                       ("process", "acquisition process + rings")):
+        sim, path = simulator(a.rate)
+        try:
+            dt, kept = run(app, how, path, a.rate, a.seconds)
+        finally:
+            sim.terminate()
+            sim.wait()
+        late = float((dt > 2 * FRAME_MS).mean()) if len(dt) else 0.0
+        print(f"{label:>30} {np.percentile(dt, 50):7.1f} {np.percentile(dt, 99):7.1f} {dt.max():7.1f} {late:6.1%} "
+              f"{'' if kept is None else f'{kept:8.1%}'}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
+    sys.stdout.flush()
+    os._exit(0) # skip Qt teardown
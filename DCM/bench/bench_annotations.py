@@ -0,0 +1,51 @@
+# Annotation store (core.annotations) on a long recording: building it from MARKER items, a chart
+# window query and a percentage-paced count, against scanning a plain list of events.
+# Run: python DCM/bench/bench_annotations.py
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import numpy as np # noqa: E402
+from core.annotations import AnnotationStore # noqa: E402
+from core import frames # noqa: E402
+
+FS = 1000
+
+
+def per_call(fn, n: int) -> float: # seconds per call
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n
+
+
+def recording(beats: int, seed: int = 0): # DDD-like: one atrial and one ventricular event per beat, mostly paced
+    rng = np.random.default_rng(seed)
+    beat = np.cumsum(rng.integers(700, 1000, beats)) # sample of each beat, 60-85 bpm
+    a = np.where(rng.random(beats) < 0.3, frames.AS, frames.AP)
+    v = np.where(rng.random(beats) < 0.1, frames.VS, frames.VP)
+    items = np.empty((2 * beats, 2), dtype=np.int64)
+    items[0::2, 0], items[0::2, 1] = beat, a
+    items[1::2, 0], items[1::2, 1] = beat + 150, v
+    return [tuple(x) for x in items.tolist()]
+
+
+def main():
+    for beats in (100_000, 1_000_000):
+        markers = recording(beats)
+        store = AnnotationStore()
+        t0 = time.perf_counter()
+        for i in range(0, len(markers), 8): # a MARKER frame or so per beat pair
+            store.add_markers(markers[i:i + 8], FS, {"ARP": 250, "VRP": 320})
+        build = time.perf_counter() - t0
+        plain = [(s / FS, c) for s, c in markers] # what a list of tuples would hold
+        mid = markers[len(markers) // 2][0] / FS
+        window = per_call(lambda: store.query(mid, mid + 10.0), 200)
+        scan = per_call(lambda: [e for e in plain if mid <= e[0] <= mid + 10.0], 3)
+        paced = per_call(lambda: store.paced_percent(mid, mid + 3600.0), 200)
+        paced_scan = per_call(lambda: sum(1 for e in plain if mid <= e[0] <= mid + 3600.0 and e[1] == frames.VP), 3)
+        print(f"{len(store):>9} events: built in {build:.2f} s | 10 s window {window * 1e6:6.1f} us (scan {scan * 1e3:6.1f} ms)"
+              f" | 1 h paced % {paced * 1e6:6.1f} us (scan {paced_scan * 1e3:6.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
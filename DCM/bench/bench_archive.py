@@ -0,0 +1,85 @@
+# Session archive (core.archive) with thousands of past sessions: time to list and filter them by device,
+# user and date with the indexes and with the indexes dropped, and to open an old session (metadata only)
+# against loading its recording. Run: python DCM/bench/bench_archive.py
+import os, sys, time, tempfile, random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import numpy as np # noqa: E402
+from core.archive import SessionArchive # noqa: E402
+from core.telemetry import Telemetry # noqa: E402
+from sim.pacemaker import Heart, SimConfig # noqa: E402
+
+SESSIONS = 20000
+DEVICES = 2000
+USERS = 10
+REPEAT = 50
+
+
+def fill(archive: SessionArchive):
+    rng = random.Random(0)
+    t0 = datetime(2020, 1, 1)
+    for i in range(SESSIONS):
+        started = (t0 + timedelta(minutes=90 * i + rng.randrange(60))).isoformat(timespec="seconds")
+        sid = archive.begin(f"SN{rng.randrange(DEVICES):05d}", "PM-SIM", f"user{rng.randrange(USERS)}", started)
+        for _ in range(rng.randrange(1, 4)):
+            archive.add_params(sid, "VVI", {"LRL": rng.randrange(40, 90), "URL": 120, "VentAmp": 3.5, "VentPW": 0.4, "VRP": 320})
+        archive.add_report(sid, "Bradycardia Parameters", "<html>" + "x" * 2000 + "</html>")
+        archive.finish(sid)
+
+
+def timed(fn) -> float: # ms per call
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - t0) / REPEAT * 1e3
+
+
+def main():
+    path = tempfile.mkdtemp()
+    archive = SessionArchive(path)
+    t0 = time.perf_counter()
+    fill(archive)
+    print(f"{SESSIONS} sessions ({DEVICES} devices, {USERS} users) archived in {time.perf_counter() - t0:.1f} s, "
+          f"{os.path.getsize(os.path.join(path, 'archive.db')) / 1e6:.1f} MB")
+
+    queries = {
+        "newest 100": lambda a: a.sessions(),
+        "one device": lambda a: a.sessions(device="SN01234"),
+        "one user, page 5": lambda a: a.sessions(user="user3", offset=400),
+        "one month": lambda a: a.sessions(since="2022-03-01", until="2022-04-01"),
+        "device + month": lambda a: a.sessions(device="SN01234", since="2021-01-01", until="2022-01-01"),
+        "count per device": lambda a: a.count(device="SN01234"),
+        "device list": lambda a: a.devices(),
+    }
+    indexed = {name: timed(lambda: q(archive)) for name, q in queries.items()}
+    for index in ("sessions_device", "sessions_user", "sessions_started"):
+        archive.db.execute(f"DROP INDEX {index}")
+    print(f"{'query':>18} {'indexed ms':>11} {'no index ms':>12}")
+    for name, q in queries.items():
+        print(f"{name:>18} {indexed[name]:11.3f} {timed(lambda: q(archive)):12.3f}")
+    archive.db.executescript("CREATE INDEX sessions_device ON sessions (device_serial, started, device_model);"
+                             "CREATE INDEX sessions_user ON sessions (user, started);"
+                             "CREATE INDEX sessions_started ON sessions (started);")
+
+    rec = Telemetry() # one 10 minute recording to open
+    heart = Heart(SimConfig(mode="VVI", intrinsic_bpm=55, seed=1))
+    for _ in range(10 * 60 * 50):
+        start, a, v = heart.step()
+        rec.append_samples(start / 1000 + np.arange(len(a)) / 1000, a, v, 1000)
+    sid = archive.begin("SN00001", "PM-SIM", "user1")
+    archive.finish(sid, rec)
+    t_open = timed(lambda: archive.open(sid).record)
+    t_params = timed(lambda: archive.open(sid).params)
+    t0 = time.perf_counter()
+    old = archive.open(sid)
+    samples = old.telemetry.samples
+    t_load = (time.perf_counter() - t0) * 1e3
+    print(f"open old session: {t_open:.3f} ms metadata, {t_params:.3f} ms with its parameters, "
+          f"{t_load:.0f} ms once the recording ({samples} samples) is viewed")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Audit log (core.audit) cost on the calling thread: record() against writing each event synchronously
+# (with and without an fsync per event), how many fsyncs the background writer needs for a burst,
+# and chain verification speed. Run: python DCM/bench/bench_audit.py
+import os, sys, time, tempfile, json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from core import audit # noqa: E402
+
+EVENTS = 100000
+SYNCED = 300 # per-event fsync is slow, fewer of those
+PARAMS = {"LRL": 60, "URL": 120, "VentAmp": 3.5, "VentPW": 0.4, "VRP": 320, "Hys": 0, "RS": 0}
+
+
+def synchronous(path: str, n: int, sync: bool) -> float: # us per event, one hashed line written per call
+    prev = audit.GENESIS
+    with open(path, "ab") as f:
+        t0 = time.perf_counter()
+        for i in range(n):
+            body = json.dumps({"seq": i, "time": time.time(), "user": "alice", "action": "program",
+                               "data": {"mode": "VVI", "params": PARAMS}}, separators=(",", ":"), sort_keys=True).encode()
+            prev = audit._hash(prev, body)
+            f.write(prev.encode() + b" " + body + b"\n")
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+        return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    d = tempfile.mkdtemp()
+    print(f"{'':>34} {'us per event':>13}")
+    print(f"{'write + fsync per event':>34} {synchronous(os.path.join(d, 's.log'), SYNCED, True):13.1f}")
+    print(f"{'write per event, no fsync':>34} {synchronous(os.path.join(d, 'n.log'), EVENTS, False):13.1f}")
+
+    path = os.path.join(d, "audit.log")
+    log = audit.AuditLog(path)
+    t0 = time.perf_counter()
+    for _ in range(EVENTS):
+        log.record("program", "alice", mode="VVI", params=PARAMS)
+    per_call = (time.perf_counter() - t0) / EVENTS * 1e6
+    log.flush(60.0)
+    total = time.perf_counter() - t0
+    print(f"{'AuditLog.record (caller thread)':>34} {per_call:13.2f}")
+    print(f"burst of {EVENTS} events on disk after {total:.2f} s ({EVENTS / total:.0f} records/s) with {log.batches} fsyncs")
+
+    log.batches = 0
+    t0 = time.perf_counter()
+    for _ in range(200): # UI pace: an action every few ms
+        log.record("report", "alice", name="Trending")
+        time.sleep(0.002)
+    log.flush()
+    print(f"200 events over {time.perf_counter() - t0:.2f} s of UI actions: {log.batches} fsyncs")
+    log.close()
+
+    size = os.path.getsize(path)
+    t0 = time.perf_counter()
+    ok, msg, n = audit.verify(path)
+    took = time.perf_counter() - t0
+    print(f"verify: {msg} ({ok}); {n / took:.0f} records/s, {size / took / 1e6:.0f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Egram storage with the block codec (core.codec): bytes per sample, compression ratio against float64
+# lists/arrays and encode/decode throughput for each compressor, with and without the delta and byte-plane
+# steps, on simulated egrams (sim.pacemaker.Heart at the wire resolution) and on a recording (the same
+# session filtered by Telemetry, saved and loaded back). Run: python DCM/bench/bench_codec.py
+import os, sys, time, tempfile, zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import numpy as np # noqa: E402
+from core import codec # noqa: E402
+from core.frames import EGRAM_SCALE # noqa: E402
+from core.telemetry import Telemetry # noqa: E402
+from sim.pacemaker import Heart, SimConfig # noqa: E402
+
+FS = 1000
+MINUTES = 10
+REPEAT = 3
+
+
+def simulated(): # (n, 2) mV of a paced VVI session, wire resolution, plus the Telemetry that recorded it
+    heart = Heart(SimConfig(mode="VVI", intrinsic_bpm=55, rate_jitter=0.1, seed=3))
+    rec = Telemetry()
+    blocks = []
+    for _ in range(MINUTES * 60 * FS // heart.block):
+        start, a, v = heart.step()
+        a, v = np.round(a * EGRAM_SCALE) / EGRAM_SCALE, np.round(v * EGRAM_SCALE) / EGRAM_SCALE # as decode_egram gives them
+        blocks.append(np.column_stack([a, v]))
+        rec.append_samples(start / FS + np.arange(len(a)) / FS, a, v, FS)
+    return np.concatenate(blocks), rec
+
+
+def best(fn, *args): # fastest of REPEAT runs, seconds
+    times = []
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def plain_int16(x, method): # quantized, no delta or byte planes
+    q = np.rint(x * EGRAM_SCALE).astype("<i2").tobytes()
+    return zlib.compress(q, 1) if method == "zlib" else codec.lzma.compress(q, preset=1)
+
+
+def blocks_of(x, method, level):
+    return [codec.encode(x[i:i + codec.BLOCK], method, level) for i in range(0, len(x), codec.BLOCK)]
+
+
+def table(name: str, x: np.ndarray):
+    mb = x.shape[0] * 16 / 1e6 # float64 per two-channel sample
+    seconds = x.shape[0] / FS
+    print(f"\n{name}: {x.shape[0] / 1e3:.0f} k samples x 2 ({seconds / 60:.0f} min), float64 {mb:.1f} MB")
+    print(f"{'storage':>26} {'B/sample':>9} {'ratio':>7} {'enc MB/s':>9} {'dec MB/s':>9} {'x real time':>12}")
+    t, data = best(lambda: np.asarray(x, dtype=np.float32).tobytes())
+    print(f"{'float32 array':>26} {len(data) / x.shape[0]:9.2f} {mb * 1e6 / len(data):7.1f}")
+    for method in ("zlib", "lzma"):
+        t, data = best(plain_int16, x, method)
+        print(f"{f'int16, no delta, {method}':>26} {len(data) / x.shape[0]:9.2f} {mb * 1e6 / len(data):7.1f} {mb / t:9.1f}")
+    for method, level in (("raw", 0), ("zlib", 1), ("zlib", 6), ("lzma", 1), ("lzma", 6)):
+        t_enc, blocks = best(blocks_of, x, method, level)
+        size = sum(len(b) for b in blocks)
+        t_dec, _ = best(lambda: [codec.decode(b) for b in blocks])
+        label = f"codec {method}" + (f" -{level}" if method != "raw" else "")
+        print(f"{label:>26} {size / x.shape[0]:9.2f} {mb * 1e6 / size:7.1f} {mb / t_enc:9.1f} {mb / t_dec:9.1f} {seconds / t_dec:12.0f}")
+
+
+def main():
+    t0 = time.perf_counter()
+    x, rec = simulated()
+    print(f"{MINUTES} min simulated and filtered in {time.perf_counter() - t0:.1f} s")
+    table("Simulated (wire resolution)", x)
+
+    path = os.path.join(tempfile.mkdtemp(), "recording.npz")
+    rec.save(path)
+    loaded = Telemetry()
+    loaded.load(path)
+    y = loaded.snippet(0, loaded.samples)
+    table("Recorded (filtered, from Telemetry.save)", np.column_stack(y[1:]))
+
+    e = rec.egram
+    old = os.path.join(os.path.dirname(path), "old.npz")
+    np.savez_compressed(old, time=np.asarray(e.time), atrial=np.asarray(e.atrial), ventricular=np.asarray(e.ventricular))
+    lists = sum(sys.getsizeof(v) + 24 * len(v) for v in (e.time, e.atrial, e.ventricular)) # list plus float objects
+    print(f"\nrecording on disk: {os.path.getsize(path) / 1e6:.2f} MB with codec blocks (everything), "
+          f"{os.path.getsize(old) / 1e6:.2f} MB for savez_compressed float64 time/atrial/ventricular alone")
+    print(f"in memory: {rec.history.nbytes / 1e6:.2f} MB EgramHistory, {lists / 1e6:.1f} MB as Python float lists")
+
+    live = Telemetry(live_window_s=60.0)
+    a, v = x[:, 0], x[:, 1]
+    t0 = time.perf_counter()
+    for i in range(0, len(x), 20): # live telemetry: 20 ms blocks
+        live.append_samples(np.arange(i, i + 20) / FS, a[i:i + 20], v[i:i + 20], FS)
+    per_block = (time.perf_counter() - t0) / (len(x) / 20)
+    t0 = time.perf_counter()
+    for i in range(0, len(x) - 5 * FS, 37 * FS): # episode snippets from the compressed history
+        live.snippet(i, i + 10 * FS)
+    per_snippet = (time.perf_counter() - t0) / len(range(0, len(x) - 5 * FS, 37 * FS))
+    print(f"live window 60 s: {len(live.egram.time)} samples in lists, {live.history.nbytes / 1e6:.2f} MB history; "
+          f"{per_block * 1e6:.0f} us per 20 ms block (filters and detectors included), {per_snippet * 1e3:.2f} ms per 10 s snippet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Cold cost of getting a parameter set and a histogram: the Qt-free core against going through the GUI.
+# Each run is a fresh interpreter so import costs are counted. Run: python DCM/bench/bench_core_import.py
+import os, sys, subprocess, statistics
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src") # DCM sources
+RUNS = 7
+
+CHILD = r"""
+import time, sys
+t0 = time.perf_counter()
+if sys.argv[1] == "core": # scripts and services
+    from core import params, reports
+    from core.session import Session
+    from core.telemetry import Telemetry
+    values = params.defaults("VVI")
+    counts = reports.bincount(reports.synthetic_bpm(values["LRL"], values["URL"]), reports.RATE_EDGES)
+    assert "PySide6" not in sys.modules
+else: # the only way before the core existed: build the shell and read the dashboard
+    from PySide6 import QtWidgets
+    from ui_shell import UIShell
+    app = QtWidgets.QApplication([])
+    w = UIShell()
+    values = w.dashboard_page._collect_params("VVI")
+    counts = w._bincount(w._bpm_series(), list(range(30, 190, 10)))
+print((time.perf_counter() - t0) * 1e3)
+"""
+
+
+def run(path: str) -> float: # One cold run, returns ms
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    out = subprocess.run([sys.executable, "-c", CHILD, path], cwd=SRC, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'path':>6} {'median ms':>10} {'min ms':>8}")
+    for path in ("gui", "core"):
+        times = [run(path) for _ in range(RUNS)]
+        print(f"{path:>6} {statistics.median(times):>10.1f} {min(times):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# Parameter-grid sweeps with the pacing emulator (sim.emulator) over one hour of irregular intrinsic
+# rhythm: combinations per second with one parameter set per numpy step (no vectorization), with
+# bigger vectors, and on a process pool. Run: python DCM/bench/bench_emulator.py
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import numpy as np # noqa: E402
+from sim.emulator import grid, emulate, sweep # noqa: E402
+
+
+def rhythm(seconds: float = 3600.0, seed: int = 0): # 60-90 bpm with occasional pauses, 1-6 mV R waves
+    rng = np.random.default_rng(seed)
+    rr = rng.uniform(0.65, 1.0, int(seconds / 0.8))
+    rr[rng.random(len(rr)) < 0.01] = 2.5
+    times = np.cumsum(rr)
+    return times[times < seconds], rng.uniform(1.0, 6.0, len(times))[times < seconds]
+
+
+def main():
+    times, amps = rhythm()
+    g = grid("VVI", LRL=range(40, 95, 5), VRP=range(150, 425, 25), Hys=[0, 10, 20], RS=[0, 100, 300], VS=[1, 2, 3, 4])
+    n = len(g["LRL"])
+    print(f"{len(times)} beats (1 h), {n} VVI parameter sets, {os.cpu_count()} cpu")
+    for vector in (1, 64, 512, 4096):
+        count = min(n, max(vector, 16 if vector == 1 else vector))
+        t0 = time.perf_counter()
+        for i in range(0, count, vector):
+            emulate("VVI", {k: v[i:i + vector] for k, v in g.items()}, times, amps)
+        print(f"{f'one process, {vector} per step':>28}: {count / (time.perf_counter() - t0):8.0f} sets/s")
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        _, rate = sweep("VVI", g, times, amps, workers=workers)
+        print(f"{f'pool, {workers} workers':>28}: {rate:8.0f} sets/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Episode detector (core.episodes) on a day-long beat stream with injected high-rate runs, pauses
+# and runs below LRL. Reports beats per second, how long after onset (in recording time) each kind
+# is detected, and the detector's memory at the start and end of the day. Run: python DCM/bench/bench_episodes.py
+import os, sys, time, random, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from core.episodes import EpisodeDetector, EpisodeLog, HIGH_RATE, PAUSE, LOW_RATE # noqa: E402
+
+FS = 1000
+HOURS = 24
+
+
+def day(seed: int = 0): # (beat times, injected episodes as (kind, onset time))
+    rng = random.Random(seed)
+    beats, truth, now = [], [], 0.0
+    while now < HOURS * 3600:
+        r = rng.random()
+        if r < 0.002: # high-rate run of 12-40 beats at 160-200 bpm
+            truth.append((HIGH_RATE, now))
+            rr = 60.0 / rng.uniform(160, 200)
+            for _ in range(rng.randint(12, 40)):
+                now += rr
+                beats.append(now)
+        elif r < 0.003: # pause of 2.5-4 s
+            truth.append((PAUSE, now))
+            now += rng.uniform(2.5, 4.0)
+            beats.append(now)
+        elif r < 0.004: # 20 beats at 40-50 bpm
+            truth.append((LOW_RATE, now))
+            for _ in range(20):
+                now += 60.0 / rng.uniform(40, 50)
+                beats.append(now)
+        else: # normal beat, 65-95 bpm
+            now += 60.0 / rng.uniform(65, 95)
+            beats.append(now)
+    return beats, truth
+
+
+def main():
+    beats, truth = day()
+    log = EpisodeLog()
+    det = EpisodeDetector(FS, on_episode=log.add)
+    detected = [] # (kind, recording time) whenever a kind becomes active
+    active = set()
+    tracemalloc.start()
+    start_mem = None
+    busy = worst = 0.0
+    last = 0.0
+    for i, b in enumerate(beats):
+        ticks = [b - 0.02] if b - last < 1.5 else [last + k * 0.02 for k in range(1, int((b - last) / 0.02))] # 20 ms blocks
+        for now in ticks:
+            c0 = time.perf_counter()
+            det.tick(now)
+            busy += time.perf_counter() - c0
+            if PAUSE in det.active() and PAUSE not in active:
+                detected.append((PAUSE, now))
+                active.add(PAUSE)
+        c0 = time.perf_counter()
+        det.beat(b, int(b * FS))
+        spent = time.perf_counter() - c0
+        busy += spent
+        worst = max(worst, spent)
+        now_active = set(det.active())
+        detected += [(k, b) for k in now_active - active]
+        active = now_active
+        last = b
+        if i == 1000:
+            start_mem = tracemalloc.get_traced_memory()[0]
+    elapsed = busy
+    end_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"{len(beats)} beats ({HOURS} h), detector time {elapsed:.2f} s: {len(beats) / elapsed / 1e3:.0f} k beats/s, "
+          f"worst beat {worst * 1e6:.0f} us")
+    print(f"episodes: injected {len(truth)}, logged {len(log)} "
+          + ", ".join(f"{k} {log.counts.get(k, 0)}/{sum(1 for x in truth if x[0] == k)}" for k in (HIGH_RATE, PAUSE, LOW_RATE)))
+    delays = {k: [] for k in (HIGH_RATE, PAUSE, LOW_RATE)} # onset -> first detection of that kind after it
+    for kind, onset in truth:
+        later = [at for k, at in detected if k == kind and onset <= at <= onset + 60]
+        if later:
+            delays[kind].append(later[0] - onset)
+    for kind, d in delays.items():
+        if d:
+            d.sort()
+            print(f"  {kind:>9} detected {d[len(d) // 2]:.2f} s after onset (median, recording time), max {d[-1]:.2f} s")
+    print(f"traced memory: {start_mem / 1e3:.0f} kB after 1000 beats, {end_mem / 1e3:.0f} kB at the end "
+          f"(the {len(log)} logged episodes and this script's lists included)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Cost of the two-dimensional rate histogram (core/histogram.py): what counting adds to every beat
+# and marker on the telemetry path, and what a report pays to rebin a long recording. Rebinning reads
+# the fine base grid, so its cost doesn't depend on how many beats there are; the comparison is
+# core.reports.bincount over the beat list, which the 1-D histogram still does on every report.
+# Run: python DCM/bench/bench_histogram.py [--beats 1000000]
+import os, sys, time, argparse
+
+SRC = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")) # DCM sources
+sys.path.insert(0, SRC)
+import numpy as np # noqa: E402
+
+EDGE_SETS = {"report 10 bpm": list(range(30, 190, 10)), "5 bpm": list(range(30, 185, 5)),
+             "clinical bands": [30, 50, 60, 100, 120, 150, 250]} # name -> rate edges
+
+
+def best(fn, repeat: int = 5) -> float: # fastest of repeat runs, seconds
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return min(out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rate histogram update and rebin cost")
+    ap.add_argument("--beats", type=int, default=1_000_000, help="beats in the recording (about 10 days at 70 bpm)")
+    a = ap.parse_args()
+    from core.histogram import RateHistogram
+    from core.frames import VS, VP
+    from core.reports import bincount, histogram_heat_maps
+    rng = np.random.default_rng(1)
+    bpm = np.clip(rng.normal(72, 12, a.beats), 30, 200).astype(int).tolist()
+    at = np.cumsum(60.0 / np.asarray(bpm)).tolist() # beat times, seconds
+    markers = list(zip((np.asarray(at) * 1000).astype(int).tolist(), rng.choice([VS, VP], a.beats).tolist()))
+
+    h = RateHistogram()
+    h.clock0 = time.time()
+    t0 = time.perf_counter()
+    for r, s in zip(bpm, at):
+        h.add_beat(r, s)
+    per_beat = (time.perf_counter() - t0) / a.beats
+    t0 = time.perf_counter()
+    for i in range(0, len(markers), 50): # MARKER frames carry a few dozen items
+        h.add_markers(markers[i:i + 50], 1000.0)
+    per_marker = (time.perf_counter() - t0) / a.beats
+    print(f"{a.beats} beats, {h.table('hour', [0, 300]).sum()} counted, {h.table('marker', [0, 300]).sum()} marker intervals")
+    print(f"update: {1e9 * per_beat:.0f} ns per beat, {1e9 * per_marker:.0f} ns per marker")
+
+    print(f"{'bins':>16} {'rebin ms':>9} {'bincount ms':>12} {'same':>5}")
+    for name, edges in EDGE_SETS.items():
+        fine = best(lambda: h.table("hour", edges, 2))
+        scan = best(lambda: bincount(bpm, edges), 1)
+        same = h.table("hour", edges).sum(axis=1).tolist() == bincount(bpm, edges)
+        print(f"{name:>16} {1e3 * fine:9.3f} {1e3 * scan:12.1f} {'yes' if same else 'NO':>5}")
+    print(f"heat map html: {1e3 * best(lambda: histogram_heat_maps(h)):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
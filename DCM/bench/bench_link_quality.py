@@ -0,0 +1,56 @@
+# Link-quality classifier on a scripted session: clean, borderline loss, a noise burst, heavy loss,
+# silence and recovery. Reports per-block cost and how often the pill would change with and
+# without hysteresis. Run: python DCM/bench/bench_link_quality.py
+import os, sys, time, random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from core.link_quality import LinkQuality # noqa: E402
+from sim.pacemaker import Heart, SimConfig # noqa: E402
+
+SCRIPT = [ # (seconds, frame loss, lead noise mV, what happens)
+    (10, 0.00, 0.05, "clean"),
+    (10, 0.17, 0.05, "borderline loss"),
+    (5, 0.00, 1.20, "noise burst"),
+    (5, 0.00, 0.05, "clean"),
+    (5, 0.40, 0.05, "heavy loss"),
+    (3, 1.00, 0.05, "silence"),
+    (7, 0.00, 0.05, "recovered"),
+]
+UPDATE = 0.25 # seconds between update() calls, as in DeviceBridge
+
+
+def session(q: LinkQuality):
+    heart = Heart(SimConfig(seed=3))
+    rng = random.Random(3)
+    dt = heart.block / heart.fs
+    now, seq, next_update = 0.0, 0, 0.0
+    states, cost, blocks = [], 0.0, 0
+    q.on_device("SIM0001")
+    for secs, loss, noise, _ in SCRIPT:
+        heart.cfg.noise_mv = noise
+        for _ in range(int(secs / dt)):
+            start, atrial, ventricular = heart.step()
+            if rng.random() >= loss:
+                t0 = time.perf_counter()
+                q.on_egram(seq, atrial, ventricular, heart.fs, now)
+                cost += time.perf_counter() - t0
+                blocks += 1
+            seq = (seq + 1) & 0xFFFF
+            now += dt
+            if now >= next_update:
+                states.append((round(now, 2), q.update(now)))
+                next_update += UPDATE
+    changes = [s for i, s in enumerate(states) if i == 0 or s[1] != states[i - 1][1]]
+    return changes, cost / max(blocks, 1)
+
+
+def main():
+    plain = LinkQuality("SIM0001", hold=0.0, loss_leave=0.20, snr_leave_db=20.0, wander_leave_mv=2.0, crc_leave=0.05)
+    for name, q in (("no hysteresis", plain), ("hysteresis", LinkQuality("SIM0001"))):
+        changes, per_block = session(q)
+        print(f"{name}: {len(changes) - 1} pill changes, {per_block * 1e6:.0f} us per block")
+        print("   " + " -> ".join(f"{s}@{t:g}s" for t, s in changes))
+
+
+if __name__ == "__main__":
+    main()
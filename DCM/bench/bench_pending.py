@@ -0,0 +1,78 @@
+# Air-time of queued device writes: replaying every edit made while out of range, against the
+# coalesced queue flushed as one BATCH. The queue is reloaded from disk first, as after a restart.
+# Run: python DCM/bench/bench_pending.py
+import os, sys, time, random, asyncio, tempfile, subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src") # DCM sources
+sys.path.insert(0, SRC)
+from core import frames, params, transport # noqa: E402
+from core.pending import PendingOps # noqa: E402
+from core.protocol import DeviceProtocol # noqa: E402
+
+EDITS = 40 # parameter saves while the device is out of range
+CLOCKS = 6 # clock sets in the same time
+DELAY_MS = 5 # device turnaround per command
+
+
+def clinician(queue: PendingOps, serial: str): # edits as (frame type, body), also queued
+    rng = random.Random(1)
+    edits = []
+    for i in range(EDITS):
+        mode = rng.choice(["AAI", "VVI"])
+        values = params.defaults(mode)
+        values["LRL"] = rng.randint(50, 80)
+        values["Hys"] = rng.randint(0, 10)
+        edits.append((frames.SET_PARAMS, {"mode": mode, "params": values}))
+        queue.set_params(serial, mode, values)
+        if i % (EDITS // CLOCKS) == 0:
+            iso = f"2026-10-19T10:{i:02d}:00"
+            edits.append((frames.SET_CLOCK, {"time": iso}))
+            queue.set_clock(serial, iso)
+    return edits
+
+
+async def run(path: str, work):
+    link = transport.identify(path)
+    proto = DeviceProtocol(link, window=1)
+    await proto.start()
+    t0 = time.perf_counter()
+    await work(proto)
+    wall = time.perf_counter() - t0
+    state = await proto.get_params()
+    proto.close()
+    return wall, state
+
+
+def main():
+    sim = subprocess.Popen([sys.executable, os.path.join(SRC, "sim", "pacemaker.py"), "--delay-ms", str(DELAY_MS)],
+                           stdout=subprocess.PIPE, text=True)
+    serial, path = sim.stdout.readline().split()
+    try:
+        file = os.path.join(tempfile.mkdtemp(), "pending.json")
+        edits = clinician(PendingOps(file), serial)
+        queue = PendingOps(file) # restart
+        assert queue.edits(serial) == len(edits)
+
+        async def replay(proto):
+            for ftype, body in edits:
+                await proto.request(ftype, body)
+
+        async def flush(proto):
+            await queue.flush(serial, proto)
+
+        raw_bytes = sum(len(frames.encode_json(ft, 0, b)) for ft, b in edits)
+        batch_bytes = len(frames.encode_json(frames.BATCH, 0, {"ops": queue.ops(serial)}))
+        t_replay, s_replay = asyncio.run(run(path, replay))
+        t_flush, s_flush = asyncio.run(run(path, flush))
+    finally:
+        sim.terminate()
+        sim.wait()
+    assert s_replay == s_flush, "coalesced flush must leave the device in the same state"
+    assert not queue.pending(serial) and not PendingOps(file).pending(serial)
+    print(f"{len(edits)} queued operations, {DELAY_MS} ms device turnaround")
+    print(f"{'replay':>8} {len(edits):>3} frames {raw_bytes:>6} bytes {t_replay * 1e3:>7.1f} ms")
+    print(f"{'batch':>8} {1:>3} frames {batch_bytes:>6} bytes {t_flush * 1e3:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
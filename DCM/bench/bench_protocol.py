@@ -0,0 +1,57 @@
+# Command round-trip latency and throughput of core.protocol against the simulator, stop-and-wait
+# (window 1) against pipelined windows, with and without reply loss.
+# Run: python DCM/bench/bench_protocol.py
+import os, sys, time, asyncio, subprocess, statistics
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src") # DCM sources
+sys.path.insert(0, SRC)
+from core import transport # noqa: E402
+from core.protocol import DeviceProtocol, CommandTimeout # noqa: E402
+
+COMMANDS = 400
+DELAY_MS = 5 # device turnaround per command, roughly a USB serial round trip
+
+
+def simulator(drop: float): # child process serving one device; returns (process, port path)
+    sim = subprocess.Popen([sys.executable, os.path.join(SRC, "sim", "pacemaker.py"), "--drop", str(drop),
+                            "--delay-ms", str(DELAY_MS)], stdout=subprocess.PIPE, text=True)
+    return sim, sim.stdout.readline().split()[1]
+
+
+async def run(path: str, window: int):
+    link = transport.identify(path)
+    proto = DeviceProtocol(link, window=window, timeout=0.05, retries=5)
+    await proto.start()
+    failed = 0
+
+    async def one(i):
+        nonlocal failed
+        try:
+            await proto.echo(str(i))
+        except CommandTimeout:
+            failed += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(COMMANDS)))
+    wall = time.perf_counter() - t0
+    rtt = sorted(proto.rtts)
+    proto.close()
+    return COMMANDS / wall, statistics.median(rtt) * 1e3, rtt[int(len(rtt) * 0.99) - 1] * 1e3, proto.stats["retries"], failed
+
+
+def main():
+    print(f"{COMMANDS} ECHO commands, {DELAY_MS} ms device turnaround")
+    print(f"{'loss':>5} {'window':>6} {'cmd/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'retries':>7} {'failed':>6}")
+    for drop in (0.0, 0.05):
+        for window in (1, 4, 16):
+            sim, path = simulator(drop)
+            try:
+                rate, p50, p99, retries, failed = asyncio.run(run(path, window))
+            finally:
+                sim.terminate()
+                sim.wait()
+            print(f"{drop:>5.0%} {window:>6} {rate:>8.0f} {p50:>7.1f} {p99:>7.1f} {retries:>7} {failed:>6}")
+
+
+if __name__ == "__main__":
+    main()
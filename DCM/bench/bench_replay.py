@@ -0,0 +1,147 @@
+# Whole-pipeline throughput from a recorded session: sim/replay.py plays a capture (or a Telemetry
+# .npz) on a pty in its own process and the DCM reads it the way it reads a pacemaker, through
+# transport.identify -> DeviceProtocol -> decoding, filtering, beat and episode detection, then
+# builds the rate histogram, trending and episode reports from the result. Cases are the in-process
+# link (DeviceBridge, filtering on the GUI thread) and the acquisition child (ProcessBridge, rings),
+# each at the paced speeds and at max, where the replay only sends as fast as the DCM reads.
+# Speed-up is recording seconds per wall second from STREAM on until the last sample is in the
+# recording and the reports are built; lag is how far the last sample came after its paced time.
+# Every run must end with the same beats, episodes and sample count (the digest), whatever the speed
+# or bridge. The headline is the highest speed-up at max with no sample lost.
+# Run: python DCM/bench/bench_replay.py [--source session.cap --seconds 120 --speeds 1,10,max]
+import os, sys, time, json, hashlib, argparse, tempfile, subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+SRC = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")) # DCM sources
+sys.path.insert(0, SRC)
+import numpy as np # noqa: E402
+from PySide6 import QtCore # noqa: E402
+
+STALL_S = 5.0 # no new samples for this long ends a run short
+
+
+def replay(source: str, speed: str): # replay process serving the source; returns (process, port path)
+    sim = subprocess.Popen([sys.executable, os.path.join(SRC, "sim", "replay.py"), source, "--speed", speed],
+                           stdout=subprocess.PIPE, text=True)
+    return sim, sim.stdout.readline().split()[1]
+
+
+def expected(source: str): # (samples, rate) in the EGRAM frames of a source, decoded like the DCM does
+    from core import frames
+    from sim.replay import open_source
+    decoder, samples, rate = frames.FrameDecoder(), 0, 0
+    for _, data in open_source(source)[1]:
+        for f in decoder.feed(data):
+            if f.type == frames.EGRAM:
+                _, rate, a, _ = frames.decode_egram(f.payload)
+                samples += len(a)
+    return samples, rate
+
+
+def reports(tel) -> float: # seconds to build the three telemetry reports and decode their egram
+    from core import reports as r
+    from core.session import AppInfo, Session
+    t0 = time.perf_counter()
+    app, session = AppInfo(), Session()
+    r.histogram_report(tel.bpm, app, session, paced=tel.annotations.paced_percent())
+    r.trending_report(tel.bpm, app, session)
+    _, shown = r.episode_report(tel.episodes.episodes, app, session)
+    for ep in shown:
+        tel.snippet(*ep.snippet)
+    return time.perf_counter() - t0
+
+
+def digest(tel) -> str: # what the recording turned into
+    h = hashlib.sha1(json.dumps([tel.samples, tel.bpm]).encode())
+    h.update(tel.episodes.to_json().encode())
+    return h.hexdigest()[:10]
+
+
+def run(source: str, how: str, speed: str, want: int, rate: int) -> dict:
+    from core.telemetry import Telemetry
+    tel = Telemetry(live_window_s=60.0)
+    sim, path = replay(source, speed)
+    try:
+        if how == "thread":
+            from core import transport, frames as wire
+            from utility.device_bridge import DeviceBridge
+            bridge = DeviceBridge(transport.identify(path))
+            def on_frame(f):
+                if f.type == wire.EGRAM:
+                    start, r, a, v = wire.decode_egram(f.payload)
+                    tel.append_samples((start + np.arange(len(a))) / r, a, v, r)
+                elif f.type == wire.MARKER:
+                    tel.append_markers(wire.decode_markers(f.payload))
+            bridge.stream.connect(on_frame)
+        else:
+            from utility.device_bridge import ProcessBridge
+            bridge = ProcessBridge(path, max_rate=rate)
+            tel.attach(bridge.rings)
+            bridge.samplesReady.connect(tel.pull)
+        bridge.call("stream", True).result(5.0)
+        t0 = last = time.perf_counter()
+        seen = 0
+        loop = QtCore.QEventLoop()
+        def check():
+            nonlocal seen, last
+            if tel.samples != seen:
+                seen, last = tel.samples, time.perf_counter()
+            if seen >= want or time.perf_counter() - last > STALL_S:
+                loop.quit()
+        timer = QtCore.QTimer()
+        timer.timeout.connect(check)
+        timer.start(5)
+        loop.exec()
+        timer.stop()
+        wall = last - t0 + reports(tel)
+        bridge.call("stream", False).result(2.0)
+        tel.detach()
+        bridge.close()
+    finally:
+        sim.terminate()
+        sim.wait()
+    duration = want / rate
+    paced = duration / float(speed) if speed != "max" else 0.0
+    return {"speedup": tel.samples / rate / wall, "lag": last - t0 - paced if paced else None,
+            "kept": tel.samples / want, "digest": digest(tel)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay throughput of the whole telemetry pipeline")
+    ap.add_argument("--source", help="capture or .npz recording (default: a synthetic capture)")
+    ap.add_argument("--seconds", type=float, default=120.0, help="length of the synthetic capture")
+    ap.add_argument("--rate", type=int, default=1000, help="sample rate of the synthetic capture")
+    ap.add_argument("--speeds", default="1,10,max", help="comma separated pacing factors, max for unpaced")
+    ap.add_argument("--bridges", default="thread,process", help="thread (DeviceBridge), process (ProcessBridge)")
+    a = ap.parse_args()
+    from PySide6 import QtWidgets
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([]) # noqa: F841
+    source = a.source
+    if source is None:
+        from sim.replay import synthetic_capture
+        source = os.path.join(tempfile.mkdtemp(), "synthetic.cap")
+        synthetic_capture(source, a.seconds, rate=a.rate, seed=1, intrinsic_bpm=75.0)
+    want, rate = expected(source)
+    print(f"{os.path.basename(source)}: {want / rate:.0f} s at {rate} Hz, {os.cpu_count()} cpu(s)")
+    print(f"{'bridge':>8} {'speed':>6} {'speed-up':>9} {'lag ms':>7} {'samples':>8} {'digest':>11}")
+    best, digests = {}, set()
+    for how in a.bridges.split(","):
+        for speed in a.speeds.split(","):
+            r = run(source, how, speed, want, rate)
+            digests.add(r["digest"])
+            if speed == "max" and r["kept"] >= 1.0:
+                best[how] = r["speedup"]
+            lag = "" if r["lag"] is None else f"{1e3 * r['lag']:7.0f}"
+            print(f"{how:>8} {speed:>6} {r['speedup']:8.1f}x {lag:>7} {r['kept']:8.1%} {r['digest']:>11}", flush=True)
+    print("deterministic: " + ("yes" if len(digests) == 1 else f"NO, {len(digests)} different results"))
+    for how in a.bridges.split(","):
+        if how in best:
+            print(f"max sustainable speed-up, {how}: {best[how]:.1f}x")
+        elif "max" in a.speeds.split(","):
+            print(f"max sustainable speed-up, {how}: samples lost at max, try paced speeds below it")
+
+
+if __name__ == "__main__":
+    main()
+    sys.stdout.flush()
+    os._exit(0) # skip Qt teardown
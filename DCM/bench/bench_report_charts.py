@@ -0,0 +1,48 @@
+# Render time and PDF size of the egram report charts against recording length.
+# Run from anywhere: python DCM/bench/bench_report_charts.py
+import os, sys, time, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src")) # DCM sources
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # no display needed
+
+import numpy as np
+from PySide6 import QtWidgets, QtGui
+from dialogs.report_charts import EgramStrip, TrendChart, chart_placeholder, install_charts
+from dialogs.report_preview import write_pdf
+
+RATE = 100.0 # Hz, same as EgramData.sampling_rate
+LENGTHS = [1_000, 10_000, 100_000, 1_000_000, int(24 * 3600 * RATE)] # up to a 24 hour trace
+
+
+def synthetic(n: int): # Noisy sine pair standing in for a recording
+    t = np.arange(n) / RATE
+    rng = np.random.default_rng(0)
+    atrial = np.sin(2 * np.pi * 1.2 * t) + 0.05 * rng.standard_normal(n)
+    vent = np.sin(2 * np.pi * 1.2 * t + 0.6) + 0.05 * rng.standard_normal(n)
+    return t, atrial, vent
+
+
+def run(n: int, out_dir: str): # Build, render and measure one report
+    t, a, v = synthetic(n)
+    bpm = (70 + 10 * np.sin(np.arange(n // 50 or 1) / 200)).astype(int)
+    start = time.perf_counter()
+    doc = QtGui.QTextDocument()
+    doc.setHtml(f"<h3>Egram</h3><p>{chart_placeholder('egram')}</p><p>{chart_placeholder('trend')}</p>")
+    install_charts(doc, {"egram": EgramStrip(t, a, v), "trend": TrendChart(bpm)})
+    built = time.perf_counter()
+    fn = os.path.join(out_dir, f"report_{n}.pdf")
+    write_pdf(doc, fn)
+    done = time.perf_counter()
+    return {"samples": n, "build_ms": (built - start) * 1e3, "render_ms": (done - built) * 1e3, "pdf_kb": os.path.getsize(fn) / 1024}
+
+
+def main():
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    with tempfile.TemporaryDirectory() as out_dir:
+        print(f"{'samples':>10} {'build ms':>10} {'render ms':>10} {'pdf KiB':>9}")
+        for n in LENGTHS:
+            r = run(n, out_dir)
+            print(f"{r['samples']:>10} {r['build_ms']:>10.1f} {r['render_ms']:>10.1f} {r['pdf_kb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
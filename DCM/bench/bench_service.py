@@ -0,0 +1,197 @@
+# Load test for main.py --service: a headless shell with live telemetry serves a swarm of clinic
+# scripts from a second process, each on one kept-alive connection calling status, sessions.list,
+# params.get/set and reports.generate back to back, while other clients hold /egram subscriptions.
+# The shell side is what a clinic would run: telemetry blocks arrive every 20 ms on the GUI thread
+# (as the device bridge delivers them) and the service hands its calls to the same thread. Reported:
+# requests per second, client-side latency percentiles, errors, egram lines each subscriber got
+# and lost, and the GUI thread's frame jitter (lateness of the 20 ms telemetry timer) idle and under
+# load. The number that matters is the jitter under load: the service may be slow, the GUI may not.
+# Run: python DCM/bench/bench_service.py [--clients 100 --subscribers 8 --seconds 10]
+import os, sys, json, time, random, asyncio, argparse, tempfile, subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+SRC = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")) # DCM sources
+sys.path.insert(0, SRC)
+
+BLOCK_MS = 20 # telemetry block period
+MIX = [("status", {}, 40), ("sessions.list", {"limit": 20}, 20), ("params.get", {"mode": "VVI"}, 20),
+       ("params.set", {"mode": "VVI", "params": {"LRL": 60, "URL": 120}}, 10),
+       ("reports.generate", {"kind": "brady"}, 5), ("reports.generate", {"kind": "histogram"}, 5)] # (method, params, weight)
+
+
+def percentiles(xs, ps=(50, 99)): # of a list, in ms
+    import numpy as np
+    return [1e3 * float(np.percentile(xs, p)) if len(xs) else 0.0 for p in ps] + [1e3 * max(xs, default=0.0)]
+
+
+# --- client process -------------------------------------------------------------
+
+async def http(reader, writer, verb: str, path: str, body: bytes = b"", token: str = "") -> bytes: # one request on a kept-alive connection
+    auth = f"Authorization: Bearer {token}\r\n" if token else ""
+    writer.write(f"{verb} {path} HTTP/1.1\r\nHost: dcm\r\n{auth}Content-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    return await reader.readexactly(length)
+
+
+async def rpc(reader, writer, method: str, params: dict, token: str = "") -> dict:
+    body = json.dumps({"jsonrpc": "2.0", "method": method, "params": params, "id": 1}).encode()
+    return json.loads(await http(reader, writer, "POST", "/rpc", body, token))
+
+
+async def client(host: str, port: int, until: float, latencies: list, errors: list, seed: int):
+    rng = random.Random(seed)
+    methods, weights = [(m, p) for m, p, _ in MIX], [w for *_, w in MIX]
+    reader, writer = await asyncio.open_connection(host, port)
+    token = (await rpc(reader, writer, "login", {"username": "bench", "password": "password"}))["result"]["token"]
+    while time.perf_counter() < until:
+        method, params = rng.choices(methods, weights)[0]
+        t0 = time.perf_counter()
+        reply = await rpc(reader, writer, method, params, token)
+        latencies.append(time.perf_counter() - t0)
+        if "error" in reply:
+            errors.append(f"{method}: {reply['error']['message']}")
+    writer.close()
+
+
+async def subscriber(host: str, port: int, until: float, counts: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    token = (await rpc(reader, writer, "login", {"username": "bench", "password": "password"}))["result"]["token"]
+    writer.write(f"GET /egram HTTP/1.1\r\nHost: dcm\r\nAuthorization: Bearer {token}\r\n\r\n".encode())
+    await reader.readuntil(b"\r\n\r\n")
+    lines = lost = samples = 0
+    while time.perf_counter() < until:
+        try:
+            size = int(await asyncio.wait_for(reader.readline(), max(0.01, until - time.perf_counter())), 16)
+        except asyncio.TimeoutError:
+            break
+        line = json.loads((await reader.readexactly(size + 2))[:-2])
+        lines, lost, samples = lines + 1, lost + line.get("lost", 0), samples + len(line["atrial"])
+    counts.append((lines, lost, samples))
+    writer.close()
+
+
+async def swarm(host: str, port: int, clients: int, subscribers: int, seconds: float) -> dict:
+    latencies, errors, counts = [], [], []
+    until = time.perf_counter() + seconds
+    await asyncio.gather(*[client(host, port, until, latencies, errors, i) for i in range(clients)],
+                         *[subscriber(host, port, until, counts) for _ in range(subscribers)])
+    return {"latencies": latencies, "errors": errors, "subscribers": counts}
+
+
+def client_main(address: str, clients: int, subscribers: int, seconds: float): # --swarm: print a summary as one JSON line
+    host, port = address.rpartition("/")[2].split(":")
+    t0 = time.perf_counter()
+    r = asyncio.run(swarm(host, int(port), clients, subscribers, seconds))
+    print(json.dumps({"wall": time.perf_counter() - t0, "requests": len(r["latencies"]), "latency": percentiles(r["latencies"]),
+                      "errors": len(r["errors"]), "messages": sorted(set(r["errors"]))[:5], "subscribers": r["subscribers"]}), flush=True)
+
+
+# --- shell process --------------------------------------------------------------
+
+def shell_main(a):
+    import numpy as np
+    from PySide6 import QtCore, QtWidgets
+    work = tempfile.mkdtemp()
+    os.chdir(work) # saved_Params.txt is written to the working directory
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    from dialogs.report_preview import ReportPreview
+    from core.users import UserStore
+    from core.pending import PendingOps
+    from core.archive import SessionArchive
+    from core.audit import AuditLog
+    from core.transport import ConnectionPool
+    from sim.pacemaker import Heart, SimConfig
+    from ui_shell import UIShell
+    from utility.service import ShellService
+    ReportPreview.exec = lambda self: 0
+    QtWidgets.QMessageBox.question = staticmethod(lambda *args, **kw: QtWidgets.QMessageBox.Yes)
+    QtWidgets.QMessageBox.information = staticmethod(lambda *args, **kw: QtWidgets.QMessageBox.Ok)
+
+    shell = UIShell()
+    shell._user_store = UserStore(os.path.join(work, "users.json"))
+    shell._pending_ops = PendingOps(os.path.join(work, "pending.json"))
+    shell._archive = SessionArchive(os.path.join(work, "archive"))
+    shell._audit = AuditLog(os.path.join(work, "audit.log"))
+    shell._link_pool = ConnectionPool(os.path.join(work, "ports.json"), ports=lambda: []) # login looks for a pacemaker; find none
+    shell.user_store.register("bench", "password")
+    for i in range(200): # some history for sessions.list
+        shell.archive.finish(shell.archive.begin(f"PM-{i % 7:04d}", "PM-SIM", "bench"))
+    shell.handle_login("bench", "password")
+    shell.goto(shell.dashboard_page)
+
+    heart = Heart(SimConfig(mode="VVI", intrinsic_bpm=72, seed=1))
+    for _ in range(30 * 1000 // BLOCK_MS): # half a minute already recorded, so reports have beats
+        start, x, v = heart.step()
+        shell.telemetry.append_samples(start / 1000 + np.arange(len(x)) / 1000, x, v, 1000)
+    frames, last = [], [time.perf_counter()]
+    def block(): # one telemetry block, as the bridge would deliver it; its lateness is the GUI's jitter
+        now = time.perf_counter()
+        frames.append(now - last[0] - BLOCK_MS / 1000)
+        last[0] = now
+        start, x, v = heart.step()
+        shell.telemetry.append_samples(start / 1000 + np.arange(len(x)) / 1000, x, v, 1000)
+    timer = QtCore.QTimer()
+    timer.setTimerType(QtCore.Qt.PreciseTimer)
+    timer.timeout.connect(block)
+    timer.start(BLOCK_MS)
+
+    def run_for(seconds: float):
+        loop = QtCore.QEventLoop()
+        QtCore.QTimer.singleShot(int(seconds * 1000), loop.quit)
+        loop.exec()
+
+    service = ShellService(shell, "127.0.0.1:0").start()
+    run_for(a.seconds) # idle: telemetry and the publish timer only
+    idle = list(frames)
+    swarm = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--swarm", service.service.address,
+                              "--clients", str(a.clients), "--subscribers", str(a.subscribers), "--seconds", str(a.seconds)],
+                             stdout=subprocess.PIPE, text=True)
+    frames.clear()
+    last[0] = time.perf_counter()
+    done = QtCore.QTimer()
+    done.timeout.connect(lambda: swarm.poll() is not None and loop.quit())
+    loop = QtCore.QEventLoop()
+    done.start(50)
+    loop.exec()
+    done.stop()
+    timer.stop()
+    loaded = list(frames)
+    r = json.loads(swarm.stdout.read())
+    stats = dict(service.service.stats)
+    service.close()
+
+    n = r["requests"]
+    print(f"{a.clients} clients, {a.subscribers} egram subscribers, {a.seconds:g} s, {os.cpu_count()} cpu(s)")
+    print(f"requests: {n} in {r['wall']:.1f} s = {n / r['wall']:.0f}/s, errors {r['errors']}")
+    p50, p99, top = r["latency"]
+    print(f"latency ms: p50 {p50:.1f}  p99 {p99:.1f}  max {top:.1f}")
+    for i, (lines, lost, samples) in enumerate(r["subscribers"]):
+        print(f"egram subscriber {i}: {lines} lines, {samples} samples, {lost} lines lost")
+    print(f"service: {stats['connections']} connections, {stats['published']} lines published, {stats['dropped']} dropped")
+    print(f"{'GUI frame lateness ms':>22} {'p50':>6} {'p99':>6} {'max':>6}")
+    for name, xs in (("idle", idle), ("under load", loaded)):
+        p50, p99, top = percentiles(xs)
+        print(f"{name:>22} {p50:6.2f} {p99:6.2f} {top:6.2f}")
+    for e in r["messages"]:
+        print("error: " + e)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test of the DCM's local service")
+    ap.add_argument("--clients", type=int, default=100, help="JSON-RPC clients, one connection each")
+    ap.add_argument("--subscribers", type=int, default=8, help="egram stream clients")
+    ap.add_argument("--seconds", type=float, default=10.0, help="length of the idle and the loaded phase")
+    ap.add_argument("--swarm", metavar="ADDRESS", help=argparse.SUPPRESS) # the client process
+    a = ap.parse_args()
+    if a.swarm:
+        client_main(a.swarm, a.clients, a.subscribers, a.seconds)
+    else:
+        shell_main(a)
+
+
+if __name__ == "__main__":
+    main()
+    sys.stdout.flush()
+    os._exit(0) # skip Qt teardown
@@ -0,0 +1,62 @@
+# Load harness: N simulated pacemakers streaming egrams at a given rate, read back over their ptys.
+# The simulator runs in its own process; this one opens every port, decodes every frame and checks
+# that no samples go missing. Run: python DCM/bench/bench_simulator.py --devices 16 --rate 1000 --duration 3600
+import os, sys, time, argparse, selectors, subprocess, resource
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src") # DCM sources
+sys.path.insert(0, SRC)
+from core import frames, transport # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--devices", type=int, default=16)
+    ap.add_argument("--rate", type=int, default=1000)
+    ap.add_argument("--duration", type=float, default=10.0)
+    a = ap.parse_args()
+
+    sim = subprocess.Popen([sys.executable, os.path.join(SRC, "sim", "pacemaker.py"), "--devices", str(a.devices),
+                            "--rate", str(a.rate), "--stream", "--duration", str(a.duration + 1)],
+                           stdout=subprocess.PIPE, text=True)
+    ports = [sim.stdout.readline().split()[1] for _ in range(a.devices)]
+
+    sel = selectors.DefaultSelector()
+    state = {}
+    for p in ports:
+        port = transport.open_port(p, timeout=0)
+        sel.register(port.fileno(), selectors.EVENT_READ, p)
+        state[p] = {"port": port, "dec": frames.FrameDecoder(), "next": None, "samples": 0, "gaps": 0, "markers": 0}
+
+    t0 = time.monotonic()
+    cpu0 = time.process_time()
+    while time.monotonic() - t0 < a.duration:
+        for key, _ in sel.select(0.1):
+            s = state[key.data]
+            for f in s["dec"].feed(os.read(key.fd, 65536)):
+                if f.type == frames.EGRAM:
+                    start, rate, atrial, ventricular = frames.decode_egram(f.payload)
+                    if s["next"] is not None and start != s["next"]:
+                        s["gaps"] += 1
+                    s["next"] = start + len(atrial)
+                    s["samples"] += len(atrial)
+                elif f.type == frames.MARKER:
+                    s["markers"] += len(frames.decode_markers(f.payload))
+    wall = time.monotonic() - t0
+    cpu = time.process_time() - cpu0
+
+    samples = sum(s["samples"] for s in state.values())
+    gaps = sum(s["gaps"] for s in state.values())
+    crc = sum(s["dec"].crc_errors for s in state.values())
+    beats = sum(s["markers"] for s in state.values())
+    for s in state.values():
+        s["port"].close()
+    sim.wait()
+    print(sim.stdout.read().strip()[:200])
+    want = a.devices * a.rate * wall
+    print(f"{a.devices} devices x {a.rate} Hz for {wall:.0f} s")
+    print(f"samples read {samples} of ~{want:.0f} ({samples / want:.1%}), gaps {gaps}, crc errors {crc}, markers {beats}")
+    print(f"reader cpu {cpu / wall:.1%}, max rss {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Time-to-first-window of the DCM shell, lazy (current) against building every page and form up front.
+# Each run is a fresh interpreter so import costs are counted. Run: python DCM/bench/bench_startup.py
+import os, sys, subprocess, statistics
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src") # DCM sources
+RUNS = 5
+
+CHILD = r"""
+import time, sys
+t0 = time.perf_counter()
+from PySide6 import QtWidgets, QtCore
+from ui_shell import UIShell
+app = QtWidgets.QApplication([])
+w = UIShell()
+if sys.argv[1] == "eager": # what the shell used to do before the first frame
+    for p in (w.welcome_page, w.login_page, w.register_page, w.dashboard_page):
+        pass
+    for i in range(4):
+        w.dashboard_page._ensure_form(i)
+    w.user_store
+w.show()
+QtCore.QTimer.singleShot(0, app.quit) # first timer after the window is painted
+app.exec()
+print((time.perf_counter() - t0) * 1e3)
+"""
+
+
+def run(mode: str) -> float: # One cold start, returns ms to first window
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    out = subprocess.run([sys.executable, "-c", CHILD, mode], cwd=SRC, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'mode':>6} {'median ms':>10} {'min ms':>8}")
+    for mode in ("eager", "lazy"):
+        times = [run(mode) for _ in range(RUNS)]
+        print(f"{mode:>6} {statistics.median(times):>10.1f} {min(times):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Widget construction/polish time and status-pill update cost with the application theme.
+# Run: python DCM/bench/bench_theme.py [path/to/DCM/src]
+# Pass an older checkout's DCM/src to get the per-widget stylesheet numbers for comparison.
+import os, sys, time, statistics
+SRC = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, os.path.abspath(SRC)) # DCM sources
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen") # no display needed
+
+from PySide6 import QtWidgets
+RUNS = 10
+SWITCHES = 2000
+
+
+def build_pages(app): # Construct every page (and every dashboard form) and polish it on screen
+    from page_welcome import WelcomePage
+    from page_login import LoginPage
+    from page_register import RegisterPage
+    from page_dashboard import DashboardPage
+    start = time.perf_counter()
+    pages = [WelcomePage(), LoginPage(), RegisterPage(), DashboardPage()]
+    dash = pages[-1]
+    for i in range(4): # show every form, older trees built them eagerly
+        dash.stack.setCurrentIndex(i)
+        if hasattr(dash, "_ensure_form"):
+            dash._ensure_form(i)
+    built = time.perf_counter()
+    for p in pages:
+        p.show() # polish happens on show
+        p.ensurePolished()
+    app.processEvents()
+    done = time.perf_counter()
+    for p in pages:
+        p.close()
+        p.deleteLater()
+    app.processEvents()
+    return (built - start) * 1e3, (done - built) * 1e3
+
+
+def status_switches(app, use_theme: bool) -> float: # Cost of one status pill change in microseconds
+    label = QtWidgets.QLabel("Disconnected")
+    label.setObjectName("statusPill")
+    label.show()
+    colors = ["rgba(52, 199, 89, 0.2)", "rgba(255, 59, 48, 0.2)", "rgba(255, 159, 10, 0.2)", "rgba(10, 132, 255, 0.2)"]
+    states = ["connected", "out-of-range", "noise", "different-device"]
+    if use_theme:
+        from utility import theme
+    start = time.perf_counter()
+    for i in range(SWITCHES):
+        if use_theme:
+            theme.set_status(label, states[i % 4])
+        else: # the old way: a fresh stylesheet string per change
+            label.setStyleSheet(f"#statusPill {{ padding:4px 10px; border-radius:0px; color:white; "
+                                f"background:{colors[i % 4]}; border:1px solid rgba(255,255,255,0.35); }}")
+        app.processEvents()
+    took = time.perf_counter() - start
+    label.deleteLater()
+    return took / SWITCHES * 1e6
+
+
+def main():
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    themed = True
+    try:
+        from utility import theme
+        theme.apply(app)
+    except ImportError: # tree from before the theme module
+        themed = False
+    build_pages(app) # warm up imports
+    runs = [build_pages(app) for _ in range(RUNS)]
+    print(f"tree: {os.path.abspath(SRC)} ({'app theme' if themed else 'per-widget stylesheets'})")
+    print(f"construct pages  median {statistics.median(r[0] for r in runs):7.1f} ms")
+    print(f"polish + show    median {statistics.median(r[1] for r in runs):7.1f} ms")
+    print(f"status change (setStyleSheet)   {status_switches(app, False):7.1f} us")
+    if themed:
+        print(f"status change (theme property)  {status_switches(app, True):7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Frame time of an egram chart zoomed from 2 s to 8 h of a 1 kHz recording (28.8 M samples),
+# served from the min/max tile pyramid (core.tiles) against min/max decimating the raw samples.
+# A frame is the envelope for 600 columns plus painting it into an image. Run: python DCM/bench/bench_tiles.py
+import os, sys, time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import numpy as np # noqa: E402
+from PySide6 import QtCore, QtGui # noqa: E402
+from core.decimate import minmax_decimate # noqa: E402
+from core.tiles import TilePyramid # noqa: E402
+
+FS = 1000
+HOURS = 8
+COLUMNS = 600
+SPANS = [2, 10, 60, 600, 3600, HOURS * 3600] # seconds on screen
+
+
+def recording(n: int) -> np.ndarray: # a 75 bpm beat shape with noise and slow wander
+    rng = np.random.default_rng(0)
+    tt = np.arange(800) / FS
+    beat = 8 * np.exp(-((tt - 0.1) / 0.008) ** 2) + 0.6 * np.exp(-((tt - 0.35) / 0.04) ** 2)
+    x = np.tile(beat, n // len(beat) + 1)[:n].astype(np.float32)
+    x += rng.normal(0, 0.05, n).astype(np.float32)
+    x += (0.3 * np.sin(2 * np.pi * np.arange(n) / (FS * 40))).astype(np.float32)
+    return x
+
+
+def frame(image: QtGui.QImage, xs: np.ndarray, ys: np.ndarray): # paint one envelope
+    image.fill(0xFFFFFF)
+    p = QtGui.QPainter(image)
+    x0, x1 = float(xs[0]), float(xs[-1]) or 1.0
+    lo, hi = float(ys.min()), float(ys.max())
+    px = (xs - x0) * (COLUMNS / ((x1 - x0) or 1.0))
+    py = 100 - (ys - lo) * (100 / ((hi - lo) or 1.0))
+    p.drawPolyline(QtGui.QPolygonF([QtCore.QPointF(a, b) for a, b in zip(px.tolist(), py.tolist())]))
+    p.end()
+
+
+def main():
+    _app = QtGui.QGuiApplication([])
+    image = QtGui.QImage(COLUMNS, 100, QtGui.QImage.Format_RGB32)
+    n = HOURS * 3600 * FS
+    x = recording(n)
+
+    pyramid = TilePyramid()
+    t0 = time.perf_counter()
+    for i in range(0, n, FS): # built as it arrives, a second at a time here
+        pyramid.append(x[i:i + FS])
+    build = time.perf_counter() - t0
+    live = TilePyramid()
+    t0 = time.perf_counter()
+    for i in range(0, 60 * FS, 20): # live telemetry: 20 ms blocks
+        live.append(x[i:i + 20])
+    per_block = (time.perf_counter() - t0) / (60 * FS / 20)
+    size = sum(len(b) for level in pyramid.levels for b in level.tiles)
+    print(f"{n / 1e6:.1f} M samples: pyramid built in {build:.1f} s, {size / 1e6:.1f} MB of tiles "
+          f"(raw float32 {n * 4 / 1e6:.0f} MB); {per_block * 1e6:.0f} us per live 20 ms block")
+
+    rng = np.random.default_rng(1)
+    frame(image, *minmax_decimate(np.arange(2 * FS), x[:2 * FS], COLUMNS)) # warm up the painter
+    print(f"{'span':>8} {'level':>6} {'pyramid ms':>11} {'raw ms':>8}")
+    for span in SPANS:
+        pans = [int(rng.integers(0, n - span * FS + 1)) for _ in range(20)]
+        pyramid.cache.clear() # cold for the first frame of every span
+        t0 = time.perf_counter()
+        for i0 in pans:
+            frame(image, *pyramid.view(i0, i0 + span * FS, COLUMNS, x))
+        tiles = (time.perf_counter() - t0) / len(pans)
+        reps = pans[:3] if span > 600 else pans # the raw path takes seconds per frame when zoomed out
+        t0 = time.perf_counter()
+        for i0 in reps:
+            frame(image, *minmax_decimate(np.arange(i0, i0 + span * FS, dtype=np.float64), x[i0:i0 + span * FS], COLUMNS))
+        raw = (time.perf_counter() - t0) / len(reps)
+        level = pyramid.level_for(span * FS, COLUMNS) + 1
+        print(f"{span:>7}s {level:>6} {tiles * 1e3:>11.2f} {raw * 1e3:>8.2f}")
+    print(f"tile cache: {pyramid.hits} hits, {pyramid.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
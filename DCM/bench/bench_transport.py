@@ -0,0 +1,83 @@
+# Device discovery and reconnect cost of core.transport against pty stand-ins (POSIX only).
+# Some ptys answer the identify handshake after a short delay, the rest stay silent like unrelated
+# serial devices. Run: python DCM/bench/bench_transport.py
+import os, sys, time, select, tempfile, threading, statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from core import transport # noqa: E402
+
+DEVICES = 4 # ptys that answer like a pacemaker
+SILENT = 4 # ptys that never answer
+REPLY_DELAY = 0.02 # seconds a stand-in takes to answer IDENT
+RUNS = 20
+
+
+class StandIn(threading.Thread): # Answers IDENT on the master side of a pty
+    def __init__(self, serial):
+        super().__init__(daemon=True)
+        self.master, slave = os.openpty()
+        self.path = os.ttyname(slave)
+        self.slave = slave # kept open so the pty stays valid
+        self.serial = serial
+        self.start()
+
+    def run(self):
+        buf = b""
+        while True:
+            select.select([self.master], [], [])
+            try:
+                buf += os.read(self.master, 256)
+            except OSError:
+                return
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                if line.strip() == transport.IDENT.strip() and self.serial:
+                    time.sleep(REPLY_DELAY)
+                    os.write(self.master, f"PACE SIM {self.serial}\n".encode())
+
+
+def ms(fn, runs=RUNS) -> float: # median wall time of fn() in ms
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(times)
+
+
+def main():
+    stands = [StandIn(f"PM{i:04d}") for i in range(DEVICES)] + [StandIn(None) for _ in range(SILENT)]
+    paths = [s.path for s in stands]
+    cache = os.path.join(tempfile.mkdtemp(), "ports.json")
+
+    def sequential(): # one port after another, what a naive open/identify loop does
+        for p in paths:
+            link = transport.identify(p)
+            if link:
+                link.close()
+
+    def concurrent(): # pool discovery on a fresh pool
+        pool = transport.ConnectionPool(cache_path=None, ports=lambda: paths)
+        assert len(pool.discover()) == DEVICES
+        pool.close_all()
+
+    pool = transport.ConnectionPool(cache_path=cache, ports=lambda: paths)
+    pool.discover()
+
+    def pooled(): # a command wants the link that is already open
+        assert pool.get("PM0002").alive
+
+    def reconnect(): # link dropped, cached port tried first
+        pool.drop("PM0002")
+        assert pool.get("PM0002").alive
+
+    print(f"{DEVICES} devices + {SILENT} silent ports, IDENT reply delay {REPLY_DELAY * 1e3:.0f} ms")
+    print(f"{'sequential probe':>20} {ms(sequential, 3):>9.1f} ms")
+    print(f"{'concurrent discover':>20} {ms(concurrent, 5):>9.1f} ms")
+    print(f"{'reconnect (cached)':>20} {ms(reconnect):>9.2f} ms")
+    print(f"{'pooled get':>20} {ms(pooled, 1000) * 1e3:>9.1f} us")
+    pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Soak test for long clinic sessions: drives the shell headless through login -> some telemetry
+# -> saving parameters -> every report -> new patient -> logout, over and over, and checks that memory
+# stays flat once the first cycles have built the pages and caches. Samples come from the same
+# utility.memwatch code as main.py --memory; after the warm-up, Python heap growth per cycle, QObject
+# counts under the shell and open file descriptors must not keep climbing. Fails with status 1 and
+# prints where the growth was allocated. Run: python DCM/bench/soak.py [--cycles 60 --warmup 20]
+import os, sys, argparse, tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")))
+import numpy as np # noqa: E402
+from PySide6 import QtWidgets # noqa: E402
+
+BLOCKS = 20 * 50 # 20 seconds of 20 ms telemetry blocks per patient
+HEAP_KB_PER_CYCLE = 16.0 # allowed traced growth per cycle after the warm-up (sqlite row caches, interned strings)
+
+
+def wait(app, ms: int): # let the toolbar animations finish and deleteLater() run
+    from PySide6 import QtCore
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(ms, loop.quit)
+    loop.exec()
+    app.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    app.processEvents()
+
+
+def cycle(app, shell, i: int):
+    from sim.pacemaker import Heart, SimConfig
+    from core import params
+    shell.handle_login("soak", "password")
+    wait(app, 400)
+    shell.goto(shell.dashboard_page)
+    heart = Heart(SimConfig(mode="VVI", intrinsic_bpm=50 + i % 40, seed=i))
+    for _ in range(BLOCKS):
+        start, a, v = heart.step()
+        shell.telemetry.append_samples(start / 1000 + np.arange(len(a)) / 1000, a, v, 1000)
+    for mode, values in (("VVI", {"LRL": 60 + i % 10, "URL": 120, "VentAmp": 3.5, "VentPW": 0.4, "VRP": 320}),
+                         ("AAI", {"LRL": 65, "URL": 120, "AtrialAmp": 3.5, "AtrialPW": 0.4, "ARP": 250})):
+        assert params.validate(mode, values)[0], values # the full, valid sets the dashboard saves
+        shell._on_params_saved(mode, params.normalize(mode, values))
+    shell.open_brady_params_report()
+    shell.open_temporary_params_report()
+    shell.open_rate_histogram_report()
+    shell.open_trending_report()
+    shell.open_episode_report()
+    shell.new_patient()
+    shell.handle_logout()
+    wait(app, 600)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="DCM memory soak test")
+    ap.add_argument("--cycles", type=int, default=60, help="measured cycles after the warm-up")
+    ap.add_argument("--warmup", type=int, default=20, help="cycles before the first sample")
+    ap.add_argument("--every", type=int, default=10, help="cycles between samples")
+    a = ap.parse_args(argv)
+
+    work = tempfile.mkdtemp()
+    os.chdir(work) # saved_Params.txt is written to the working directory
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    from dialogs.report_preview import ReportPreview
+    from core.users import UserStore
+    from core.pending import PendingOps
+    from core.archive import SessionArchive
+    from core.audit import AuditLog
+    from core.transport import ConnectionPool
+    from ui_shell import UIShell
+    from utility.memwatch import MemoryWatch, report
+    ReportPreview.exec = lambda self: 0 # build the preview and its charts, don't block on it
+    QtWidgets.QMessageBox.question = staticmethod(lambda *args, **kw: QtWidgets.QMessageBox.Yes)
+    QtWidgets.QMessageBox.information = staticmethod(lambda *args, **kw: QtWidgets.QMessageBox.Ok)
+    QtWidgets.QMessageBox.warning = staticmethod(lambda *args, **kw: QtWidgets.QMessageBox.Ok)
+
+    shell = UIShell()
+    shell._user_store = UserStore(os.path.join(work, "users.json"))
+    shell._pending_ops = PendingOps(os.path.join(work, "pending.json"))
+    shell._archive = SessionArchive(os.path.join(work, "archive"))
+    shell._audit = AuditLog(os.path.join(work, "audit.log"))
+    shell._link_pool = ConnectionPool(os.path.join(work, "ports.json"), ports=lambda: []) # login searches for a device; no ports here
+    shell.user_store.register("soak", "password")
+
+    for i in range(a.warmup):
+        cycle(app, shell, i)
+    shell.audit.flush()
+    watch = MemoryWatch(shell, path=None)
+    watch.start()
+    first = watch.sample()
+    print(f"{'cycle':>6} {'traced KiB':>11} {'rss KiB':>9} {'fds':>5} {'qobjects':>9}")
+    print(f"{a.warmup:6d} {first['traced_kb']:11d} {first['rss_kb'] or 0:9d} {first['fds'] or 0:5d} {first['qobjects']['shell']:9d}")
+    for i in range(a.warmup, a.warmup + a.cycles):
+        cycle(app, shell, i)
+        if (i - a.warmup + 1) % a.every == 0:
+            shell.audit.flush()
+            s = watch.sample()
+            print(f"{i + 1:6d} {s['traced_kb']:11d} {s['rss_kb'] or 0:9d} {s['fds'] or 0:5d} {s['qobjects']['shell']:9d}", flush=True)
+    shell.audit.flush()
+    watch.stop()
+    last = watch.samples[-1]
+
+    per_cycle = (last["traced_kb"] - first["traced_kb"]) / a.cycles
+    failures = []
+    if per_cycle > HEAP_KB_PER_CYCLE:
+        failures.append(f"Python heap grew {per_cycle:.1f} KiB per cycle (limit {HEAP_KB_PER_CYCLE})")
+    for name, n in last["qobjects"].items():
+        if n > first["qobjects"].get(name, 0):
+            failures.append(f"{name}: {first['qobjects'].get(name, 0)} -> {n} QObjects")
+    if (last["fds"] or 0) > (first["fds"] or 0):
+        failures.append(f"open files: {first['fds']} -> {last['fds']}")
+
+    print(f"\n{a.cycles} cycles after {a.warmup} warm-up: {per_cycle:+.2f} KiB traced per cycle, "
+          f"rss {first['rss_kb']} -> {last['rss_kb']} KiB, fds {first['fds']} -> {last['fds']}")
+    print("growth since the first sample:\n" + report(last))
+    for f in failures:
+        print("FAIL: " + f)
+    if not failures:
+        print("memory flat")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    os._exit(code) # skip Qt teardown
@@ -0,0 +1,270 @@
+# Headless benchmark suite for the DCM's data and report hot paths, no device needed. Each case times
+# one call of a small function (best of a few repeats, calls per repeat chosen like timeit.autorange),
+# results are written to JSON and compared against a stored baseline; a case slower than the baseline
+# by more than the tolerance (re-measured a few times at the end, to rule out a busy moment of the
+# machine) is a regression and the run exits with status 1. The baseline is only meaningful on the machine that recorded it; record a
+# new one with --save (best of a few --runs) when the machine changes.
+#   python DCM/bench/suite.py                          run everything, compare with bench/baseline.json
+#   python DCM/bench/suite.py --save DCM/bench/baseline.json --runs 3
+#   python DCM/bench/suite.py -k report --json out.json --tolerance 0.5
+import os, sys, time, json, argparse, platform, tempfile, fnmatch
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+CASES = {} # name -> setup(); setup returns the zero-argument function that is timed
+SIZES = [1_000, 10_000, 100_000, 1_000_000] # bpm series lengths
+ROWS = [10, 100, 1000] # parameter table rows
+USERS = [10, 100, 500] # UserStore sizes
+_qt = {} # QApplication and a UIShell, created by the first case that needs them
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def app():
+    if "app" not in _qt:
+        from PySide6 import QtWidgets
+        _qt["app"] = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    return _qt["app"]
+
+
+def shell():
+    if "shell" not in _qt:
+        app()
+        from ui_shell import UIShell
+        _qt["shell"] = UIShell()
+    return _qt["shell"]
+
+
+def series(n: int):
+    from core.reports import synthetic_bpm
+    return synthetic_bpm(60, 120, n)
+
+
+# --- cases ----------------------------------------------------------------------------------
+
+for _n in SIZES:
+    @case(f"bincount/{_n}")
+    def _(n=_n):
+        from core.reports import RATE_EDGES
+        bpm, s = series(n), shell()
+        return lambda: s._bincount(bpm, RATE_EDGES)
+
+for _n in SIZES:
+    @case(f"trend_averages/{_n}")
+    def _(n=_n):
+        from core.reports import trend_averages
+        bpm = series(n)
+        return lambda: trend_averages(bpm)
+
+for _n in ROWS:
+    @case(f"table_from_kv/{_n}")
+    def _(n=_n):
+        kv, s = {f"Param{i}": i * 0.5 for i in range(n)}, shell()
+        return lambda: s._table_from_kv(kv)
+
+for _n in ROWS:
+    @case(f"diff_table/{_n}")
+    def _(n=_n):
+        before = {f"Param{i}": i for i in range(n)}
+        after = {k: v + (i % 3 == 0) for i, (k, v) in enumerate(before.items())}
+        s = shell()
+        return lambda: s._diff_table(before, after)
+
+
+def _pdf(build):
+    from dialogs.report_preview import ReportPreview, write_pdf
+    out = os.path.join(tempfile.mkdtemp(), "report.pdf")
+    def run():
+        html, charts = build()
+        preview = ReportPreview(html, None, charts)
+        write_pdf(preview.doc, out)
+        preview.deleteLater()
+    return run
+
+
+@case("report_pdf/brady")
+def _():
+    from core import reports, params
+    s = shell()
+    values = params.normalize("VVI", {})
+    return _pdf(lambda: (reports.brady_report("VVI", values, s.app_info, s.session), None))
+
+
+@case("report_pdf/trending")
+def _():
+    from core import reports
+    from dialogs.report_charts import TrendChart, EgramStrip
+    import numpy as np
+    s, bpm = shell(), series(10_000)
+    t = np.arange(60_000) / 1000.0
+    a, v = np.sin(2 * np.pi * 1.2 * t), np.cos(2 * np.pi * 1.2 * t)
+    def build():
+        html, avgs = reports.trending_report(bpm, s.app_info, s.session)
+        return html, {"trend": TrendChart(bpm, avgs), "egram": EgramStrip(t, a, v)}
+    return _pdf(build)
+
+
+for _n in USERS:
+    @case(f"users/register/{_n}")
+    def _(n=_n): # n registrations into an empty store
+        from core.users import UserStore
+        d = tempfile.mkdtemp()
+        def run():
+            store = UserStore(os.path.join(d, "users.json"), max_users=n)
+            store._users = []
+            for i in range(n):
+                store.register(f"user{i:04d}", "password")
+        return run
+
+for _n in USERS:
+    @case(f"users/login/{_n}")
+    def _(n=_n): # the last user of a full store, the slowest to find
+        from core.users import UserStore
+        store = UserStore(os.path.join(tempfile.mkdtemp(), "users.json"), max_users=n)
+        for i in range(n):
+            store.register(f"user{i:04d}", "password")
+        return lambda: store.check_credentials(f"user{n - 1:04d}", "password")
+
+
+@case("egram/append_clear/60s")
+def _(): # one minute at 1 kHz in 20 ms blocks, then clear
+    from core.egram import EgramData
+    e = EgramData()
+    block = [0.1 * i for i in range(20)]
+    def run():
+        for k in range(3000):
+            e.time.extend(block)
+            e.atrial.extend(block)
+            e.ventricular.extend(block)
+        e.clear()
+    return run
+
+
+@case("telemetry/append_samples/20ms")
+def _(): # one block through filters, beat and episode detection, tiles and the compressed history
+    import numpy as np
+    from core.telemetry import Telemetry
+    tel = Telemetry(live_window_s=60.0)
+    x = np.sin(np.arange(20) / 3.0)
+    state = {"t": 0.0}
+    def run():
+        tel.append_samples(state["t"] + np.arange(20) / 1000.0, x, x, 1000.0)
+        state["t"] += 0.02
+    return run
+
+
+@case("dashboard/reset_all")
+def _(): # with every mode's form visited, as after a full programming session
+    from page_dashboard import DashboardPage
+    qt = app()
+    page = DashboardPage()
+    def run():
+        for i in range(len(page.mode_buttons)):
+            page._ensure_form(i)
+        page.reset_all()
+        qt.processEvents() # the old forms are deleted later
+    return run
+
+
+# --- runner ---------------------------------------------------------------------------------
+
+def measure(fn, repeat: int = 5, min_time: float = 0.05) -> float: # best seconds per call
+    fn() # warm up: imports, caches, first allocation
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        took = time.perf_counter() - t0
+        if took >= min_time or number >= 1 << 20:
+            break
+        number *= 10 if took < min_time / 10 else 2
+    best = took / number
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def _unit(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list: # names slower than baseline * (1 + tolerance)
+    return [name for name, seconds in results.items()
+            if baseline.get(name) is not None and seconds > baseline[name] * (1.0 + tolerance)]
+
+
+def _row(name: str, seconds: float, baseline: dict, tolerance: float):
+    base = baseline.get(name)
+    change = f"{100 * (seconds / base - 1):+7.0f}%" if base else ""
+    flag = "  REGRESSION?" if compare({name: seconds}, baseline, tolerance) else ""
+    print(f"{name:<32} {_unit(seconds)} {_unit(base) if base else '':>11} {change:>8}{flag}", flush=True)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="DCM benchmark suite")
+    ap.add_argument("-k", dest="pattern", default="*", help="run cases whose name matches this glob (substring if no wildcard)")
+    ap.add_argument("--json", help="write the results here")
+    ap.add_argument("--save", help="write the results as a new baseline here")
+    ap.add_argument("--baseline", default=BASELINE, help="compare against this file (default bench/baseline.json)")
+    ap.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown before a case fails (0.3 = 30%%)")
+    ap.add_argument("--repeat", type=int, default=5, help="timed repeats per measurement, the best one counts")
+    ap.add_argument("--runs", type=int, default=1, help="measure every case this many times and keep the best")
+    a = ap.parse_args(argv)
+
+    pattern = a.pattern if any(c in a.pattern for c in "*?[") else f"*{a.pattern}*"
+    names = [n for n in CASES if fnmatch.fnmatch(n, pattern)]
+    baseline = {}
+    if not a.save and os.path.exists(a.baseline):
+        with open(a.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    results, fns = {}, {}
+    print(f"{'case':<32} {'time':>11} {'baseline':>11} {'change':>8}")
+    for name in names:
+        fns[name] = CASES[name]()
+        results[name] = min(measure(fns[name], a.repeat) for _ in range(a.runs))
+        _row(name, results[name], baseline, a.tolerance)
+    for _ in range(3): # re-measure suspects a little later, a busy moment of the machine passes
+        slower = compare(results, baseline, a.tolerance)
+        if not slower:
+            break
+        print(f"re-checking {len(slower)} case(s)", flush=True)
+        time.sleep(1.0)
+        for name in slower:
+            results[name] = min(results[name], measure(fns[name], a.repeat))
+            _row(name, results[name], baseline, a.tolerance)
+
+    doc = {"meta": {"date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                    "machine": platform.machine(), "system": platform.platform(), "cpus": os.cpu_count()},
+           "results": results}
+    for path in filter(None, (a.json, a.save)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+    slower = compare(results, baseline, a.tolerance)
+    if slower:
+        print(f"{len(slower)} regression(s) beyond {a.tolerance:.0%}: {', '.join(slower)}")
+        return 1
+    if baseline:
+        print(f"no regressions against {a.baseline} ({len(set(results) & set(baseline))} cases compared)")
+    return 0
+
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    os._exit(code) # skip Qt teardown of the widgets the cases left behind
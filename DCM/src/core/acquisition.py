@@ -0,0 +1,240 @@
+import asyncio, os, threading, time # standard libraries
+import multiprocessing as mp # the acquisition child
+import typing as t # for type hints
+import numpy as np
+from core.ring import SampleRing # shared-memory sample rings
+
+# Telemetry acquisition in a child process. The child owns the serial link and its DeviceProtocol,
+# decodes EGRAM/MARKER frames, runs the filter bank and the beat detector, and writes the results to
+# shared-memory rings, so none of that work holds the GUI process' GIL:
+#     egram    time, filtered atrial, filtered ventricular (one column per sample)
+#     beats    ring position of each detected R wave
+#     markers  device sample and code of each pace/sense marker
+# Commands (programming, set clock, batches) go to the child over a pipe and their replies come
+# back the same way. The parent side (Acquisition) owns the rings, so they outlive a child: if the
+# child exits, or stops updating the heartbeat in the egram ring for stall_s, it is killed and a new
+# one is started after a short backoff; the new child reopens the port and carries on writing where
+# the old one stopped. The child is spawned, never forked, so it starts without the GUI's Qt state.
+
+EGRAM, BEATS, MARKERS = "egram", "beats", "markers"
+HEARTBEAT_S = 0.1 # child: seconds between heartbeats
+STATUS_S = 0.25 # child: seconds between link quality updates, as in DeviceBridge
+
+
+# --- child ---------------------------------------------------------------------
+
+class _Acquirer: # Everything that runs in the child process
+    def __init__(self, port: str, specs: dict, conn, expected_serial: t.Optional[str], chains: t.Optional[dict],
+                 protocol_args: dict):
+        self.port, self.conn = port, conn
+        self.rings = {name: SampleRing.attach(spec) for name, spec in specs.items()}
+        self.expected_serial, self.chains, self.protocol_args = expected_serial, chains, protocol_args
+        self.filters = self.beats = None # core.filters.FilterBank and core.beats.BeatDetector for the stream's rate
+        self._offset = 0 # ring position of the first sample the current filters saw
+        self._shown = None # last link state sent to the parent
+        self.protocol = self.quality = None
+        self.status = 0 # exit status: 0 stopped by the parent, 2 link lost
+
+    def send(self, *msg): # loop only; the command thread just receives
+        try:
+            self.conn.send(msg)
+        except (OSError, EOFError): # parent is gone
+            self.stop.set()
+
+    async def main(self) -> int:
+        from core import transport
+        from core.protocol import DeviceProtocol
+        from core.link_quality import LinkQuality
+        self.loop, self.stop = asyncio.get_running_loop(), asyncio.Event()
+        self.rings[EGRAM].claim()
+        link = transport.identify(self.port)
+        if link is None:
+            self.send("error", f"No pacemaker answered on {self.port}.")
+            return 1
+        self.quality = LinkQuality(self.expected_serial or link.device.serial)
+        self.quality.on_device(link.device.serial)
+        self.protocol = DeviceProtocol(link, on_stream=self._on_stream, on_lost=self._lost, **self.protocol_args)
+        await self.protocol.start()
+        self.send("device", link.device)
+        threading.Thread(target=self._commands, name="dcm-acquisition-commands", daemon=True).start()
+        self._heartbeat()
+        self._status()
+        await self.stop.wait()
+        self.protocol.close()
+        link.close()
+        return self.status
+
+    def _commands(self): # thread: the pipe is read here, the work is done on the loop
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (OSError, EOFError):
+                msg = ("stop",)
+            if msg[0] == "stop":
+                self.loop.call_soon_threadsafe(self.stop.set)
+                return
+            self.loop.call_soon_threadsafe(self._call, *msg[1:])
+
+    def _call(self, rid: int, name: str, args: tuple):
+        fut = asyncio.ensure_future(getattr(self.protocol, name)(*args))
+        fut.add_done_callback(lambda f: self._reply(rid, name, f))
+
+    def _reply(self, rid: int, name: str, fut):
+        try:
+            result = fut.result()
+        except Exception as e:
+            self.send("reply", rid, False, str(e))
+            return
+        if name == "identify": # the device on the link may have been swapped
+            self.quality.on_device(result.get("serial"))
+        self.send("reply", rid, True, result)
+
+    def _on_stream(self, f): # loop: decode, measure, filter, detect, publish
+        from core import frames
+        now = time.monotonic()
+        if f.type == frames.EGRAM:
+            start, rate, atrial, ventricular = frames.decode_egram(f.payload)
+            self.quality.on_egram(f.seq, atrial, ventricular, rate, now)
+            self._egram(start, float(rate), atrial, ventricular)
+        else:
+            self.quality.on_frame(f.seq, now)
+            if f.type == frames.MARKER:
+                markers = frames.decode_markers(f.payload)
+                if markers:
+                    self.rings[MARKERS].write(np.asarray(markers, dtype=np.float64).T)
+
+    def _egram(self, start: int, rate: float, atrial, ventricular):
+        ring = self.rings[EGRAM]
+        if self.filters is None or self.filters.fs != rate:
+            from core.filters import FilterBank
+            from core.beats import BeatDetector
+            self.filters, self.beats = FilterBank(rate, self.chains), BeatDetector(rate)
+            self._offset = ring.head
+            ring.rate = rate
+        out = self.filters.process(atrial=atrial, ventricular=ventricular)
+        times = (start + np.arange(len(atrial))) / rate
+        ring.write(np.vstack((times, out["atrial"], out["ventricular"])))
+        beats = self.beats.process(out["ventricular"], start)
+        if beats: # after the samples they point into, so a reader never sees a beat ahead of its egram
+            self.rings[BEATS].write(np.asarray(beats, dtype=np.float64) + self._offset)
+
+    def _lost(self, error: Exception):
+        self.quality.on_closed()
+        self.status = 2
+        self.send("lost", str(error))
+        self.loop.call_soon_threadsafe(self.stop.set)
+
+    def _heartbeat(self):
+        self.rings[EGRAM].beat()
+        self.loop.call_later(HEARTBEAT_S, self._heartbeat)
+
+    def _status(self):
+        from core.link_quality import TEXT
+        state = self.quality.update(time.monotonic(), self.protocol.decoder.crc_errors)
+        if state != self._shown:
+            self._shown = state
+            self.send("status", TEXT[state], state)
+        self.loop.call_later(STATUS_S, self._status)
+
+
+def run(port: str, specs: dict, conn, expected_serial: t.Optional[str] = None, chains: t.Optional[dict] = None,
+        **protocol_args): # Child process entry point
+    code = asyncio.run(_Acquirer(port, specs, conn, expected_serial, chains, protocol_args).main())
+    conn.close()
+    os._exit(code) # the rings belong to the parent; nothing here to clean up
+
+
+# --- parent --------------------------------------------------------------------
+
+class Acquisition: # Rings plus a supervised acquisition child for one device port
+    def __init__(self, port: str, expected_serial: t.Optional[str] = None, live_window_s: float = 60.0,
+                 max_rate: float = 1000.0, stall_s: float = 2.0, startup_s: float = 15.0,
+                 chains: t.Optional[dict] = None, **protocol_args):
+        self.port, self.expected_serial, self.chains, self.protocol_args = port, expected_serial, chains, protocol_args
+        self.live = int(live_window_s * max_rate) # samples a reader shows
+        self.rings = {EGRAM: SampleRing(3, self.live + int(2 * max_rate)), # 2 s slack, the reader never looks at samples being overwritten
+                      BEATS: SampleRing(1, 4096), MARKERS: SampleRing(2, 8192)}
+        self.stall_s, self.startup_s = stall_s, startup_s
+        self.process: t.Optional[mp.process.BaseProcess] = None
+        self.device = None # core.session.DeviceId the first child identified, see wait_ready()
+        self.conn = None # parent end of the command pipe of the current child
+        self.restarts = 0 # children started after the first one
+        self._failures = 0 # children in a row that died soon after starting, for the backoff
+        self._started = 0.0
+        self._generation = 0 # egram ring generation before the current child claimed it
+        self._retry_at: t.Optional[float] = None # when the next child may start
+
+    def start(self):
+        ctx = mp.get_context("spawn") # a forked child would inherit the GUI's threads and Qt state
+        self.conn, child = ctx.Pipe()
+        self._generation = self.rings[EGRAM].generation
+        self.process = ctx.Process(target=run, name="dcm-acquisition", daemon=True,
+                                   args=(self.port, {k: r.spec() for k, r in self.rings.items()}, child,
+                                         self.expected_serial, self.chains), kwargs=self.protocol_args)
+        self.process.start()
+        child.close()
+        self._started = time.monotonic()
+        self._retry_at = None
+
+    def wait_ready(self, timeout: float = 15.0): # Block until the first child has identified the device; no Qt, any thread
+        if not self.conn.poll(timeout): # spawn, imports and the identify handshake
+            self.close()
+            raise ConnectionError(f"Acquisition process didn't start on {self.port}.")
+        msg = self.conn.recv()
+        if msg[0] != "device":
+            self.close()
+            raise ConnectionError(msg[-1])
+        self.device = msg[1]
+        return self.device
+
+    @property
+    def alive(self) -> bool: return self.process is not None and self.process.is_alive()
+
+    def stalled(self) -> bool: # running but not beating
+        ring = self.rings[EGRAM]
+        if ring.generation == self._generation: # not attached yet: spawn, imports and the handshake
+            return time.monotonic() - self._started > self.startup_s
+        return ring.heartbeat_age() > self.stall_s
+
+    def check(self) -> t.Optional[str]: # Supervise; returns what happened ("restarted" or why the child went down) or None
+        if self.process is None:
+            return None
+        now = time.monotonic()
+        if self._retry_at is None:
+            if self.alive and not self.stalled():
+                return None
+            reason = "stalled" if self.alive else f"exited with status {self.process.exitcode}"
+            self._kill()
+            self._failures = 0 if now - self._started > 30.0 else self._failures + 1 # a child that ran a while isn't a crash loop
+            self._retry_at = now + min(0.25 * 2 ** self._failures, 5.0) # retry soon, then back off to every 5 s
+            return reason
+        if now < self._retry_at:
+            return None
+        self.restarts += 1
+        self.start()
+        return "restarted"
+
+    def _kill(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+        if self.process is not None:
+            self.process.join(1.0)
+
+    def stop(self): # Ask the child to close the link and exit
+        if self.process is None:
+            return
+        try:
+            self.conn.send(("stop",))
+        except (OSError, EOFError, AttributeError):
+            pass
+        self.process.join(2.0)
+        self._kill()
+        self.process = None
+
+    def close(self):
+        self.stop()
+        for ring in self.rings.values():
+            ring.close()
@@ -0,0 +1,134 @@
+import typing as t # for type hints
+import numpy as np
+from core.frames import AS, AP, VS, VP # marker codes of the MARKER frames
+
+# Pace/sense markers and refractory windows for a recording, kept next to EgramData. Every kind has
+# its own column: start and end times (seconds, end == start for point events) in sorted numpy
+# arrays plus a running maximum of the ends. With that, "events in [t0, t1]" is two binary searches
+# and a slice, O(log n + k), and counting a kind over a range (percentage paced) is O(log n) without
+# touching the events at all. Markers arrive in time order, so appends are amortised O(1); a late
+# event is merged into the tail.
+
+ARP, VRP = 5, 6 # atrial/ventricular refractory windows
+KINDS = {AS: "AS", AP: "AP", VS: "VS", VP: "VP", ARP: "ARP", VRP: "VRP"}
+REFRACTORY = {AS: ("ARP", ARP), AP: ("ARP", ARP), VS: ("VRP", VRP), VP: ("VRP", VRP)} # marker -> (parameter, window kind)
+
+
+class _Column: # One kind of event, sorted by start time
+    def __init__(self):
+        self.start = np.empty(64)
+        self.end = np.empty(64)
+        self.max_end = np.empty(64) # max(end[:i+1]), non-decreasing, for the lower bound of overlap queries
+        self.n = 0
+
+    def _grow(self, need: int):
+        if need > len(self.start):
+            size = max(need, 2 * len(self.start))
+            for name in ("start", "end", "max_end"):
+                old = getattr(self, name)
+                new = np.empty(size)
+                new[:self.n] = old[:self.n]
+                setattr(self, name, new)
+
+    def extend(self, start: np.ndarray, end: np.ndarray):
+        n, m = self.n, len(start)
+        if not m:
+            return
+        order = np.argsort(start, kind="stable")
+        start, end = start[order], end[order]
+        self._grow(n + m)
+        i = int(np.searchsorted(self.start[:n], start[0], side="right")) # only the tail from here moves
+        if i < n: # late events, merge them into the tail
+            s = np.concatenate([self.start[i:n], start])
+            e = np.concatenate([self.end[i:n], end])
+            order = np.argsort(s, kind="stable")
+            start, end = s[order], e[order]
+        self.start[i:n + m], self.end[i:n + m] = start, end
+        np.maximum.accumulate(end, out=self.max_end[i:n + m])
+        if i:
+            np.maximum(self.max_end[i:n + m], self.max_end[i - 1], out=self.max_end[i:n + m])
+        self.n = n + m
+
+    def span(self, t0: float, t1: float) -> t.Tuple[int, int]: # index range of the events that may overlap [t0, t1]
+        lo = int(np.searchsorted(self.max_end[:self.n], t0, side="left")) # everything before ends before t0
+        hi = int(np.searchsorted(self.start[:self.n], t1, side="right")) # everything after starts after t1
+        return lo, max(lo, hi)
+
+    def query(self, t0: float, t1: float) -> t.Tuple[np.ndarray, np.ndarray]: # (start, end) of events overlapping [t0, t1]
+        lo, hi = self.span(t0, t1)
+        s, e = self.start[lo:hi], self.end[lo:hi]
+        keep = e >= t0 # drops a short event that sits behind a longer one; windows are all about as long
+        return s[keep], e[keep]
+
+    def count(self, t0: float, t1: float) -> int: # events starting in [t0, t1]
+        s = self.start[:self.n]
+        return int(np.searchsorted(s, t1, side="right") - np.searchsorted(s, t0, side="left"))
+
+
+class AnnotationStore:
+    def __init__(self):
+        self.columns = {kind: _Column() for kind in KINDS}
+
+    def __len__(self) -> int:
+        return sum(c.n for c in self.columns.values())
+
+    def clear(self):
+        self.columns = {kind: _Column() for kind in KINDS}
+
+    def add(self, kind: int, start: t.Sequence[float], end: t.Optional[t.Sequence[float]] = None): # Events of one kind
+        start = np.asarray(start, dtype=float).ravel()
+        end = start if end is None else np.asarray(end, dtype=float).ravel()
+        self.columns[kind].extend(start, end)
+
+    def add_markers(self, markers: t.Iterable[t.Tuple[int, int]], rate: float,
+                    refractory_ms: t.Optional[t.Dict[str, float]] = None): # MARKER frame items (sample, code)
+        # refractory_ms, e.g. {"ARP": 250, "VRP": 320}, also adds the window each event starts.
+        times: t.Dict[int, t.List[float]] = {}
+        for sample, code in markers:
+            if code in REFRACTORY:
+                times.setdefault(code, []).append(sample / rate)
+        windows: t.Dict[int, t.List[float]] = {}
+        for code, ts in times.items():
+            self.add(code, ts)
+            param, window = REFRACTORY[code]
+            if refractory_ms and refractory_ms.get(param):
+                windows.setdefault(window, []).extend(ts)
+        for window, ts in windows.items(): # sensed and paced events start the same window, add them in one go
+            start = np.asarray(ts)
+            length = refractory_ms["ARP" if window == ARP else "VRP"] / 1000.0
+            self.add(window, start, start + length)
+
+    def query(self, t0: float, t1: float, kinds: t.Optional[t.Iterable[int]] = None) -> t.Dict[int, t.Tuple[np.ndarray, np.ndarray]]:
+        # {kind: (start, end)} of the events overlapping [t0, t1], e.g. the part of the egram on screen
+        return {kind: self.columns[kind].query(t0, t1) for kind in (kinds or KINDS)}
+
+    def counts(self, t0: float = -np.inf, t1: float = np.inf) -> t.Dict[str, int]: # {"AS": n, ...} for events starting in [t0, t1]
+        return {name: self.columns[kind].count(t0, t1) for kind, name in KINDS.items()}
+
+    def paced_percent(self, t0: float = -np.inf, t1: float = np.inf) -> t.Dict[str, t.Optional[float]]:
+        # Share of paced events per chamber, None where the chamber had no events
+        c = self.counts(t0, t1)
+        out = {}
+        for chamber, paced, sensed in (("atrial", "AP", "AS"), ("ventricular", "VP", "VS")):
+            total = c[paced] + c[sensed]
+            out[chamber] = 100.0 * c[paced] / total if total else None
+        return out
+
+    # --- persistence, stored in the same .npz as the recording ---------------
+
+    def to_arrays(self, prefix: str = "ann_") -> t.Dict[str, np.ndarray]:
+        out = {}
+        for kind, name in KINDS.items():
+            c = self.columns[kind]
+            out[f"{prefix}{name}_start"] = c.start[:c.n].copy()
+            out[f"{prefix}{name}_end"] = c.end[:c.n].copy()
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str = "ann_") -> "AnnotationStore":
+        store = cls()
+        for kind, name in KINDS.items():
+            key = f"{prefix}{name}_start"
+            if key in arrays:
+                store.add(kind, arrays[key], arrays[f"{prefix}{name}_end"])
+        return store
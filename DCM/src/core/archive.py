@@ -0,0 +1,184 @@
+from dataclasses import dataclass # for easy data storage
+from datetime import datetime # session times
+import json, os, sqlite3, zlib # standard libraries
+import typing as t # for type hints
+
+ARCHIVE_PATH = os.path.join(os.path.dirname(__file__), "..", "archive") # default archive directory
+
+# Every interrogation session, kept after new_patient() starts the next one. Metadata lives in one
+# SQLite file (archive.db): a row per session with the device, user, start/end and a few counts, plus
+# the parameter sets programmed and the reports generated. The recording itself is a Telemetry.save
+# .npz under recordings/, named by session id. Listing filters on indexed columns and never touches
+# the recordings; ArchivedSession loads its parameters, reports and recording only when asked for.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    device_serial TEXT NOT NULL DEFAULT '',
+    device_model TEXT NOT NULL DEFAULT '',
+    user TEXT NOT NULL DEFAULT '',
+    started TEXT NOT NULL,
+    ended TEXT,
+    samples INTEGER NOT NULL DEFAULT 0,
+    episodes INTEGER NOT NULL DEFAULT 0,
+    recording TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_device ON sessions (device_serial, started, device_model); -- covers devices()
+CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user, started);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started);
+CREATE TABLE IF NOT EXISTS params (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    at TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    params TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS params_session ON params (session_id);
+CREATE TABLE IF NOT EXISTS reports (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    at TEXT NOT NULL,
+    name TEXT NOT NULL,
+    html BLOB NOT NULL -- zlib
+);
+CREATE INDEX IF NOT EXISTS reports_session ON reports (session_id);
+"""
+COLUMNS = "id, device_serial, device_model, user, started, ended, samples, episodes, recording"
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+@dataclass # one row of the session list
+class SessionRecord:
+    id: int
+    device_serial: str
+    device_model: str
+    user: str
+    started: str # ISO time
+    ended: t.Optional[str] # None while the session is open
+    samples: int # egram samples in the recording
+    episodes: int
+    recording: t.Optional[str] # file name under recordings/, None without egram data
+
+
+class ArchivedSession: # An old session; only the metadata row is read until something else is asked for
+    def __init__(self, archive: "SessionArchive", record: SessionRecord):
+        self.archive = archive
+        self.record = record
+        self._telemetry = None
+
+    @property
+    def params(self) -> t.List[t.Tuple[str, str, dict]]: # (time, mode, parameters) in the order they were saved
+        rows = self.archive.db.execute("SELECT at, mode, params FROM params WHERE session_id = ? ORDER BY rowid",
+                                       (self.record.id,))
+        return [(at, mode, json.loads(p)) for at, mode, p in rows]
+
+    @property
+    def reports(self) -> t.List[t.Tuple[str, str]]: # (time, report name), without the html
+        return self.archive.db.execute("SELECT at, name FROM reports WHERE session_id = ? ORDER BY rowid",
+                                       (self.record.id,)).fetchall()
+
+    def report_html(self, index: int) -> str: # html of the index-th report
+        row = self.archive.db.execute("SELECT html FROM reports WHERE session_id = ? ORDER BY rowid LIMIT 1 OFFSET ?",
+                                      (self.record.id, index)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else ""
+
+    @property
+    def telemetry(self): # core.telemetry.Telemetry with the recording, loaded on first use
+        if self._telemetry is None:
+            from core.telemetry import Telemetry
+            self._telemetry = Telemetry()
+            if self.record.recording:
+                self._telemetry.load(os.path.join(self.archive.recordings, self.record.recording))
+        return self._telemetry
+
+
+class SessionArchive:
+    def __init__(self, path: str = ARCHIVE_PATH):
+        self.path = os.path.abspath(path)
+        self.recordings = os.path.join(self.path, "recordings")
+        os.makedirs(self.recordings, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(self.path, "archive.db"))
+        self.db.execute("PRAGMA journal_mode = WAL") # a crash loses at most the last write
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # --- writing, as the session goes on -------------------------------------
+
+    def begin(self, device_serial: str = "", device_model: str = "", user: str = "", started: t.Optional[str] = None) -> int:
+        with self.db:
+            cur = self.db.execute("INSERT INTO sessions (device_serial, device_model, user, started) VALUES (?, ?, ?, ?)",
+                                  (device_serial, device_model, user, started or _now()))
+        return cur.lastrowid
+
+    def set_device(self, session_id: int, serial: str, model: str): # The link identified the device
+        with self.db:
+            self.db.execute("UPDATE sessions SET device_serial = ?, device_model = ? WHERE id = ?", (serial, model, session_id))
+
+    def add_params(self, session_id: int, mode: str, params: dict):
+        with self.db:
+            self.db.execute("INSERT INTO params VALUES (?, ?, ?, ?)", (session_id, _now(), mode, json.dumps(params)))
+
+    def add_report(self, session_id: int, name: str, html: str):
+        with self.db:
+            self.db.execute("INSERT INTO reports VALUES (?, ?, ?, ?)", (session_id, _now(), name, zlib.compress(html.encode("utf-8"))))
+
+    def finish(self, session_id: int, telemetry=None): # Close the session, saving its recording if it has one
+        recording, samples, episodes = None, 0, 0
+        if telemetry is not None and telemetry.samples:
+            recording = f"{session_id:06d}.npz"
+            telemetry.save(os.path.join(self.recordings, recording))
+            samples, episodes = telemetry.samples, len(telemetry.episodes)
+        with self.db:
+            self.db.execute("UPDATE sessions SET ended = ?, samples = ?, episodes = ?, recording = ? WHERE id = ?",
+                            (_now(), samples, episodes, recording, session_id))
+
+    def delete(self, session_id: int):
+        record = self.get(session_id)
+        if record is None:
+            return
+        with self.db:
+            self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        if record.recording:
+            try:
+                os.remove(os.path.join(self.recordings, record.recording))
+            except FileNotFoundError:
+                pass
+
+    # --- reading --------------------------------------------------------------
+
+    def _where(self, device: t.Optional[str], user: t.Optional[str], since: t.Optional[str], until: t.Optional[str]):
+        clauses, args = [], []
+        for clause, value in (("device_serial = ?", device), ("user = ?", user), ("started >= ?", since), ("started < ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                args.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+    def sessions(self, device: t.Optional[str] = None, user: t.Optional[str] = None, since: t.Optional[str] = None,
+                 until: t.Optional[str] = None, limit: int = 100, offset: int = 0) -> t.List[SessionRecord]:
+        # Newest first, filtered by device serial, user and start time (ISO strings compare in time order)
+        where, args = self._where(device, user, since, until)
+        rows = self.db.execute(f"SELECT {COLUMNS} FROM sessions{where} ORDER BY started DESC, id DESC LIMIT ? OFFSET ?",
+                               args + [limit, offset])
+        return [SessionRecord(*row) for row in rows]
+
+    def count(self, device: t.Optional[str] = None, user: t.Optional[str] = None, since: t.Optional[str] = None,
+              until: t.Optional[str] = None) -> int:
+        where, args = self._where(device, user, since, until)
+        return self.db.execute(f"SELECT COUNT(*) FROM sessions{where}", args).fetchone()[0]
+
+    def devices(self) -> t.List[t.Tuple[str, str, int]]: # (serial, model, sessions) of every device seen
+        return self.db.execute("SELECT device_serial, MAX(device_model), COUNT(*) FROM sessions "
+                               "GROUP BY device_serial ORDER BY device_serial").fetchall()
+
+    def get(self, session_id: int) -> t.Optional[SessionRecord]:
+        row = self.db.execute(f"SELECT {COLUMNS} FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return SessionRecord(*row) if row else None
+
+    def open(self, session_id: int) -> t.Optional[ArchivedSession]: # metadata now, the rest on first use
+        record = self.get(session_id)
+        return ArchivedSession(self, record) if record else None
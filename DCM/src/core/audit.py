@@ -0,0 +1,127 @@
+import atexit, hashlib, json, os, threading, time # standard libraries
+from collections import deque # lock-free handoff to the writer
+import typing as t # for type hints
+
+AUDIT_PATH = os.path.join(os.path.dirname(__file__), "..", "audit.log") # default log file path
+GENESIS = "0" * 64 # previous hash of the first record
+
+# Append-only audit trail of logins, programming and reports. record() only appends a tuple to a
+# deque (atomic in CPython, no lock and no I/O on the caller's thread); a background writer wakes
+# every interval_ms, takes everything queued, writes it in one go and fsyncs once per batch, so the
+# cost of the disk sync is shared by all the records of the batch. Each line is
+#   <sha256 hex> <json>
+# where the hash is sha256(previous hash + json), so editing, removing or reordering any line breaks
+# every hash after it. verify() recomputes the chain without parsing the json.
+
+
+def _hash(prev: str, body: bytes) -> str:
+    return hashlib.sha256(prev.encode("ascii") + body).hexdigest()
+
+
+def _tail(path: str) -> t.Tuple[int, str, int]: # (last sequence number, last hash, end of the last whole line) of an existing log
+    # Reads back from the end, twice as far each time, until the last record is complete: records have
+    # no size limit. Only bytes after the last newline are ever cut, never a record that was written.
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0, GENESIS, 0
+    with f:
+        base = f.seek(0, os.SEEK_END)
+        data, step = b"", 65536
+        while True:
+            if base:
+                step = min(step, base)
+                base -= step
+                f.seek(base)
+                data = f.read(step) + data
+                step *= 2
+            end = data.rfind(b"\n") + 1 # a line without its newline was torn by a crash and never synced
+            e = end
+            while e:
+                start = data.rfind(b"\n", 0, e - 1) + 1
+                if not start and base: # the line may begin before what has been read
+                    break
+                digest, _, body = data[start:e - 1].partition(b" ")
+                try:
+                    return json.loads(body)["seq"], digest.decode("ascii"), base + end
+                except (ValueError, KeyError):
+                    e = start # not a record, try the one before
+            if not base:
+                return 0, GENESIS, end
+
+
+class AuditLog:
+    def __init__(self, path: str = AUDIT_PATH, interval_ms: float = 50.0):
+        self.path = os.path.abspath(path)
+        self.interval = interval_ms / 1000.0
+        self._queue: deque = deque() # (time, user, action, data) from any thread
+        self._seq, self._prev, self._end = _tail(self.path)
+        self._wake = threading.Event() # set by flush()/close() to write without waiting for the interval
+        self._closed = False
+        self.batches = 0 # batches written (each one fsync)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, action: str, user: str = "", **data): # Queue one event; returns at once
+        self._queue.append((time.time(), user, action, data))
+
+    def _write(self, f) -> int: # Everything queued so far as one batch; returns records written
+        lines, waiting = [], []
+        while self._queue:
+            item = self._queue.popleft()
+            if isinstance(item, threading.Event): # a flush() waiting for everything queued before it
+                waiting.append(item)
+                continue
+            at, user, action, data = item
+            self._seq += 1
+            body = json.dumps({"seq": self._seq, "time": round(at, 6), "user": user, "action": action, "data": data},
+                              separators=(",", ":"), sort_keys=True, default=str).encode("utf-8")
+            self._prev = _hash(self._prev, body)
+            lines.append(self._prev.encode("ascii") + b" " + body + b"\n")
+        if lines:
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno()) # group commit: one sync for the whole batch
+            self.batches += 1
+        for done in waiting:
+            done.set()
+        return len(lines)
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.truncate(self._end) # drop a torn record left by a crash
+            while True:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                closing = self._closed
+                self._write(f)
+                if closing:
+                    return
+
+    def flush(self, timeout: float = 5.0): # Wait until everything recorded so far is on disk
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.append(done)
+        self._wake.set()
+        done.wait(timeout)
+
+    def close(self): # Write what is left and stop the writer
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(5.0)
+
+
+def verify(path: str = AUDIT_PATH) -> t.Tuple[bool, str, int]: # (ok, message, records checked)
+    prev, n = GENESIS, 0
+    with open(path, "rb") as f:
+        for n, line in enumerate(f, 1):
+            digest, _, body = line.rstrip(b"\n").partition(b" ")
+            prev = _hash(prev, body)
+            if digest != prev.encode("ascii"):
+                return False, f"Chain broken at line {n}.", n - 1
+    return True, f"{n} records, last hash {prev[:16]}", n
@@ -0,0 +1,42 @@
+import typing as t # for type hints
+import numpy as np
+
+class BeatDetector: # R-wave detector for a filtered ventricular egram, one block at a time
+    # A beat is the first sample above an adaptive threshold (half the recent R amplitude, never
+    # below min_mv) once the refractory time since the previous beat has passed. Indices count the
+    # samples processed; if the stream skips samples (a dropped frame) the refractory time restarts.
+
+    def __init__(self, fs: float, refractory_ms: float = 300.0, min_mv: float = 0.5, decay_s: float = 3.0, fraction: float = 0.5):
+        self.fs = fs
+        self.refractory = int(refractory_ms * fs / 1000.0) # samples
+        self.min_mv = min_mv
+        self.fraction = fraction # threshold as a share of the recent R amplitude
+        self.decay = 0.5 ** (1.0 / (decay_s * fs)) # per-sample decay of the amplitude estimate
+        self.peak = 0.0 # recent R amplitude (mV)
+        self.last: t.Optional[int] = None # sample index of the previous beat
+        self.sample = 0 # index of the next input sample
+        self._stream: t.Optional[int] = None # device sample number expected next
+
+    def process(self, x: np.ndarray, stream: t.Optional[int] = None) -> t.List[int]: # Sample indices of the beats that start in this block
+        # stream: the device's sample number of x[0], to notice samples that never arrived
+        x = np.abs(np.asarray(x, dtype=float))
+        if stream is not None:
+            if self._stream is not None and stream != self._stream: # a gap: the previous beat's time is unknown
+                self.last = None
+            self._stream = stream + len(x)
+        start = self.sample
+        self.sample += len(x)
+        if not len(x):
+            return []
+        self.peak = max(self.peak * self.decay ** len(x), self.min_mv)
+        thr = max(self.fraction * self.peak, self.min_mv)
+        beats = []
+        for i in np.flatnonzero(x > thr): # a few samples per beat; everything else is skipped in numpy
+            s = start + int(i)
+            if self.last is not None and s - self.last < self.refractory:
+                continue
+            beats.append(s)
+            self.last = s
+        if beats:
+            self.peak = max(self.peak, float(x.max()))
+        return beats
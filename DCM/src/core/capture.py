@@ -0,0 +1,94 @@
+import json, os, struct, time # standard libraries
+import typing as t # for type hints
+
+# Byte-exact recordings of what a pacemaker sent, for replaying a session later (sim/replay.py).
+# DeviceProtocol(capture=Capture(path)) hands every chunk it reads from the link to the capture
+# before decoding it, so a replay goes through the same framing, CRC checks and resynchronisation
+# as the original session, corrupt frames included. File layout:
+#     DCMCAP1\n
+#     {"model": ..., "serial": ..., "started": ..., "t0": ...}\n      one JSON line
+#     [t float64 | n uint32 | n bytes] ...                 seconds since t0, big-endian
+# A new Capture starts an empty file. Only the path is kept until the link is identified, so a
+# capture can be passed to an acquisition child; a child restarted by core.acquisition appends to
+# the file its predecessor began, after cutting off the record that predecessor was killed in the
+# middle of (read() stops at the first incomplete record, so it would hide the rest of the session).
+
+MAGIC = b"DCMCAP1\n"
+RECORD = struct.Struct(">dI") # arrival time, chunk length
+
+
+class Capture: # Appends every chunk read from one link to a capture file
+    def __init__(self, path: str):
+        self.path = path
+        self.bytes = 0 # link bytes recorded
+        self._f = None
+        self._t0 = 0.0
+        open(path, "wb").close() # fresh capture; begin() writes the header
+
+    def __getstate__(self): # only the path crosses to another process
+        return {"path": self.path}
+
+    def __setstate__(self, state): # the file stays as it is, the child carries on writing it
+        self.path, self.bytes, self._f, self._t0 = state["path"], 0, None, 0.0
+
+    def begin(self, device): # The link is identified: write the header (device is a core.session.DeviceId)
+        try:
+            with open(self.path, "rb") as f:
+                header = json.loads(f.readline() == MAGIC and f.readline() or b"null")
+        except (OSError, ValueError):
+            header = None
+        if header and header.get("serial") == device.serial: # a restarted acquisition child on the same device
+            os.truncate(self.path, _records_end(self.path))
+            self._f = open(self.path, "ab")
+            self._t0 = header["t0"]
+            return
+        self._f = open(self.path, "wb")
+        self._t0 = time.time()
+        header = {"model": device.model, "serial": device.serial, "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "t0": self._t0}
+        self._f.write(MAGIC + (json.dumps(header) + "\n").encode())
+
+    def __call__(self, data: bytes):
+        if self._f is None:
+            return
+        self._f.write(RECORD.pack(time.time() - self._t0, len(data)))
+        self._f.write(data)
+        self.bytes += len(data)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def _records_end(path: str) -> int: # File offset after the last complete record
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline(), f.readline() # magic and header
+        end = f.tell()
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return end
+            _, n = RECORD.unpack(head)
+            if f.tell() + n > size:
+                return end
+            end = f.seek(n, os.SEEK_CUR)
+
+
+def read(path: str) -> t.Tuple[dict, t.List[t.Tuple[float, bytes]]]: # (header, [(seconds, chunk), ...])
+    with open(path, "rb") as f:
+        if f.readline() != MAGIC:
+            raise ValueError(f"{path} is not a DCM capture")
+        header = json.loads(f.readline())
+        chunks = []
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size: # end of file, or cut short by a crash mid-record
+                break
+            at, n = RECORD.unpack(head)
+            data = f.read(n)
+            if len(data) < n:
+                break
+            chunks.append((at, data))
+    return header, chunks
@@ -0,0 +1,150 @@
+from collections import OrderedDict # decoded block cache
+import lzma, struct, zlib # standard libraries
+import typing as t # for type hints
+import numpy as np
+from core.frames import EGRAM_SCALE # counts per mV on the wire, the finest resolution worth keeping
+
+# Compact egram storage. A block of samples (n, channels) is quantized to int16 with a scale per
+# channel, delta coded (neighbouring samples are close, so the deltas are small), split into a
+# plane of low bytes and a plane of high bytes (the high plane is nearly all 00/FF) and compressed
+# with zlib or lzma. The int16 deltas wrap around and np.cumsum wraps back, so the integers come
+# back exactly; the only loss is the quantization step: the wire's 10 uV, or peak/32767 for a
+# block whose peak doesn't fit in int16 at that step.
+#   block = encode(x)    x = decode(block)
+# EgramHistory keeps a whole recording that way, in blocks, and reads any sample range back.
+
+RAW, ZLIB, LZMA = 0, 1, 2 # compressors
+METHODS = {"raw": RAW, "zlib": ZLIB, "lzma": LZMA}
+HEADER = struct.Struct(">BBI") # method, channels, samples; then a float32 scale per channel
+BLOCK = 4096 # samples per block in EgramHistory (4 s at 1 kHz)
+
+
+def encode(x: np.ndarray, method: str = "zlib", level: int = 1, resolution: float = 1.0 / EGRAM_SCALE) -> bytes:
+    # (n,) or (n, channels) mV -> block. resolution is the quantization step (0: per-block peak/32767, near lossless).
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[:, None]
+    n, channels = x.shape
+    peak = np.abs(x).max(axis=0) if n else np.zeros(channels)
+    scale = np.maximum(np.maximum(peak / 32767.0, resolution), 1e-12).astype(np.float32) # mV per count
+    q = np.rint(x / scale).astype(np.int64)
+    d = np.ascontiguousarray(np.diff(q, axis=0, prepend=0).astype("<i2").T) # channel-major deltas, wrapping
+    planes = d.view(np.uint8).reshape(-1, 2).T.tobytes() # all low bytes, then all high bytes
+    m = METHODS[method]
+    if m == ZLIB:
+        planes = zlib.compress(planes, level)
+    elif m == LZMA:
+        planes = lzma.compress(planes, preset=level)
+    return HEADER.pack(m, channels, n) + scale.astype(">f4").tobytes() + planes
+
+
+def decode(block: bytes) -> np.ndarray: # block -> (n, channels) float32 mV
+    m, channels, n = HEADER.unpack_from(block)
+    start = HEADER.size + 4 * channels
+    scale = np.frombuffer(block, dtype=">f4", count=channels, offset=HEADER.size).astype(np.float32)
+    planes = block[start:]
+    if m == ZLIB:
+        planes = zlib.decompress(planes)
+    elif m == LZMA:
+        planes = lzma.decompress(planes)
+    d = np.frombuffer(planes, dtype=np.uint8).reshape(2, -1).T.copy().view("<i2").reshape(channels, n)
+    q = np.cumsum(d, axis=1, dtype=np.int16) # wraps exactly like the encoder did
+    return (q.T * scale).astype(np.float32)
+
+
+class EgramHistory: # A recording as compressed blocks plus an uncompressed tail, readable by sample index
+    def __init__(self, rate: float, start: float = 0.0, channels: t.Sequence[str] = ("atrial", "ventricular"),
+                 method: str = "zlib", block: int = BLOCK, cache: int = 8):
+        self.rate = rate
+        self.start = start # recording time of sample 0
+        self.channels = list(channels)
+        self.method = method
+        self.block = block
+        self.blocks: t.List[bytes] = []
+        self._tail = np.empty((block, len(self.channels)), dtype=np.float32)
+        self._fill = 0
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict() # block index -> decoded
+        self._cache_size = cache
+
+    def __len__(self) -> int:
+        return len(self.blocks) * self.block + self._fill
+
+    @property
+    def nbytes(self) -> int: # memory held by the samples
+        return sum(len(b) for b in self.blocks) + self._tail.nbytes
+
+    def append(self, x: np.ndarray): # (n, channels) samples
+        x = np.asarray(x, dtype=np.float32).reshape(-1, len(self.channels))
+        i = 0
+        while i < len(x):
+            n = min(self.block - self._fill, len(x) - i)
+            self._tail[self._fill:self._fill + n] = x[i:i + n]
+            self._fill += n
+            i += n
+            if self._fill == self.block:
+                self.blocks.append(encode(self._tail, self.method))
+                self._fill = 0
+
+    def _block(self, k: int) -> np.ndarray:
+        if k == len(self.blocks):
+            return self._tail[:self._fill]
+        hit = self._cache.get(k)
+        if hit is None:
+            hit = self._cache[k] = decode(self.blocks[k])
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(k)
+        return hit
+
+    def read(self, i0: int, i1: int) -> np.ndarray: # samples i0..i1-1 as (n, channels)
+        i0, i1 = max(i0, 0), min(i1, len(self))
+        if i1 <= i0:
+            return np.empty((0, len(self.channels)), dtype=np.float32)
+        parts = []
+        for k in range(i0 // self.block, (i1 - 1) // self.block + 1):
+            b = self._block(k)
+            parts.append(b[max(i0 - k * self.block, 0):i1 - k * self.block])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def channel(self, name: str) -> "_Channel": # one channel, sliceable like a list
+        return _Channel(self, self.channels.index(name))
+
+    def times(self, i0: int, i1: int) -> np.ndarray: # recording time of samples i0..i1-1
+        return self.start + np.arange(max(i0, 0), min(i1, len(self))) / self.rate
+
+    # --- persistence, stored in the same .npz as the recording ---------------
+
+    def to_arrays(self, prefix: str = "history_") -> t.Dict[str, np.ndarray]:
+        blocks = self.blocks + [encode(self._tail[:self._fill], self.method)]
+        return {prefix + "blocks": np.frombuffer(b"".join(blocks), dtype=np.uint8),
+                prefix + "sizes": np.array([len(b) for b in blocks], dtype=np.int64),
+                prefix + "meta": np.array([self.rate, self.start, self.block], dtype=np.float64),
+                prefix + "channels": np.array(self.channels)}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str = "history_") -> t.Optional["EgramHistory"]: # None if the file has no history
+        if prefix + "blocks" not in arrays:
+            return None
+        rate, start, block = arrays[prefix + "meta"].tolist()
+        history = cls(rate, start, [str(c) for c in arrays[prefix + "channels"]], block=int(block))
+        data, sizes = arrays[prefix + "blocks"].tobytes(), arrays[prefix + "sizes"].tolist()
+        ends = np.cumsum(sizes).tolist()
+        blocks = [data[e - s:e] for s, e in zip(sizes, ends)]
+        history.blocks = blocks[:-1] # all full except the last
+        history.append(decode(blocks[-1]))
+        return history
+
+
+class _Channel: # EgramHistory column with list-style slicing, e.g. for TilePyramid.view's raw samples
+    def __init__(self, history: EgramHistory, column: int):
+        self.history, self.column = history, column
+
+    def __len__(self) -> int:
+        return len(self.history)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            i0, i1, step = index.indices(len(self.history))
+            return self.history.read(i0, i1)[::step, self.column]
+        return float(self.history.read(index, index + 1)[0, self.column])
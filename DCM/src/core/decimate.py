@@ -0,0 +1,22 @@
+import numpy as np # vectorized min/max reduction
+import typing as t # for type hints
+
+def minmax_decimate(time: t.Sequence[float], values: t.Sequence[float], buckets: int): # Reduce a trace to a min/max pair per bucket
+    # A plotted trace can never show more detail than one vertical stroke per pixel column, so keeping the
+    # min and max of every column draws the same picture as the raw data with at most 2 * buckets points.
+    x = np.asarray(time, dtype=np.float64) # time axis
+    y = np.asarray(values, dtype=np.float64) # signal values
+    n = min(len(x), len(y)) # guard against ragged lists
+    x, y = x[:n], y[:n] # trim to common length
+    if buckets <= 0 or n <= 2 * buckets: # already small enough to draw directly
+        return x, y
+
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1] # first sample of each bucket
+    lo = np.minimum.reduceat(y, starts) # minimum per bucket
+    hi = np.maximum.reduceat(y, starts) # maximum per bucket
+
+    out_x = np.repeat(x[starts], 2) # both points share the bucket's x position
+    out_y = np.empty(2 * buckets, dtype=np.float64) # interleaved min, max
+    out_y[0::2] = lo
+    out_y[1::2] = hi
+    return out_x, out_y
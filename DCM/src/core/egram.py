@@ -15,3 +15,31 @@ class EgramData: # ECG data structure
         self.ventricular.clear()
         self.timestamp = ""
     
+
+
+class SharedEgram: # EgramData over the egram ring of an acquisition process: the live window as numpy views, no copies
+    # time/atrial/ventricular are views of the last `window` samples up to head, which Telemetry.pull
+    # moves forward; the ring keeps a couple of seconds more than the window, so what a view shows
+    # isn't overwritten while the GUI is using it. Hold on to a copy, not a view, for anything longer.
+    def __init__(self, ring, window: int, sampling_rate: float = 100.0):
+        self.ring = ring # core.ring.SampleRing with rows time, atrial, ventricular
+        self.window = window # samples shown
+        self.sampling_rate = sampling_rate
+        self.timestamp = ""
+        self.base = self.head = ring.head # ring positions of the recording start and of the last pull
+
+    def _rows(self):
+        return self.ring.window(min(self.window, self.head - self.base), self.head)
+
+    @property
+    def time(self): return self._rows()[0]
+
+    @property
+    def atrial(self): return self._rows()[1]
+
+    @property
+    def ventricular(self): return self._rows()[2]
+
+    def clear(self): # the next recording starts at the newest sample
+        self.base = self.head = self.ring.head
+        self.timestamp = ""
@@ -0,0 +1,150 @@
+from bisect import bisect_left, bisect_right # sorted episode index
+from dataclasses import dataclass, asdict # for easy data storage
+import json # persistence
+import typing as t # for type hints
+
+# Rhythm episodes found in the beat stream: sustained high-rate runs, pauses and runs below the lower
+# rate limit. EpisodeDetector is fed one beat at a time (and tick() between beats, so a pause is
+# reported while it is still going on) and keeps a handful of numbers per open episode, never the
+# beats themselves. Finished episodes go to an EpisodeLog, sorted by start for time-range lookups.
+
+HIGH_RATE = "high-rate"
+PAUSE = "pause"
+LOW_RATE = "low-rate"
+KIND_TEXT = {HIGH_RATE: "High rate", PAUSE: "Pause", LOW_RATE: "Below LRL"} # report labels
+
+
+@dataclass # one finished episode
+class Episode:
+    kind: str
+    start: float # s, recording time of the first beat
+    end: float # s, recording time of the last beat
+    beats: int # RR intervals in the episode
+    max_rate: float # bpm
+    min_rate: float # bpm
+    snippet: t.Tuple[int, int] # first and last egram sample around the episode (offsets into the recording)
+
+    @property
+    def duration(self) -> float: return self.end - self.start
+
+
+class _Run: # an open run of beats: O(1) state, whatever its length
+    __slots__ = ("start", "start_sample", "end", "end_sample", "beats", "max_rate", "min_rate", "out")
+
+    def __init__(self, time: float, sample: int):
+        self.start, self.start_sample = time, sample
+        self.end, self.end_sample = time, sample
+        self.beats = 0
+        self.max_rate, self.min_rate = 0.0, float("inf")
+        self.out = 0 # consecutive beats that no longer qualify
+
+    def add(self, time: float, sample: int, bpm: float):
+        self.end, self.end_sample = time, sample
+        self.beats += 1
+        self.max_rate = max(self.max_rate, bpm)
+        self.min_rate = min(self.min_rate, bpm)
+        self.out = 0
+
+
+class EpisodeDetector:
+    def __init__(self, rate: float, high_bpm: float = 150.0, high_beats: int = 8, low_bpm: float = 60.0,
+                 low_beats: int = 8, end_beats: int = 4, pause_s: float = 2.0, snippet_s: float = 5.0,
+                 on_episode: t.Optional[t.Callable[[Episode], None]] = None):
+        self.rate = rate # egram samples per second, for the snippet offsets
+        self.high_bpm, self.high_beats = high_bpm, high_beats # this fast for this many beats in a row
+        self.low_bpm, self.low_beats = low_bpm, low_beats # set to the programmed LRL
+        self.end_beats = end_beats # normal beats in a row that close a rate episode
+        self.pause_s = pause_s
+        self.snippet = int(snippet_s * rate) # egram kept before and after each episode
+        self.on_episode = on_episode # called for every finished episode
+        self.last: t.Optional[t.Tuple[float, int]] = None # (time, sample) of the previous beat
+        self.runs: t.Dict[str, t.Optional[_Run]] = {HIGH_RATE: None, LOW_RATE: None} # candidate or open
+        self.pause_open = False # reported by tick() before the next beat came
+        self.opened = 0 # episodes detected (open or finished)
+
+    def _finish(self, kind: str, run: _Run) -> Episode:
+        ep = Episode(kind, run.start, run.end, run.beats, round(run.max_rate, 1), round(run.min_rate, 1),
+                     (max(run.start_sample - self.snippet, 0), run.end_sample + self.snippet))
+        if self.on_episode:
+            self.on_episode(ep)
+        return ep
+
+    def beat(self, time: float, sample: int) -> t.List[Episode]: # One detected beat; returns episodes it finished
+        done = []
+        last, self.last = self.last, (time, sample)
+        if last is None:
+            return done
+        rr = time - last[0]
+        bpm = 60.0 / rr if rr > 0 else 0.0
+        if rr >= self.pause_s:
+            if not self.pause_open:
+                self.opened += 1
+            self.pause_open = False
+            run = _Run(last[0], last[1])
+            run.add(time, sample, bpm)
+            done.append(self._finish(PAUSE, run))
+        for kind, limit, needed in ((HIGH_RATE, self.high_bpm, self.high_beats), (LOW_RATE, self.low_bpm, self.low_beats)):
+            inside = bpm >= limit if kind == HIGH_RATE else bpm < limit
+            run = self.runs[kind]
+            if inside:
+                if run is None:
+                    run = self.runs[kind] = _Run(last[0], last[1])
+                before = run.beats
+                run.add(time, sample, bpm)
+                if before < needed <= run.beats:
+                    self.opened += 1
+            elif run is not None:
+                if run.beats < needed: # too short to count
+                    self.runs[kind] = None
+                else:
+                    run.out += 1
+                    if run.out >= self.end_beats:
+                        done.append(self._finish(kind, run))
+                        self.runs[kind] = None
+        return done
+
+    def tick(self, now: float) -> t.Optional[str]: # Recording time without a beat; returns PAUSE when one starts
+        if self.last is not None and not self.pause_open and now - self.last[0] >= self.pause_s:
+            self.pause_open = True
+            self.opened += 1
+            return PAUSE
+        return None
+
+    def active(self) -> t.List[str]: # kinds of the episodes going on right now
+        out = [kind for kind, needed in ((HIGH_RATE, self.high_beats), (LOW_RATE, self.low_beats))
+               if self.runs[kind] is not None and self.runs[kind].beats >= needed]
+        return out + ([PAUSE] if self.pause_open else [])
+
+
+class EpisodeLog: # Finished episodes, sorted by start
+    def __init__(self):
+        self.episodes: t.List[Episode] = []
+        self._starts: t.List[float] = []
+        self._longest = 0.0 # longest duration, bounds how far back an overlapping episode can start
+        self.counts: t.Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.episodes)
+
+    def add(self, ep: Episode):
+        i = bisect_right(self._starts, ep.start)
+        self._starts.insert(i, ep.start) # usually the end of the list, episodes finish roughly in order
+        self.episodes.insert(i, ep)
+        self._longest = max(self._longest, ep.duration)
+        self.counts[ep.kind] = self.counts.get(ep.kind, 0) + 1
+
+    def query(self, t0: float, t1: float, kind: t.Optional[str] = None) -> t.List[Episode]: # episodes overlapping [t0, t1]
+        lo = bisect_left(self._starts, t0 - self._longest)
+        hi = bisect_right(self._starts, t1)
+        return [ep for ep in self.episodes[lo:hi] if ep.end >= t0 and (kind is None or ep.kind == kind)]
+
+    def to_json(self) -> str:
+        return json.dumps([asdict(ep) for ep in self.episodes])
+
+    @classmethod
+    def from_json(cls, text: str) -> "EpisodeLog":
+        log = cls()
+        for d in json.loads(text or "[]"):
+            d["snippet"] = tuple(d["snippet"])
+            log.add(Episode(**d))
+        return log
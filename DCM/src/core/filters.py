@@ -0,0 +1,145 @@
+import math # filter design
+import typing as t # for type hints
+import numpy as np
+
+# Streaming IIR filters for egram blocks. A filter is a cascade of biquads in second-order-sections
+# form (rows b0 b1 b2 a0 a1 a2, like scipy's sos). Instead of running the recursion one sample at a
+# time in Python, the cascade is turned into one state-space system and, for a block of L samples,
+# into matrices that map (input block, state) -> (output block, next state):
+#     Y = T @ X + O @ S        S' = Ad @ S + Bd @ X
+# T is the Toeplitz matrix of the impulse response. The result is exactly the recursion, state is
+# carried between blocks so the output is seamless, and many channels go through one matmul.
+
+CHUNK = 128 # longest block handled in one matmul; longer input is split (cost per sample grows with L)
+
+
+# --- design (RBJ audio-EQ cookbook, bilinear transform with prewarping) ------
+
+def _biquad(kind: str, f0: float, fs: float, q: float) -> t.List[float]:
+    w0 = 2.0 * math.pi * min(f0, 0.45 * fs) / fs
+    cw, alpha = math.cos(w0), math.sin(w0) / (2.0 * q)
+    if kind == "lowpass":
+        b = [(1 - cw) / 2, 1 - cw, (1 - cw) / 2]
+    elif kind == "highpass":
+        b = [(1 + cw) / 2, -(1 + cw), (1 + cw) / 2]
+    elif kind == "notch":
+        b = [1.0, -2 * cw, 1.0]
+    else:
+        raise ValueError(f"unknown filter type {kind!r}")
+    a = [1 + alpha, -2 * cw, 1 - alpha]
+    return [b[0] / a[0], b[1] / a[0], b[2] / a[0], 1.0, a[1] / a[0], a[2] / a[0]]
+
+
+def butter(kind: str, fc: float, fs: float, order: int = 2) -> np.ndarray: # Butterworth low/high-pass, even order
+    qs = [1.0 / (2.0 * math.cos((2 * k - 1) * math.pi / (2 * order))) for k in range(1, order // 2 + 1)]
+    return np.array([_biquad(kind, fc, fs, q) for q in qs])
+
+
+def notch(f0: float, fs: float, q: float = 30.0) -> np.ndarray: # narrow band-stop at f0 (mains hum)
+    return np.array([_biquad("notch", f0, fs, q)])
+
+
+def design(spec: t.Sequence, fs: float) -> np.ndarray: # ("highpass", 0.5, 2), ("notch", 60), ... -> sos
+    kind, freq, *rest = spec
+    if kind == "notch":
+        return notch(freq, fs, *rest)
+    return butter(kind, freq, fs, *rest)
+
+
+EGRAM_CHAIN = [ # default per-channel chain
+    ("highpass", 0.5, 2), # baseline wander and electrode drift
+    ("lowpass", 100.0, 4), # muscle noise and aliasing
+    ("notch", 60.0), # mains hum (use 50 outside North America)
+]
+
+
+# --- filtering ---------------------------------------------------------------
+
+def state_space(sos: np.ndarray): # SOS cascade -> (A, B, C, D) of the whole cascade, transposed direct form II
+    A = np.zeros((0, 0)); B = np.zeros(0); C = np.zeros(0); D = 1.0
+    for b0, b1, b2, a0, a1, a2 in np.asarray(sos, dtype=float):
+        b0, b1, b2, a1, a2 = b0 / a0, b1 / a0, b2 / a0, a1 / a0, a2 / a0
+        a = np.array([[-a1, 1.0], [-a2, 0.0]])
+        bb = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        c = np.array([1.0, 0.0])
+        n = len(B)
+        A2 = np.zeros((n + 2, n + 2))
+        A2[:n, :n] = A
+        A2[n:, :n] = np.outer(bb, C) # this section is fed by the previous output
+        A2[n:, n:] = a
+        A, B, C, D = A2, np.concatenate([B, bb * D]), np.concatenate([b0 * C, c]), b0 * D
+    return A, B, C, D
+
+
+class SosFilter: # One SOS cascade with state, for one or more channels
+    def __init__(self, sos: np.ndarray, channels: int = 1):
+        self.sos = np.asarray(sos, dtype=float)
+        self.A, self.B, self.C, self.D = state_space(self.sos)
+        self.order = len(self.B)
+        self.channels = channels
+        self.state = np.zeros((self.order, channels))
+        self._blocks: t.Dict[int, tuple] = {} # block length -> (T, O, Ad, Bd)
+
+    def reset(self):
+        self.state[:] = 0.0
+
+    def _matrices(self, L: int):
+        m = self._blocks.get(L)
+        if m is None:
+            A, B, C = self.A, self.B, self.C
+            powers = [np.eye(self.order)]
+            for _ in range(L):
+                powers.append(A @ powers[-1])
+            O = np.array([C @ powers[k] for k in range(L)]) # free response of the state
+            h = np.concatenate([[self.D], [C @ powers[k] @ B for k in range(L - 1)]]) # impulse response
+            T = np.zeros((L, L))
+            for k in range(L):
+                T[k:, k] = h[:L - k]
+            Ad = powers[L]
+            Bd = np.stack([powers[L - 1 - j] @ B for j in range(L)], axis=1)
+            m = self._blocks[L] = (T, O, Ad, Bd)
+        return m
+
+    def process(self, x: np.ndarray) -> np.ndarray: # Filter the next block, shape (n,) or (n, channels)
+        x = np.asarray(x, dtype=float)
+        flat = x.ndim == 1
+        X = x.reshape(len(x), -1)
+        Y = np.empty_like(X)
+        S = self.state
+        for i in range(0, len(X), CHUNK):
+            xb = X[i:i + CHUNK]
+            T, O, Ad, Bd = self._matrices(len(xb))
+            Y[i:i + len(xb)] = T @ xb + O @ S
+            S = Ad @ S + Bd @ xb
+        self.state = S
+        return Y[:, 0] if flat else Y
+
+
+def sosfilt_reference(sos: np.ndarray, x: np.ndarray) -> np.ndarray: # Plain per-sample recursion, for checking
+    y = np.asarray(x, dtype=float).copy()
+    for b0, b1, b2, a0, a1, a2 in np.asarray(sos, dtype=float):
+        s1 = s2 = 0.0
+        out = np.empty_like(y)
+        for i, v in enumerate(y):
+            o = b0 / a0 * v + s1
+            s1 = b1 / a0 * v - a1 / a0 * o + s2
+            s2 = b2 / a0 * v - a2 / a0 * o
+            out[i] = o
+        y = out
+    return y
+
+
+class FilterBank: # Named channels, each with its own chain, e.g. {"atrial": [...], "ventricular": [...]}
+    def __init__(self, fs: float, chains: t.Optional[t.Dict[str, t.Sequence]] = None):
+        self.fs = fs
+        chains = chains or {"atrial": EGRAM_CHAIN, "ventricular": EGRAM_CHAIN}
+        self.filters = {name: SosFilter(np.concatenate([design(s, fs) for s in chain]) if chain else np.zeros((0, 6)))
+                        for name, chain in chains.items()}
+
+    def process(self, **blocks: np.ndarray) -> t.Dict[str, np.ndarray]: # atrial=..., ventricular=... -> filtered blocks
+        return {name: self.filters[name].process(x) if self.filters[name].order else np.asarray(x, dtype=float)
+                for name, x in blocks.items()}
+
+    def reset(self):
+        for f in self.filters.values():
+            f.reset()
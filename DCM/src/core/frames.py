@@ -0,0 +1,132 @@
+import json, struct # standard libraries
+from binascii import crc_hqx # CRC-16/CCITT in C
+import typing as t # for type hints
+import numpy as np
+
+# Binary frames used on the pacemaker link after the IDENT handshake (see core.transport):
+#   AA 55 | type u8 | seq u16 | length u16 | payload | crc u16
+# All numbers are big-endian. The CRC is CRC-16/CCITT (init 0xFFFF) over type..payload.
+# Commands and their ACK/NAK replies carry JSON payloads and share a sequence number.
+# Egram and marker frames are device-initiated and numbered by their own stream counter.
+
+SYNC = b"\xaa\x55"
+HEADER = struct.Struct(">BHH") # type, seq, payload length
+CRC = struct.Struct(">H")
+MAX_PAYLOAD = 4096 # longer length fields are treated as line noise
+
+# command types (host -> device)
+IDENTIFY = 0x01
+GET_PARAMS = 0x02
+SET_PARAMS = 0x03
+SET_CLOCK = 0x04
+STREAM = 0x05 # {"on": bool, "rate": Hz}
+INTERROGATE = 0x06
+ECHO = 0x07 # replies with the same payload, used for latency checks
+BATCH = 0x08 # {"ops": [{"type": SET_PARAMS, "body": {...}}, ...]}, applied all-or-nothing
+# replies and device-initiated frames (device -> host)
+ACK = 0x80
+NAK = 0x81
+EGRAM = 0x90 # >IH start sample and rate, then int16 atrial/ventricular pairs
+MARKER = 0x91 # (>I sample, u8 code) pairs
+
+NAMES = {IDENTIFY: "IDENTIFY", GET_PARAMS: "GET_PARAMS", SET_PARAMS: "SET_PARAMS", SET_CLOCK: "SET_CLOCK",
+         STREAM: "STREAM", INTERROGATE: "INTERROGATE", ECHO: "ECHO", BATCH: "BATCH", ACK: "ACK", NAK: "NAK",
+         EGRAM: "EGRAM", MARKER: "MARKER"}
+
+# marker codes
+AS, AP, VS, VP = 1, 2, 3, 4 # atrial/ventricular sensed and paced events
+MARKER_NAMES = {AS: "AS", AP: "AP", VS: "VS", VP: "VP"}
+
+EGRAM_HEAD = struct.Struct(">IH")
+EGRAM_MAX_SAMPLES = (MAX_PAYLOAD - EGRAM_HEAD.size) // 4 # sample pairs that fit one frame
+EGRAM_SCALE = 100.0 # counts per mV (10 uV resolution, +-327 mV range)
+MARKER_ITEM = struct.Struct(">IB")
+
+
+class Frame(t.NamedTuple):
+    type: int
+    seq: int
+    payload: bytes
+
+    def json(self): # Decoded JSON payload (commands, ACK, NAK)
+        return json.loads(self.payload) if self.payload else {}
+
+
+def encode(ftype: int, seq: int, payload: bytes = b"") -> bytes: # One frame ready to write
+    if len(payload) > MAX_PAYLOAD: # the decoder would drop it as line noise
+        raise ValueError(f"{NAMES.get(ftype, ftype)} payload of {len(payload)} bytes is over MAX_PAYLOAD ({MAX_PAYLOAD})")
+    body = HEADER.pack(ftype, seq & 0xFFFF, len(payload)) + payload
+    return SYNC + body + CRC.pack(crc_hqx(body, 0xFFFF))
+
+
+def encode_json(ftype: int, seq: int, obj) -> bytes:
+    return encode(ftype, seq, json.dumps(obj, separators=(",", ":")).encode())
+
+
+def encode_egram(seq: int, start: int, rate: int, atrial: np.ndarray, ventricular: np.ndarray) -> bytes: # mV arrays -> EGRAM frame
+    both = np.empty(2 * len(atrial), dtype=">i2")
+    both[0::2] = np.clip(np.rint(atrial * EGRAM_SCALE), -32768, 32767)
+    both[1::2] = np.clip(np.rint(ventricular * EGRAM_SCALE), -32768, 32767)
+    return encode(EGRAM, seq, EGRAM_HEAD.pack(start & 0xFFFFFFFF, rate) + both.tobytes())
+
+
+def decode_egram(payload: bytes): # EGRAM payload -> (start sample, rate, atrial mV, ventricular mV)
+    start, rate = EGRAM_HEAD.unpack_from(payload)
+    both = np.frombuffer(payload, dtype=">i2", offset=EGRAM_HEAD.size).astype(np.float32) / EGRAM_SCALE
+    return start, rate, both[0::2], both[1::2]
+
+
+def encode_markers(seq: int, markers: t.Sequence[t.Tuple[int, int]]) -> bytes: # [(sample, code)] -> MARKER frame
+    return encode(MARKER, seq, b"".join(MARKER_ITEM.pack(s & 0xFFFFFFFF, c) for s, c in markers))
+
+
+def decode_markers(payload: bytes) -> t.List[t.Tuple[int, int]]:
+    return [MARKER_ITEM.unpack_from(payload, i) for i in range(0, len(payload) - MARKER_ITEM.size + 1, MARKER_ITEM.size)]
+
+
+class FrameDecoder: # Turns a byte stream into frames, skipping noise and frames with a bad CRC
+    def __init__(self):
+        self._buf = bytearray()
+        self.frames = 0 # good frames decoded
+        self.crc_errors = 0 # frames dropped for a bad CRC
+        self.skipped = 0 # bytes discarded while looking for SYNC
+
+    @property
+    def pending(self) -> int: return len(self._buf) # bytes of an incomplete frame
+
+    def feed(self, data: bytes) -> t.List[Frame]:
+        buf = self._buf
+        buf += data
+        out = []
+        pos = 0
+        end = len(buf)
+        while True:
+            i = buf.find(SYNC, pos)
+            if i < 0: # keep a trailing AA, it may be the first half of SYNC
+                keep = end - 1 if end > pos and buf[end - 1] == SYNC[0] else end
+                self.skipped += keep - pos
+                pos = keep
+                break
+            self.skipped += i - pos
+            pos = i
+            if end - pos < 2 + HEADER.size:
+                break # header not here yet
+            ftype, seq, length = HEADER.unpack_from(buf, pos + 2)
+            if length > MAX_PAYLOAD: # not a real header
+                pos += 1
+                self.skipped += 1
+                continue
+            total = 2 + HEADER.size + length + CRC.size
+            if end - pos < total:
+                break # rest of the frame not here yet
+            body = bytes(buf[pos + 2:pos + total - CRC.size])
+            (crc,) = CRC.unpack_from(buf, pos + total - CRC.size)
+            if crc_hqx(body, 0xFFFF) != crc: # corrupted; resync one byte later
+                self.crc_errors += 1
+                pos += 1
+                continue
+            out.append(Frame(ftype, seq, body[HEADER.size:]))
+            self.frames += 1
+            pos += total
+        del buf[:pos]
+        return out
@@ -0,0 +1,107 @@
+import time # local hour of a beat
+import typing as t # for type hints
+import numpy as np
+from core.frames import AS, AP, VS, VP # marker codes of the MARKER frames
+
+# Two-dimensional rate histograms of a recording, kept up to date as beats and markers arrive.
+# Counts live on a fine base grid, one row per bpm from 0 to MAX_BPM - 1, so adding a beat is one
+# array increment and any coarser set of rate bins (report edges, 5 or 20 bpm, uneven clinical
+# bands) is a difference of two cumulative rows, never a pass over the beats again. Two axes:
+#     hour     rate x local hour of day (24 columns), from the beat stream; circadian patterns
+#     marker   rate x AS/AP/VS/VP (4 columns), from the marker stream: the rate of each marker is
+#              taken from the interval to the previous marker of its chamber, so paced and sensed
+#              rates are told apart without matching beats to markers.
+# Rates at or above MAX_BPM land in the last row; rates outside a table's edges are left out of it,
+# like core.reports.bincount.
+
+MAX_BPM = 300 # rows of the base grid
+HOURS = 24
+MARKERS = (AS, AP, VS, VP) # columns of the marker axis
+MARKER_NAMES = ("AS", "AP", "VS", "VP")
+COLUMN = {code: i for i, code in enumerate(MARKERS)}
+CHAMBER = {AS: 0, AP: 0, VS: 1, VP: 1} # atrial, ventricular
+
+
+class RateHistogram:
+    def __init__(self):
+        self.counts = {"hour": np.zeros((MAX_BPM, HOURS), dtype=np.int64),
+                       "marker": np.zeros((MAX_BPM, len(MARKERS)), dtype=np.int64)} # axis -> base grid
+        self.clock0: t.Optional[float] = None # epoch seconds of recording time 0, set by the owner
+        self._last = [None, None] # time of the previous marker per chamber
+        self._hour_start = np.inf # recording time the cached hour starts at
+        self._hour = 0
+
+    def clear(self):
+        for m in self.counts.values():
+            m[:] = 0
+        self.clock0 = None
+        self._last = [None, None]
+        self._hour_start = np.inf
+
+    def __len__(self) -> int: # beats counted
+        return int(self.counts["hour"].sum())
+
+    @staticmethod
+    def _row(bpm: float) -> int:
+        return min(max(int(bpm), 0), MAX_BPM - 1)
+
+    def _hour_of(self, at: float) -> int: # local hour at recording time at; localtime() once per hour of recording
+        if not self._hour_start <= at < self._hour_start + 3600.0:
+            now = (self.clock0 or 0.0) + at
+            lt = time.localtime(now)
+            self._hour = lt.tm_hour
+            self._hour_start = at - (lt.tm_min * 60 + lt.tm_sec + now % 1.0)
+        return self._hour
+
+    def add_beat(self, bpm: float, at: float): # One beat's rate at recording time at (seconds)
+        self.counts["hour"][self._row(bpm), self._hour_of(at)] += 1
+
+    def add_markers(self, markers: t.Iterable[t.Tuple[int, int]], rate: float): # MARKER frame items (sample, code)
+        m, last = self.counts["marker"], self._last
+        for sample, code in markers:
+            c = CHAMBER.get(code)
+            if c is None:
+                continue
+            at = sample / rate
+            if last[c] is not None and at > last[c]:
+                m[self._row(60.0 / (at - last[c])), COLUMN[code]] += 1
+            last[c] = at
+
+    @classmethod
+    def from_recording(cls, bpm: t.Sequence[float], annotations, rate: float) -> "RateHistogram":
+        # Rebuilt from a recording saved without one. Its beats have no times, so they are counted in
+        # hour 0 and clock0 stays None (reports leave the hour table out); the markers are all there.
+        h = cls()
+        np.add.at(h.counts["hour"][:, 0], np.clip(np.asarray(bpm, dtype=np.int64), 0, MAX_BPM - 1), 1)
+        found = annotations.query(-np.inf, np.inf, MARKERS)
+        at = np.concatenate([found[code][0] for code in MARKERS])
+        code = np.concatenate([np.full(len(found[c][0]), c) for c in MARKERS])
+        order = np.argsort(at, kind="stable")
+        h.add_markers(zip(np.rint(at[order] * rate).astype(np.int64).tolist(), code[order].tolist()), rate)
+        return h
+
+    def table(self, axis: str = "hour", edges: t.Sequence[int] = (30, 180), group: int = 1) -> np.ndarray:
+        # Counts with rows binned at integer edges (len(edges) - 1 rows, bin i is edges[i] .. edges[i+1] - 1)
+        # and every group columns summed (hours 3 -> 8 columns of three hours)
+        m = self.counts[axis]
+        e = np.clip(np.asarray(edges, dtype=np.int64), 0, MAX_BPM)
+        cum = np.vstack([np.zeros((1, m.shape[1]), dtype=m.dtype), np.cumsum(m, axis=0)]) # rows below each edge
+        rows = cum[e[1:]] - cum[e[:-1]]
+        return np.add.reduceat(rows, np.arange(0, m.shape[1], max(1, group)), axis=1)
+
+    # --- persistence, stored in the same .npz as the recording ---------------
+
+    def to_arrays(self, prefix: str = "hist_") -> t.Dict[str, np.ndarray]:
+        return {f"{prefix}{axis}": m.copy() for axis, m in self.counts.items()} | \
+            {f"{prefix}clock0": np.float64(np.nan if self.clock0 is None else self.clock0)}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str = "hist_") -> t.Optional["RateHistogram"]: # None for a file saved without one
+        if f"{prefix}hour" not in arrays:
+            return None
+        h = cls()
+        for axis in h.counts:
+            h.counts[axis][:] = arrays[f"{prefix}{axis}"]
+        clock0 = float(arrays[f"{prefix}clock0"])
+        h.clock0 = None if np.isnan(clock0) else clock0
+        return h
@@ -0,0 +1,139 @@
+import math # square roots of the running sums
+import typing as t # for type hints
+import numpy as np
+
+# Heart rate variability of a recording, updated beat by beat from the RR interval stream.
+# Time domain, O(1) per interval from running sums over the whole recording:
+#     SDNN    standard deviation of the intervals (Welford's update, no catastrophic cancellation)
+#     RMSSD   root mean square of successive differences
+#     pNN50   share of successive differences over 50 ms
+#     SDANN   standard deviation of the 5 minute segment means, a segment counted once it is over
+# Frequency domain, over the last WINDOW_S of intervals only: the tachogram is resampled evenly at
+# RESAMPLE_HZ, detrended, Hann windowed and transformed with one rfft; LF and HF are the power in
+# their bands. That is O(n log n) in the window, so it is recomputed at most every REFRESH_S of
+# recording time and cached in between, whatever the caller's refresh rate.
+# Intervals outside RR_MS (noise, dropped beats) are skipped and break the successive differences,
+# as do gaps; the detectors upstream already refuse beats inside the refractory period.
+
+RR_MS = (250.0, 2000.0) # accepted interval range, 240 to 30 bpm
+SEGMENT_S = 300.0 # SDANN segment
+WINDOW_S = 300.0 # frequency-domain window
+RESAMPLE_HZ = 4.0
+REFRESH_S = 5.0 # least recording time between two spectra
+LF, HF = (0.04, 0.15), (0.15, 0.40) # bands, Hz
+MIN_SPECTRUM_S = 60.0 # shorter windows give no spectrum
+CAPACITY = int(WINDOW_S * 1000.0 / RR_MS[0]) + 1 # interval ring, room for a window at the fastest rate
+
+
+class HrvEngine:
+    def __init__(self):
+        self.n = 0 # accepted intervals
+        self._mean = self._m2 = 0.0 # Welford state of the intervals
+        self._prev: t.Optional[float] = None # previous accepted interval, None after a rejected one
+        self._ssd = 0.0 # sum of squared successive differences
+        self._diffs = 0
+        self._nn50 = 0
+        self._segment: t.Optional[int] = None # SDANN segment in progress
+        self._seg_sum = 0.0
+        self._seg_n = 0
+        self._segs = 0 # finished segments, Welford state of their means
+        self._seg_mean = self._seg_m2 = 0.0
+        self._at = np.zeros(CAPACITY) # ring of (time s, interval ms) for the spectrum
+        self._rr = np.zeros(CAPACITY)
+        self._head = 0 # intervals written to the ring
+        self._spectrum: t.Optional[dict] = None
+        self._spectrum_at = -np.inf # recording time of the cached spectrum
+        self.refreshes = 0 # spectra computed
+
+    def add(self, rr_ms: float, at: float): # One interval ending at recording time at (seconds)
+        rr_ms = float(rr_ms)
+        if not RR_MS[0] <= rr_ms <= RR_MS[1]:
+            self._prev = None
+            return
+        self.n += 1
+        d = rr_ms - self._mean
+        self._mean += d / self.n
+        self._m2 += d * (rr_ms - self._mean)
+        if self._prev is not None:
+            s = rr_ms - self._prev
+            self._ssd += s * s
+            self._diffs += 1
+            self._nn50 += abs(s) > 50.0
+        self._prev = rr_ms
+        segment = int(at // SEGMENT_S)
+        if segment != self._segment:
+            self._close_segment()
+            self._segment = segment
+        self._seg_sum += rr_ms
+        self._seg_n += 1
+        i = self._head % CAPACITY
+        self._at[i], self._rr[i] = at, rr_ms
+        self._head += 1
+
+    def gap(self): # The interval stream broke (lost frames): no successive difference across it
+        self._prev = None
+
+    def _close_segment(self):
+        if self._seg_n:
+            m = self._seg_sum / self._seg_n
+            self._segs += 1
+            d = m - self._seg_mean
+            self._seg_mean += d / self._segs
+            self._seg_m2 += d * (m - self._seg_mean)
+        self._seg_sum, self._seg_n = 0.0, 0
+
+    def time_domain(self) -> dict: # {"beats", "mean_rr", "sdnn", "rmssd", "pnn50", "sdann", "segments"}, None where undefined
+        return {"beats": self.n, "mean_rr": self._mean if self.n else None,
+                "sdnn": math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else None,
+                "rmssd": math.sqrt(self._ssd / self._diffs) if self._diffs else None,
+                "pnn50": 100.0 * self._nn50 / self._diffs if self._diffs else None,
+                "sdann": math.sqrt(self._seg_m2 / (self._segs - 1)) if self._segs > 1 else None,
+                "segments": self._segs}
+
+    def window(self) -> t.Tuple[np.ndarray, np.ndarray]: # (time, interval ms) of the last WINDOW_S, oldest first
+        n = min(self._head, CAPACITY)
+        order = np.arange(self._head - n, self._head) % CAPACITY
+        at, rr = self._at[order], self._rr[order]
+        if not n:
+            return at, rr
+        keep = at >= at[-1] - WINDOW_S
+        return at[keep], rr[keep]
+
+    def frequency_domain(self, force: bool = False) -> dict: # {"lf", "hf", "lf_hf", "window_s"}, ms², cached for REFRESH_S
+        now = self._at[(self._head - 1) % CAPACITY] if self._head else 0.0
+        if force or self._spectrum is None or now - self._spectrum_at >= REFRESH_S:
+            self._spectrum, self._spectrum_at = self._compute(), now
+            self.refreshes += 1
+        return self._spectrum
+
+    def _compute(self) -> dict:
+        at, rr = self.window()
+        span = float(at[-1] - at[0]) if len(at) > 1 else 0.0
+        if span < MIN_SPECTRUM_S:
+            return {"lf": None, "hf": None, "lf_hf": None, "window_s": span}
+        grid = np.arange(at[0], at[-1], 1.0 / RESAMPLE_HZ)
+        x = np.interp(grid, at, rr)
+        x -= np.polyval(np.polyfit(grid - grid[0], x, 1), grid - grid[0]) # linear detrend
+        w = np.hanning(len(x))
+        power = np.abs(np.fft.rfft(x * w)) ** 2 / (RESAMPLE_HZ * (w * w).sum()) # one-sided density, ms²/Hz
+        power[1:] *= 2.0
+        freq = np.fft.rfftfreq(len(x), 1.0 / RESAMPLE_HZ)
+        df = freq[1] - freq[0]
+        lf = float(power[(freq >= LF[0]) & (freq < LF[1])].sum() * df)
+        hf = float(power[(freq >= HF[0]) & (freq < HF[1])].sum() * df)
+        return {"lf": lf, "hf": hf, "lf_hf": lf / hf if hf > 1e-9 else None, "window_s": span}
+
+    def metrics(self) -> dict: # time and frequency domain in one dict
+        return {**self.time_domain(), **self.frequency_domain()}
+
+    @classmethod
+    def from_bpm(cls, bpm: t.Sequence[float]) -> "HrvEngine": # From a saved beat-rate series, times rebuilt from the intervals
+        # the series is rounded to whole bpm, so the metrics are approximate (RMSSD most of all)
+        h = cls()
+        at = 0.0
+        for r in bpm:
+            if r > 0:
+                rr = 60000.0 / r
+                at += rr / 1000.0
+                h.add(rr, at)
+        return h
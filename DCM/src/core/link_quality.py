@@ -0,0 +1,149 @@
+from collections import deque # sliding window of blocks
+import typing as t # for type hints
+import numpy as np
+
+# Live link state for the status pill, worked out from the telemetry stream instead of set by hand.
+# Feed it every stream frame (on the thread that decodes them) and call update() a few times a
+# second; update() returns the state to show. Each metric has separate enter/leave thresholds and
+# a new state must hold for `hold` seconds before it is reported, so a borderline link doesn't
+# make the pill flicker. Disconnected and different-device are reported at once.
+
+CONNECTED = "connected"
+OUT_OF_RANGE = "out-of-range"
+NOISE = "noise"
+DIFFERENT_DEVICE = "different-device"
+DISCONNECTED = "disconnected"
+
+BASELINE_S = 0.5 # baseline wander compares medians over this much signal, longer than a QRS or T wave
+
+TEXT = {CONNECTED: "Connected", OUT_OF_RANGE: "Out of range", NOISE: "Noise",
+        DIFFERENT_DEVICE: "Different device", DISCONNECTED: "Disconnected"} # pill text per state
+
+
+def block_stats(x: np.ndarray): # (noise sigma, peak amplitude, baseline) of one egram block
+    # First differences remove the baseline; their median absolute value is a robust white-noise
+    # estimate (a QRS only touches a few samples). /0.6745 turns MAD into sigma, /sqrt(2) undoes
+    # the differencing.
+    d = np.diff(x)
+    sigma = float(np.median(np.abs(d))) / (0.6745 * 1.4142) if len(d) else 0.0
+    base = float(np.median(x)) if len(x) else 0.0
+    peak = float(np.abs(x - base).max()) if len(x) else 0.0
+    return sigma, peak, base
+
+
+class LinkQuality:
+    def __init__(self, expected_serial: t.Optional[str] = None, window: float = 2.0, hold: float = 1.0,
+                 silence: float = 1.0, loss_enter: float = 0.20, loss_leave: float = 0.05,
+                 snr_enter_db: float = 20.0, snr_leave_db: float = 26.0,
+                 wander_enter_mv: float = 2.0, wander_leave_mv: float = 1.0,
+                 crc_enter: float = 0.05, crc_leave: float = 0.01):
+        self.expected_serial = expected_serial # device the session belongs to
+        self.window = window # seconds of history the metrics look at
+        self.hold = hold # seconds a new state must persist before it is shown
+        self.silence = silence # no frames for this long means out of range
+        self.loss = (loss_enter, loss_leave)
+        self.snr = (snr_enter_db, snr_leave_db)
+        self.wander = (wander_enter_mv, wander_leave_mv)
+        self.crc = (crc_enter, crc_leave)
+
+        self.state = DISCONNECTED # what the pill shows
+        self._candidate = None # state waiting out the hold time
+        self._candidate_since = 0.0
+        self._flags = {"loss": False, "snr": False, "wander": False, "crc": False} # per-metric hysteresis
+        self._blocks: deque = deque() # (time, sigma, peak, baseline) per egram block
+        self._frames: deque = deque() # (time, received, lost, crc errors) per update
+        self._received = self._lost = 0 # since the last update
+        self._crc_seen = 0 # decoder's crc_errors at the last update
+        self._next_seq: t.Optional[int] = None
+        self._last_frame: t.Optional[float] = None
+        self._serial: t.Optional[str] = None
+        self._closed = False
+        self.metrics: dict = {} # last computed values, for tooltips and traces
+
+    # --- inputs (acquisition thread) ----------------------------------------
+
+    def on_device(self, serial: str): # Serial reported by the handshake or an IDENTIFY reply
+        self._serial = serial
+        self._closed = False
+
+    def on_closed(self):
+        self._closed = True
+
+    def on_frame(self, seq: int, now: float): # Any stream frame; gaps in the stream counter are lost frames
+        if self._next_seq is not None:
+            self._lost += (seq - self._next_seq) & 0xFFFF
+        self._next_seq = (seq + 1) & 0xFFFF
+        self._received += 1
+        self._last_frame = now
+
+    def on_egram(self, seq: int, atrial: np.ndarray, ventricular: np.ndarray, rate: float, now: float): # One EGRAM block
+        self.on_frame(seq, now)
+        sa, pa, ma = block_stats(atrial)
+        sv, pv, mv = block_stats(ventricular)
+        self._blocks.append((now, max(sa, sv), pv, mv, len(ventricular) / rate)) # ventricular lead carries the signal that matters
+
+    # --- output (timer, a few times a second) ---------------------------------
+
+    def update(self, now: float, crc_errors: int = 0) -> str: # Fold in the latest counters, return the state to show
+        self._frames.append((now, self._received, self._lost, crc_errors - self._crc_seen))
+        self._received = self._lost = 0
+        self._crc_seen = crc_errors
+        cutoff = now - self.window
+        while self._frames and self._frames[0][0] < cutoff:
+            self._frames.popleft()
+        while self._blocks and self._blocks[0][0] < cutoff:
+            self._blocks.popleft()
+
+        raw = self._classify(now)
+        if raw in (DISCONNECTED, DIFFERENT_DEVICE) or raw == self.state:
+            self._candidate = None
+            self.state = raw
+        else:
+            if raw != self._candidate:
+                self._candidate, self._candidate_since = raw, now
+            if now - self._candidate_since >= self.hold:
+                self.state, self._candidate = raw, None
+        return self.state
+
+    def _flag(self, name: str, value: float, limits, above: bool) -> bool: # threshold with separate enter/leave levels
+        enter, leave = limits
+        on = self._flags[name]
+        if above:
+            on = value >= enter if not on else value > leave
+        else:
+            on = value <= enter if not on else value < leave
+        self._flags[name] = on
+        return on
+
+    def _classify(self, now: float) -> str:
+        if self._closed or self._serial is None:
+            return DISCONNECTED
+        if self.expected_serial and self._serial != self.expected_serial:
+            return DIFFERENT_DEVICE
+
+        frames = np.array([f[1:] for f in self._frames], dtype=float).reshape(-1, 3)
+        received, lost, crc = frames.sum(axis=0) if len(frames) else (0.0, 0.0, 0.0)
+        loss = lost / (received + lost) if received + lost else 0.0
+        crc_rate = crc / (received + crc) if received + crc else 0.0
+        quiet = self._last_frame is not None and now - self._last_frame > self.silence # stream stopped arriving
+
+        snr_db, wander = 99.0, 0.0
+        if self._blocks and now - self._blocks[0][0] >= self.window / 2: # need a beat or two before judging the signal
+            b = np.array([x[1:] for x in self._blocks]) # sigma, peak, baseline, seconds
+            noise = max(float(np.median(b[:, 0])), 1e-3)
+            snr_db = 20.0 * np.log10(max(float(b[:, 1].max()), 1e-3) / noise)
+            group = max(1, round(BASELINE_S / max(float(np.median(b[:, 3])), 1e-6))) # blocks per BASELINE_S at this rate and block length
+            k = len(b) // group * group # median of every group of block baselines, so QRS and T blocks don't count
+            base = np.median(b[:k, 2].reshape(-1, group), axis=1) if k else np.zeros(1) # too little data yet
+            wander = float(base.max() - base.min()) # baseline swing over the window
+        self.metrics = {"loss": loss, "crc": crc_rate, "snr_db": snr_db, "wander_mv": wander}
+
+        lossy = self._flag("loss", loss, self.loss, above=True)
+        noisy = self._flag("snr", snr_db, self.snr, above=False)
+        noisy = self._flag("wander", wander, self.wander, above=True) or noisy
+        bad_crc = self._flag("crc", crc_rate, self.crc, above=True)
+        if quiet or lossy:
+            return OUT_OF_RANGE
+        if noisy or bad_crc:
+            return NOISE
+        return CONNECTED
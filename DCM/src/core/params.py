@@ -0,0 +1,91 @@
+from dataclasses import dataclass # for easy data storage
+import typing as t # for type hints
+
+@dataclass(frozen=True) # one programmable parameter of a pacing mode
+class ParamSpec:
+    key: str # name used in saved files, reports and device writes (LRL, URL, ...)
+    label: str # form label shown on the dashboard
+    minimum: float
+    maximum: float
+    default: float
+    decimals: int = 0 # 0 -> integer spin box
+    step: float = 1
+
+    def clamp(self, value) -> float: # Bring a value into range and to the right type
+        value = min(self.maximum, max(self.minimum, float(value)))
+        return round(value, self.decimals) if self.decimals else int(value)
+
+
+def _lrl(): return ParamSpec("LRL", "Lower Rate Limit (bpm)", 30, 175, 60) # Lower Rate Limit in bpm
+def _url(): return ParamSpec("URL", "Upper Rate Limit (bpm)", 50, 175, 120) # Upper Rate Limit in bpm
+
+MODES = ["AOO", "VOO", "AAI", "VVI"] # supported modes, in dashboard order
+
+MODE_PARAMS: t.Dict[str, t.List[ParamSpec]] = { # mode -> parameters in form order
+    "AOO": [
+        _lrl(), _url(),
+        ParamSpec("AtrialAmp", "Atrial Amplitude (V)", 0.5, 5.0, 3.5, 2, 0.01),
+        ParamSpec("AtrialPW", "Atrial Pulse Width (ms)", 0.05, 1.90, 0.4, 2, 0.01),
+    ],
+    "VOO": [
+        _lrl(), _url(),
+        ParamSpec("VentAmp", "Ventricular Amplitude (V)", 0.5, 5.0, 3.5, 2, 0.01),
+        ParamSpec("VentPW", "Ventricular Pulse Width (ms)", 0.05, 1.90, 0.4, 2, 0.01),
+    ],
+    "AAI": [
+        _lrl(), _url(),
+        ParamSpec("AtrialAmp", "Atrial Amplitude (V)", 0.5, 5.0, 3.5, 2, 0.01),
+        ParamSpec("AtrialPW", "Atrial Pulse Width (ms)", 0.05, 1.90, 0.4, 2, 0.01),
+        ParamSpec("AS", "Atrial Sensitivity (mV)", 0, 5, 0), # Atrial Sensitivity in mV
+        ParamSpec("ARP", "ARP (ms)", 150, 500, 250),
+        ParamSpec("PVARP", "PVARP (ms)", 150, 500, 250),
+        ParamSpec("Hys", "Hysteresis (bpm)", 0, 50, 0),
+        ParamSpec("RS", "Rate Smoothing (ms)", 0, 500, 0),
+    ],
+    "VVI": [
+        _lrl(), _url(),
+        ParamSpec("VentAmp", "Ventricular Amplitude (V)", 0.5, 5.0, 3.5, 2, 0.01),
+        ParamSpec("VentPW", "Ventricular Pulse Width (ms)", 0.05, 1.90, 0.4, 2, 0.01),
+        ParamSpec("VS", "Ventricular Sensitivity (mV)", 0, 5, 2), # Ventricular Sensitivity in mV
+        ParamSpec("VRP", "VRP (ms)", 150, 500, 250),
+        ParamSpec("Hys", "Hysteresis (bpm)", 0, 50, 0),
+        ParamSpec("RS", "Rate Smoothing (ms)", 0, 500, 0),
+    ],
+}
+
+
+def specs(mode: str) -> t.List[ParamSpec]: # Parameters of a mode, raises KeyError for unknown modes
+    return MODE_PARAMS[mode]
+
+
+def defaults(mode: str) -> dict: # Default parameter values of a mode
+    return {p.key: p.clamp(p.default) for p in specs(mode)}
+
+
+def validate(mode: str, params: dict): # Check a parameter set; returns (ok, message) like UserStore.register
+    if mode not in MODE_PARAMS:
+        return False, f"Unknown mode {mode!r}."
+    known = {p.key: p for p in specs(mode)}
+    for key, value in params.items():
+        spec = known.get(key)
+        if spec is None:
+            return False, f"{key} is not a {mode} parameter."
+        try:
+            v = float(value)
+        except (TypeError, ValueError):
+            return False, f"{key} must be a number."
+        if not spec.minimum <= v <= spec.maximum:
+            return False, f"{key} must be between {spec.minimum:g} and {spec.maximum:g}."
+    lrl = params.get("LRL", known["LRL"].default)
+    url = params.get("URL", known["URL"].default)
+    if float(lrl) > float(url): # a lower limit above the upper one can't be paced
+        return False, "Lower Rate Limit must not exceed Upper Rate Limit."
+    return True, "OK"
+
+
+def normalize(mode: str, params: dict) -> dict: # Fill missing keys with defaults and clamp everything into range
+    values = defaults(mode)
+    for p in specs(mode):
+        if p.key in params:
+            values[p.key] = p.clamp(params[p.key])
+    return values
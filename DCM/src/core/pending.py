@@ -0,0 +1,113 @@
+import json, os, threading # standard libraries
+import typing as t # for type hints
+from core import frames # command types for the batch
+
+PENDING_PATH = os.path.join(os.path.dirname(__file__), "..", "pending.json") # default queue file path
+UNASSIGNED = "" # queue of edits made before any device identified itself
+
+# Device operations made while the pacemaker isn't reachable, kept per device serial and saved to
+# pending.json after every change so they survive a restart. Operations coalesce as they arrive:
+# the last clock set wins, edits to the same parameter collapse into one value, and the last mode
+# programmed is the one left active. flush() sends whatever is left as one BATCH command that the
+# device applies all-or-nothing, and the queue is cleared only once the device has ACKed it.
+# Edits made before the device is known go under UNASSIGNED and adopt() moves them onto the device
+# that answers; they are never sent anywhere else.
+# The GUI queues edits while flush() runs on a device loop thread, so every read and write of the
+# queue, and its file, happens under one lock; only the BATCH exchange itself runs without it.
+
+
+class PendingOps: # Persistent, coalescing queue of device writes
+    def __init__(self, path: t.Optional[str] = PENDING_PATH):
+        self.path = os.path.abspath(path) if path else None # None keeps the queue in memory only
+        self._devices: t.Dict[str, dict] = {} # serial -> {"clock", "mode", "params": {mode: {key: value}}, "edits"}
+        self._lock = threading.RLock() # guards _devices and pending.json
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._devices = json.load(f).get("devices", {})
+        except Exception: # unreadable queue, nothing pending
+            self._devices = {}
+
+    def _save(self): # Write to a temp file and rename, so a crash never leaves half a queue
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"devices": self._devices}, f, indent=2)
+            os.replace(tmp, self.path)
+
+    def _device(self, serial: str) -> dict:
+        return self._devices.setdefault(serial, {"clock": None, "mode": None, "params": {}, "edits": 0})
+
+    def set_clock(self, serial: str, iso: str): # Queue a clock set; replaces any earlier one
+        with self._lock:
+            d = self._device(serial)
+            d["clock"] = iso
+            d["edits"] += 1
+            self._save()
+
+    def set_params(self, serial: str, mode: str, values: dict): # Queue parameter writes and make mode the active one
+        with self._lock:
+            d = self._device(serial)
+            d["params"].setdefault(mode, {}).update(values)
+            d["mode"] = mode
+            d["edits"] += 1
+            self._save()
+
+    def pending(self, serial: str) -> bool: return serial in self._devices
+    def edits(self, serial: str) -> int: return self._devices.get(serial, {}).get("edits", 0) # operations queued before coalescing
+
+    def clock(self, serial: str) -> t.Optional[str]: # queued clock time, if any
+        return self._devices.get(serial, {}).get("clock")
+
+    def ops(self, serial: str) -> t.List[dict]: # Coalesced operations in the order the device should apply them
+        with self._lock:
+            d = self._devices.get(serial)
+            if not d:
+                return []
+            out = []
+            modes = [m for m in d["params"] if m != d["mode"]] + ([d["mode"]] if d["mode"] else [])
+            for mode in modes: # active mode last so it ends up programmed
+                out.append({"type": frames.SET_PARAMS, "body": {"mode": mode, "params": dict(d["params"][mode])}})
+            if d["clock"]:
+                out.append({"type": frames.SET_CLOCK, "body": {"time": d["clock"]}})
+            return out
+
+    def adopt(self, serial: str): # Move the UNASSIGNED edits onto serial; they are newer than anything queued for it
+        with self._lock:
+            d = self._devices.pop(UNASSIGNED, None)
+            if not d:
+                return
+            mine = self._device(serial)
+            for mode, values in d["params"].items():
+                mine["params"].setdefault(mode, {}).update(values)
+            mine["mode"] = d["mode"] or mine["mode"]
+            mine["clock"] = d["clock"] or mine["clock"]
+            mine["edits"] += d["edits"]
+            self._save()
+
+    def clear(self, serial: str):
+        with self._lock:
+            if self._devices.pop(serial, None) is not None:
+                self._save()
+
+    def _snapshot(self, serial: str) -> str: # the device's queue as text, to tell whether it changed
+        with self._lock:
+            return json.dumps(self._devices.get(serial), sort_keys=True)
+
+    async def flush(self, serial: str, protocol) -> t.Optional[dict]: # Send the queue as one transaction, None if empty
+        with self._lock:
+            ops, snapshot = self.ops(serial), self._snapshot(serial)
+        if not ops:
+            return None
+        reply = await protocol.batch(ops) # raises on NAK/timeout; the queue stays for the next try
+        with self._lock:
+            if self._snapshot(serial) == snapshot: # nothing new arrived meanwhile
+                self.clear(serial)
+        return reply
@@ -0,0 +1,177 @@
+import asyncio, os, sys, time, threading # standard libraries
+import typing as t # for type hints
+from core import frames # wire format
+from core.transport import Link # identified serial link
+
+# Request/response commands on a pacemaker link, for asyncio. Every command gets a sequence number
+# and its own future, so up to `window` commands are on the wire at once instead of one round trip
+# each. A command that times out is resent with the same sequence number (only that one, the rest
+# of the window keeps going); the device answers a repeat from its reply cache, so a retried
+# SET_PARAMS is never applied twice. A NAK is the device refusing and is not retried.
+# One DeviceProtocol owns a link's reads: telemetry, programming and set-clock share the protocol.
+
+
+class CommandError(Exception): # The device answered NAK
+    pass
+
+
+class CommandTimeout(CommandError): # No answer after all retries
+    pass
+
+
+class DeviceProtocol:
+    def __init__(self, link: Link, window: int = 8, timeout: float = 0.25, retries: int = 3,
+                 on_stream: t.Optional[t.Callable[[frames.Frame], None]] = None,
+                 on_lost: t.Optional[t.Callable[[Exception], None]] = None, capture=None):
+        self.link = link
+        self.window = window # commands in flight at most
+        self.timeout = timeout # seconds per attempt
+        self.retries = retries # resends after the first attempt
+        self.on_stream = on_stream # called with every EGRAM/MARKER frame
+        self.on_lost = on_lost # called once if the link fails
+        self.capture = capture # core.capture.Capture: every byte read, for sim/replay.py
+        self.decoder = frames.FrameDecoder()
+        self.stats = {"commands": 0, "retries": 0, "timeouts": 0, "naks": 0, "late": 0}
+        self.rtts: t.List[float] = [] # seconds, successful commands, most recent last
+        self._seq = 0
+        self._pending: t.Dict[int, asyncio.Future] = {} # seq -> reply future
+        self._slots: t.Optional[asyncio.Semaphore] = None
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._reader: t.Optional[threading.Thread] = None
+        self._fd: t.Optional[int] = None
+
+    # --- lifecycle ------------------------------------------------------------
+
+    async def start(self): # Begin reading the link on the running loop
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.window)
+        if self.capture:
+            self.capture.begin(self.link.device)
+        port = self.link.port
+        fileno = getattr(port, "fileno", None)
+        if fileno and sys.platform != "win32": # ptys, ttys and pyserial on POSIX
+            self._fd = fileno()
+            os.set_blocking(self._fd, False)
+            self._loop.add_reader(self._fd, self._on_readable)
+        else: # Windows COM ports can't be watched by the loop; read on a thread
+            self._reader = threading.Thread(target=self._read_thread, name="dcm-link-reader", daemon=True)
+            self._reader.start()
+
+    def close(self):
+        if self._fd is not None and self._loop:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(CommandError("link closed"))
+        self._pending.clear()
+        if self.capture:
+            self.capture.close()
+        self.link.close()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._lost(e)
+            return
+        if not data:
+            self._lost(OSError("link closed"))
+            return
+        self._feed(data)
+
+    def _read_thread(self):
+        while self.link.alive:
+            try:
+                data = self.link.read(4096)
+            except Exception as e:
+                self._loop.call_soon_threadsafe(self._lost, e)
+                return
+            if data:
+                self._loop.call_soon_threadsafe(self._feed, data)
+
+    def _lost(self, error: Exception):
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(CommandError(f"link lost: {error}"))
+        if self.on_lost:
+            self.on_lost(error)
+
+    def _feed(self, data: bytes):
+        if self.capture:
+            self.capture(data)
+        for f in self.decoder.feed(data):
+            if f.type in (frames.ACK, frames.NAK):
+                fut = self._pending.get(f.seq)
+                if fut is None or fut.done(): # answer to an attempt we already gave up on or got twice
+                    self.stats["late"] += 1
+                else:
+                    fut.set_result(f)
+            elif self.on_stream:
+                self.on_stream(f)
+
+    # --- commands -------------------------------------------------------------
+
+    def _next_seq(self) -> int:
+        while True:
+            self._seq = (self._seq + 1) & 0xFFFF
+            if self._seq not in self._pending: # a wrapped number still waiting is skipped
+                return self._seq
+
+    async def request(self, ftype: int, body=None, timeout: t.Optional[float] = None,
+                      retries: t.Optional[int] = None) -> dict: # Send one command, return the ACK payload
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        async with self._slots:
+            seq = self._next_seq()
+            data = frames.encode_json(ftype, seq, body) if body is not None else frames.encode(ftype, seq)
+            fut = self._loop.create_future()
+            self._pending[seq] = fut
+            self.stats["commands"] += 1
+            t0 = time.perf_counter()
+            try:
+                for attempt in range(retries + 1):
+                    if attempt:
+                        self.stats["retries"] += 1
+                    try:
+                        self.link.write(data)
+                    except OSError as e: # write timed out or the port went away; the link is closed
+                        fut.cancel()
+                        self._lost(e)
+                        raise CommandError(f"link lost: {e}") from e
+                    try:
+                        reply = await asyncio.wait_for(asyncio.shield(fut), timeout)
+                        break
+                    except asyncio.TimeoutError:
+                        continue
+                else:
+                    self.stats["timeouts"] += 1
+                    raise CommandTimeout(f"{frames.NAMES.get(ftype, ftype)} got no answer after {retries + 1} tries")
+            finally:
+                self._pending.pop(seq, None)
+                if not fut.done():
+                    fut.cancel()
+        if reply.type == frames.NAK:
+            self.stats["naks"] += 1
+            raise CommandError(reply.json().get("error", "refused"))
+        self.rtts.append(time.perf_counter() - t0)
+        del self.rtts[:-1000]
+        return reply.json()
+
+    async def identify(self) -> dict: return await self.request(frames.IDENTIFY)
+    async def get_params(self) -> dict: return await self.request(frames.GET_PARAMS)
+    async def interrogate(self) -> dict: return await self.request(frames.INTERROGATE)
+    async def set_clock(self, iso: str) -> dict: return await self.request(frames.SET_CLOCK, {"time": iso})
+    async def stream(self, on: bool = True) -> dict: return await self.request(frames.STREAM, {"on": on})
+    async def echo(self, text: str = "") -> dict: return await self.request(frames.ECHO, text)
+
+    async def set_params(self, mode: str, values: dict) -> dict: # Program a mode and its parameters
+        return await self.request(frames.SET_PARAMS, {"mode": mode, "params": values})
+
+    async def batch(self, ops: t.List[dict]) -> dict: # Several writes in one frame, applied all-or-nothing
+        return await self.request(frames.BATCH, {"ops": ops})
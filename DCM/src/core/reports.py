@@ -0,0 +1,264 @@
+from bisect import bisect_right # bin lookup
+from datetime import datetime # report print time
+import random # synthetic rate series
+import typing as t # for type hints
+from core.session import AppInfo, Session # report header data
+
+# Report data and HTML, without Qt. The GUI shows the html in a ReportPreview and paints the
+# charts named by chart_placeholder(); scripts can save the html or use the numbers directly.
+
+RATE_EDGES = list(range(30, 190, 10)) # 30–180 bpm, 10-bpm bins
+HEAT_HOURS = 2 # hours per column of the rate x time-of-day table
+TREND_BUCKETS = 10 # number of time segments in the trending report
+
+REPORT_CSS = """
+    <style>
+        body { background:#fff; color:#000; font: 13pt/1.4 -apple-system, Segoe UI, Arial, sans-serif; }
+        table { width:100%; border-collapse:collapse; }
+        th, td { border:1px solid #ccc; padding:6pt 8pt; font-size:12pt; }
+        th { background:#333; color:#fff; text-align:left; }
+        tr.changed { background:#eee; }
+    </style>
+""" # parameter reports
+
+REPORT_CSS_SIMPLE = """
+    <style>
+        body { background:#fff; color:#000; font:13pt/1.4 -apple-system, Segoe UI, Arial, sans-serif; } /* 13 points line spacing 1.4 */
+        h2 { font-size:18pt; margin:0 0 8pt 0; }
+        h3 { font-size:14pt; margin:10pt 0 6pt 0; }
+        table { width:100%; border-collapse:collapse; }
+        th, td { border:1px solid #ccc; padding:6pt 8pt; font-size:12pt; text-align:left; }
+        th { background:#333; color:#fff; }
+        .muted { color:#555; font-size:11pt; }
+    </style>
+""" # Simple stylesheet for the histogram and trending reports
+
+
+def chart_placeholder(name: str) -> str: # Marker text put in the report html where a chart belongs
+    return f"[[chart:{name}]]"
+
+
+# --- numbers ---------------------------------------------------------------
+
+def synthetic_bpm(lrl: int = 60, url: int = 120, n: int = 240, seed: int = 42) -> t.List[int]: # Stand-in rate series until real telemetry exists
+    center = (lrl + url) // 2 # center between LRL and URL
+    spread = max(6, (url - lrl) // 8) # find the spread of data
+    rng = random.Random(seed) # own generator, same sequence as random.seed(seed)
+    return [max(lrl, min(url, int(rng.gauss(center, spread)))) for _ in range(n)] # n values in between lrl and url
+
+
+def bincount(values: t.Iterable[float], edges: t.Sequence[float]) -> t.List[int]: # calculate frequency
+    # Simple histogram: edges like [30, 40, ... 180] produce len(edges)-1 bins; values outside are dropped.
+    nbins = len(edges) - 1
+    counts = [0] * max(nbins, 0) # set the list
+    for v in values:
+        i = bisect_right(edges, v) - 1 # bin whose left edge is <= v
+        if 0 <= i < nbins:
+            counts[i] += 1
+    return counts # return the list of freq
+
+
+def trend_averages(bpm: t.Sequence[float], buckets: int = TREND_BUCKETS) -> t.List[float]: # average BPM per time segment
+    size = max(1, len(bpm) // buckets) # number of samples per bucket
+    avgs = []
+    for i in range(buckets):
+        chunk = bpm[i * size:min((i + 1) * size, len(bpm))] # get the chunk of data
+        if not chunk: # fewer samples than buckets
+            break
+        avgs.append(sum(chunk) / len(chunk))
+    return avgs
+
+
+def bin_labels(edges: t.Sequence[int]) -> t.List[str]: # "30–39", "40–49", ...
+    return [f"{edges[i]}–{edges[i+1]-1}" for i in range(len(edges) - 1)]
+
+
+# --- html ------------------------------------------------------------------
+
+def header_html(report_name: str, app: AppInfo, session: Session) -> str: # Return a header of a PDF file
+    return f"""
+        <div style="border-bottom:1px solid #aaa;margin-bottom:10px;padding-bottom:6px;">
+            <h2 style="margin:0 0 6px 0;">{report_name}</h2>
+            <table style="font-size:12px;">
+                <tr><td><b>Institution</b></td><td>{app.institution}</td></tr>
+                <tr><td><b>Printed</b></td><td>{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</td></tr>
+                <tr><td><b>Device</b></td><td>{session.device_id.label()}</td></tr>
+                <tr><td><b>DCM Serial</b></td><td>{app.dcm_serial}</td></tr>
+                <tr><td><b>Application</b></td><td>{app.model_number} v{app.version}</td></tr>
+            </table>
+        </div>
+    """
+
+
+CELL = 'style="border:1px solid #ccc;padding:6px;"' # inline cell style, QTextDocument ignores most css selectors
+HEAD = 'style="text-align:left;border:1px solid #ccc;padding:6px;"'
+
+
+def table_from_kv(kv: dict, cols=("Parameter", "Value")) -> str: # Make a table from all the parameter data (kv)
+    rows = "".join(f"<tr><td {CELL}>{k}</td><td {CELL}>{v}</td></tr>" for k, v in kv.items())
+    return f"""
+        <table style="width:100%;border-collapse:collapse;">
+            <tr><th {HEAD}>{cols[0]}</th>
+            <th {HEAD}>{cols[1]}</th></tr>
+            {rows}
+        </table>
+    """
+
+
+def diff_table(before: dict, after: dict) -> str: # create a difference table between old and new values
+    row_html = []
+    for k in sorted(set(before) | set(after)): # every key in either set
+        a = before.get(k, "—"); b = after.get(k, "—")
+        mark = "" if a == b else ' style="background:#ff8a8a;"' # changed rows are reddish
+        row_html.append(f'<tr{mark}><td {CELL}>{k}</td><td {CELL}>{a}</td><td {CELL}>{b}</td></tr>')
+    return f"""
+        <table style="width:100%;border-collapse:collapse;">
+            <tr><th {HEAD}>Parameter</th>
+            <th {HEAD}>Saved</th>
+            <th {HEAD}>Current</th></tr>
+            {"".join(row_html)}
+        </table>
+    """
+
+
+def brady_report(mode: str, params: dict, app: AppInfo, session: Session) -> str: # Bradycardia Parameters Report html
+    return REPORT_CSS + header_html("Bradycardia Parameters Report", app, session) + f"<h3>Mode: {mode}</h3>" + table_from_kv(params)
+
+
+def temporary_report(mode: str, saved: dict, current: dict, app: AppInfo, session: Session) -> str: # Temporary Parameters Report html
+    note = "<p style='color:#666;'>Rows highlighted = values changed since last Save.</p>" # explain the table
+    return REPORT_CSS + header_html("Temporary Parameters Report", app, session) + f"<h3>Mode: {mode}</h3>" + note + diff_table(saved, current)
+
+
+def paced_table(paced: t.Dict[str, t.Optional[float]]) -> str: # {"atrial": 97.5, "ventricular": None} -> table
+    rows = "".join(f"<tr><td>{chamber.capitalize()}</td><td>{'—' if v is None else f'{v:.1f}%'}</td></tr>"
+                   for chamber, v in paced.items())
+    return "<h3>Pacing</h3><table><tr><th>Chamber</th><th>Paced</th></tr>" + rows + "</table>"
+
+
+def _heat(share: float) -> str: # cell style for a share of the table's largest count, white to dark red
+    if share <= 0:
+        return CELL
+    g = int(235 - 200 * share)
+    ink = "#fff" if share > 0.55 else "#000"
+    return f'style="border:1px solid #ccc;padding:4px;text-align:right;background-color:#{235 - int(60 * share):02x}{g:02x}{g:02x};color:{ink};"'
+
+
+def heat_map(counts, rows: t.Sequence[str], columns: t.Sequence[str], corner: str = "bpm") -> str: # Count matrix as a shaded table
+    # rows are drawn top to bottom in reverse, so the highest rates are at the top like a chart's y axis
+    top = max((int(c) for row in counts for c in row), default=0) or 1
+    head = f"<tr><th {HEAD}>{corner}</th>" + "".join(f"<th {HEAD}>{c}</th>" for c in columns) + "</tr>"
+    body = "".join(
+        f"<tr><td {CELL}>{label}</td>" + "".join(f"<td {_heat(int(c) / top)}>{int(c) or ''}</td>" for c in row) + "</tr>"
+        for label, row in reversed(list(zip(rows, counts)))
+    )
+    return f'<table style="width:100%;border-collapse:collapse;">{head}{body}</table>'
+
+
+def histogram_heat_maps(histogram, edges=RATE_EDGES, hours: int = HEAT_HOURS) -> str: # Rate x time of day and rate x marker tables
+    from core.histogram import MARKER_NAMES
+    labels = bin_labels(edges)
+    out = ""
+    if histogram.clock0 is not None and len(histogram):
+        columns = [f"{h:02d}" for h in range(0, 24, max(1, hours))]
+        out += (f"<h3>Rate by time of day (beats, {hours} h columns)</h3>"
+                + heat_map(histogram.table("hour", edges, hours), labels, columns))
+    marker = histogram.table("marker", edges)
+    if marker.any():
+        out += "<h3>Rate by marker (events)</h3>" + heat_map(marker, labels, MARKER_NAMES)
+    return out
+
+
+def histogram_report(bpm: t.Sequence[float], app: AppInfo, session: Session, edges=RATE_EDGES,
+                     paced: t.Optional[dict] = None, histogram=None,
+                     hours: int = HEAT_HOURS): # Rate Histogram Report html and its counts
+    # histogram: core.histogram.RateHistogram of the recording, adds its heat maps at the same edges
+    counts = bincount(bpm, edges)
+    total = sum(counts) or 1 # if we do not have any beats set artificial as 1
+    rows = "".join( # each bucket with frequency and percentage of all beats; the bars are drawn by the chart
+        f"<tr><td>{label}</td><td>{c}</td><td>{100 * c / total:.1f}%</td></tr>"
+        for label, c in zip(bin_labels(edges), counts)
+    )
+    table = (
+        "<h3>Rate Histogram (beats per minute)</h3>"
+        f"<p>{chart_placeholder('histogram')}</p>"
+        "<table>"
+        "<tr><th>Bin (bpm)</th><th>Count</th><th>Share</th></tr>"
+        + rows + "</table>"
+        + (paced_table(paced) if paced else "")
+        + (histogram_heat_maps(histogram, edges, hours) if histogram is not None else "") +
+        "<h3>Egram</h3>"
+        f"<p>{chart_placeholder('egram')}</p>"
+    )
+    html = REPORT_CSS_SIMPLE + header_html("Rate Histogram Report", app, session) + table + "</body></html>"
+    return html, counts
+
+
+def _ms(v: t.Optional[float], unit: str = " ms", digits: int = 1) -> str: # metric cell, — where undefined
+    return "—" if v is None else f"{v:.{digits}f}{unit}"
+
+
+def hrv_table(m: dict) -> str: # core.hrv.HrvEngine.metrics() -> Heart Rate Variability section
+    rows = [("Intervals", str(m["beats"])), ("Mean RR", _ms(m["mean_rr"])), ("SDNN", _ms(m["sdnn"])),
+            ("RMSSD", _ms(m["rmssd"])), ("pNN50", _ms(m["pnn50"], "%")),
+            ("SDANN", _ms(m["sdann"]) + f" ({m['segments']} × 5 min)"),
+            ("LF power", _ms(m["lf"], " ms²", 0)), ("HF power", _ms(m["hf"], " ms²", 0)), ("LF/HF", _ms(m["lf_hf"], "", 2))]
+    return (
+        "<h3>Heart Rate Variability</h3>"
+        f"<p class='muted'>Time domain over the whole recording; LF and HF over its last {m['window_s'] / 60:.1f} min.</p>"
+        "<table><tr><th>Measure</th><th>Value</th></tr>"
+        + "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k, v in rows) + "</table>"
+    )
+
+
+def trending_report(bpm: t.Sequence[float], app: AppInfo, session: Session, hrv: t.Optional[dict] = None,
+                    synthetic: bool = False): # Trending Report html and its segment averages (hrv: HrvEngine.metrics(), synthetic: bpm is synthetic_bpm())
+    avgs = trend_averages(bpm)
+    rows = "".join(f"<tr><td>T{i+1}</td><td>{v:.1f} bpm</td></tr>" for i, v in enumerate(avgs))
+    table = (
+        "<h3>Trending (average BPM per time segment)</h3>"
+        + ("<p class='muted'>No telemetry recorded yet; synthetic rates between LRL and URL.</p>" if synthetic else "") +
+        f"<p>{chart_placeholder('trend')}</p>"
+        "<table>"
+        "<tr><th>Segment</th><th>Average</th></tr>"
+        + rows + "</table>"
+        + (hrv_table(hrv) if hrv and hrv["beats"] else "") +
+        "<h3>Egram</h3>"
+        f"<p>{chart_placeholder('egram')}</p>"
+    )
+    html = REPORT_CSS_SIMPLE + header_html("Trending Report", app, session) + table + "</body></html>"
+    return html, avgs
+
+
+EPISODE_ROWS = 200 # longest episode table in the report
+EPISODE_STRIPS = 6 # episodes shown with their egram
+
+
+def _clock(seconds: float) -> str: # recording time as h:mm:ss
+    s = int(seconds)
+    return f"{s // 3600}:{s // 60 % 60:02d}:{s % 60:02d}"
+
+
+def episode_report(episodes: t.Sequence, app: AppInfo, session: Session): # Episode Report html and the episodes drawn
+    from core.episodes import KIND_TEXT
+    counts = {kind: sum(1 for ep in episodes if ep.kind == kind) for kind in KIND_TEXT}
+    summary = "".join(f"<tr><td>{text}</td><td>{counts[kind]}</td></tr>" for kind, text in KIND_TEXT.items())
+    rows = "".join(
+        f"<tr><td>{i + 1}</td><td>{KIND_TEXT.get(ep.kind, ep.kind)}</td><td>{_clock(ep.start)}</td>"
+        f"<td>{ep.duration:.1f} s</td><td>{ep.beats}</td><td>{ep.max_rate:.0f}</td><td>{ep.min_rate:.0f}</td></tr>"
+        for i, ep in enumerate(episodes[:EPISODE_ROWS])
+    )
+    more = f"<p class='muted'>First {EPISODE_ROWS} of {len(episodes)} episodes.</p>" if len(episodes) > EPISODE_ROWS else ""
+    shown = sorted(episodes, key=lambda ep: ep.duration, reverse=True)[:EPISODE_STRIPS] # longest episodes get an egram
+    strips = "".join(f"<p>{KIND_TEXT.get(ep.kind, ep.kind)} at {_clock(ep.start)}</p><p>{chart_placeholder(f'episode{i}')}</p>"
+                     for i, ep in enumerate(shown))
+    table = (
+        "<h3>Episodes</h3>"
+        "<table><tr><th>Type</th><th>Count</th></tr>" + summary + "</table>"
+        + ("<p class='muted'>No episodes recorded.</p>" if not episodes else
+           "<h3>Episode log</h3>"
+           "<table><tr><th>#</th><th>Type</th><th>Start</th><th>Duration</th><th>Intervals</th><th>Max bpm</th><th>Min bpm</th></tr>"
+           + rows + "</table>" + more + "<h3>Egram</h3>" + strips)
+    )
+    html = REPORT_CSS_SIMPLE + header_html("Episode Report", app, session) + table + "</body></html>"
+    return html, shown
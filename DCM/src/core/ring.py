@@ -0,0 +1,127 @@
+import os, time # standard libraries
+from multiprocessing import shared_memory # one block per ring, shared by name
+import typing as t # for type hints
+import numpy as np
+
+# Single-writer ring of float64 samples in shared memory, for handing telemetry from the
+# acquisition process to the GUI without a pipe or a copy. The block starts with a header of 8-byte
+# slots, then one row per channel of 2 * capacity samples:
+#     [head, tail, writer pid, generation | rate, heartbeat, spare, spare] [channel 0 ...] [channel 1 ...]
+# head counts samples ever written and is only stored by the writer, after the samples themselves;
+# tail is the reader's position and is only stored by the reader. Both are aligned 8-byte words, so
+# each store is a single move that the other process sees whole. Every sample is written twice,
+# at i and i + capacity, so the newest n <= capacity samples are always one contiguous slice and
+# a reader can use them as a numpy view instead of copying around the wrap point. The writer never
+# waits for the reader: a reader more than capacity behind has lost the oldest samples and is told
+# how many.
+
+HEAD, TAIL, PID, GENERATION = 0, 1, 2, 3 # int64 header slots
+RATE, HEARTBEAT = 4, 5 # float64 header slots
+HEADER = 8 # slots
+
+
+class SampleRing:
+    def __init__(self, channels: int, capacity: int, name: t.Optional[str] = None, create: bool = True):
+        self.channels = channels
+        self.capacity = capacity
+        size = 8 * (HEADER + channels * 2 * capacity)
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name) # children share the parent's resource tracker
+        self.owner = create # the creating process unlinks the block
+        self._ints = np.ndarray((HEADER,), dtype=np.int64, buffer=self.shm.buf)
+        self._floats = np.ndarray((HEADER,), dtype=np.float64, buffer=self.shm.buf)
+        self.data = np.ndarray((channels, 2 * capacity), dtype=np.float64, buffer=self.shm.buf, offset=8 * HEADER)
+        if create:
+            self._ints[:] = 0
+            self._floats[RATE] = 0.0
+
+    @classmethod
+    def attach(cls, spec: t.Tuple[str, int, int]) -> "SampleRing": # (name, channels, capacity) from spec()
+        name, channels, capacity = spec
+        return cls(channels, capacity, name, create=False)
+
+    def spec(self) -> t.Tuple[str, int, int]: # what another process needs to attach
+        return self.shm.name, self.channels, self.capacity
+
+    # --- header ------------------------------------------------------------------
+
+    @property
+    def head(self) -> int: return int(self._ints[HEAD]) # samples written so far
+
+    @property
+    def tail(self) -> int: return int(self._ints[TAIL]) # samples the reader has taken
+
+    @property
+    def rate(self) -> float: return float(self._floats[RATE])
+
+    @rate.setter
+    def rate(self, value: float): self._floats[RATE] = value
+
+    @property
+    def generation(self) -> int: return int(self._ints[GENERATION]) # writers that have attached so far
+
+    @property
+    def writer(self) -> int: return int(self._ints[PID])
+
+    def heartbeat_age(self) -> float: # seconds since the writer last showed it was alive (monotonic is system-wide)
+        beat = float(self._floats[HEARTBEAT])
+        return time.monotonic() - beat if beat else float("inf")
+
+    def claim(self): # A new writer process takes over the ring; the sample count carries on
+        self._ints[PID] = os.getpid()
+        self._ints[GENERATION] += 1
+        self.beat()
+
+    def beat(self):
+        self._floats[HEARTBEAT] = time.monotonic()
+
+    # --- writer ------------------------------------------------------------------
+
+    def write(self, block: np.ndarray): # (channels, n) samples, n may be more than capacity
+        block = np.asarray(block, dtype=np.float64).reshape(self.channels, -1)
+        cap, head = self.capacity, self.head
+        n = block.shape[1]
+        if n > cap: # only the newest capacity samples can be kept
+            head += n - cap
+            block, n = block[:, -cap:], cap
+        pos = head % cap
+        end = pos + n
+        self.data[:, pos:end] = block
+        if end <= cap:
+            self.data[:, pos + cap:end + cap] = block
+        else: # the copy above ran into the mirror half; finish the mirror at the front
+            k = cap - pos
+            self.data[:, pos + cap:] = block[:, :k]
+            self.data[:, :end - cap] = block[:, k:]
+        self._ints[HEAD] = head + n # publish last: the samples are in place before the reader can see them
+
+    # --- reader ------------------------------------------------------------------
+
+    def window(self, n: int, head: t.Optional[int] = None) -> np.ndarray: # view of the n samples before head (newest by default)
+        head = self.head if head is None else head
+        n = max(0, min(n, head, self.capacity))
+        start = (head - n) % self.capacity
+        return self.data[:, start:start + n]
+
+    def read(self, since: int) -> t.Tuple[int, int, np.ndarray]: # (head, samples lost, view of samples since..head)
+        head = self.head
+        lost = max(0, head - since - self.capacity)
+        return head, lost, self.window(head - since - lost, head)
+
+    def consume(self, position: int): # Reader has everything before position
+        self._ints[TAIL] = position
+
+    def close(self):
+        self._ints = self._floats = self.data = None # views must go before the buffer
+        try:
+            self.shm.close()
+        except BufferError: # a caller still holds a view; the mapping goes when that does
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
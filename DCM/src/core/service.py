@@ -0,0 +1,246 @@
+import asyncio, json, os, secrets, threading # standard libraries
+from collections import OrderedDict # login tokens, oldest first
+import typing as t # for type hints
+
+# Local service for clinic integration scripts: HTTP/1.1 on 127.0.0.1 (or a Unix socket), served
+# by asyncio on its own thread so any number of clients cost the GUI nothing while they wait.
+#     POST /rpc     JSON-RPC 2.0: {"jsonrpc": "2.0", "method": ..., "params": {...}, "id": ...}
+#     GET  /egram   chunked stream of JSON lines, one per publish() (egram subscription)
+# Every method but login needs the token login returned, as "Authorization: Bearer <token>" or a
+# "token" param. Methods are coroutines (user, **params) -> JSON-able result; what they do is up to
+# the owner (utility/service.py binds them to the shell). Connections are kept alive, so a script
+# pays for its TCP handshake once. publish() may be called from any thread: the data is encoded
+# once by the caller and the same bytes go to every subscriber's bounded queue; a subscriber that
+# can't keep up loses whole lines (and is told how many with the next one), the others don't wait.
+
+HOST, PORT = "127.0.0.1", 8765 # default address; only local clients
+MAX_HEAD = 16 * 1024 # request line and headers
+MAX_BODY = 1024 * 1024
+IDLE_S = 60.0 # a kept-alive connection with no request for this long is closed
+TOKENS = 1000 # logins remembered at most, the oldest is forgotten first
+QUEUE = 64 # lines buffered per egram subscriber
+
+# JSON-RPC error codes
+PARSE_ERROR, INVALID_REQUEST, METHOD_NOT_FOUND, INVALID_PARAMS = -32700, -32600, -32601, -32602
+FAILED, UNAUTHORIZED = -32000, -32001
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large"}
+
+
+class RpcError(Exception): # A method refusing a call; becomes the JSON-RPC error object
+    def __init__(self, message: str, code: int = FAILED):
+        super().__init__(message)
+        self.code = code
+
+
+def parse_address(text: t.Optional[str]) -> t.Tuple[t.Optional[str], int, t.Optional[str]]: # "host:port", "port" or "unix:path" -> (host, port, unix path)
+    if not text:
+        return HOST, PORT, None
+    if text.startswith("unix:"):
+        return None, 0, text[5:]
+    host, _, port = text.rpartition(":")
+    return host or HOST, int(port), None
+
+
+class Service:
+    def __init__(self, methods: t.Dict[str, t.Callable[..., t.Awaitable]],
+                 authenticate: t.Callable[[str, str], t.Awaitable[bool]], address: t.Optional[str] = None):
+        self.methods = methods # name -> coroutine function (user, **params)
+        self.authenticate = authenticate # (username, password) -> ok
+        self.host, self.port, self.unix = parse_address(address)
+        self.tokens: "OrderedDict[str, str]" = OrderedDict() # token -> username
+        self.stats = {"connections": 0, "open": 0, "requests": 0, "errors": 0, "subscribers": 0, "published": 0,
+                      "dropped": 0}
+        self._subscribers: t.Dict[asyncio.Queue, t.List[int]] = {} # queue -> [lines lost since the last one sent]
+        self._server = None
+        self.loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._thread: t.Optional[threading.Thread] = None
+
+    # --- lifecycle ------------------------------------------------------------
+
+    def start(self) -> "Service": # Listen on a thread of its own; returns once the socket is bound
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="dcm-service", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._listen(), self.loop).result()
+        return self
+
+    async def _listen(self):
+        if self.unix:
+            if os.path.exists(self.unix): # left behind by a DCM that didn't shut down
+                os.unlink(self.unix)
+            self._server = await asyncio.start_unix_server(self._connection, self.unix, limit=MAX_HEAD)
+        else:
+            self._server = await asyncio.start_server(self._connection, self.host, self.port, limit=MAX_HEAD)
+            self.port = self._server.sockets[0].getsockname()[1] # the one picked for port 0
+
+    @property
+    def address(self) -> str: return f"unix:{self.unix}" if self.unix else f"http://{self.host}:{self.port}"
+
+    def close(self):
+        if self.loop is None:
+            return
+        async def stop():
+            self._server.close()
+            for q in list(self._subscribers): # end the streams
+                q.put_nowait(None)
+            await asyncio.sleep(0)
+        asyncio.run_coroutine_threadsafe(stop(), self.loop).result(2.0)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(2.0)
+        if self.unix and os.path.exists(self.unix):
+            os.unlink(self.unix)
+        self.loop = None
+
+    # --- egram subscribers ----------------------------------------------------
+
+    @property
+    def subscribed(self) -> bool: return bool(self._subscribers) # read from other threads; a dict's truth is atomic
+
+    def publish(self, line: bytes): # Any thread: one JSON line (no newline) to every subscriber
+        if self.loop is not None and self._subscribers:
+            self.loop.call_soon_threadsafe(self._fanout, line)
+
+    def _fanout(self, line: bytes):
+        self.stats["published"] += 1
+        for q, lost in self._subscribers.items():
+            if q.full():
+                lost[0] += 1
+                self.stats["dropped"] += 1
+            else:
+                q.put_nowait(line)
+
+    # --- HTTP -----------------------------------------------------------------
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        self.stats["open"] += 1
+        try:
+            while await self._request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+            pass # the client went away, sent garbage or sat idle
+        finally:
+            self.stats["open"] -= 1
+            writer.close()
+
+    async def _request(self, reader, writer) -> bool: # Serve one request; False closes the connection
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_S)
+        lines = head.decode("latin-1").split("\r\n")
+        verb, path, version = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        path, _, query = path.partition("?")
+        keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            self._respond(writer, 413, {"error": "body too large"}, False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+        self.stats["requests"] += 1
+        token = headers.get("authorization", "").partition("Bearer ")[2] or dict(
+            p.partition("=")[::2] for p in query.split("&") if p).get("token", "")
+        if path == "/rpc":
+            if verb != "POST":
+                self._respond(writer, 405, {"error": "POST JSON-RPC requests here"}, keep)
+            else:
+                self._respond(writer, 200, await self._rpc(body, token), keep)
+            await writer.drain()
+            return keep
+        if path == "/egram" and verb == "GET":
+            if token not in self.tokens:
+                self._respond(writer, 401, {"error": "log in first"}, keep)
+                await writer.drain()
+                return keep
+            await self._stream(writer)
+            return False
+        self._respond(writer, 404, {"error": f"no {path}"}, keep)
+        await writer.drain()
+        return keep
+
+    def _respond(self, writer, status: int, obj, keep: bool):
+        if status != 200:
+            self.stats["errors"] += 1
+        body = json.dumps(obj, separators=(",", ":")).encode()
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode() + body)
+
+    async def _stream(self, writer): # Chunked JSON lines until the client or the service goes away
+        q: asyncio.Queue = asyncio.Queue(QUEUE)
+        lost = [0]
+        self._subscribers[q] = lost
+        self.stats["subscribers"] += 1
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+                     b"Cache-Control: no-store\r\nConnection: close\r\n\r\n")
+        try:
+            while True:
+                line = await q.get()
+                if line is None:
+                    break
+                if lost[0]: # tell the client what it missed, in the stream's own terms
+                    line = line[:-1] + b',"lost":%d}' % lost[0]
+                    lost[0] = 0
+                writer.write(b"%x\r\n%s\n\r\n" % (len(line) + 1, line))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            del self._subscribers[q]
+            self.stats["subscribers"] -= 1
+
+    # --- JSON-RPC ---------------------------------------------------------------
+
+    async def _rpc(self, body: bytes, token: str):
+        try:
+            req = json.loads(body)
+        except ValueError:
+            return self._error(None, PARSE_ERROR, "not JSON")
+        if isinstance(req, list): # a batch: run its calls concurrently, answer in order
+            return await asyncio.gather(*(self._call(r, token) for r in req)) if req else \
+                self._error(None, INVALID_REQUEST, "empty batch")
+        return await self._call(req, token)
+
+    async def _call(self, req, token: str) -> dict:
+        if not isinstance(req, dict) or not isinstance(req.get("method"), str):
+            return self._error(None, INVALID_REQUEST, "expected an object with a method")
+        rid, name = req.get("id"), req["method"]
+        params = req.get("params") or {}
+        if not isinstance(params, dict):
+            return self._error(rid, INVALID_PARAMS, "params must be an object")
+        try:
+            if name == "login":
+                result = await self._login(**params)
+            elif name == "logout":
+                result = self.tokens.pop(params.get("token", token), None) is not None
+            else:
+                method = self.methods.get(name)
+                if method is None:
+                    return self._error(rid, METHOD_NOT_FOUND, f"no method {name}")
+                user = self.tokens.get(params.pop("token", None) or token)
+                if user is None:
+                    return self._error(rid, UNAUTHORIZED, "log in first")
+                result = await method(user, **params)
+        except RpcError as e:
+            return self._error(rid, e.code, str(e))
+        except TypeError as e: # wrong or missing params
+            return self._error(rid, INVALID_PARAMS, str(e))
+        except Exception as e:
+            return self._error(rid, FAILED, f"{type(e).__name__}: {e}")
+        return {"jsonrpc": "2.0", "id": rid, "result": result}
+
+    def _error(self, rid, code: int, message: str) -> dict:
+        self.stats["errors"] += 1
+        return {"jsonrpc": "2.0", "id": rid, "error": {"code": code, "message": message}}
+
+    async def _login(self, username: str, password: str) -> dict:
+        if not await self.authenticate(username, password):
+            raise RpcError("Invalid username or password.", UNAUTHORIZED)
+        token = secrets.token_urlsafe(24)
+        self.tokens[token] = username
+        while len(self.tokens) > TOKENS:
+            self.tokens.popitem(last=False)
+        return {"token": token, "user": username}
@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field, asdict # for easy data storage
+from datetime import datetime # timestamps for the saved parameter log
+import typing as t # for type hints
+
+@dataclass # fixed facts about this DCM install, shown in About and on every report
+class AppInfo:
+    model_number: str = "DCM-EMU-01" # If there is a way in the future pull metadata off the DCM device and return application model number
+    version: str = "0.1.0" # software revision
+    institution: str = "McMaster University" # Change the institution if needed
+    dcm_serial: str = "987654321-ABCDE-XYZ" # Change if you can actually pull the serial number from the device.
+
+
+@dataclass # identity of the pacemaker on the other end of the link
+class DeviceId:
+    model: str = "Pacemaker"
+    serial: str = "COM1"
+
+    def label(self) -> str: # "Pacemaker / COM1" as printed in report headers
+        return f"{self.model} / {self.serial}"
+
+
+@dataclass # state of one interrogation session; new_patient() starts a fresh one
+class Session:
+    connected: bool = False
+    device_id: DeviceId = field(default_factory=DeviceId)
+    started_at: t.Optional[str] = None
+    last_seen: t.Optional[str] = None
+    status: str = "Disconnected" # text shown in the status pill
+    saved_params: t.Dict[str, dict] = field(default_factory=dict) # mode -> last saved parameters
+
+    def attach(self, device: DeviceId): # Record the device an identified link answered for
+        now = datetime.now().isoformat(timespec="seconds")
+        self.connected = True
+        self.device_id = device
+        self.started_at = self.started_at or now
+        self.last_seen = now
+
+    def save_params(self, mode: str, params: dict) -> str: # Remember a saved parameter set, returns its log line
+        self.saved_params[mode] = dict(params)
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " " + mode + " -> " + str(params)
+
+    def as_dict(self) -> dict: # plain dict, e.g. for json
+        return asdict(self)
@@ -0,0 +1,281 @@
+import typing as t # for type hints
+from core.egram import EgramData # egram buffers
+from core.episodes import EpisodeLog # rhythm episodes found in the beat stream
+
+class Telemetry: # Live data coming from the device: egram samples and the beat-rate series
+    def __init__(self, chains: t.Optional[dict] = None, live_window_s: t.Optional[float] = None):
+        self.egram = EgramData() # filtered atrial/ventricular samples of the live window
+        self.history = None # core.codec.EgramHistory, every filtered sample of the recording, compressed
+        self.live_window_s = live_window_s # seconds kept in self.egram, None keeps the whole recording there
+        self.dropped = 0 # samples trimmed from the front of self.egram (recording position of egram index 0)
+        self.bpm: t.List[int] = [] # instantaneous rate per beat, used by the rate reports
+        self.running = False # true while a link is streaming
+        self.chains = chains # per-channel filter chains, None for core.filters.EGRAM_CHAIN
+        self.filters = None # core.filters.FilterBank for the stream's sample rate, built with the first block
+        self.beats = None # core.beats.BeatDetector on the filtered ventricular lead
+        self._last_beat: t.Optional[int] = None
+        self._last_at = 0.0 # stream time of the previous beat
+        self._annotations = None
+        self._histogram = None
+        self._hrv = None
+        self.tiles: t.Dict[str, t.Any] = {} # core.tiles.TilePyramid per channel, for zoomed-out views
+        self.episodes = EpisodeLog() # finished episodes of the recording
+        self.detector = None # core.episodes.EpisodeDetector on the beat stream
+        self.lower_rate = 60.0 # programmed LRL, runs below it are episodes
+        self._offset = 0 # recording position of the first sample the current filters saw
+        self._rings = None # core.acquisition rings when samples come from an acquisition process
+        self._read: t.Dict[str, int] = {} # ring positions taken so far
+        self._skip = 0 # ring position of recording sample 0 (plus samples lost to a stalled reader)
+
+    @property
+    def annotations(self): # core.annotations.AnnotationStore with the pace/sense markers of the recording
+        if self._annotations is None:
+            from core.annotations import AnnotationStore # numpy, loaded with the first marker
+            self._annotations = AnnotationStore()
+        return self._annotations
+
+    @property
+    def histogram(self): # core.histogram.RateHistogram, rate x hour of day and rate x marker of the recording
+        if self._histogram is None:
+            from core.histogram import RateHistogram # numpy, loaded with the first beat
+            self._histogram = RateHistogram()
+        return self._histogram
+
+    @property
+    def hrv(self): # core.hrv.HrvEngine fed with the beat intervals of the recording
+        if self._hrv is None:
+            from core.hrv import HrvEngine
+            self._hrv = HrvEngine()
+        return self._hrv
+
+    def start(self):
+        self.running = True
+
+    def stop(self): # For deliverable 1 there is nothing to close since we are not communicating with the pacemaker
+        self.running = False
+
+    def clear(self): # Drop everything recorded for the current patient
+        self.egram.clear()
+        self.history = None
+        self.dropped = 0
+        self.bpm = []
+        self.filters = self.beats = None # new patient, fresh filter state
+        self._last_beat = None
+        self._annotations = None
+        self._histogram = None
+        self._hrv = None
+        self.tiles = {}
+        self.episodes = EpisodeLog()
+        self.detector = None
+        self._offset = 0
+        if self._rings is not None: # older ring samples belong to the previous patient
+            self._read = {name: ring.head for name, ring in self._rings.items()}
+            self._skip = self.egram.base
+
+    def append_samples(self, time: t.Sequence[float], atrial: t.Sequence[float], ventricular: t.Sequence[float],
+                       rate: t.Optional[float] = None): # Filter a block of raw egram samples and add it
+        import numpy as np
+        rate = rate or self.egram.sampling_rate
+        if self.filters is None or self.filters.fs != rate:
+            from core.filters import FilterBank # band-pass, notch and baseline removal (numpy, loaded with the first block)
+            from core.beats import BeatDetector
+            self.filters = FilterBank(rate, self.chains)
+            self.beats = BeatDetector(rate)
+            self._begin(rate)
+        time = np.asarray(time, dtype=float)
+        out = self.filters.process(atrial=atrial, ventricular=ventricular)
+        self._ingest(time, out)
+        stream = int(round(float(time[0]) * rate)) if len(time) else None # device sample number, from the frame's start
+        self._add_beats([self._offset + s for s in self.beats.process(out["ventricular"], stream)], time)
+
+    def _begin(self, rate: float): # Stream (re)started at this rate: fresh episode detector from the next sample
+        from core.episodes import EpisodeDetector
+        self.detector = EpisodeDetector(rate, low_bpm=self.lower_rate, on_episode=self.episodes.add)
+        self.egram.sampling_rate = rate
+        self._offset = self.samples
+        self._last_beat = None
+
+    def _ingest(self, time, out: dict): # One block of filtered samples into the history, live window and tiles
+        import numpy as np
+        if self.history is None:
+            from core.codec import EgramHistory
+            from time import time as wall_clock
+            self.history = EgramHistory(self.egram.sampling_rate, float(time[0]) if len(time) else 0.0, list(out))
+            if len(time): # the newest sample is now: local time of day of every later beat
+                self.histogram.clock0 = wall_clock() - float(time[-1])
+        self.history.append(np.column_stack(list(out.values())))
+        if self._rings is None: # a shared egram follows the ring by itself
+            self.egram.time.extend(time.tolist())
+            self.egram.atrial.extend(out["atrial"].tolist())
+            self.egram.ventricular.extend(out["ventricular"].tolist())
+            self._trim()
+        if not self.tiles:
+            from core.tiles import TilePyramid
+            self.tiles = {name: TilePyramid() for name in out}
+        for name, x in out.items():
+            self.tiles[name].append(x)
+
+    def _add_beats(self, beats: t.Sequence[int], time): # Recording positions of new beats; time is the newest block
+        # Recording positions count the samples received, the block times come from the frames' start
+        # sample. Where the two disagree, frames were lost between two beats: the interval is unknown
+        # (it may even hold a missed beat), so no rate is recorded and the RR chain starts again.
+        n, rate = self.samples, self.egram.sampling_rate
+        for i in beats:
+            if i < 0: # before this recording (a new patient, or samples a stalled reader lost)
+                continue
+            k = i - n + len(time)
+            at = float(time[k]) if 0 <= k < len(time) else float(self.history.times(i, i + 1)[0]) # an earlier block
+            if self._last_beat is not None and abs((at - self._last_at) * rate - (i - self._last_beat)) < 0.5:
+                self.append_beat(int(round(60.0 * rate / (i - self._last_beat))), at)
+                self.hrv.add(1000.0 * (i - self._last_beat) / rate, at) # the exact interval, not the rounded rate
+            elif self._last_beat is not None:
+                self.hrv.gap()
+            self._last_beat, self._last_at = i, at
+            self.detector.beat(at, i)
+        if len(time):
+            self.detector.tick(float(time[-1])) # a pause shows up before the next beat
+
+    # --- samples from an acquisition process (core.acquisition) ----------------------
+
+    def attach(self, rings: dict): # Read from the rings of an acquisition process instead of append_samples
+        from core.egram import SharedEgram
+        from core.acquisition import EGRAM
+        self.egram = SharedEgram(rings[EGRAM], rings[EGRAM].capacity, self.egram.sampling_rate)
+        self._rings = rings
+        self._read = {name: ring.head for name, ring in rings.items()} # the recording so far carries on from here
+        self._skip = rings[EGRAM].head - self.samples
+        self.detector = None # new stream, _begin() with the first pull
+
+    def detach(self): # Stop reading the rings (before they are closed); the recording stays
+        from core.egram import EgramData
+        if self._rings is None:
+            return
+        self.egram = EgramData(sampling_rate=self.egram.sampling_rate, timestamp=self.egram.timestamp)
+        self._rings = None
+
+    def pull(self, refractory_ms: t.Optional[t.Callable[[], dict]] = None) -> int: # Take what the child wrote since the last pull
+        # Returns the new sample count. refractory_ms is only asked for when markers arrived.
+        from core.acquisition import EGRAM, BEATS, MARKERS
+        rings, read, e = self._rings, self._read, self.egram
+        if rings is None or not rings[EGRAM].rate:
+            return 0
+        rate = rings[EGRAM].rate
+        b_head, _, beats = rings[BEATS].read(read[BEATS]) # beats first: the child writes them after their samples
+        m_head, _, markers = rings[MARKERS].read(read[MARKERS])
+        head, lost, x = rings[EGRAM].read(read[EGRAM])
+        if self.detector is None or rate != e.sampling_rate:
+            if self.live_window_s:
+                e.window = min(int(self.live_window_s * rate), rings[EGRAM].capacity)
+            self._begin(rate)
+        self._skip += lost # samples the GUI was too slow for; later ring positions move down by as many
+        if x.shape[1]:
+            self._ingest(x[0], {"atrial": x[1], "ventricular": x[2]})
+        self._add_beats([int(p) - self._skip for p in beats[0].tolist()], x[0])
+        e.head = head
+        self.dropped = self.samples - len(e.time)
+        if markers.shape[1]:
+            self.append_markers(zip(markers[0].astype(int).tolist(), markers[1].astype(int).tolist()),
+                                refractory_ms() if refractory_ms else None)
+        read.update({EGRAM: head, BEATS: b_head, MARKERS: m_head})
+        rings[EGRAM].consume(head)
+        return x.shape[1]
+
+    @property
+    def samples(self) -> int: # samples recorded so far
+        return len(self.history) if self.history is not None else 0
+
+    def _trim(self): # Drop samples older than the live window from self.egram, they stay in self.history
+        e = self.egram
+        if self.live_window_s is None:
+            return
+        keep = int(self.live_window_s * e.sampling_rate)
+        excess = len(e.time) - keep
+        if excess > keep // 4: # in batches, deleting from the front of a list moves the rest
+            del e.time[:excess], e.atrial[:excess], e.ventricular[:excess]
+            self.dropped += excess
+
+    def span(self) -> t.Tuple[float, float]: # (first, last) sample time of the whole recording
+        if not self.samples:
+            return 0.0, 0.0
+        return self.history.start, self.history.start + (self.samples - 1) / self.history.rate
+
+    def snippet(self, i0: int, i1: int): # (time, atrial, ventricular) arrays of recording samples i0..i1-1
+        if self.history is None:
+            return [], [], []
+        x = self.history.read(i0, i1)
+        return self.history.times(i0, i1), x[:, 0], x[:, 1]
+
+    def set_lower_rate(self, bpm: float): # Programmed LRL changed
+        self.lower_rate = float(bpm)
+        if self.detector is not None:
+            self.detector.low_bpm = self.lower_rate
+
+    def append_beat(self, bpm: int, at: t.Optional[float] = None): # Add one beat's instantaneous rate (at: recording seconds)
+        self.bpm.append(bpm)
+        if at is not None:
+            self.histogram.add_beat(bpm, at)
+
+    def append_markers(self, markers: t.Iterable[t.Tuple[int, int]], refractory_ms: t.Optional[dict] = None): # MARKER frame items
+        markers = list(markers)
+        self.annotations.add_markers(markers, self.egram.sampling_rate, refractory_ms)
+        self.histogram.add_markers(markers, self.egram.sampling_rate)
+
+    def view(self, t0: float, t1: float, columns: int): # (x seconds, {channel: y}) envelope of [t0, t1] for a chart
+        h = self.history
+        if not self.samples or not self.tiles:
+            return [], {}
+        start, rate = h.start, h.rate
+        i0, i1 = int((t0 - start) * rate), int((t1 - start) * rate) + 1 # sample positions, gaps in the stream are ignored
+        out, x = {}, []
+        for name in ("atrial", "ventricular"):
+            x, out[name] = self.tiles[name].view(i0, i1, columns, h.channel(name)) # short spans decode a block or two
+        return start + x / rate, out
+
+    def save(self, path: str): # Recording and its annotations in one .npz, the samples as codec blocks
+        import numpy as np
+        e = self.egram
+        history = self.history.to_arrays() if self.history is not None else {}
+        np.savez_compressed(path, **history,
+                            sampling_rate=e.sampling_rate, timestamp=e.timestamp, bpm=np.asarray(self.bpm, dtype=np.int32),
+                            episodes=self.episodes.to_json(), **self.annotations.to_arrays(), **self.histogram.to_arrays(),
+                            **{k: v for name, p in self.tiles.items() for k, v in p.to_arrays(f"tiles_{name}_").items()})
+
+    def load(self, path: str): # Replace the current recording with a saved one
+        import numpy as np
+        from core.annotations import AnnotationStore
+        from core.codec import EgramHistory
+        from core.histogram import RateHistogram
+        from core.hrv import HrvEngine
+        self.detach()
+        self.clear()
+        with np.load(path) as f:
+            self.egram.sampling_rate = float(f["sampling_rate"])
+            self.history = EgramHistory.from_arrays(f)
+            if self.history is None and "time" in f and len(f["time"]): # saved as plain float64 arrays
+                self.history = EgramHistory(self.egram.sampling_rate, float(f["time"][0]))
+                self.history.append(np.column_stack([f["atrial"], f["ventricular"]]))
+            self.egram.timestamp = str(f["timestamp"])
+            self.bpm = f["bpm"].tolist()
+            self._annotations = AnnotationStore.from_arrays(f)
+            self._histogram = RateHistogram.from_arrays(f)
+            if self._histogram is None: # saved before the histogram: rates without beat times, markers from the annotations
+                self._histogram = RateHistogram.from_recording(self.bpm, self._annotations, self.egram.sampling_rate)
+            self._hrv = HrvEngine.from_bpm(self.bpm) # intervals aren't saved, the rates are
+            self.episodes = EpisodeLog.from_json(str(f["episodes"]) if "episodes" in f else "[]")
+            from core.tiles import TilePyramid
+            self.tiles = {name: TilePyramid.from_arrays(f, f"tiles_{name}_") for name in ("atrial", "ventricular")}
+        if self.history is None:
+            self.tiles = {}
+            return
+        n = self.samples
+        i0 = 0 if self.live_window_s is None else max(n - int(self.live_window_s * self.egram.sampling_rate), 0)
+        time, atrial, ventricular = self.snippet(i0, n)
+        self.egram.time.extend(time.tolist())
+        self.egram.atrial.extend(atrial.tolist())
+        self.egram.ventricular.extend(ventricular.tolist())
+        self.dropped = i0
+        for name in ("atrial", "ventricular"):
+            if self.tiles[name] is None: # saved before the pyramid existed, build it once
+                self.tiles[name] = TilePyramid()
+                for k in range(0, n, self.history.block):
+                    self.tiles[name].append(self.history.read(k, k + self.history.block)[:, self.history.channels.index(name)])
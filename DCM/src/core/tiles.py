@@ -0,0 +1,184 @@
+from collections import OrderedDict # LRU of decoded tiles
+import typing as t # for type hints
+import zlib # tile compression
+import numpy as np
+from core.frames import EGRAM_SCALE # counts per mV, tiles are stored at the wire resolution
+
+# Min/max pyramid over one egram channel, so a chart can zoom from seconds to hours without
+# touching every sample. Level 1 keeps the min and max of every BASE samples, each level above
+# folds FACTOR buckets of the one below. Buckets are grouped into tiles of TILE buckets; a full
+# tile is packed as int16 counts and zlib-compressed, and tiles are decoded on demand through a
+# small LRU. view() picks the coarsest level that still has a couple of buckets per pixel column,
+# so any zoom or pan reads at most a few tiles. Level 0 is the raw samples, kept by the caller.
+
+BASE = 8 # samples per level-1 bucket
+FACTOR = 4 # buckets folded into one at the next level
+LEVELS = 9 # level 9 buckets are 8 * 4**8 samples (~9 minutes at 1 kHz)
+TILE = 1024 # buckets per tile
+CACHE = 256 # decoded tiles kept per channel (8 KiB each)
+
+
+def _encode(lo: np.ndarray, hi: np.ndarray) -> bytes:
+    both = np.empty(2 * len(lo), dtype=np.int16)
+    both[0::2] = np.clip(np.floor(lo * EGRAM_SCALE), -32768, 32767) # rounded outwards, the envelope stays outside the trace
+    both[1::2] = np.clip(np.ceil(hi * EGRAM_SCALE), -32768, 32767)
+    return zlib.compress(both.tobytes(), 1)
+
+
+def _decode(data: bytes) -> t.Tuple[np.ndarray, np.ndarray]:
+    both = np.frombuffer(zlib.decompress(data), dtype=np.int16).astype(np.float32) / EGRAM_SCALE
+    return both[0::2], both[1::2]
+
+
+class _Level:
+    def __init__(self, bucket: int, fold: int):
+        self.bucket = bucket # samples per bucket
+        self.fold = fold # child values per bucket
+        self.tiles: t.List[bytes] = [] # full tiles, encoded
+        self.lo = np.empty(TILE, dtype=np.float32) # the open tile
+        self.hi = np.empty(TILE, dtype=np.float32)
+        self.fill = 0 # buckets in the open tile
+        self.carry_lo = np.empty(0, dtype=np.float32) # child values that don't make a whole bucket yet
+        self.carry_hi = np.empty(0, dtype=np.float32)
+
+    @property
+    def count(self) -> int: # finished buckets
+        return len(self.tiles) * TILE + self.fill
+
+    def add(self, lo: np.ndarray, hi: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]: # child values in, new buckets out
+        lo = np.concatenate([self.carry_lo, lo]) if len(self.carry_lo) else lo
+        hi = np.concatenate([self.carry_hi, hi]) if len(self.carry_hi) else hi
+        whole = len(lo) // self.fold * self.fold
+        self.carry_lo, self.carry_hi = lo[whole:].copy(), hi[whole:].copy()
+        new_lo = lo[:whole].reshape(-1, self.fold).min(axis=1)
+        new_hi = hi[:whole].reshape(-1, self.fold).max(axis=1)
+        i = 0
+        while i < len(new_lo): # fill the open tile, pack it when full
+            n = min(TILE - self.fill, len(new_lo) - i)
+            self.lo[self.fill:self.fill + n] = new_lo[i:i + n]
+            self.hi[self.fill:self.fill + n] = new_hi[i:i + n]
+            self.fill += n
+            i += n
+            if self.fill == TILE:
+                self.tiles.append(_encode(self.lo, self.hi))
+                self.fill = 0
+        return new_lo, new_hi
+
+
+class TilePyramid: # One channel
+    def __init__(self, levels: int = LEVELS, cache: int = CACHE):
+        self.levels = [_Level(BASE * FACTOR ** k, BASE if k == 0 else FACTOR) for k in range(levels)] # levels[0] is level 1
+        self.samples = 0 # raw samples seen
+        self.cache: "OrderedDict[t.Tuple[int, int], tuple]" = OrderedDict() # (level, tile) -> (lo, hi)
+        self.cache_size = cache
+        self.hits = self.misses = 0
+
+    def append(self, x: np.ndarray): # Next block of samples
+        lo = hi = np.asarray(x, dtype=np.float32)
+        self.samples += len(lo)
+        for level in self.levels:
+            lo, hi = level.add(lo, hi)
+            if not len(lo):
+                break # nothing new reaches the levels above
+
+    def _tile(self, k: int, i: int) -> t.Tuple[np.ndarray, np.ndarray]: # decoded tile i of level index k
+        level = self.levels[k]
+        if i == len(level.tiles): # the open tile is never cached, it is still growing
+            return level.lo[:level.fill], level.hi[:level.fill]
+        key = (k, i)
+        hit = self.cache.get(key)
+        if hit is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return hit
+        self.misses += 1
+        tile = self.cache[key] = _decode(level.tiles[i])
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return tile
+
+    def _tail(self, k: int) -> t.Optional[t.Tuple[float, float]]: # min/max of the samples not yet in a level-k bucket
+        lo, hi = [], []
+        for level in self.levels[:k + 1]:
+            if len(level.carry_lo):
+                lo.append(level.carry_lo.min())
+                hi.append(level.carry_hi.max())
+        return (min(lo), max(hi)) if lo else None
+
+    def buckets(self, k: int, b0: int, b1: int) -> t.Tuple[np.ndarray, np.ndarray]: # level-k buckets b0..b1-1 (the partial last one included)
+        level = self.levels[k]
+        end = min(b1, level.count)
+        lo, hi = [], []
+        for i in range(b0 // TILE, (end - 1) // TILE + 1 if end > b0 else b0 // TILE):
+            tlo, thi = self._tile(k, i)
+            s, e = max(b0 - i * TILE, 0), min(end - i * TILE, TILE)
+            lo.append(tlo[s:e])
+            hi.append(thi[s:e])
+        if b1 > level.count >= b0:
+            tail = self._tail(k)
+            if tail is not None:
+                lo.append(np.array([tail[0]], dtype=np.float32))
+                hi.append(np.array([tail[1]], dtype=np.float32))
+        if not lo:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+        return np.concatenate(lo), np.concatenate(hi)
+
+    def level_for(self, span: int, columns: int) -> int: # level index to draw `span` samples in `columns`, -1 for raw
+        per_column = span / max(columns, 1)
+        k = -1
+        while k + 1 < len(self.levels) and 2 * self.levels[k + 1].bucket <= per_column: # at least two buckets per column
+            k += 1
+        return k
+
+    def view(self, i0: int, i1: int, columns: int, raw: t.Optional[t.Sequence[float]] = None):
+        # Envelope of samples i0..i1-1 in `columns` pixel columns: (x sample index, y) with a min and a
+        # max point per column, like core.decimate.minmax_decimate. raw (the samples themselves) is
+        # used when the range is too short for level 1.
+        i0, i1 = max(i0, 0), min(i1, self.samples)
+        if i1 <= i0:
+            return np.empty(0), np.empty(0)
+        k = self.level_for(i1 - i0, columns)
+        if k < 0:
+            y = np.asarray(raw[i0:i1] if raw is not None else [], dtype=np.float64)
+            x = np.arange(i0, i0 + len(y), dtype=np.float64)
+            from core.decimate import minmax_decimate
+            return minmax_decimate(x, y, columns)
+        size = self.levels[k].bucket
+        b0 = i0 // size
+        lo, hi = self.buckets(k, b0, -(-i1 // size))
+        n = len(lo)
+        columns = min(columns, n)
+        starts = np.linspace(0, n, columns + 1).astype(np.int64)[:-1] # first bucket of each column
+        out_x = np.repeat((b0 + starts) * float(size), 2)
+        out_y = np.empty(2 * columns)
+        out_y[0::2] = np.minimum.reduceat(lo, starts)
+        out_y[1::2] = np.maximum.reduceat(hi, starts)
+        return out_x, out_y
+
+    # --- persistence, stored in the same .npz as the recording ---------------
+
+    def to_arrays(self, prefix: str) -> t.Dict[str, np.ndarray]:
+        out = {f"{prefix}samples": np.array(self.samples)}
+        for k, level in enumerate(self.levels):
+            p = f"{prefix}{k}_"
+            out[p + "tiles"] = np.frombuffer(b"".join(level.tiles), dtype=np.uint8)
+            out[p + "sizes"] = np.array([len(x) for x in level.tiles], dtype=np.int64)
+            out[p + "open"] = np.stack([level.lo[:level.fill], level.hi[:level.fill]])
+            out[p + "carry"] = np.stack([level.carry_lo, level.carry_hi])
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str) -> t.Optional["TilePyramid"]: # None if the file has no pyramid
+        if f"{prefix}samples" not in arrays:
+            return None
+        pyramid = cls()
+        pyramid.samples = int(arrays[f"{prefix}samples"])
+        for k, level in enumerate(pyramid.levels):
+            p = f"{prefix}{k}_"
+            data, sizes = arrays[p + "tiles"].tobytes(), arrays[p + "sizes"]
+            ends = np.cumsum(sizes).tolist()
+            level.tiles = [data[e - s:e] for s, e in zip(sizes.tolist(), ends)]
+            level.fill = arrays[p + "open"].shape[1]
+            level.lo[:level.fill], level.hi[:level.fill] = arrays[p + "open"]
+            level.carry_lo, level.carry_hi = (np.array(a, dtype=np.float32) for a in arrays[p + "carry"])
+        return pyramid
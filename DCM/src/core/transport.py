@@ -0,0 +1,299 @@
+import glob, json, os, select, sys, threading, time # standard libraries
+from concurrent.futures import ThreadPoolExecutor # probe ports in parallel
+import typing as t # for type hints
+from core.session import DeviceId # identity reported by the device
+
+try: # pyserial gives real port settings and Windows COM ports; ptys and POSIX ttys work without it
+    import serial
+    from serial.tools import list_ports
+except ImportError:
+    serial = None
+
+# Serial links to pacemakers. A device is found by opening each candidate port and sending the
+# identify handshake IDENT\n; a pacemaker answers PACE <model> <serial>\n. The pool keeps the links
+# it has identified open, so telemetry, programming and set-clock share one connection per device,
+# and remembers serial -> port in ports.json so a reconnect only has to try one port.
+
+PORTS_PATH = os.path.join(os.path.dirname(__file__), "..", "ports.json") # default serial -> port cache
+BAUDRATE = 115200
+WRITE_TIMEOUT = 1.0 # seconds a write may wait for the device to take bytes, a full frame at BAUDRATE is under 0.4
+IDENT = b"IDENT\n" # identify request
+IDENT_REPLY = b"PACE" # first word of the identify answer
+PORT_PATTERNS = ["/dev/ttyACM*", "/dev/ttyUSB*", "/dev/cu.usbmodem*", "/dev/tty.usbmodem*"] # used when pyserial is missing
+
+
+class _FdPort: # Minimal pyserial-like port over a POSIX file descriptor (ttys and ptys)
+    def __init__(self, path: str, baudrate: int = BAUDRATE, timeout: float = 0.1):
+        import termios, tty
+        self.port = path
+        self.timeout = timeout # read timeout in seconds, like serial.Serial.timeout
+        self.write_timeout = WRITE_TIMEOUT # like serial.Serial.write_timeout, but per stall: reset whenever bytes go out
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            tty.setraw(self.fd) # no echo, no line editing
+            speed = getattr(termios, f"B{baudrate}", None)
+            if speed is not None: # ptys ignore the speed but real ttys need it
+                attrs = termios.tcgetattr(self.fd)
+                attrs[4] = attrs[5] = speed
+                termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    @property
+    def in_waiting(self) -> int: # bytes that can be read without blocking
+        import fcntl, termios, struct
+        return struct.unpack("i", fcntl.ioctl(self.fd, termios.FIONREAD, b"\0\0\0\0"))[0]
+
+    @property
+    def is_open(self) -> bool:
+        return self.fd is not None
+
+    def fileno(self) -> int: return self.fd # for select/selectors, like serial.Serial
+
+    def read(self, size: int = 1) -> bytes: # Up to size bytes, waiting at most timeout for them
+        out = bytearray()
+        deadline = time.monotonic() + (self.timeout or 0)
+        while len(out) < size:
+            left = deadline - time.monotonic()
+            if left <= 0 and out:
+                break
+            ready, _, _ = select.select([self.fd], [], [], max(0.0, left))
+            if not ready:
+                break
+            try:
+                chunk = os.read(self.fd, size - len(out))
+            except BlockingIOError:
+                continue
+            if not chunk: # the other end went away
+                raise OSError(f"{self.port} closed")
+            out += chunk
+        return bytes(out)
+
+    def write(self, data: bytes) -> int: # All of data; TimeoutError if the other end takes none of it for write_timeout
+        view = memoryview(data)
+        while view:
+            _, ready, _ = select.select([], [self.fd], [], self.write_timeout)
+            if not ready: # device stopped reading, its buffer is full
+                raise TimeoutError(f"{self.port} write timed out, {len(view)} of {len(data)} bytes unsent")
+            try:
+                n = os.write(self.fd, view)
+            except BlockingIOError:
+                continue
+            view = view[n:]
+        return len(data)
+
+    def reset_input_buffer(self):
+        import termios
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def open_port(path: str, baudrate: int = BAUDRATE, timeout: float = 0.1): # Open a serial port, pyserial when installed
+    if serial is not None:
+        return serial.Serial(path, baudrate=baudrate, timeout=timeout, write_timeout=WRITE_TIMEOUT) # SerialTimeoutException is an OSError
+    if sys.platform == "win32":
+        raise RuntimeError("pyserial is required for COM ports (pip install pyserial)")
+    return _FdPort(path, baudrate, timeout)
+
+
+def candidate_ports() -> t.List[str]: # Serial devices that could be a pacemaker
+    if serial is not None:
+        return sorted(p.device for p in list_ports.comports())
+    found = []
+    for pattern in PORT_PATTERNS:
+        found.extend(glob.glob(pattern))
+    return sorted(found)
+
+
+class Link: # One open, identified connection to a pacemaker
+    def __init__(self, port, device: DeviceId):
+        self.port = port # pyserial Serial or _FdPort
+        self.device = device # model and serial number reported by the handshake
+        self.lock = threading.RLock() # hold while doing a command exchange; the link is shared
+        self.opened_at = time.monotonic()
+        self._buf = bytearray() # bytes read past the last line
+
+    @property
+    def path(self) -> str: return self.port.port # e.g. /dev/ttyACM0 or COM3
+
+    @property
+    def alive(self) -> bool: return self.port is not None and self.port.is_open
+
+    def write(self, data: bytes):
+        try:
+            self.port.write(data)
+        except Exception:
+            self.close()
+            raise
+
+    def read(self, size: int) -> bytes: # Up to size bytes within the port timeout
+        if self._buf:
+            data = bytes(self._buf[:size])
+            del self._buf[:size]
+            return data
+        try:
+            return self.port.read(size)
+        except Exception:
+            self.close()
+            raise
+
+    def read_line(self, timeout: float) -> bytes: # One \n terminated line, b"" on timeout
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._buf:
+            if time.monotonic() >= deadline:
+                return b""
+            try:
+                chunk = self.port.read(self.port.in_waiting or 1)
+            except Exception:
+                self.close()
+                raise
+            self._buf += chunk
+        line, _, rest = bytes(self._buf).partition(b"\n")
+        self._buf = bytearray(rest)
+        return line + b"\n"
+
+    def close(self):
+        if self.port is not None:
+            try:
+                self.port.close()
+            except Exception:
+                pass
+            self.port = None
+
+
+def identify(path: str, timeout: float = 0.3, baudrate: int = BAUDRATE) -> t.Optional[Link]: # Open a port and run the handshake, None if it isn't a pacemaker
+    try:
+        port = open_port(path, baudrate, timeout=min(timeout, 0.05))
+    except Exception:
+        return None # busy, missing or no permission
+    link = Link(port, DeviceId())
+    try:
+        port.reset_input_buffer() # drop anything left over from a previous session
+        link.write(IDENT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            words = link.read_line(deadline - time.monotonic()).split()
+            if len(words) >= 3 and words[0] == IDENT_REPLY: # PACE <model> <serial>
+                link.device = DeviceId(model=words[1].decode(errors="replace"), serial=words[2].decode(errors="replace"))
+                return link
+            if not words: # timed out
+                break
+    except Exception:
+        pass
+    link.close()
+    return None
+
+
+class PortCache: # serial number -> last port it answered on, saved as JSON
+    def __init__(self, path: str = PORTS_PATH):
+        self.path = os.path.abspath(path) if path else None # None keeps the cache in memory only
+        self._ports: t.Dict[str, str] = {}
+        self._lock = threading.Lock() # probes put() from the pool's worker threads
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._ports = dict(json.load(f).get("ports", {}))
+        except Exception: # unreadable cache, probe again
+            self._ports = {}
+
+    def _save(self): # Write to a temp file and rename, so a crash never leaves half a cache; caller holds _lock
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ports": self._ports}, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, serial: str) -> t.Optional[str]: return self._ports.get(serial)
+
+    def put(self, serial: str, port: str):
+        with self._lock:
+            if self._ports.get(serial) != port:
+                self._ports[serial] = port
+                self._save()
+
+
+class ConnectionPool: # Identified links kept open and shared, one per device serial
+    def __init__(self, cache_path: t.Optional[str] = PORTS_PATH, probe_timeout: float = 0.3, workers: int = 8,
+                 ports: t.Optional[t.Callable[[], t.List[str]]] = None):
+        self.cache = PortCache(cache_path)
+        self.probe_timeout = probe_timeout # how long a port gets to answer IDENT
+        self.workers = workers # ports probed at the same time
+        self.ports = ports or candidate_ports # where discover() looks
+        self._links: t.Dict[str, Link] = {} # serial -> open link
+        self._lock = threading.Lock()
+
+    def discover(self) -> t.Dict[str, Link]: # Probe every free candidate port at once, returns serial -> link for all devices
+        with self._lock:
+            busy = {l.path for l in self._links.values() if l.alive}
+        todo = [p for p in self.ports() if p not in busy]
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(todo)), thread_name_prefix="dcm-probe") as ex:
+                found = [l for l in ex.map(lambda p: identify(p, self.probe_timeout), todo) if l]
+            for link in found:
+                self._add(link)
+        with self._lock:
+            return {s: l for s, l in self._links.items() if l.alive}
+
+    def get(self, serial: t.Optional[str] = None) -> t.Optional[Link]: # Open link to a device (any device if serial is None)
+        with self._lock:
+            link = self._pick(serial)
+        if link:
+            return link # pooled: no handshake at all
+
+        if serial:
+            cached = self.cache.get(serial)
+            if cached: # reconnect: one handshake on the port it used last time
+                link = identify(cached, self.probe_timeout)
+                if link and link.device.serial == serial:
+                    return self._add(link)
+                if link: # a different pacemaker is on that port now; keep it for whoever wants it
+                    self._add(link)
+
+        self.discover() # full probe
+        with self._lock:
+            return self._pick(serial)
+
+    def drop(self, serial: str): # Close a device's link, e.g. after a write error; the next get() reconnects
+        with self._lock:
+            link = self._links.pop(serial, None)
+        if link:
+            link.close()
+
+    def close_all(self):
+        with self._lock:
+            links, self._links = list(self._links.values()), {}
+        for link in links:
+            link.close()
+
+    def _pick(self, serial): # (under lock) live link for serial, or the first live one
+        for s, link in list(self._links.items()):
+            if not link.alive:
+                del self._links[s]
+        if serial is None:
+            return next(iter(self._links.values()), None)
+        return self._links.get(serial)
+
+    def _add(self, link: Link) -> Link: # Pool a new link; if the device is already pooled keep the existing one
+        serial = link.device.serial
+        with self._lock:
+            old = self._links.get(serial)
+            if old and old.alive:
+                keep, extra = old, link
+            else:
+                self._links[serial] = keep = link
+                extra = None
+        if extra:
+            extra.close()
+        self.cache.put(serial, keep.path)
+        return keep
@@ -0,0 +1,220 @@
+import abc # charts implement paint()
+import numpy as np # vectorized point mapping
+from PySide6 import QtCore, QtGui
+from core.decimate import minmax_decimate # keeps path size bounded by chart width
+from core.reports import chart_placeholder # marker text the reports put where a chart goes
+from core import annotations as ann # pace/sense marker kinds
+
+# Charts are drawn with QPainter straight into the document, so a PDF export gets real vector paths
+# instead of a raster screenshot. HTML can't express a custom object, so reports drop a text
+# placeholder where a chart should go and install_charts() swaps it for the object afterwards.
+CHART_OBJECT = QtGui.QTextFormat.UserObject + 1 # custom text object type
+CHART_NAME = QtGui.QTextFormat.UserProperty + 1 # property holding the chart name
+
+CHART_WIDTH = 600 # fits an A4/Letter page at the default 96 dpi layout
+COLUMNS = 1200 # min/max buckets per trace (2 path points each)
+
+GRID_PEN = QtGui.QColor("#cccccc")
+ATRIAL_PEN = QtGui.QColor("#d0453b")
+VENT_PEN = QtGui.QColor("#2f6fed")
+TEXT_PEN = QtGui.QColor("#555555")
+PACED_PEN = QtGui.QColor("#222222")
+REFRACTORY_FILL = QtGui.QColor(0, 0, 0, 18) # light band behind the trace
+
+LANE_KINDS = ((ann.AS, ann.AP, ann.ARP), (ann.VS, ann.VP, ann.VRP)) # markers drawn on the atrial/ventricular lane
+LABELLED = 60 # marker names are written only when the strip has at most this many markers
+
+
+def _polyline(xs, ys, rect: QtCore.QRectF, x_range, y_range) -> QtGui.QPolygonF: # Map data points into rect
+    x0, x1 = x_range
+    y0, y1 = y_range
+    sx = rect.width() / ((x1 - x0) or 1.0) # pixels per x unit
+    sy = rect.height() / ((y1 - y0) or 1.0) # pixels per y unit
+    px = rect.left() + (xs - x0) * sx # vectorized mapping
+    py = rect.bottom() - (ys - y0) * sy # y grows downwards on the page
+    return QtGui.QPolygonF([QtCore.QPointF(x, y) for x, y in zip(px.tolist(), py.tolist())])
+
+
+def _frame(painter: QtGui.QPainter, rect: QtCore.QRectF, label: str): # Border plus a small caption
+    painter.setPen(QtGui.QPen(GRID_PEN, 0.8))
+    painter.drawRect(rect)
+    painter.setPen(TEXT_PEN)
+    painter.drawText(rect.adjusted(4, 2, -4, -2), QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop, label)
+
+
+class Chart(abc.ABC): # Base class: a fixed size box that paints itself
+    height = 160
+
+    def size(self) -> QtCore.QSizeF:
+        return QtCore.QSizeF(CHART_WIDTH, self.height)
+
+    @abc.abstractmethod
+    def paint(self, painter: QtGui.QPainter, rect: QtCore.QRectF): # implemented by each chart
+        ...
+
+
+class EgramStrip(Chart): # Atrial and ventricular lanes stacked on a shared time axis
+    height = 200
+
+    def __init__(self, time, atrial, ventricular, annotations=None, columns: int = COLUMNS):
+        self.samples = min(len(time), len(atrial), len(ventricular)) # raw length, shown in the caption
+        self.lanes = [] # (label, pen, x, y, events) per channel
+        if self.samples:
+            t0, t1 = float(time[0]), float(time[self.samples - 1])
+            for label, pen, values, kinds in (("Atrial", ATRIAL_PEN, atrial, LANE_KINDS[0]),
+                                              ("Ventricular", VENT_PEN, ventricular, LANE_KINDS[1])):
+                x, y = minmax_decimate(time, values, columns) # bounded number of points per lane
+                events = annotations.query(t0, t1, kinds) if annotations is not None else {} # markers on the strip only
+                self.lanes.append((label, pen, x, y, events))
+
+    @classmethod
+    def from_telemetry(cls, telemetry, columns: int = COLUMNS) -> "EgramStrip": # whole recording, read from the tile pyramid
+        strip = cls([], [], [], columns=columns)
+        strip.samples = telemetry.samples
+        if strip.samples:
+            t0, t1 = telemetry.span()
+            x, ys = telemetry.view(t0, t1, columns)
+            for label, pen, name, kinds in (("Atrial", ATRIAL_PEN, "atrial", LANE_KINDS[0]),
+                                            ("Ventricular", VENT_PEN, "ventricular", LANE_KINDS[1])):
+                strip.lanes.append((label, pen, x, ys[name], telemetry.annotations.query(t0, t1, kinds)))
+        return strip
+
+    def paint(self, painter, rect):
+        if not self.lanes: # nothing recorded yet
+            _frame(painter, rect, "Egram")
+            painter.drawText(rect, QtCore.Qt.AlignCenter, "No egram data recorded.")
+            return
+        lane_h = rect.height() / len(self.lanes) # equal height lanes
+        for i, (label, pen, x, y, events) in enumerate(self.lanes):
+            lane = QtCore.QRectF(rect.left(), rect.top() + i * lane_h, rect.width(), lane_h)
+            _frame(painter, lane, label)
+            plot = lane.adjusted(2, 16, -2, -4) # leave room for the caption
+            x_range = (float(x[0]), float(x[-1]))
+            self._paint_events(painter, plot, x_range, events)
+            lo, hi = float(y.min()), float(y.max())
+            pad = (hi - lo) * 0.05 or 1.0 # keep flat lines off the border
+            painter.setPen(QtGui.QPen(pen, 0.6))
+            painter.drawPolyline(_polyline(x, y, plot, x_range, (lo - pad, hi + pad)))
+        span = float(self.lanes[0][2][-1] - self.lanes[0][2][0]) # seconds covered
+        painter.setPen(TEXT_PEN)
+        painter.drawText(rect.adjusted(4, 2, -4, -2), QtCore.Qt.AlignRight | QtCore.Qt.AlignTop,
+                         f"{self.samples} samples • {span:.1f} s")
+
+    def _paint_events(self, painter, plot: QtCore.QRectF, x_range, events: dict): # Refractory bands and marker ticks
+        x0, x1 = x_range
+        sx = plot.width() / ((x1 - x0) or 1.0)
+        to_x = lambda v: plot.left() + (min(max(float(v), x0), x1) - x0) * sx # clipped to the strip
+        ticks = sum(len(s) for kind, (s, _) in events.items() if kind not in (ann.ARP, ann.VRP))
+        for kind, (start, end) in events.items():
+            if kind in (ann.ARP, ann.VRP):
+                for a, b in zip(start.tolist(), end.tolist()):
+                    painter.fillRect(QtCore.QRectF(to_x(a), plot.top(), max(to_x(b) - to_x(a), 0.5), plot.height()), REFRACTORY_FILL)
+                continue
+            paced = kind in (ann.AP, ann.VP)
+            painter.setPen(QtGui.QPen(PACED_PEN if paced else TEXT_PEN, 1.0 if paced else 0.6))
+            name = ann.KINDS[kind]
+            for a in start.tolist():
+                px = to_x(a)
+                painter.drawLine(QtCore.QPointF(px, plot.top()), QtCore.QPointF(px, plot.top() + 6))
+                if ticks <= LABELLED:
+                    painter.drawText(QtCore.QPointF(px + 1, plot.top() + 14), name)
+
+
+class TrendChart(Chart): # Rate over time with segment averages overlaid
+    def __init__(self, bpm, averages=(), columns: int = COLUMNS):
+        self.x, self.y = minmax_decimate(np.arange(len(bpm)), bpm, columns) # beat index on the x axis
+        self.count = len(bpm) # original length
+        self.averages = list(averages) # one value per segment
+
+    def paint(self, painter, rect):
+        _frame(painter, rect, "Rate (bpm)")
+        if not self.count:
+            painter.drawText(rect, QtCore.Qt.AlignCenter, "No data available.")
+            return
+        plot = rect.adjusted(36, 16, -6, -6) # space for the y labels
+        lo = float(min(self.y.min(), min(self.averages, default=self.y.min()))) - 5
+        hi = float(max(self.y.max(), max(self.averages, default=self.y.max()))) + 5
+        x_range = (0.0, float(max(self.count - 1, 1)))
+
+        painter.setPen(TEXT_PEN) # y axis labels
+        painter.drawText(QtCore.QRectF(rect.left(), plot.top() - 6, 32, 12), QtCore.Qt.AlignRight, f"{hi:.0f}")
+        painter.drawText(QtCore.QRectF(rect.left(), plot.bottom() - 6, 32, 12), QtCore.Qt.AlignRight, f"{lo:.0f}")
+
+        painter.setPen(QtGui.QPen(GRID_PEN, 0.6))
+        painter.drawPolyline(_polyline(self.x, self.y, plot, x_range, (lo, hi))) # raw rate envelope
+
+        if self.averages: # segment averages as a step line
+            seg = len(self.averages)
+            sx = np.repeat(np.linspace(0, x_range[1], seg + 1), 2)[1:-1] # step edges
+            sy = np.repeat(np.asarray(self.averages, dtype=np.float64), 2)
+            painter.setPen(QtGui.QPen(VENT_PEN, 1.4))
+            painter.drawPolyline(_polyline(sx, sy, plot, x_range, (lo, hi)))
+
+
+class HistogramChart(Chart): # Vertical bars, one per bin
+    def __init__(self, labels, counts):
+        self.labels = list(labels)
+        self.counts = list(counts)
+
+    def paint(self, painter, rect):
+        _frame(painter, rect, "Beats per bin")
+        if not self.counts:
+            return
+        plot = rect.adjusted(6, 16, -6, -18) # room for the caption and bin labels
+        maxc = max(self.counts) or 1
+        bar_w = plot.width() / len(self.counts)
+        font = QtGui.QFont(painter.font())
+        font.setPixelSize(8) # narrow bins need smaller labels
+        painter.setFont(font)
+        for i, (label, c) in enumerate(zip(self.labels, self.counts)):
+            h = plot.height() * c / maxc
+            bar = QtCore.QRectF(plot.left() + i * bar_w + 1, plot.bottom() - h, bar_w - 2, h)
+            painter.fillRect(bar, QtGui.QColor("#666666"))
+            painter.setPen(TEXT_PEN)
+            painter.drawText(QtCore.QRectF(bar.left(), plot.bottom() + 2, bar_w - 2, 14), QtCore.Qt.AlignCenter, label)
+
+
+class ChartObject(QtGui.QPyTextObject): # Text object handler that lays out and paints the charts
+    def __init__(self, charts: dict, parent=None):
+        super().__init__(parent)
+        self.charts = charts # name -> Chart
+
+    @staticmethod
+    def _scale(doc) -> float: # Device pixels per 96 dpi layout pixel (a PDF writer lays out at 1200 dpi)
+        device = doc.documentLayout().paintDevice()
+        return device.logicalDpiY() / 96.0 if device else 1.0
+
+    def intrinsicSize(self, doc, pos, fmt):
+        chart = self.charts.get(fmt.property(CHART_NAME))
+        return chart.size() * self._scale(doc) if chart else QtCore.QSizeF(0, 0)
+
+    def drawObject(self, painter, rect, doc, pos, fmt):
+        chart = self.charts.get(fmt.property(CHART_NAME))
+        if not chart:
+            return
+        scale = self._scale(doc)
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setClipRect(rect)
+        painter.translate(rect.topLeft())
+        painter.scale(scale, scale) # charts always paint in 96 dpi units
+        font = QtGui.QFont(painter.font())
+        font.setPixelSize(10) # pixel size, so the scale above applies to text as well
+        painter.setFont(font)
+        chart.paint(painter, QtCore.QRectF(QtCore.QPointF(0, 0), chart.size()))
+        painter.restore()
+
+
+def install_charts(doc: QtGui.QTextDocument, charts: dict): # Replace chart placeholders in doc with chart objects
+    if not charts:
+        return
+    handler = ChartObject(charts, doc) # parented to the document so it lives as long as it does
+    doc.documentLayout().registerHandler(CHART_OBJECT, handler)
+    for name in charts:
+        cursor = doc.find(chart_placeholder(name)) # selects the marker text
+        if cursor.isNull():
+            continue
+        fmt = QtGui.QTextCharFormat()
+        fmt.setObjectType(CHART_OBJECT)
+        fmt.setProperty(CHART_NAME, name)
+        cursor.insertText("\ufffc", fmt) # object replacement character carries the chart
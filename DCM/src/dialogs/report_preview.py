@@ -1,7 +1,14 @@
-from PySide6 import QtWidgets, QtGui, QtPrintSupport
+from PySide6 import QtWidgets, QtGui
+from dialogs.report_charts import install_charts # vector charts embedded in the report
+
+def write_pdf(doc: QtGui.QTextDocument, fn: str): # Render a report document into a PDF file
+    writer = QtGui.QPdfWriter(fn) # vector output, charts stay as paths
+    writer.setResolution(1200) # High Resolution Output
+    writer.setPageSize(QtGui.QPageSize(QtGui.QPageSize.Letter))
+    doc.print_(writer) # Render the doc
 
 class ReportPreview(QtWidgets.QDialog): # Preview page for each of the reports
-    def __init__(self, html: str, parent=None): # pass the html page 
+    def __init__(self, html: str, parent=None, charts: dict | None = None): # pass the html page and any charts it references
         super().__init__(parent) 
 
         # Window Settings
@@ -11,6 +18,7 @@ class ReportPreview(QtWidgets.QDialog): # Preview page for each of the reports
         font.setPointSize(12)
         self.doc.setDefaultFont(font)
         self.doc.setHtml(html)
+        install_charts(self.doc, charts) # swap chart placeholders for painted charts
         view = QtWidgets.QTextBrowser()
         view.setDocument(self.doc)
         self.resize(820, 640)
@@ -35,8 +43,5 @@ class ReportPreview(QtWidgets.QDialog): # Preview page for each of the reports
     def _save_pdf(self): # save pdf function
         fn, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save PDF", "report.pdf", "PDF Files (*.pdf)") # ask the user where to save the file
         if not fn: return # if user cancels do nothing
-        printer = QtPrintSupport.QPrinter(QtPrintSupport.QPrinter.HighResolution) # High Resolution Output
-        printer.setOutputFormat(QtPrintSupport.QPrinter.PdfFormat) # Tell QPrinter function to just create an output file
-        printer.setOutputFileName(fn) # Set the target filename/path for the PDF
-        self.doc.print_(printer) # Render the doc
+        write_pdf(self.doc, fn) # Render the doc
 
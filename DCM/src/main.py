@@ -1,24 +1,62 @@
-import sys 
-from PySide6 import QtWidgets
-from ui_shell import UIShell # main UI shell
+import os, sys
+from utility.startup_trace import trace # optional startup profiling
+from utility import tracing # optional runtime trace (--trace)
+
+TRACE_PATH = os.path.join(os.path.dirname(__file__), "..", "traces", "dcm_trace.json") # Chrome trace-event file
 
 if __name__ == "__main__": # main entry point
-    app = QtWidgets.QApplication([]) # create application
-    widget = UIShell() # main UI shell
-    widget.setObjectName("background-image") # for styling
-    widget.setStyleSheet("""
-        #background-image {
-            background: 
-                qlineargradient(
-                    x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #e3868a,
-                    stop:0.25 #e3baaf,
-                    stop:0.5 #e3acd4,
-                    stop:0.75 #91b1e6,
-                    stop:1 #abcfe0
-                );
-        }
-    """) # gradient background
+    if "--profile-startup" in sys.argv: # record import and construction times until the first frame
+        sys.argv.remove("--profile-startup")
+        trace.enable()
+    if "--trace" in sys.argv: # handler spans and event loop stalls into TRACE_PATH
+        sys.argv.remove("--trace")
+        tracing.start(TRACE_PATH)
+    memory = "--memory" in sys.argv # periodic memory samples into traces/dcm_memory.jsonl
+    if memory:
+        sys.argv.remove("--memory")
+        import tracemalloc
+        tracemalloc.start(16) # before the imports below, so their allocations are attributed too
+    service = next((a for a in sys.argv if a == "--service" or a.startswith("--service=")), None) # local HTTP/JSON-RPC service
+    if service:
+        sys.argv.remove(service)
+
+    from PySide6 import QtWidgets, QtCore # imported here so the trace can time them
+    from ui_shell import UIShell # main UI shell
+    from utility import theme # application stylesheet
+
+    with trace.span("QApplication"):
+        app = QtWidgets.QApplication([]) # create application
+        theme.apply(app) # one stylesheet for every page and dialog
+    with trace.span("UIShell"):
+        widget = UIShell() # main UI shell
+    widget.setObjectName("background-image") # gradient background, see utility/theme.py
     widget.resize(800, 600) # initial size
-    widget.show() # show the UI
-    sys.exit(app.exec()) # start event loop and exit on close
\ No newline at end of file
+    with trace.span("show"):
+        widget.show() # show the UI
+
+    if tracing.enabled(): # watch for a blocked event loop
+        from utility.watchdog import StallWatchdog
+        watchdog = StallWatchdog(parent=app)
+        watchdog.start()
+        app.aboutToQuit.connect(tracing.stop) # close the JSON array
+
+    if memory: # heap, RSS, file descriptors and QObjects per page, every minute
+        from utility.memwatch import MemoryWatch, report
+        memwatch = MemoryWatch(widget, parent=app)
+        memwatch.start()
+        app.aboutToQuit.connect(lambda: (memwatch.stop(), print(report(memwatch.samples[-1]), file=sys.stderr)))
+
+    if service: # --service or --service=ADDR (host:port, port or unix:path), see core/service.py
+        from utility.service import ShellService
+        shell_service = ShellService(widget, service.partition("=")[2] or None, parent=app).start()
+        print(f"service: {shell_service.service.address}", file=sys.stderr)
+        app.aboutToQuit.connect(shell_service.close)
+
+    if trace.enabled: # the first zero-delay timer runs once the window has been painted
+        def _first_window():
+            trace.mark("first window")
+            trace.disable()
+            print(trace.report(), file=sys.stderr)
+        QtCore.QTimer.singleShot(0, _first_window)
+
+    sys.exit(app.exec()) # start event loop and exit on close
@@ -1,37 +1,5 @@
 from PySide6 import QtCore, QtWidgets, QtGui
-# Styles
-LINE_EDIT_STYLE = """
-QLineEdit {
-    background-color: rgba(255,255,255,0.18);
-    color: white;
-    border: 1px solid rgba(255,255,255,0.35);
-    border-radius: 10px;
-    padding: 10px 14px;
-    selection-background-color: rgba(255,255,255,0.35);
-    selection-color: #111;
-}
-QLineEdit:focus {
-    border: 1px solid rgba(255,255,255,0.65);
-    background-color: rgba(255,255,255,0.22);
-}
-QLineEdit::placeholder {
-    color: rgba(255,255,255,0.75);
-}
-"""
-
-BTN_STYLE = """
-QPushButton {
-    font-size: 16px; font-weight: 600;
-    padding: 10px 22px;
-    min-height: 42px;
-    border-radius: 10px;
-    color: white;
-    background-color: rgba(255,255,255,0.22);
-    border: 1px solid rgba(255,255,255,0.40);
-}
-QPushButton:hover { background-color: rgba(255,255,255,0.30); }
-QPushButton:pressed { background-color: rgba(255,255,255,0.38); }
-"""
+from utility import theme # shared application stylesheet
 
 class LoginPage(QtWidgets.QWidget): # Login page for existing users
     backClicked = QtCore.Signal() # signal for back button
@@ -39,45 +7,29 @@ class LoginPage(QtWidgets.QWidget): # Login page for existing users
 
     def __init__(self): # Initialize the login page
         super().__init__() # call parent constructor
-        self.setObjectName("background-image") # for styling
-        self.setStyleSheet("""
-        #background-image {
-            background: 
-                qlineargradient(
-                    x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #e3868a,
-                    stop:0.25 #e3baaf,
-                    stop:0.5 #e3acd4,
-                    stop:0.75 #91b1e6,
-                    stop:1 #abcfe0
-                );
-        }
-        """) # gradient background
+        theme.set_page(self) # gradient background
 
         # Title
         title = QtWidgets.QLabel("Login", alignment=QtCore.Qt.AlignCenter) # title label
-        title.setStyleSheet("color: white;") # white text
         title.setFont(QtGui.QFont("Helvetica Neue", 28, QtGui.QFont.Bold)) # large bold font
 
         # Inputs
         self.username = QtWidgets.QLineEdit() # username input
         self.username.setPlaceholderText("Username") # placeholder text
         self.username.setMaximumWidth(360) # max width
-        self.username.setStyleSheet(LINE_EDIT_STYLE) # apply style
 
         self.password = QtWidgets.QLineEdit() # password input
         self.password.setPlaceholderText("Password") # placeholder text
         self.password.setEchoMode(QtWidgets.QLineEdit.Password) # hide input
         self.password.setMaximumWidth(360) # max width
-        self.password.setStyleSheet(LINE_EDIT_STYLE) # apply style
 
         # Buttons
         self.login_button = QtWidgets.QPushButton("Login") # login button
-        self.login_button.setStyleSheet(BTN_STYLE) # apply style
+        theme.set_variant(self.login_button, "primary") # apply style
         self.login_button.setMaximumWidth(360) # max width
 
         self.back_button = QtWidgets.QPushButton("Back") # back button
-        self.back_button.setStyleSheet(BTN_STYLE) # apply style
+        theme.set_variant(self.back_button, "primary") # apply style
         self.back_button.setMaximumWidth(360) # max width
 
         # Center card (same structure as Register)
@@ -1,38 +1,5 @@
 from PySide6 import QtCore, QtWidgets, QtGui
-
-# Styles
-LINE_EDIT_STYLE = """
-QLineEdit {
-    background-color: rgba(255,255,255,0.18);
-    color: white;
-    border: 1px solid rgba(255,255,255,0.35);
-    border-radius: 10px;
-    padding: 10px 14px;
-    selection-background-color: rgba(255,255,255,0.35);
-    selection-color: #111;
-}
-QLineEdit:focus {
-    border: 1px solid rgba(255,255,255,0.65);
-    background-color: rgba(255,255,255,0.22);
-}
-QLineEdit::placeholder {
-    color: rgba(255,255,255,0.75);
-}
-"""
-
-BTN_STYLE = """
-QPushButton {
-    font-size: 16px; font-weight: 600;
-    padding: 10px 22px;
-    min-height: 42px;
-    border-radius: 10px;
-    color: white;
-    background-color: rgba(255,255,255,0.22);
-    border: 1px solid rgba(255,255,255,0.40);
-}
-QPushButton:hover { background-color: rgba(255,255,255,0.30); }
-QPushButton:pressed { background-color: rgba(255,255,255,0.38); }
-"""
+from utility import theme # shared application stylesheet
 
 class RegisterPage(QtWidgets.QWidget): # Registration page for new users
     backClicked = QtCore.Signal() # signal for back button
@@ -40,48 +7,31 @@ class RegisterPage(QtWidgets.QWidget): # Registration page for new users
 
     def __init__(self): # Initialize the registration page
         super().__init__() # call parent constructor
-        self.setObjectName("background-image") # for styling
-        self.setStyleSheet(""" 
-            #background-image {
-                background: 
-                    qlineargradient(
-                        x1:0, y1:0, x2:1, y2:1,
-                        stop:0 #e3868a,
-                        stop:0.25 #e3baaf,
-                        stop:0.5 #e3acd4,
-                        stop:0.75 #91b1e6,
-                        stop:1 #abcfe0
-                    );
-            }
-        """) # gradient background
+        theme.set_page(self) # gradient background
 
         title = QtWidgets.QLabel("Create Account", alignment=QtCore.Qt.AlignCenter) # title label
-        title.setStyleSheet("color: white;") # white text
         title.setFont(QtGui.QFont("Helvetica Neue", 28, QtGui.QFont.Bold)) # large bold font
 
         self.username = QtWidgets.QLineEdit() # username input
         self.username.setPlaceholderText("Username") # placeholder text
         self.username.setMaximumWidth(360) # max width
-        self.username.setStyleSheet(LINE_EDIT_STYLE) # apply style
 
         self.password = QtWidgets.QLineEdit() # password input
         self.password.setPlaceholderText("Password") # placeholder text
         self.password.setEchoMode(QtWidgets.QLineEdit.Password) # hide input
         self.password.setMaximumWidth(360) # max width
-        self.password.setStyleSheet(LINE_EDIT_STYLE) # apply style
 
         self.confirm = QtWidgets.QLineEdit() # confirm password input
         self.confirm.setPlaceholderText("Confirm password") # placeholder text
         self.confirm.setEchoMode(QtWidgets.QLineEdit.Password) # hide input
         self.confirm.setMaximumWidth(360) # max width
-        self.confirm.setStyleSheet(LINE_EDIT_STYLE) # apply style
 
         self.create_btn = QtWidgets.QPushButton("Create Account") # create account button
-        self.create_btn.setStyleSheet(BTN_STYLE) # apply style
+        theme.set_variant(self.create_btn, "primary") # apply style
         self.create_btn.setMaximumWidth(360) # max width
 
         self.back_btn = QtWidgets.QPushButton("Back") # back button
-        self.back_btn.setStyleSheet(BTN_STYLE) # apply style
+        theme.set_variant(self.back_btn, "primary") # apply style
         self.back_btn.setMaximumWidth(360) # max width
 
         # Center card (same proportions as Login)
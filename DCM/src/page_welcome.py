@@ -1,5 +1,6 @@
 from PySide6 import QtCore, QtWidgets, QtGui
 import random # for random greetings
+from utility import theme # shared application stylesheet
 
 class WelcomePage(QtWidgets.QWidget): 
     # signals to communicate upward to the shell
@@ -9,31 +10,29 @@ class WelcomePage(QtWidgets.QWidget):
 
     def __init__(self): # Initialize the welcome page
         super().__init__() # call parent constructor
+        theme.set_page(self, background=False) # white text on the window's gradient
 
         # List of "Hello" in different languages
         self.hello = ["Afrikaans: Hallo", "Albanian: Përshëndetje", "Azerbaijani: Salam", "Basque: Kaixo", "Bulgarian: Здравейте (zdraveite)", "Catalan: Hola", "Cebuano: Kumusta", "Croatian: Bok", "Czech: Ahoj", "Danish: Hej", "Dutch: Hallo", "English: Hello", "Estonian: Tere", "Finnish: Hei", "French: Bonjour", "German: Hallo", "Haitian Creole: Bonjou", "Hausa: Sannu", "Hungarian: Szia", "Icelandic: Halló", "Indonesian: Halo", "Irish: Dia dhuit", "Italian: Ciao", "Javanese: Halo", "Kurdish (Kurmanji): Silav", "Latin: Salve", "Latvian: Sveiki", "Lithuanian: Labas", "Luxembourgish: Moien", "Macedonian: Здраво (zdravo)", "Malay: Hai", "Maori: Kia ora", "Norwegian: Hei", "Portuguese: Olá", "Romanian: Bună ziua", "Russian: Здравствуйте (zdravstvuyte)", "Samoan: Talofa", "Scots Gaelic: Halò", "Serbian: Здраво (zdravo)", "Shona: Mhoro", "Slovak: Ahoj", "Slovenian: Živjo", "Somali: Soo dhawoow", "Spanish: Hola", "Swahili: Jambo", "Swedish: Hej", "Tagalog: Kumusta", "Turkish: Merhaba", "Uzbek: Salom", "Vietnamese: Xin chào", "Welsh: Helo", "Xhosa: Molo", "Yoruba: Bawo", "Zulu: Sawubona"]
 
         self.text = QtWidgets.QLabel("English: Hello", alignment=QtCore.Qt.AlignCenter) # default text
         self.text.setFont(QtGui.QFont("Helvetica Neue", 36, QtGui.QFont.Bold)) # large bold font
-        self.text.setStyleSheet("color: white;") # white text
 
         self.about_btn = QtWidgets.QPushButton(self) # about button
         self.about_btn.setText("About") # Set text in the button
         self.about_btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor)) # pointer cursor
         self.about_btn.setFixedHeight(36) # fixed height
-        self.about_btn.setStyleSheet("""QPushButton {font-size: 14px;font-weight: 600;padding: 6px 14px;border-radius: 14px;color: white;background-color: rgba(255,255,255,0.22);border: 1px solid rgba(255,255,255,0.40);}QPushButton:hover { background-color: rgba(255,255,255,0.30); }QPushButton:pressed { background-color: rgba(255,255,255,0.38); }""") # button styles
+        theme.set_variant(self.about_btn, "pill") # button styles
 
         # login buttons
         self.login_button = QtWidgets.QPushButton("Login") # login button
         self.login_button.setObjectName("loginBtn") # for styling
         self.login_button.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor)) # pointer cursor
-        # button styles
-        self.login_button.setStyleSheet("""#loginBtn {font-size: 17px;font-weight: 500;padding: 10px 26px;border: 1px solid rgba(255, 255, 255, 100);border-radius: 11px;color: white;background-color: rgba(255, 255, 255, 0.25);}#loginBtn:hover {background-color: rgba(255,255,255,0.35);}#loginBtn:pressed {background-color: rgba(255,255,255,0.5);}""")
+        theme.set_variant(self.login_button, "hero") # button styles
         self.register_button = QtWidgets.QPushButton("Register") # register button
         self.register_button.setObjectName("registerBtn") # for styling
         self.register_button.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor)) # pointer cursor
-        # button styles
-        self.register_button.setStyleSheet("""#registerBtn {font-size: 17px;font-weight: 500;padding: 10px 26px;border: 1px solid rgba(255, 255, 255, 100);border-radius: 11px;color: white;background-color: rgba(255, 255, 255, 0.25);}#registerBtn:hover {background-color: rgba(255,255,255,0.35);}#registerBtn:pressed {background-color: rgba(255,255,255,0.5);}""")
+        theme.set_variant(self.register_button, "hero") # button styles
 
         self.login_button.clicked.connect(self.loginClicked.emit) # emit signal on click
         self.register_button.clicked.connect(self.registerClicked.emit) # emit signal on click
@@ -0,0 +1,203 @@
+import os, sys, time, argparse, itertools # standard libraries
+from concurrent.futures import ProcessPoolExecutor # grid sweeps
+from multiprocessing import shared_memory # recording shared with the workers
+import typing as t # for type hints
+import numpy as np
+
+if __package__ in (None, ""): # python DCM/src/sim/emulator.py
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core import params # parameter ranges and defaults
+from core.reports import RATE_EDGES # rate histogram bins
+
+# Offline what-if for a patient: replay the intrinsic beats of a recording through the AOO/VOO/AAI/VVI
+# pacing logic for many candidate parameter sets at once. The state machine is the one in
+# sim.pacemaker.Heart (escape interval with hysteresis and rate smoothing, refractory period,
+# sensitivity, 250 ms tissue refractory) but it steps through the intrinsic events one at a time
+# with every parameter set as one element of a numpy vector. sweep() splits a grid over a process
+# pool; the recording goes to the workers once, through shared memory.
+#   python DCM/src/sim/emulator.py recording.npz --mode VVI LRL=40:90:5 VRP=150:400:25 Hys=0:20:5
+
+TISSUE_REFRACTORY = 0.250 # s, as in sim.pacemaker.Heart
+RHEOBASE_V = 0.5 # capture threshold model: V = rheobase * (1 + chronaxie / pulse width)
+CHRONAXIE_MS = 0.5
+SENSED = {"A": ("AS", "ARP", "AtrialAmp", "AtrialPW"), "V": ("VS", "VRP", "VentAmp", "VentPW")} # chamber -> parameter keys
+
+
+def intrinsic_events(telemetry, chamber: str, window_ms: float = 60.0) -> t.Tuple[np.ndarray, np.ndarray]:
+    # (times s from the start of the recording, amplitudes mV) of the patient's own beats in one
+    # chamber, so the emulated pacer starts with the recording rather than at stream time 0. Sensed markers
+    # are used when the recording has them, otherwise beats are detected on the filtered egram. Beats
+    # hidden behind pacing in the recording can't be recovered; record with pacing off or at a low LRL.
+    from core.annotations import AS, VS
+    _, atrial, ventricular = telemetry.snippet(0, telemetry.samples) # the whole recording, not only the live window
+    x = np.abs(np.asarray(atrial if chamber == "A" else ventricular, dtype=float))
+    rate, start = telemetry.egram.sampling_rate, telemetry.span()[0]
+    times, _ = telemetry.annotations.query(-np.inf, np.inf, [AS if chamber == "A" else VS])[AS if chamber == "A" else VS]
+    if not len(times):
+        from core.beats import BeatDetector
+        times = start + np.asarray(BeatDetector(rate).process(x), dtype=float) / rate
+    w = max(1, int(window_ms * rate / 1000.0))
+    idx = np.clip(((times - start) * rate).astype(np.int64), 0, max(len(x) - 1, 0))
+    amps = np.array([x[i:i + w].max() for i in idx.tolist()]) if len(x) else np.zeros(len(times))
+    return times - start, amps
+
+
+def grid(mode: str, base: t.Optional[dict] = None, **ranges: t.Sequence[float]) -> t.Dict[str, np.ndarray]:
+    # Cartesian product of the given ranges over a base parameter set (dashboard values or defaults):
+    # grid("VVI", LRL=range(40, 95, 5), VRP=[200, 250, 300]) -> {"LRL": array, "VRP": array, ...}
+    base = params.normalize(mode, base or {})
+    keys = list(ranges)
+    combos = np.array(list(itertools.product(*(ranges[k] for k in keys))), dtype=float).reshape(-1, len(keys))
+    out = {k: np.full(len(combos), float(v)) for k, v in base.items()}
+    for i, k in enumerate(keys):
+        out[k] = combos[:, i]
+    ok = out["LRL"] <= out["URL"] # same rule as params.validate
+    return {k: v[ok] for k, v in out.items()}
+
+
+def emulate(mode: str, grid: t.Dict[str, np.ndarray], times: np.ndarray, amps: np.ndarray,
+            duration: t.Optional[float] = None, edges: t.Sequence[float] = RATE_EDGES) -> t.Dict[str, np.ndarray]:
+    # Pace counts, capture statistics and a rate histogram per parameter set (one row of grid each).
+    # The pacer starts at time 0 and runs to duration: times are seconds from the start of the recording.
+    chamber = mode[0]
+    sens_key, rp_key, amp_key, pw_key = SENSED[chamber]
+    n = len(grid["LRL"])
+    senses = mode[2] == "I"
+    base = 60.0 / grid["LRL"] # escape interval
+    hys = grid.get("Hys", np.zeros(n))
+    hys_interval = np.where(hys > 0, 60.0 / np.maximum(grid["LRL"] - hys, 1.0), base) # after a sensed beat
+    shortest = 60.0 / grid["URL"]
+    rs = grid.get("RS", np.zeros(n)) / 1000.0
+    rp = grid.get(rp_key, np.zeros(n)) / 1000.0
+    sens = grid.get(sens_key, np.zeros(n))
+    captures = grid[amp_key] >= RHEOBASE_V * (1.0 + CHRONAXIE_MS / grid[pw_key]) # output above the capture threshold
+    edges = np.asarray(edges, dtype=float)
+
+    last_event = np.zeros(n) # last paced or sensed event, the pacer's timing reference
+    last_interval = base.copy()
+    escape = base.copy() # next pace
+    last_depol = np.full(n, -np.inf) # last depolarization of the chamber (tissue refractory)
+    out = {key: np.zeros(n, dtype=np.int64) for key in ("paces", "captured", "lost", "sensed", "undersensed", "refractory", "hidden")}
+    hist = np.zeros((n, len(edges) - 1), dtype=np.int64)
+    rows = np.arange(n)
+
+    def beat(idx: np.ndarray, at): # a depolarization: rate of the interval that ended here
+        iv = at - last_depol[idx]
+        bins = np.searchsorted(edges, 60.0 / np.maximum(iv, 1e-9), side="right") - 1
+        ok = (bins >= 0) & (bins < len(edges) - 1) & np.isfinite(iv)
+        np.add.at(hist, (idx[ok], bins[ok]), 1)
+        last_depol[idx] = at
+
+    def next_escape(idx: np.ndarray, at, after_sense: bool):
+        iv = (hys_interval if after_sense else base)[idx]
+        r = rs[idx]
+        iv = np.where(r > 0, np.clip(iv, last_interval[idx] - r, last_interval[idx] + r), iv) # rate smoothing
+        escape[idx] = at + np.maximum(iv, shortest[idx])
+
+    end = duration if duration is not None else (float(times[-1]) if len(times) else 0.0)
+    for e, a in itertools.chain(zip(times.tolist(), amps.tolist()), [(end, None)]):
+        while True: # paces due before this beat (several in a long pause)
+            idx = rows[escape < e]
+            if not len(idx):
+                break
+            s = escape[idx]
+            out["paces"][idx] += 1
+            capt = captures[idx] & (s - last_depol[idx] >= TISSUE_REFRACTORY)
+            out["captured"][idx] += capt
+            out["lost"][idx] += ~capt
+            beat(idx[capt], s[capt])
+            last_interval[idx] = s - last_event[idx]
+            last_event[idx] = s
+            next_escape(idx, s, False)
+        if a is None:
+            break
+        alive = e - last_depol >= TISSUE_REFRACTORY # the heart is refractory right after a captured pace
+        out["hidden"] += ~alive
+        idx = rows[alive]
+        beat(idx, e)
+        if not senses:
+            continue
+        seen = a >= sens[idx]
+        out["undersensed"][idx] += ~seen
+        late = e - last_event[idx] >= rp[idx]
+        out["refractory"][idx] += seen & ~late
+        idx = idx[seen & late]
+        out["sensed"][idx] += 1
+        last_interval[idx] = e - last_event[idx]
+        last_event[idx] = e
+        next_escape(idx, e, True)
+
+    out["hist"] = hist
+    out["paced_pct"] = 100.0 * out["paces"] / np.maximum(out["paces"] + out["sensed"], 1)
+    return out
+
+
+# --- parallel sweep -------------------------------------------------------------
+
+_shared: dict = {} # worker side: the recording attached from shared memory
+
+
+def _attach(name: str, count: int, mode: str, duration: t.Optional[float]):
+    shm = shared_memory.SharedMemory(name=name)
+    data = np.ndarray((2, count), dtype=np.float64, buffer=shm.buf)
+    _shared.update(shm=shm, times=data[0], amps=data[1], mode=mode, duration=duration)
+
+
+def _run(chunk: t.Dict[str, np.ndarray]):
+    return emulate(_shared["mode"], chunk, _shared["times"], _shared["amps"], _shared["duration"])
+
+
+def sweep(mode: str, grid: t.Dict[str, np.ndarray], times: np.ndarray, amps: np.ndarray, workers: t.Optional[int] = None,
+          chunk: t.Optional[int] = None, duration: t.Optional[float] = None) -> t.Tuple[t.Dict[str, np.ndarray], float]:
+    # emulate() over the whole grid on a process pool; returns (results, combinations per second)
+    n = len(grid["LRL"])
+    workers = workers or os.cpu_count() or 1
+    chunk = chunk or min(4096, max(256, -(-n // (2 * workers)))) # long vectors, but two chunks per worker to balance
+    started = time.perf_counter()
+    shm = shared_memory.SharedMemory(create=True, size=max(16 * len(times), 16))
+    try:
+        data = np.ndarray((2, len(times)), dtype=np.float64, buffer=shm.buf)
+        data[0], data[1] = times, amps
+        chunks = [{k: v[i:i + chunk] for k, v in grid.items()} for i in range(0, n, chunk)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, len(times), mode, duration)) as pool:
+            parts = list(pool.map(_run, chunks))
+    finally:
+        shm.close()
+        shm.unlink()
+    results = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]} if parts else {}
+    return results, n / (time.perf_counter() - started)
+
+
+def _range(text: str) -> t.List[float]: # "40:90:5" (inclusive) or "1,2,3"
+    if ":" in text:
+        lo, hi, step = (float(x) for x in text.split(":"))
+        return np.arange(lo, hi + step / 2, step).tolist()
+    return [float(x) for x in text.split(",")]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay a recording through candidate pacing parameters")
+    ap.add_argument("recording", help=".npz saved by Telemetry.save")
+    ap.add_argument("ranges", nargs="+", help="KEY=lo:hi:step or KEY=a,b,c")
+    ap.add_argument("--mode", default="VVI", choices=params.MODES)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--top", type=int, default=10, help="parameter sets to print, fewest paces first")
+    a = ap.parse_args()
+
+    from core.telemetry import Telemetry
+    rec = Telemetry()
+    rec.load(a.recording)
+    times, amps = intrinsic_events(rec, a.mode[0])
+    g = grid(a.mode, **{k: _range(v) for k, v in (r.split("=", 1) for r in a.ranges)})
+    t0, t1 = rec.span()
+    res, rate = sweep(a.mode, g, times, amps, a.workers, duration=t1 - t0 if rec.samples else None)
+    print(f"{len(times)} intrinsic beats, {len(g['LRL'])} parameter sets, {rate:.0f} per second")
+    keys = [r.split("=", 1)[0] for r in a.ranges]
+    for i in np.lexsort((res["lost"], res["paces"]))[:a.top].tolist():
+        print(" ".join(f"{k}={g[k][i]:g}" for k in keys) + f": paced {res['paced_pct'][i]:.1f}%, {res['paces'][i]} paces,"
+              f" {res['lost'][i]} without capture, {res['undersensed'][i]} undersensed")
+
+
+if __name__ == "__main__":
+    main()
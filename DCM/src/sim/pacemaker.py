@@ -0,0 +1,484 @@
+import os, sys, json, time, random, select, selectors, threading, argparse # standard libraries
+from collections import OrderedDict # reply cache for retransmitted commands
+from dataclasses import dataclass, field # for easy data storage
+from datetime import datetime # SET_CLOCK times are checked before they are applied
+import typing as t # for type hints
+import numpy as np
+
+if __package__ in (None, ""): # python DCM/src/sim/pacemaker.py
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core import frames, params # wire format and parameter ranges
+from core.transport import IDENT # identify handshake
+
+# Software pacemaker for testing the DCM without hardware. Each SimDevice owns a pty: the DCM opens
+# the slave path like any serial port, the simulator answers on the master side. A Heart model paces
+# AOO/VOO/AAI/VVI with the same parameter names the dashboard uses and renders atrial and ventricular
+# egrams block by block with numpy. One SimHost thread serves any number of devices.
+#   python DCM/src/sim/pacemaker.py --devices 16 --rate 1000 --duration 3600
+
+
+@dataclass # what can go wrong on the link or the leads, for exercising the DCM's error handling
+class Faults:
+    drop: float = 0.0 # probability that a frame to the host is lost
+    corrupt: float = 0.0 # probability that a frame to the host has one byte flipped
+    delay_ms: float = 0.0 # extra latency before each command reply
+    noise_burst: float = 0.0 # chance per second of a one-second lead noise burst
+    disconnect_after: t.Optional[float] = None # seconds until the device stops answering
+
+
+@dataclass # patient and device setup of one simulated pacemaker
+class SimConfig:
+    serial: str = "SIM0001"
+    model: str = "PM-SIM"
+    rate: int = 1000 # egram sample rate in Hz
+    block_ms: int = 20 # samples are generated and sent in blocks this long
+    mode: str = "VVI"
+    params: dict = field(default_factory=dict) # missing values use core.params defaults
+    intrinsic_bpm: float = 70.0 # sinus rate of the patient
+    rate_jitter: float = 0.05 # beat-to-beat variation of the sinus rate (fraction)
+    conduction: float = 1.0 # fraction of P waves that conduct to the ventricle (1 = normal, 0 = complete block)
+    av_delay_ms: float = 160.0
+    p_amp: float = 2.0 # intrinsic P wave in mV on the atrial lead
+    r_amp: float = 8.0 # intrinsic R wave in mV on the ventricular lead
+    noise_mv: float = 0.05 # white noise on both leads
+    wander_mv: float = 0.3 # baseline wander amplitude (0.25 Hz)
+    faults: Faults = field(default_factory=Faults)
+    seed: t.Optional[int] = None
+
+
+def _gauss(fs: int, ms: float, width_ms: float, length_ms: float) -> np.ndarray: # bump centered at ms
+    x = np.arange(int(length_ms * fs / 1000)) * 1000.0 / fs
+    return np.exp(-0.5 * ((x - ms) / width_ms) ** 2)
+
+
+class Heart: # Pacing logic and egram synthesis for one patient, one block at a time
+    TISSUE_REFRACTORY_MS = 250 # myocardium can't depolarize again this soon
+    SPIKE_MV_PER_V = 20.0 # pacing artifact seen on the sensing lead per volt of output
+
+    def __init__(self, cfg: SimConfig):
+        self.cfg = cfg
+        self.fs = cfg.rate
+        self.rng = np.random.default_rng(cfg.seed)
+        self.rand = random.Random(cfg.seed)
+        self.mode = cfg.mode
+        self.params = params.normalize(cfg.mode, cfg.params)
+
+        fs = self.fs
+        self.p_wave = _gauss(fs, 40, 12, 100) # atrial depolarization
+        qrs = _gauss(fs, 40, 8, 400) - 0.35 * _gauss(fs, 62, 10, 400) # R and S
+        self.qrs = qrs + 0.25 * _gauss(fs, 300, 40, 400) # plus T wave
+        paced = _gauss(fs, 60, 22, 450) - 0.5 * _gauss(fs, 110, 25, 450) # wide paced complex
+        self.paced_qrs = paced - 0.35 * _gauss(fs, 330, 45, 450)
+        self.tail = max(len(self.qrs), len(self.paced_qrs), len(self.p_wave)) + 1
+        self.block = min(max(1, cfg.block_ms * fs // 1000), frames.EGRAM_MAX_SAMPLES) # samples per block, one EGRAM frame each
+        self._acc_a = np.zeros(self.block + self.tail) # waves that started but haven't been emitted yet
+        self._acc_v = np.zeros(self.block + self.tail)
+
+        self.t = 0 # first sample of the next block
+        self.next_p = self._sinus_interval() # next intrinsic P wave
+        self.next_r: t.Optional[int] = None # conducted R wave waiting for the AV delay
+        self.last_a_tissue = self.last_v_tissue = -10 ** 9 # last depolarization of each chamber
+        self.last_event = -10 ** 9 # last sensed or paced event in the paced chamber (refractory period)
+        self.last_interval = self._ms(60000.0 / self.params["LRL"])
+        self.escape = self.last_interval # when the pacer fires if nothing is sensed
+        self.noise_until = -1 # end of a noise burst
+        self.markers: t.List[t.Tuple[int, int]] = [] # (sample, code) produced since the last take
+
+    def _ms(self, ms: float) -> int: return int(round(ms * self.fs / 1000.0))
+
+    def _sinus_interval(self) -> int:
+        bpm = self.cfg.intrinsic_bpm * (1.0 + self.rand.gauss(0.0, self.cfg.rate_jitter))
+        return self._ms(60000.0 / max(bpm, 10.0))
+
+    def program(self, mode: str, values: dict): # New mode/parameters from a SET_PARAMS command
+        self.mode = mode
+        self.params = params.normalize(mode, values)
+        self.escape = min(self.escape, self.t + self._pacing_interval(False))
+
+    def _pacing_interval(self, after_sense: bool) -> int: # escape interval, with hysteresis and rate smoothing
+        p = self.params
+        bpm = p["LRL"] - p.get("Hys", 0) if after_sense and p.get("Hys", 0) else p["LRL"]
+        interval = self._ms(60000.0 / max(bpm, 1))
+        rs = self._ms(p.get("RS", 0))
+        if rs: # limit the change against the previous interval
+            interval = min(max(interval, self.last_interval - rs), self.last_interval + rs)
+        return max(interval, self._ms(60000.0 / p["URL"]))
+
+    def _add(self, acc: np.ndarray, wave: np.ndarray, at: int, gain: float):
+        i = at - self.t
+        n = min(len(wave), len(acc) - i)
+        acc[i:i + n] += gain * wave[:n]
+
+    def _spike(self, acc: np.ndarray, at: int, amp_v: float, pw_ms: float):
+        i = at - self.t
+        n = max(1, self._ms(pw_ms))
+        acc[i:i + n] += amp_v * self.SPIKE_MV_PER_V
+
+    def _paces(self, chamber: str) -> bool: return self.mode[0] == chamber
+    def _senses(self) -> bool: return self.mode[2] == "I" # AAI / VVI inhibit on a sensed event
+
+    def _atrial_beat(self, s: int, paced: bool):
+        if s - self.last_a_tissue < self._ms(self.TISSUE_REFRACTORY_MS):
+            return
+        self.last_a_tissue = s
+        self._add(self._acc_a, self.p_wave, s, self.cfg.p_amp)
+        self._add(self._acc_v, self.p_wave, s, 0.1 * self.cfg.p_amp) # far field
+        if paced or self.rand.random() < self.cfg.conduction:
+            self.next_r = s + self._ms(self.cfg.av_delay_ms)
+        if self._paces("A") and self._senses() and not paced and s - self.last_event >= self._ms(self.params["ARP"]) \
+                and self.cfg.p_amp >= self.params["AS"]:
+            self._sensed(s, frames.AS)
+
+    def _ventricular_beat(self, s: int, wave: np.ndarray):
+        if s - self.last_v_tissue < self._ms(self.TISSUE_REFRACTORY_MS):
+            return False
+        self.last_v_tissue = s
+        self._add(self._acc_v, wave, s, self.cfg.r_amp)
+        self._add(self._acc_a, wave, s, 0.15 * self.cfg.r_amp) # far field
+        return True
+
+    def _sensed(self, s: int, code: int):
+        self.markers.append((s, code))
+        self.last_interval = max(s - self.last_event, 1)
+        self.last_event = s
+        self.escape = s + self._pacing_interval(True)
+
+    def _pace(self, s: int):
+        p = self.params
+        self.last_interval = max(s - self.last_event, 1)
+        self.last_event = s
+        if self._paces("A"):
+            self.markers.append((s, frames.AP))
+            self._spike(self._acc_a, s, p["AtrialAmp"], p["AtrialPW"])
+            self._atrial_beat(s, paced=True)
+            self.next_p = s + self._sinus_interval() # capture resets the sinus node
+        else:
+            self.markers.append((s, frames.VP))
+            self._spike(self._acc_v, s, p["VentAmp"], p["VentPW"])
+            if self._ventricular_beat(s, self.paced_qrs):
+                self.next_r = None
+        self.escape = s + self._pacing_interval(False)
+
+    def step(self): # Advance one block, returns (start sample, atrial mV, ventricular mV)
+        start, end = self.t, self.t + self.block
+        while True: # events in time order
+            due = [(self.next_p, 0), (self.escape, 2)]
+            if self.next_r is not None:
+                due.append((self.next_r, 1))
+            s, kind = min(due)
+            if s >= end:
+                break
+            s = max(s, start)
+            if kind == 0:
+                self.next_p = s + self._sinus_interval()
+                self._atrial_beat(s, paced=False)
+            elif kind == 1:
+                self.next_r = None
+                if self._ventricular_beat(s, self.qrs) and self._paces("V") and self._senses() \
+                        and s - self.last_event >= self._ms(self.params["VRP"]) and self.cfg.r_amp >= self.params["VS"]:
+                    self._sensed(s, frames.VS)
+            else:
+                self._pace(s)
+
+        n = self.block
+        x = np.arange(start, end) / self.fs
+        base = self.cfg.wander_mv * np.sin(2 * np.pi * 0.25 * x)
+        noise = self.cfg.noise_mv
+        if self.cfg.faults.noise_burst and start > self.noise_until and self.rand.random() < self.cfg.faults.noise_burst * n / self.fs:
+            self.noise_until = start + self.fs # one second of lead noise
+        if start < self.noise_until:
+            noise = max(noise, 1.0)
+            base = base + 0.8 * np.sin(2 * np.pi * 50.0 * x) # mains pickup
+        atrial = self._acc_a[:n] + base + self.rng.normal(0.0, noise, n)
+        ventricular = self._acc_v[:n] + base + self.rng.normal(0.0, noise, n)
+        for acc in (self._acc_a, self._acc_v): # slide the pending waves forward by one block
+            acc[:-n] = acc[n:]
+            acc[-n:] = 0.0
+        self.t = end
+        return start, atrial, ventricular
+
+    def take_markers(self) -> t.List[t.Tuple[int, int]]:
+        out, self.markers = self.markers, []
+        return out
+
+
+class SimDevice: # One simulated pacemaker behind a pty
+    REPLY_CACHE = 64 # retransmitted commands get the cached reply instead of running twice
+    OUT_LIMIT = 256 * 1024 # bytes buffered for a host that isn't reading; more are dropped like a full UART
+
+    def __init__(self, cfg: SimConfig):
+        import tty
+        self.cfg = cfg
+        self.heart = Heart(cfg)
+        self.master, self._slave = os.openpty()
+        tty.setraw(self._slave) # no echo or newline translation before the host opens it
+        os.set_blocking(self.master, False)
+        self.path = os.ttyname(self._slave) # what the DCM opens
+        self.rand = random.Random(cfg.seed)
+        self.decoder = frames.FrameDecoder()
+        self.clock: t.Optional[str] = None # last SET_CLOCK time
+        self.streaming = False
+        self.stream_seq = 0
+        self.started = time.monotonic()
+        self.next_block = None # monotonic time the next egram block is due
+        self._text = bytearray() # pre-framing bytes (IDENT handshake)
+        self._out = bytearray()
+        self._replies: "OrderedDict[int, t.Tuple[bytes, bytes]]" = OrderedDict() # seq -> (request payload, reply)
+        self._delayed: t.List[t.Tuple[float, bytes]] = [] # replies held back by Faults.delay_ms
+        self.stats = {"commands": 0, "retransmits": 0, "frames_out": 0, "dropped": 0, "corrupted": 0,
+                      "overflow": 0, "samples": 0, "late_blocks": 0}
+
+    @property
+    def dead(self) -> bool: # past Faults.disconnect_after
+        after = self.cfg.faults.disconnect_after
+        return after is not None and time.monotonic() - self.started >= after
+
+    def fileno(self) -> int: return self.master
+
+    def on_readable(self):
+        try:
+            data = os.read(self.master, 65536)
+        except (BlockingIOError, OSError): # EIO until the host opens the slave
+            return
+        if self.dead:
+            return
+        if self._text or (not self.decoder.pending and data[:1] == IDENT[:1]): # handshake text, not a frame
+            data = self._handshake(data)
+        for f in self.decoder.feed(data):
+            self._command(f)
+
+    def _handshake(self, data: bytes) -> bytes: # answers IDENT\n, returns bytes that belong to frames
+        self._text += data
+        while b"\n" in self._text:
+            line, _, rest = bytes(self._text).partition(b"\n")
+            self._text = bytearray(rest)
+            if line.strip() == IDENT.strip():
+                self._queue(f"PACE {self.cfg.model} {self.cfg.serial}\n".encode(), faults=False)
+        if self._text and not IDENT.startswith(bytes(self._text[:len(IDENT)])): # not text after all
+            data, self._text = bytes(self._text), bytearray()
+            return data
+        return b""
+
+    def _command(self, f: frames.Frame):
+        self.stats["commands"] += 1
+        cached = self._replies.get(f.seq)
+        if cached and cached[0] == f.payload: # the host retried; don't apply it twice
+            self.stats["retransmits"] += 1
+            self._reply(cached[1])
+            return
+        try:
+            reply = frames.encode_json(frames.ACK, f.seq, self._run(f))
+        except Exception as e:
+            reply = frames.encode_json(frames.NAK, f.seq, {"error": str(e)})
+        self._replies[f.seq] = (f.payload, reply)
+        if len(self._replies) > self.REPLY_CACHE:
+            self._replies.popitem(last=False)
+        self._reply(reply)
+
+    def _requested(self, req: dict, state=None): # SET_PARAMS body -> (mode, full parameter set), raises if out of range
+        mode0, params0 = state or (self.heart.mode, self.heart.params) # what the write would be applied on
+        mode = req.get("mode", mode0)
+        values = dict(params0) if mode == mode0 else {} # same mode: unspecified keys keep their value
+        values.update(req.get("params", {}))
+        ok, msg = params.validate(mode, values)
+        if not ok:
+            raise ValueError(msg)
+        return mode, values
+
+    @staticmethod
+    def _clock(req: dict) -> str: # SET_CLOCK body -> device time, raises unless it is an ISO date and time
+        iso = req.get("time")
+        if not isinstance(iso, str):
+            raise ValueError("SET_CLOCK needs a time")
+        datetime.fromisoformat(iso) # ValueError names the bad string
+        return iso
+
+    def _run(self, f: frames.Frame) -> dict: # Execute one command, returns the ACK payload
+        h = self.heart
+        if f.type == frames.IDENTIFY:
+            return {"model": self.cfg.model, "serial": self.cfg.serial}
+        if f.type == frames.GET_PARAMS:
+            return {"mode": h.mode, "params": h.params}
+        if f.type == frames.SET_PARAMS:
+            mode, values = self._requested(f.json())
+            h.program(mode, values)
+            return {"mode": h.mode, "params": h.params}
+        if f.type == frames.SET_CLOCK:
+            self.clock = self._clock(f.json())
+            return {"time": self.clock}
+        if f.type == frames.STREAM:
+            req = f.json()
+            self.streaming = bool(req.get("on", True))
+            self.next_block = time.monotonic()
+            return {"on": self.streaming, "rate": self.cfg.rate}
+        if f.type == frames.INTERROGATE:
+            return {"model": self.cfg.model, "serial": self.cfg.serial, "mode": h.mode, "params": h.params,
+                    "clock": self.clock, "sample": h.t, "stats": dict(self.stats)}
+        if f.type == frames.ECHO:
+            return {"echo": f.payload.decode(errors="replace")}
+        if f.type == frames.BATCH:
+            ops = [frames.Frame(op["type"], f.seq, json.dumps(op.get("body", {})).encode()) for op in f.json()["ops"]]
+            state = None # device state each op will run on, starting from the current one
+            for op in ops: # check everything first so a bad op leaves the device untouched
+                if op.type == frames.SET_PARAMS:
+                    state = self._requested(op.json(), state)
+                elif op.type == frames.SET_CLOCK:
+                    self._clock(op.json())
+                elif op.type != frames.STREAM:
+                    raise ValueError(f"0x{op.type:02x} can't be batched")
+            return {"results": [self._run(op) for op in ops]}
+        raise ValueError(f"unknown command 0x{f.type:02x}")
+
+    def _reply(self, data: bytes):
+        if self.cfg.faults.delay_ms:
+            self._delayed.append((time.monotonic() + self.cfg.faults.delay_ms / 1000.0, data))
+        else:
+            self._queue(data)
+
+    def _queue(self, data: bytes, faults: bool = True): # Apply link faults and buffer for writing
+        fl = self.cfg.faults
+        if faults and fl.drop and self.rand.random() < fl.drop:
+            self.stats["dropped"] += 1
+            return
+        if faults and fl.corrupt and self.rand.random() < fl.corrupt:
+            data = bytearray(data)
+            data[self.rand.randrange(2, len(data))] ^= 0xFF # leave SYNC alone so the CRC is what catches it
+            self.stats["corrupted"] += 1
+        if len(self._out) + len(data) > self.OUT_LIMIT:
+            self.stats["overflow"] += 1
+            return
+        self._out += data
+        self.stats["frames_out"] += 1
+
+    def flush(self): # Write as much buffered output as the pty takes
+        if not self._out:
+            return
+        try:
+            n = os.write(self.master, self._out)
+        except (BlockingIOError, OSError):
+            return
+        del self._out[:n]
+
+    def _release(self, now: float): # Queue replies held back by Faults.delay_ms that are due
+        due = [d for d in self._delayed if d[0] <= now]
+        if due:
+            self._delayed = [d for d in self._delayed if d[0] > now]
+            for _, data in due:
+                self._queue(data)
+
+    def tick(self, now: float): # Send due replies and every egram block whose time has come
+        if self._delayed:
+            self._release(now)
+        if not self.streaming or self.dead:
+            return
+        period = self.heart.block / self.cfg.rate
+        behind = 0
+        while self.next_block <= now:
+            start, atrial, ventricular = self.heart.step()
+            self._queue(frames.encode_egram(self.stream_seq, start, self.cfg.rate, atrial, ventricular))
+            self.stream_seq = (self.stream_seq + 1) & 0xFFFF
+            markers = self.heart.take_markers()
+            if markers:
+                self._queue(frames.encode_markers(self.stream_seq, markers))
+                self.stream_seq = (self.stream_seq + 1) & 0xFFFF
+            self.stats["samples"] += len(atrial)
+            self.next_block += period
+            behind += 1
+        if behind > 1:
+            self.stats["late_blocks"] += behind - 1
+
+    @property
+    def wants_write(self) -> bool: return bool(self._out)
+
+    def close(self):
+        for fd in (self.master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class SimHost: # Serves many SimDevices from one thread
+    def __init__(self, devices: t.Sequence[SimDevice], tick_ms: float = 5.0):
+        self.devices = list(devices)
+        self.tick = tick_ms / 1000.0
+        self._stop = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+        self.loop_seconds = 0.0 # time spent working, for CPU load
+        self.started = None
+
+    def start(self) -> "SimHost":
+        self._thread = threading.Thread(target=self.serve, name="dcm-sim", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        for d in self.devices:
+            d.close()
+
+    def serve(self):
+        sel = selectors.DefaultSelector()
+        events = {} # device -> events it is registered for
+        for d in self.devices:
+            events[d] = selectors.EVENT_READ
+            sel.register(d.master, events[d], d)
+        self.started = time.monotonic()
+        while not self._stop.is_set():
+            ready = sel.select(self.tick)
+            t0 = time.monotonic()
+            for key, mask in ready:
+                if mask & selectors.EVENT_READ:
+                    key.data.on_readable()
+            for d in self.devices:
+                d.tick(t0)
+                d.flush()
+                want = selectors.EVENT_READ | (selectors.EVENT_WRITE if d.wants_write else 0) # wake when the pty drains
+                if want != events[d]:
+                    events[d] = want
+                    sel.modify(d.master, want, d)
+            self.loop_seconds += time.monotonic() - t0
+        sel.close()
+
+
+def make_devices(count: int, **kwargs) -> t.List[SimDevice]: # count devices with serials SIM0001..
+    faults = kwargs.pop("faults", None)
+    seed = kwargs.pop("seed", None)
+    return [SimDevice(SimConfig(serial=f"SIM{i + 1:04d}", faults=faults or Faults(),
+                                seed=None if seed is None else seed + i, **kwargs)) for i in range(count)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulated pacemakers on ptys")
+    ap.add_argument("--devices", type=int, default=1)
+    ap.add_argument("--rate", type=int, default=1000, help="egram samples per second")
+    ap.add_argument("--mode", default="VVI", choices=params.MODES)
+    ap.add_argument("--intrinsic", type=float, default=70.0, help="patient sinus rate (bpm)")
+    ap.add_argument("--noise", type=float, default=0.05, help="lead noise (mV)")
+    ap.add_argument("--drop", type=float, default=0.0, help="frame loss probability")
+    ap.add_argument("--corrupt", type=float, default=0.0, help="frame corruption probability")
+    ap.add_argument("--delay-ms", type=float, default=0.0, help="command reply latency")
+    ap.add_argument("--stream", action="store_true", help="stream egrams without waiting for a STREAM command")
+    ap.add_argument("--duration", type=float, default=None, help="seconds to run (default: until Ctrl+C)")
+    a = ap.parse_args()
+
+    faults = Faults(drop=a.drop, corrupt=a.corrupt, delay_ms=a.delay_ms)
+    devices = make_devices(a.devices, rate=a.rate, mode=a.mode, intrinsic_bpm=a.intrinsic, noise_mv=a.noise, faults=faults)
+    for d in devices:
+        d.streaming = a.stream
+        d.next_block = time.monotonic()
+        print(f"{d.cfg.serial} {d.path}")
+    host = SimHost(devices).start()
+    try:
+        time.sleep(a.duration) if a.duration else threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    host.stop()
+    busy = host.loop_seconds / max(time.monotonic() - host.started, 1e-9)
+    print(f"simulator busy {busy:.1%}; " + ", ".join(f"{d.cfg.serial}: {d.stats['samples']} samples" for d in devices))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os, sys, json, time, threading, argparse # standard libraries
+from binascii import crc_hqx # frame CRC, as in core.frames
+import typing as t # for type hints
+import numpy as np
+
+if __package__ in (None, ""): # python DCM/src/sim/replay.py
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core import frames, capture # wire format and capture files
+from sim.pacemaker import SimDevice, SimConfig, SimHost, Heart # pty device and its host
+
+# Recorded sessions played back to the DCM as if the pacemaker were connected. A ReplayDevice is a
+# SimDevice whose stream comes from a recording instead of the Heart model: the DCM opens its pty
+# like any port, so everything after the transport (DeviceProtocol, link quality, the acquisition
+# child, filters, beat and episode detection, reports) runs exactly as it did in the clinic.
+#     capture (core.capture)  the bytes the DCM read, with their timing. Line noise and corrupt frames
+#                             are kept; ACK/NAK replies of the recorded session are cut out, the
+#                             replay answers the commands of the new one.
+#     .npz (Telemetry.save)   the filtered egram and the markers, re-encoded as block_ms EGRAM frames
+#                             and MARKER frames. These samples pass the DCM's filters a second time.
+# speed scales the pacing: 1 is real time, 10 ten times faster. Each chunk is due at its recording
+# time / speed after STREAM on, so pacing doesn't drift with the host's tick. speed 0 sends as fast
+# as the host reads: output is only topped up while the pty has room, so nothing is dropped and
+# the DCM's read rate is the limit (bench/bench_replay.py measures that limit).
+#   python DCM/src/sim/replay.py session.cap --speed 10
+#   python DCM/src/sim/replay.py --synthetic 600 session.cap     write a 10 minute capture from the Heart model
+
+Timeline = t.Iterator[t.Tuple[float, bytes]] # (seconds into the recording, bytes due then), in time order
+BACKLOG = 16 * 1024 # bytes buffered ahead of the pty, about one pty buffer
+
+
+def _strip_replies(chunks: t.List[t.Tuple[float, bytes]]) -> Timeline: # capture chunks without valid ACK/NAK frames
+    data = b"".join(c for _, c in chunks)
+    keep = np.ones(len(data), dtype=bool)
+    head = 2 + frames.HEADER.size
+    pos = data.find(frames.SYNC)
+    while 0 <= pos and pos + head <= len(data):
+        ftype, _, length = frames.HEADER.unpack_from(data, pos + 2)
+        total = head + length + frames.CRC.size
+        body = data[pos + 2:pos + total - frames.CRC.size]
+        if length <= frames.MAX_PAYLOAD and pos + total <= len(data) \
+                and crc_hqx(body, 0xFFFF) == frames.CRC.unpack_from(data, pos + total - frames.CRC.size)[0]:
+            if ftype in (frames.ACK, frames.NAK):
+                keep[pos:pos + total] = False
+            pos = data.find(frames.SYNC, pos + total)
+        else: # noise or a corrupt frame, left for the DCM's decoder to deal with
+            pos = data.find(frames.SYNC, pos + 1)
+    offset = 0
+    for at, chunk in chunks:
+        mask = keep[offset:offset + len(chunk)]
+        offset += len(chunk)
+        if mask.all():
+            yield at, chunk
+        elif mask.any():
+            yield at, np.frombuffer(chunk, dtype=np.uint8)[mask].tobytes()
+
+
+def from_capture(path: str) -> t.Tuple[dict, Timeline]: # (header, timeline) of a core.capture file
+    header, chunks = capture.read(path)
+    if chunks: # time from the first byte, not from when the link was identified
+        t0 = chunks[0][0]
+        chunks = [(at - t0, c) for at, c in chunks]
+    return header, _strip_replies(chunks)
+
+
+def from_recording(path: str, block_ms: int = 20) -> t.Tuple[dict, Timeline]: # (header, timeline) of a Telemetry .npz
+    from core.telemetry import Telemetry
+    from core.annotations import AS, AP, VS, VP
+    tel = Telemetry()
+    tel.load(path)
+    rate = tel.egram.sampling_rate
+    codes = {AS: frames.AS, AP: frames.AP, VS: frames.VS, VP: frames.VP}
+    found = tel.annotations.query(-np.inf, np.inf, list(codes))
+    at = np.concatenate([found[k][0] for k in codes])
+    code = np.concatenate([np.full(len(found[k][0]), codes[k]) for k in codes])
+    order = np.argsort(at, kind="stable")
+    marks = np.rint(at[order] * rate).astype(np.int64), code[order]
+    header = {"model": "PM-REPLAY", "serial": "REPLAY", "started": tel.egram.timestamp, "rate": rate}
+
+    def timeline():
+        n, first = tel.samples, int(round(tel.span()[0] * rate)) # device sample number of recording sample 0
+        block = min(max(1, int(block_ms * rate / 1000)), frames.EGRAM_MAX_SAMPLES)
+        seq, m = 0, 0
+        for i in range(0, n, block):
+            j = min(i + block, n)
+            x = tel.history.read(i, j)
+            out = frames.encode_egram(seq, first + i, int(rate), x[:, 0], x[:, 1])
+            seq = (seq + 1) & 0xFFFF
+            k = int(np.searchsorted(marks[0], first + j))
+            if k > m:
+                out += frames.encode_markers(seq, list(zip(marks[0][m:k].tolist(), marks[1][m:k].tolist())))
+                seq = (seq + 1) & 0xFFFF
+                m = k
+            yield j / rate, out # sent once its last sample exists, as a device would
+    return header, timeline()
+
+
+def open_source(path: str) -> t.Tuple[dict, Timeline]: # capture or recording, by content
+    with open(path, "rb") as f:
+        magic = f.read(len(capture.MAGIC))
+    return from_capture(path) if magic == capture.MAGIC else from_recording(path)
+
+
+def synthetic_capture(path: str, seconds: float, **config) -> dict: # A capture of a SimConfig patient, written without waiting
+    cfg = SimConfig(**config)
+    heart = Heart(cfg)
+    period = heart.block / cfg.rate
+    header = {"model": cfg.model, "serial": cfg.serial, "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "t0": 0.0,
+              "rate": cfg.rate}
+    seq = 0
+    with open(path, "wb") as f:
+        f.write(capture.MAGIC + (json.dumps(header) + "\n").encode())
+        for k in range(int(seconds / period)):
+            start, atrial, ventricular = heart.step()
+            data = frames.encode_egram(seq, start, cfg.rate, atrial, ventricular)
+            seq = (seq + 1) & 0xFFFF
+            markers = heart.take_markers()
+            if markers:
+                data += frames.encode_markers(seq, markers)
+                seq = (seq + 1) & 0xFFFF
+            f.write(capture.RECORD.pack((k + 1) * period, len(data)) + data)
+    return header
+
+
+class ReplayDevice(SimDevice): # A recording behind a pty, answering commands like the simulator
+    def __init__(self, header: dict, timeline: Timeline, speed: float = 1.0):
+        super().__init__(SimConfig(serial=str(header.get("serial", "REPLAY")), model=str(header.get("model", "PM-REPLAY")),
+                                   rate=int(header.get("rate", 1000))))
+        self.timeline = iter(timeline)
+        self.speed = speed # 0: as fast as the host reads
+        self.position = 0.0 # recording seconds sent so far
+        self.started_at: t.Optional[float] = None # monotonic time of recording second 0 while streaming
+        self.finished_at: t.Optional[float] = None # monotonic time the last byte was queued
+        self._next = next(self.timeline, None)
+        self.stats.update({"chunks": 0, "bytes": 0})
+
+    @property
+    def done(self) -> bool: return self._next is None
+
+    def _run(self, f: frames.Frame) -> dict:
+        if f.type == frames.STREAM: # start or pause the recording where it is
+            on = bool(f.json().get("on", True))
+            if on and not self.streaming:
+                self.started_at = time.monotonic() - (self.position / self.speed if self.speed else 0.0)
+            self.streaming = on
+            return {"on": self.streaming, "rate": self.cfg.rate}
+        return super()._run(f)
+
+    def tick(self, now: float):
+        if self._delayed:
+            self._release(now)
+        if not self.streaming or self._next is None:
+            return
+        due = (now - self.started_at) * self.speed if self.speed else float("inf")
+        while self._next is not None and self._next[0] <= due and len(self._out) < BACKLOG:
+            at, data = self._next
+            self._out += data # straight in: a recording is never dropped or corrupted again
+            self.position = at
+            self.stats["chunks"] += 1
+            self.stats["bytes"] += len(data)
+            self._next = next(self.timeline, None)
+        if self._next is None and self.finished_at is None:
+            self.finished_at = now
+
+
+def serve(path: str, speed: float = 1.0, stream: bool = False) -> t.Tuple[ReplayDevice, SimHost]:
+    # ReplayDevice for a capture or recording and a host serving it every millisecond
+    header, timeline = open_source(path)
+    device = ReplayDevice(header, timeline, speed)
+    if stream:
+        device._run(frames.Frame(frames.STREAM, 0, b'{"on": true}'))
+    return device, SimHost([device], tick_ms=1.0).start()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay a recorded session on a pty")
+    ap.add_argument("source", help="capture file (core.capture) or Telemetry .npz recording")
+    ap.add_argument("--speed", default="1", help="pacing factor, or max for as fast as the DCM reads")
+    ap.add_argument("--stream", action="store_true", help="start without waiting for a STREAM command")
+    ap.add_argument("--synthetic", type=float, metavar="SECONDS", help="write a capture of simulated telemetry to source and exit")
+    ap.add_argument("--rate", type=int, default=1000, help="egram samples per second, with --synthetic")
+    a = ap.parse_args()
+    if a.synthetic:
+        synthetic_capture(a.source, a.synthetic, rate=a.rate, seed=1)
+        print(f"{a.source}: {a.synthetic:g} s at {a.rate} Hz")
+        return
+    device, host = serve(a.source, 0.0 if a.speed == "max" else float(a.speed), a.stream)
+    print(f"{device.cfg.serial} {device.path}", flush=True)
+    try: # the device stays up after the recording ends, like a pacemaker that has nothing more to send
+        while not device.done or device.wants_write:
+            time.sleep(0.05)
+        wall = device.finished_at - device.started_at
+        print(f"replayed {device.position:.1f} s of recording, {device.stats['bytes']} bytes in {wall:.1f} s "
+              f"({device.position / max(wall, 1e-9):.1f}x)", flush=True)
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    host.stop()
+
+if __name__ == "__main__":
+    main()
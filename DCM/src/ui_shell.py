@@ -1,13 +1,14 @@
 from PySide6 import QtWidgets, QtCore, QtGui 
-from page_welcome import WelcomePage # welcome page
-from page_login import LoginPage # login page
-from page_register import RegisterPage # register page
-from core.users import UserStore # user management
-from page_dashboard import DashboardPage # main dashboard
-from core.egram import EgramData # egram data handling
-from utility.set_clock import SetClockDialog # setting clock of pacemaker
-from dialogs.report_preview import ReportPreview
-from datetime import datetime
+from core.session import AppInfo, Session # app facts and interrogation session
+from core.telemetry import Telemetry # egram and rate data from the device
+from core import reports # report numbers and html
+from utility.startup_trace import trace # startup profiling (--profile-startup)
+from utility import theme # shared application stylesheet
+from utility.tracing import traced # handler spans for --trace
+# Pages, dialogs and reports are imported on first use (see _page and the report methods) so they don't delay the first window
+
+HRV_REFRESH_MS = 2000 # dashboard HRV readout period
+ACQUISITION_PROCESS = True # link, decoding and filtering in a supervised child (ProcessBridge), False keeps them in this process (DeviceBridge)
 
 class UIShell(QtWidgets.QMainWindow): # Main application window
     def __init__(self): # Initialize the main window
@@ -15,59 +16,276 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
         self.setWindowTitle("DCM UI") # Set window title
         self.resize(900, 600) # Set initial window size
 
-        self.appInfo = {"applicationModelNumber": self.application_model_number(), "version": self.application_software_rev_nu(), "institution": self.institution_name(), "dcmSerial": self.dcm_serial_num()}
-        self.sessionInfo = {"connected": False, "device_id": {"model": "Pacemaker", "serial": "COM1"}, "pending_set_time": None}
-        self.last_saved_params = {} # Used for printing pdf
+        # All state lives in Qt-free core objects; this class only shows it
+        self.app_info = AppInfo() # model number, version, institution, DCM serial
+        self.session = Session() # device identity, pending clock set, saved parameters
+        self.telemetry = Telemetry(live_window_s=60.0) # egram and rate data; older samples are kept compressed
 
         # Model / store
-        self.user_store = UserStore()  # saves to users.json (max 10 users)
+        self._user_store = None # saves to users.json (max 10 users), loaded on first login/register
+        self._link_pool = None # open pacemaker links shared by telemetry, programming and set-clock
+        self._finder = None # DeviceFinder, probes the pool's ports off the GUI thread
+        self._pending_ops = None # device writes waiting for a link, saved to pending.json
+        self._archive = None # past sessions, archive/archive.db plus recordings, opened on first use
+        self._archive_id = None # archive row of the current session, created with its first event
+        self.username = "" # logged in user, recorded with each archived session
+        self._audit = None # core.audit.AuditLog, hash-chained audit.log written in the background
+        self._bridge = None # DeviceBridge or ProcessBridge of the connected device
+        self._link_note = "" # status pill tooltip: why the last connect failed, acquisition restarts
+        self._synthetic_bpm = None # stand-in rate series for reports before any beats, never mixed into telemetry
 
         # Stack (router)
         self.stack = QtWidgets.QStackedWidget() # Stack for different pages
         self.setCentralWidget(self.stack) # Set stack as central widget
 
-        # Pages
-        self.welcome_page = WelcomePage() # initialize welcome page
-        self.login_page = LoginPage() # initialize login page
-        self.register_page = RegisterPage() # initialize register page
-        self.dashboard_page = DashboardPage() # initialize dashboard page
-        self.egram_data = EgramData() # initialize egram data handler
-
-        # Add to stack
-        for p in (self.welcome_page, self.login_page, self.register_page, self.dashboard_page): # add pages to stack
-            self.stack.addWidget(p) # add each page to the stack
+        # Pages are built the first time they are navigated to
+        self._pages = {} # name -> page widget
+        self._page_builders = {
+            "welcome": self._build_welcome_page,
+            "login": self._build_login_page,
+            "register": self._build_register_page,
+            "dashboard": self._build_dashboard_page,
+        }
         self.stack.setCurrentWidget(self.welcome_page) # start at welcome page
 
+        self.status_toolbar = None # in the beginning, no status toolbar
+
+    def _page(self, name: str): # Return a page, building, wiring and stacking it on first use
+        page = self._pages.get(name)
+        if page is None:
+            with trace.span(f"build {name} page"):
+                page = self._page_builders[name]()
+            self._pages[name] = page
+            self.stack.addWidget(page) # add the page to the stack
+        return page
+
+    @property
+    def welcome_page(self): return self._page("welcome")
+
+    @property
+    def login_page(self): return self._page("login")
+
+    @property
+    def register_page(self): return self._page("register")
+
+    @property
+    def dashboard_page(self): return self._page("dashboard")
+
+    @property
+    def egram_data(self): return self.telemetry.egram # egram buffers of the current session
+
+    @property
+    def user_store(self): # User store, loaded when it is first needed
+        if self._user_store is None:
+            from core.users import UserStore # user management
+            with trace.span("UserStore"):
+                self._user_store = UserStore()
+        return self._user_store
+
+    @property
+    def link_pool(self): # Serial connection pool, created on first device access
+        if self._link_pool is None:
+            from core.transport import ConnectionPool # serial discovery and shared links
+            self._link_pool = ConnectionPool()
+        return self._link_pool
+
+    @property
+    def device_finder(self): # Pool lookups on a worker thread, created with the first connect
+        if self._finder is None:
+            from utility.device_bridge import DeviceFinder
+            self._finder = DeviceFinder(self.link_pool, self, process=ACQUISITION_PROCESS, live_window_s=self.telemetry.live_window_s)
+            self._finder.found.connect(self._on_link_found)
+            self._finder.missing.connect(self._on_link_missing)
+        return self._finder
+
+    @property
+    def pending_ops(self): # Queue of device writes, loaded on first use
+        if self._pending_ops is None:
+            from core.pending import PendingOps, UNASSIGNED # persistent coalescing queue
+            self._pending_ops = PendingOps()
+            self._pending_ops.clear(UNASSIGNED) # edits of an earlier run that never met a device aren't this patient's
+        return self._pending_ops
+
+    def _pending_serial(self) -> str: # queue of the identified device, UNASSIGNED until one has answered
+        from core.pending import UNASSIGNED
+        return self.session.device_id.serial if self.session.connected else UNASSIGNED
+
+    def _flush_pending(self): # Send the device's queue now if its link is up; otherwise it waits for the next connect
+        serial = self._pending_serial()
+        if self._bridge is not None and self._bridge.live and self.pending_ops.pending(serial):
+            self._bridge.run("flush", self.pending_ops.flush(serial, self._bridge.protocol)) # a failed batch stays queued
+
+    @property
+    def archive(self): # Session archive, opened on first use
+        if self._archive is None:
+            from core.archive import SessionArchive # sqlite session index and recordings
+            self._archive = SessionArchive()
+        return self._archive
+
+    def _archive_session(self) -> int: # archive row of the current session, started on demand
+        if self._archive_id is None:
+            d = self.session.device_id
+            self._archive_id = self.archive.begin(d.serial, d.model, self.username, self.session.started_at)
+        return self._archive_id
+
+    def _finish_archive(self): # Close the current session's archive row and save its recording
+        if self._archive_id is not None or self.telemetry.samples:
+            self.archive.finish(self._archive_session(), self.telemetry)
+            self._archive_id = None
+
+    def _archive_report(self, name: str, html: str, user: str = None):
+        self.archive.add_report(self._archive_session(), name, html)
+        self._audit_event("report", user, name=name, device=self.session.device_id.serial)
+
+    @property
+    def audit(self): # Audit log, started on first use
+        if self._audit is None:
+            from core.audit import AuditLog # background writer thread
+            self._audit = AuditLog()
+        return self._audit
+
+    def _audit_event(self, action: str, user: str = None, **data): # Queue an audit record; the writer thread does the I/O
+        self.audit.record(action, user or self.username, **data) # user: a service client instead of the one at the screen
+
+    def closeEvent(self, event): # Keep the session that is open when the window closes
+        self._close_bridge()
+        self._finish_archive()
+        if self._audit is not None:
+            self._audit.close() # write what is still queued
+        super().closeEvent(event)
+
+    def connect_device(self): # Look for the pacemaker; on_device_connected runs once a pooled link answers
+        if self._bridge is not None:
+            if self._bridge.live:
+                return # already connected
+            self._close_bridge() # the link dropped, start over
+        serial = self.session.device_id.serial if self.session.connected else None # after a dropout, only the same device
+        if not self.device_finder.busy:
+            self._link_note = ""
+            self.set_link_status("Searching…", "disconnected")
+            self.device_finder.search(serial)
+
+    def _on_link_found(self, found): # Pooled link or started acquisition child: telemetry, programming and set-clock all go through its bridge
+        from utility.device_bridge import DeviceBridge, ProcessBridge
+        if ACQUISITION_PROCESS:
+            bridge = ProcessBridge(parent=self, acquisition=found)
+            bridge.restarted.connect(self._on_acquisition_restarted)
+        else:
+            expected = self.session.device_id.serial if self.session.connected else None
+            bridge = DeviceBridge(found, self, expected_serial=expected)
+        self.on_device_connected(bridge)
+        bridge.call("stream", True) # egram and markers from now on
+
+    def _on_acquisition_restarted(self, why: str, restarts: int): # The supervisor brought a dead or hung child back
+        self._link_note = f"Acquisition process {why}, restarted ({restarts} so far)"
+        if getattr(self, "status", None):
+            self.status.setToolTip(self._link_note) # the pill's text follows the new child's linkStatus
+
+    def _on_link_missing(self, why: str): # Nothing answered; the reason goes in the pill's tooltip
+        self._link_note = why
+        self.set_link_status("No pacemaker found", "disconnected")
+
+    def on_device_connected(self, bridge): # A link came up: record the device and send everything queued for it
+        device = bridge.protocol.link.device
+        self.session.attach(device)
+        if self._archive_id is None:
+            self._archive_session()
+        else:
+            self.archive.set_device(self._archive_id, device.serial, device.model)
+        bridge.linkStatus.connect(self.set_link_status) # pill follows the measured link quality
+        self._bridge = bridge
+        if hasattr(bridge, "rings"): # ProcessBridge: the child filters into shared memory, the GUI only reads
+            self.telemetry.attach(bridge.rings)
+            bridge.samplesReady.connect(self._pull_telemetry)
+        else:
+            bridge.stream.connect(self._on_stream_frame)
+        self.pending_ops.adopt(device.serial) # edits saved before the device answered are for it
+        self._flush_pending()
+
+    def _on_stream_frame(self, frame): # Telemetry from the device: filtered egram and beat rate
+        from core import frames
+        if frame.type == frames.EGRAM:
+            start, rate, atrial, ventricular = frames.decode_egram(frame.payload)
+            time = [(start + i) / rate for i in range(len(atrial))]
+            self.telemetry.append_samples(time, atrial, ventricular, rate)
+        elif frame.type == frames.MARKER: # pace/sense events, with the refractory windows they start
+            self.telemetry.append_markers(frames.decode_markers(frame.payload), self._refractory_ms())
+
+    def _pull_telemetry(self): # New samples in the acquisition process' rings
+        self.telemetry.pull(self._refractory_ms)
+
+    def _close_bridge(self): # Stop the device's bridge; rings are detached before an acquisition child frees them
+        if self._bridge is None:
+            return
+        self.telemetry.detach()
+        self._bridge.close()
+        self._bridge = None
+
+    def _refractory_ms(self) -> dict: # ARP/VRP of the mode on screen, last saved values first
+        if "dashboard" not in self._pages:
+            return {}
+        mode = self.dashboard_page.current_mode()
+        params = self.session.saved_params.get(mode) or self.dashboard_page._collect_params(mode)
+        return {k: params[k] for k in ("ARP", "VRP") if k in params}
+
+    def _build_welcome_page(self):
+        from page_welcome import WelcomePage # welcome page
+        page = WelcomePage() # initialize welcome page
         # Wiring — Welcome
-        self.welcome_page.loginClicked.connect(lambda: self.goto(self.login_page)) # go to login page on clicked login button
-        self.welcome_page.registerClicked.connect(lambda: self.goto(self.register_page)) # go to register page on clicked register button
+        page.loginClicked.connect(lambda: self.goto(self.login_page)) # go to login page on clicked login button
+        page.registerClicked.connect(lambda: self.goto(self.register_page)) # go to register page on clicked register button
+        # Wiring - About
+        page.aboutClicked.connect(self.show_about) # show about page when clicked about
+        return page
 
+    def _build_login_page(self):
+        from page_login import LoginPage # login page
+        page = LoginPage() # initialize login page
         # Wiring — Login
-        self.login_page.backClicked.connect(lambda: (self.login_page.reset_form(), self.goto(self.welcome_page))) # go back to welcome page on clicked back button
-        self.login_page.loginRequested.connect(self.handle_login) # handle login request
+        page.backClicked.connect(lambda: (page.reset_form(), self.goto(self.welcome_page))) # go back to welcome page on clicked back button
+        page.loginRequested.connect(self.handle_login) # handle login request
+        return page
 
+    def _build_register_page(self):
+        from page_register import RegisterPage # register page
+        page = RegisterPage() # initialize register page
         # Wiring — Register
-        self.register_page.backClicked.connect(lambda: (self.register_page.reset_form(), self.goto(self.welcome_page))) # go back to welcome page on clicked back button
-        self.register_page.registerRequested.connect(self.handle_register) # handle register request
-
-        # Wiring - About
-        self.welcome_page.aboutClicked.connect(self.show_about) # show about page when clicked about
+        page.backClicked.connect(lambda: (page.reset_form(), self.goto(self.welcome_page))) # go back to welcome page on clicked back button
+        page.registerRequested.connect(self.handle_register) # handle register request
+        return page
 
+    def _build_dashboard_page(self):
+        from page_dashboard import DashboardPage # main dashboard
+        page = DashboardPage() # initialize dashboard page
         # Wiring - Set Clock
-        self.dashboard_page.setClockClicked.connect(self.show_set_clock) # show clock modal when clicked
-        self.dashboard_page.newPatientClicked.connect(self.new_patient) # setup new pacemaker when clicked
-        self.dashboard_page.aboutPageClicked.connect(self.show_about) # setup about page when clicked 
-
+        page.setClockClicked.connect(self.show_set_clock) # show clock modal when clicked
+        page.newPatientClicked.connect(self.new_patient) # setup new pacemaker when clicked
+        page.aboutPageClicked.connect(self.show_about) # setup about page when clicked 
         # Save Signal - Dashboard
-        self.dashboard_page.paramsSaved.connect(self._on_params_saved) # connect paramsSaved signal to handler
-
-        self.status_toolbar = None # in the beginning, no status toolbar
-
-    def _on_params_saved(self, mode, params): # Handle saving parameters
-        self.last_saved_params[mode] = dict(params)
+        page.paramsSaved.connect(self._on_params_saved) # connect paramsSaved signal to handler
+        # Live HRV readout; the spectrum behind LF/HF refreshes on its own slower clock (core/hrv.py)
+        hrv_timer = QtCore.QTimer(page)
+        hrv_timer.timeout.connect(self._update_hrv)
+        hrv_timer.start(HRV_REFRESH_MS)
+        return page
+
+    def _update_hrv(self): # Dashboard HRV readout, while the dashboard is on screen
+        page = self.dashboard_page
+        if self.stack.currentWidget() is page:
+            page.set_hrv(self.telemetry.hrv.metrics() if self.telemetry.samples else None)
+
+    @traced("UIShell._on_params_saved")
+    def _on_params_saved(self, mode, params, user=None): # Handle saving parameters (user: a service client)
+        line = self.session.save_params(mode, params) # remembered for the temporary parameters report
+        self.pending_ops.set_params(self._pending_serial(), mode, params)
+        self._flush_pending() # written to the device now, or when its link comes up
+        self.archive.add_params(self._archive_session(), mode, params)
+        self._audit_event("program", user, device=self.session.device_id.serial, mode=mode, params=params)
+        if "LRL" in params:
+            self.telemetry.set_lower_rate(params["LRL"]) # runs below the new LRL are episodes from now on
         print(f"[DEBUG] Saved {mode} -> {params}") # debug print
-        file = open("saved_Params.txt", 'a')
-        file.write(datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " " + mode + " -> " + str(params) + '\n')
+        with open("saved_Params.txt", 'a') as file: # closed after every save, a clinic day saves many times
+            file.write(line + '\n')
 
     def create_top_toolbar(self, username: str): # Create the top toolbar function
         if hasattr(self, "top_toolbar") and self.top_toolbar: 
@@ -80,14 +298,6 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
         # Left side - user info label
         self.user_label = QtWidgets.QLabel(f"{username}") # label showing logged in user
         self.user_label.setObjectName("userLabel") # set object name for styling
-        self.user_label.setStyleSheet(""" 
-            #userLabel {
-                color: white;
-                font-weight: 500;
-                padding-left: 8px;
-                font-size: 12px;
-            }
-        """) # style the label
         self.top_toolbar.addWidget(self.user_label) # add label to toolbar
 
         self._left_pad = QtWidgets.QWidget()
@@ -102,40 +312,20 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
         self.timer_label = QtWidgets.QLabel()
         self.timer_label.setObjectName("timerLabel")
         self.timer_label.setAlignment(QtCore.Qt.AlignCenter)
-        self.timer_label.setStyleSheet("""
-            #timerLabel {
-                color: white;
-                font-size: 12px;
-                font-weight: 600;
-                padding: 0 12px 0 12px;
-            }
-        """)
         self.top_toolbar.addWidget(self.timer_label)
 
         right_spacer = QtWidgets.QWidget()
         right_spacer.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Preferred)
         self.top_toolbar.addWidget(right_spacer)
 
-        reports_btn = QtWidgets.QToolButton(self)
+        reports_btn = QtWidgets.QToolButton(self.top_toolbar)
+        reports_btn.setObjectName("reportsBtn") # set object name for styling
         reports_btn.setText("Reports")
         reports_btn.setPopupMode(QtWidgets.QToolButton.InstantPopup)
         reports_btn.setFixedHeight(28)
         reports_btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor))
-        reports_btn.setStyleSheet("""
-            QToolButton {
-                padding: 6px 14px;
-                border-radius: 16px;
-                color: white;
-                background: rgba(255,255,255,0.22);
-                border: 1px solid rgba(255,255,255,0.35);
-                font-weight: 600;
-                font-size: 12px;
-            }
-            QToolButton:hover { background: rgba(255,255,255,0.3); }
-            QToolButton:pressed { background: rgba(255,255,255,0.38); }
-        """)
-
-        menu = QtWidgets.QMenu(self)
+
+        menu = QtWidgets.QMenu(reports_btn) # goes with the toolbar when it is deleted on logout
         menu.addSection("Report")
         menu.addAction("Bradycardia Parameters", self.open_brady_params_report)
         menu.addAction("Temporary Parameters", self.open_temporary_params_report)
@@ -144,6 +334,7 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
         menu.addSection("Diagnostics")      # a bold label inside the menu
         menu.addAction("Rate Histogram", self.open_rate_histogram_report)  # item → handler
         menu.addAction("Trending", self.open_trending_report)              # item → handler
+        menu.addAction("Episodes", self.open_episode_report)
 
         reports_btn.setMenu(menu)
 
@@ -159,24 +350,11 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
         self.logout_btn.setObjectName("logoutBtn") # set object name for styling
         self.logout_btn.setCursor(QtGui.QCursor(QtCore.Qt.PointingHandCursor)) # change cursor on hover
         self.logout_btn.setFixedHeight(28) # set fixed height
-        self.logout_btn.setStyleSheet(""" 
-            #logoutBtn {
-                padding: 6px 14px;
-                border-radius: 16px;
-                color: white;
-                background: rgba(255,255,255,0.22);
-                border: 1px solid rgba(255,255,255,0.35);
-                font-weight: 600;
-                font-size: 12px;
-            }
-            #logoutBtn:hover  { background: rgba(255,255,255,0.30); }
-            #logoutBtn:pressed{ background: rgba(255,255,255,0.38); }
-        """) # style the button
         self.top_toolbar.addWidget(self.logout_btn) # add button to toolbar
 
         self.logout_btn.clicked.connect(self.handle_logout) # connect button click to logout handler
 
-        self._timer = QtCore.QTimer(self)
+        self._timer = QtCore.QTimer(self.top_toolbar)
         self._timer.timeout.connect(self._update_timer_label)
         self._timer.start(1000)  # update every second
         self._update_timer_label()  # initial update
@@ -195,15 +373,6 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
         self.status.setAlignment(QtCore.Qt.AlignCenter) # center align text
         self.status.setFixedHeight(28) # set fixed height
         self.status.setFixedWidth(180) # set fixed width
-        self.status.setStyleSheet("""
-            #statusPill {
-                padding: 4px 10px;
-                border-radius: 0px;
-                color: white;
-                background: rgba(255,255,255,0.22);
-                border: 1px solid rgba(255,255,255,0.35);
-            }
-        """) # style the label
 
         self.status_toolbar = QtWidgets.QToolBar() # create a new toolbar
         self.status_toolbar.setMovable(False) # make it non-movable
@@ -216,24 +385,13 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
         spacer = QtWidgets.QWidget()
         spacer.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Preferred)
         self.status_toolbar.addWidget(spacer)
+        self.status_toolbar.addAction("Connect", self.connect_device) # search again, e.g. after a dropout or a new patient
 
-        def set_status(text, color_rgba): # function to set status text and color
+    def set_link_status(self, text: str, status: str): # Status pill: the connect step, then the bridge's linkStatus
+        if getattr(self, "status", None):
             self.status.setText(text) # update status text
-            self.status.setStyleSheet( 
-                f"#statusPill {{ padding:4px 10px; border-radius:0px; color:white; "
-                f"background:{color_rgba}; border:1px solid rgba(255,255,255,0.35); }}"
-            ) # update status style
-
-        states = [
-            ("Connected",        "rgba(52, 199, 89, 0.2)"),
-            ("Out of range",     "rgba(255, 59, 48, 0.2)"),
-            ("Noise",            "rgba(255, 159, 10, 0.2)"),
-            ("Different device", "rgba(10, 132, 255, 0.2)"),
-            ("Disconnected",     "rgba(142, 142, 147, 0.2)")
-        ] # predefined states with colors
-        for text, color in states: # create actions for each state
-            act = self.status_toolbar.addAction(text) # add action to toolbar
-            act.triggered.connect(lambda _, t=text, c=color: set_status(t, c)) # connect action to set_status function
+            self.status.setToolTip(self._link_note)
+            theme.set_status(self.status, status) # colour comes from the theme, no stylesheet re-parse
 
     def reveal_toolbar(self, toolbar: QtWidgets.QToolBar): # Animate fade+slide down to reveal the toolbar
         if not toolbar: 
@@ -297,16 +455,21 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
 
         def _cleanup(): # cleanup after animation
             self.removeToolBar(toolbar) # remove toolbar from UI
+            toolbar.deleteLater() # with its widgets; a new one is built on the next login
             setattr(self, toolbar_attr, None) # clear reference
+            if toolbar_attr == "status_toolbar":
+                self.status = None # the pill went with it
             if on_finished: 
                 on_finished() # call callback if provided
 
         group.finished.connect(_cleanup) # connect cleanup to animation finished
         group.start(QtCore.QAbstractAnimation.DeleteWhenStopped) # start animation
 
+    @traced("UIShell.handle_logout")
     def handle_logout(self): # Handle user logout
         if QtWidgets.QMessageBox.question(self, "Logout", "Are you sure?") != QtWidgets.QMessageBox.Yes: 
             return # user cancelled logout
+        self._audit_event("logout")
 
         # Chain: hide top bar -> hide status bar -> go to Welcome
         def _after_top():
@@ -320,8 +483,12 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
 
     
     @QtCore.Slot(str, str)
+    @traced("UIShell.handle_login")
     def handle_login(self, username, password): # Handle user login
-        if self.user_store.check_credentials(username, password): # check if credentials are valid
+        ok = self.user_store.check_credentials(username, password) # check if credentials are valid
+        self.audit.record("login", username, ok=ok)
+        if ok:
+            self.username = username
             self.login_page.reset_form() # reset login form
             self.create_top_toolbar(username) # create top toolbar with username
             if hasattr(self, "user_label"): 
@@ -331,6 +498,7 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
             self.create_status_toolbar() # create status toolbar
             self.reveal_toolbar(self.top_toolbar) # reveal top toolbar
             self.reveal_toolbar(self.status_toolbar) # reveal status toolbar
+            self.connect_device() # find the pacemaker in the background
 
             self.goto(self.dashboard_page) # go to dashboard page
         else:
@@ -338,8 +506,10 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
             self.login_page.reset_form() # reset login form
 
     @QtCore.Slot(str, str)
+    @traced("UIShell.handle_register")
     def handle_register(self, username, password): # Handle user registration
         ok, msg = self.user_store.register(username, password) # attempt to register user
+        self.audit.record("register", username, ok=ok, message=msg)
         if ok: # registration successful
             QtWidgets.QMessageBox.information(self, "Register", msg) # show success message
             self.register_page.reset_form() # reset registration form
@@ -350,6 +520,7 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
 
     def show_about(self):
         dlg = QtWidgets.QDialog(self)
+        dlg.setObjectName("aboutDialog") # styled by the application theme
         dlg.setWindowTitle("About DCM")
         dlg.setModal(True)
         form = QtWidgets.QFormLayout(dlg)
@@ -359,10 +530,10 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
 
 
         labels = {
-            "Application model number": self.appInfo["applicationModelNumber"],
-            "Software revision":        self.appInfo["version"],
-            "DCM serial number":        self.appInfo["dcmSerial"],
-            "Institution":              self.appInfo["institution"],
+            "Application model number": self.app_info.model_number,
+            "Software revision":        self.app_info.version,
+            "DCM serial number":        self.app_info.dcm_serial,
+            "Institution":              self.app_info.institution,
         }
 
         # build read-only fields
@@ -371,7 +542,6 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
             le = QtWidgets.QLineEdit(v)
             le.setReadOnly(True)
             le.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
-            le.setStyleSheet("QLineEdit { background: rgba(255,255,255,0.12); color:white; border:1px solid rgba(0,0,0,0.35); border-radius:8px; padding:6px 10px; }")
             form.addRow(k+":", le)
             fields.append(le)
 
@@ -393,30 +563,19 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
 
         dlg.resize(420, dlg.sizeHint().height())
         dlg.exec()
+        dlg.deleteLater() # parented to the shell, would otherwise stay until exit
 
-    def application_model_number(self):
-        # If there is a way in the future pull metadata off the DCM device and return application model number
-        return "DCM-EMU-01"
-    
-    def application_software_rev_nu(self):
-        # If there is a way in the future pull metadata off the device and return software rev num
-        return "0.1.0"
-    
-    def institution_name(self):
-        # Change the institution if needed
-        return "McMaster University"
-
-    def dcm_serial_num(self):
-        # Change if you can actually pull the serial number from the device.
-        return "987654321-ABCDE-XYZ"
-    
+    @traced("UIShell.show_set_clock")
     def show_set_clock(self): # Open the Set Clock dialog, validate, and queue the chosen device time.
+        from utility.set_clock import SetClockDialog # setting clock of pacemaker
         dlg = SetClockDialog(self)
         if dlg.exec() == QtWidgets.QDialog.Accepted and dlg.selected:
             # Store as ISO string; you can also keep QDateTime if you prefer
             device_dt_local = dlg.selected
             iso = device_dt_local.toString(QtCore.Qt.ISODate)
-            self.sessionInfo["pending_set_time"] = iso
+            self.pending_ops.set_clock(self._pending_serial(), iso) # replaces any earlier queued time
+            self._flush_pending()
+            self._audit_event("set_clock", device=self.session.device_id.serial, time=iso)
             print("Set Time: ", iso)
 
             # UX feedback: show in status pill or a toast
@@ -426,251 +585,138 @@ class UIShell(QtWidgets.QMainWindow): # Main application window
             )
 
             # If you have a status label, reflect a 'Pending' hint
-            if getattr(self, "status", None):
+            if getattr(self, "status", None) and not self.session.connected:
                 self.status.setText("Not connected • SetTime pending")
         # else: user cancelled; do nothing
 
+    @traced("UIShell.new_patient")
     def new_patient(self):
         if QtWidgets.QMessageBox.question(self, "New Patient", "End Current Device and Interrogate New Device?") != QtWidgets.QMessageBox.Yes: 
             return # Make sure that the user wants to change devices
         
-        self._stop_telemetry_stub() # stop all telemetry
-        self.sessionInfo = { # Clear session information
-            "connected": False,
-            "device_id": {
-                "model": "Pacemaker",
-                "serial": "COM1"
-            },
-            "pending_set_time": None,
-            "started_at": None,
-            "last_seen": None,
-            "status": "Disconnected",
-        }
-
-        if hasattr(self, "egram_data") and self.egram_data: # Clear egram buffers
-            try:
-                self.egram_data.clear()
-            except AttributeError:
-                self.egram_data.time = []
-                self.egram_data.atrial = []
-                self.egram_data.ventricular = []
-                self.egram_data.timestamp = ""
-
-        if hasattr(self, "dashboard_page"): # reset all dashboard forms
+        self.telemetry.stop() # stop all telemetry
+        self._close_bridge()
+        if self._link_pool: # close the old device's link; the port cache is kept
+            self._link_pool.close_all()
+        self._finish_archive() # the old session stays in the archive
+        self._audit_event("new_patient", device=self.session.device_id.serial)
+        from core.pending import UNASSIGNED
+        self.pending_ops.clear(UNASSIGNED) # edits for a device that never answered go with its session
+        self.telemetry.clear() # Clear egram buffers and rate series
+        self._synthetic_bpm = None # the next device's reports synthesize from its own parameters
+        self.session = Session() # Clear session information
+
+        if "dashboard" in self._pages: # reset all dashboard forms (if it was ever built)
             self.dashboard_page.reset_all()
 
         self._set_status_disconnected() # disconnect serial 
         self.goto(self.dashboard_page) # go to the dashboard_page
 
-    def _stop_telemetry_stub(self):
-        # For deliverable 1 there is nothing to stop since we are not communicating with the pacemaker
-        # For deliverable 2 this is a placeholder for serial stop/close
-        pass
-
     def _set_status_disconnected(self):
         if getattr(self, "status", None):
             self.status.setText("Disconnected")
-            self.status.setStyleSheet(
-                "#statusPill { padding:4px 10px; border-radius:0px; color:white; "
-                "background: rgba(142,142,147,0.2); border:1px solid rgba(255,255,255,0.35); }"
-            )
+            theme.set_status(self.status, "disconnected")
     
     def _report_header_html(self, report_name: str) -> str: # Return a header of a PDF file
-        header_report = { # Generate a header from variables
-            'institution': self.appInfo['institution'],
-            'printed_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'device': self.sessionInfo['device_id']['model'] + " / " + self.sessionInfo['device_id']['serial'],
-            'dcm': self.appInfo['dcmSerial'],
-            'app': self.appInfo['applicationModelNumber'] + " v" + self.appInfo['version'],
-            'name': report_name
-        }
-        # Return html structured code and import all the values from variables
-        return f""" 
-            <div style="border-bottom:1px solid #aaa;margin-bottom:10px;padding-bottom:6px;">
-                <h2 style="margin:0 0 6px 0;">{header_report['name']}</h2>
-                <table style="font-size:12px;">
-                    <tr><td><b>Institution</b></td><td>{header_report['institution']}</td></tr>
-                    <tr><td><b>Printed</b></td><td>{header_report['printed_at']}</td></tr>
-                    <tr><td><b>Device</b></td><td>{header_report['device']}</td></tr>
-                    <tr><td><b>DCM Serial</b></td><td>{header_report['dcm']}</td></tr>
-                    <tr><td><b>Application</b></td><td>{header_report['app']}</td></tr>
-                </table>
-            </div>
-        """
-    # Make a table from all the parameter data (kv)
-    def _table_from_kv(self, kv: dict, cols=("Parameter","Value")) -> str:
-        rows = "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k,v in kv.items()) # From the each parameter value make a row by the key and value pair
-        # Reutrn the entire table
-        return f""" 
-            <table style="width:100%;border-collapse:collapse;">
-                <tr><th style="text-align:left;border:1px solid #ccc;padding:6px;">{cols[0]}</th>
-                <th style="text-align:left;border:1px solid #ccc;padding:6px;">{cols[1]}</th></tr>
-                {rows}
-            </table>
-        """.replace("<tr><td", '<tr><td style="border:1px solid #ccc;padding:6px;"').replace("</td><td", '</td><td style="border:1px solid #ccc;padding:6px;"')
-        # instead of crowding the for loop above we can apply style to the rows by replacing text.
+        return reports.header_html(report_name, self.app_info, self.session)
+
+    def _table_from_kv(self, kv: dict, cols=("Parameter","Value")) -> str: # Make a table from all the parameter data (kv)
+        return reports.table_from_kv(kv, cols)
 
     def _diff_table(self, before: dict, after: dict) -> str: # create a difference table between old and new values
-        keys = sorted(set(before)|set(after)) # first take all keys in before and after and sort them 
-        row_html = [] # keep an array of rows 
-        for k in keys: # loop for every key in keys 
-            a = before.get(k, "—"); b = after.get(k, "—") # store the values
-            mark = "" if a == b else ' style="background:#ff8a8a;"' # if the two values are the same do nothing else set the color to reddish
-            row_html.append(f'<tr{mark}><td>{k}</td><td>{a}</td><td>{b}</td></tr>') # append the row with style (mark) key (k) before (a) after (b)
-        rows = "".join(row_html) # When you do every key join them all up from the array
-        # Return the final table replace the styles in rows the same way as before
-        return f"""
-            <table style="width:100%;border-collapse:collapse;">
-                <tr><th style="text-align:left;border:1px solid #ccc;padding:6px;">Parameter</th>
-                <th style="text-align:left;border:1px solid #ccc;padding:6px;">Saved</th>
-                <th style="text-align:left;border:1px solid #ccc;padding:6px;">Current</th></tr>
-                {rows}
-            </table>
-        """.replace("<tr><td", '<tr><td style="border:1px solid #ccc;padding:6px;"').replace("</td><td", '</td><td style="border:1px solid #ccc;padding:6px;"')
+        return reports.diff_table(before, after)
 
-    def open_brady_params_report(self): # Bradycardia Report Generation Function
+    def _brady_report(self): # (name, html, charts) of the Bradycardia Parameters Report
         mode = self.dashboard_page.current_mode() # Get which mode is selected on the dashboard AOO, VOO, AAI, VVI
         params = self.dashboard_page._collect_params(mode) # Collect the parameters for the selected mode
-        html = self._report_header_html("Bradycardia Parameters Report") + f"<h3>Mode: {mode}</h3>" + self._table_from_kv(params) # create a header by passing the title the mode and the parameters as a table
-        css = """
-            <style>
-                body { background:#fff; color:#000; font: 13pt/1.4 -apple-system, Segoe UI, Arial, sans-serif; }
-                table { width:100%; border-collapse:collapse; }
-                th, td { border:1px solid #ccc; padding:6pt 8pt; font-size:12pt; }
-                th { background:#333; color:#fff; text-align:left; }
-                tr.changed { background:#eee; } 
-            </style>
-        """
-        # add custom css to style the text in the report
-        html = css + html # append the css to html page
-        ReportPreview(html, self).exec() # Show the preview of the report by running the html code
+        html = reports.brady_report(mode, params, self.app_info, self.session) # header, mode and the parameters as a table
+        return "Bradycardia Parameters", html, None
 
-    def open_temporary_params_report(self): # Temporary Parameters Report Generation Function
+    def _temporary_report(self): # (name, html, charts) of the Temporary Parameters Report
         mode = self.dashboard_page.current_mode() # check which mode is active
         current = self.dashboard_page._collect_params(mode) # get the current parameters
-        saved = self.last_saved_params.get(mode, {}) # get the last saved parameters for this report
-        note = "<p style='color:#666;'>Rows highlighted = values changed since last Save.</p>" # add some text to explain the table
-        html = self._report_header_html("Temporary Parameters Report") + f"<h3>Mode: {mode}</h3>" + note + self._diff_table(saved, current) # create a header the same way by passing title, mode, note, and comparison table
-        css = """
-            <style>
-                body { background:#fff; color:#000; font: 13pt/1.4 -apple-system, Segoe UI, Arial, sans-serif; }
-                table { width:100%; border-collapse:collapse; }
-                th, td { border:1px solid #ccc; padding:6pt 8pt; font-size:12pt; }
-                th { background:#333; color:#fff; text-align:left; }
-                tr.changed { background:#eee; } 
-            </style>
-        """
-        # apply the css
-        html = css + html  # append it to the html document
-        ReportPreview(html, self).exec() # display the html code
-
-    def _report_css_simple(self) -> str: # Function to style the histogram and trending report 
-        return """
-            <style>
-                body { background:#fff; color:#000; font:13pt/1.4 -apple-system, Segoe UI, Arial, sans-serif; } /* 13 points line spacing 1.4 */
-                h2 { font-size:18pt; margin:0 0 8pt 0; }
-                h3 { font-size:14pt; margin:10pt 0 6pt 0; }
-                table { width:100%; border-collapse:collapse; }
-                th, td { border:1px solid #ccc; padding:6pt 8pt; font-size:12pt; text-align:left; }
-                th { background:#333; color:#fff; }
-                .bar { height:12pt; background:#666; }
-                .barblue { height:12pt; background:#2f6fed; }
-                .muted { color:#555; font-size:11pt; }
-            </style>
-        """ # Simple stylesheet styles tables headers body
-    
-    
-    def _bpm_series(self) -> list[int]:
-        # If you later have real samples, store them on self.sessionInfo['hr_series'] and this will use them. For now generate random stuff.
-        series = (self.sessionInfo or {}).get("hr_series") # Get the series from the variables
-        if series:  # already have real or cached values
-            return series 
-    
-        # synthesize from current UI parameters: center between LRL and URL
-        mode = self.dashboard_page.current_mode() # get the mode
-        params = self.dashboard_page._collect_params(mode) # get the parameters
-        lrl = int(params.get("LRL", 60)) # lower 
-        url = int(params.get("URL", 120)) # upper
-        center = (lrl + url) // 2 # find center
-        spread = max(6, (url - lrl) // 8) # find the spread of data
-    
-        import random # imprt random
-        random.seed(42) # set seed
-        series = [max(lrl, min(url, int(random.gauss(center, spread)))) for _ in range(240)] # Generate 240 value that are in between url and lrl
-        # cache so both reports are consistent in a session
-        self.sessionInfo["hr_series"] = series # store the series in the session info variable 
-        return series # return the series
-    
-    def _bincount(self, values: list[int], edges: list[int]) -> list[int]: # calcultae frequency
-        # Simple histogram: edges like [30, 40, ... 180] produce len(edges)-1 bins.
-        counts = [0]*(len(edges)-1) # set the list
-        for v in values:
-            for i in range(len(edges)-1): 
-                if edges[i] <= v < edges[i+1]: # Find where each data point falls
-                    counts[i] += 1 # increase the count
-                    break # break out of the loop
-        return counts # return the list of freq
+        saved = self.session.saved_params.get(mode, {}) # get the last saved parameters for this report
+        html = reports.temporary_report(mode, saved, current, self.app_info, self.session) # header, mode, note, and comparison table
+        return "Temporary Parameters", html, None
 
-    def open_rate_histogram_report(self): # Make histogram tables
-        bpm = self._bpm_series() # data
-        edges = list(range(30, 190, 10))  # 30–180 bpm, 10-bpm bins
-        counts = self._bincount(bpm, edges) # calculate the frequency
-        maxc = max(counts) or 1 # if we do not have a max set atrificial as 1
-
-        # rows with simple gray bars
-        rows = []
-        for i, c in enumerate(counts): # loop
-            label = f"{edges[i]}–{edges[i+1]-1}" # generate buckets
-            w = int(400 * c / maxc)  # px width
-            rows.append( # append each bucket with frequency and pixel width of the table
-                f"<tr><td>{label}</td><td>{c}</td>"
-                f"<td><div class='bar' style='width:{w}px;'></div></td></tr>"
-            )
-        table = ( # Create the table header row and add all the other bucket rows
-            "<h3>Rate Histogram (beats per minute)</h3>"
-            "<table>"
-            "<tr><th>Bin (bpm)</th><th>Count</th><th>Distribution</th></tr>"
-            + "".join(rows) + "</table>"
-        )
-        # Add css, report header with all information and title, append table 
-        html = self._report_css_simple() + self._report_header_html("Rate Histogram Report") + table + "</body></html>"
-        ReportPreview(html, self).exec() # display html page
+    @traced("UIShell.open_brady_params_report")
+    def open_brady_params_report(self): # Bradycardia Report Generation Function
+        self._open_report(*self._brady_report())
 
-    def open_trending_report(self):
+    @traced("UIShell.open_temporary_params_report")
+    def open_temporary_params_report(self): # Temporary Parameters Report Generation Function
+        self._open_report(*self._temporary_report())
+
+    def _open_report(self, name: str, html: str, charts): # Archive a report and show its preview
+        from dialogs.report_preview import ReportPreview # report dialog, loaded on first report
+        self._archive_report(name, html)
+        self._show_report(ReportPreview(html, self, charts)) # display html page
+
+    def _show_report(self, preview): # Run a report preview and free it afterwards, each report builds a new one
+        preview.exec()
+        preview.deleteLater()
+
+    def _bpm_series(self) -> list[int]:
+        series = self.telemetry.bpm # real values
+        if series:
+            return series
+        if self._synthetic_bpm is None:
+            # No telemetry yet: synthesize from current UI parameters, centered between LRL and URL
+            mode = self.dashboard_page.current_mode() # get the mode
+            params = self.dashboard_page._collect_params(mode) # get the parameters
+            # cached here so both reports are consistent in a session; telemetry.bpm only ever holds detected beats
+            self._synthetic_bpm = reports.synthetic_bpm(int(params.get("LRL", 60)), int(params.get("URL", 120)))
+        return self._synthetic_bpm
+
+    def _egram_strip(self): # Snapshot of the recorded egram for the reports
+        from dialogs.report_charts import EgramStrip
+        return EgramStrip.from_telemetry(self.telemetry) # envelope from the tile pyramid, bounded by the chart width
+
+    def _bincount(self, values: list[int], edges: list[int]) -> list[int]: # calculate frequency
+        return reports.bincount(values, edges)
+
+    def _histogram_report(self): # (name, html, charts) of the Rate Histogram Report
+        from dialogs.report_charts import HistogramChart # vector report charts
+        bpm = self._bpm_series() # data
+        paced = self.telemetry.annotations.paced_percent() # from the markers, None per chamber without any
+        histogram = self.telemetry.histogram if self.telemetry.samples else None # heat maps of a real recording
+        html, counts = reports.histogram_report(bpm, self.app_info, self.session, paced=paced, histogram=histogram) # tables with the bin counts
+        labels = [str(e) for e in reports.RATE_EDGES[:-1]] # short axis labels
+        charts = {"histogram": HistogramChart(labels, counts), "egram": self._egram_strip()} # painted into the document
+        return "Rate Histogram", html, charts
+
+    def _trending_report(self): # (name, html, charts) of the Trending Report, None without beats
+        from dialogs.report_charts import TrendChart # vector report charts
         bpm = self._bpm_series() # data → 10 time buckets with average BPM per bucket
         if not bpm:
+            return None
+        hrv = self.telemetry.hrv.metrics() if self.telemetry.samples else None # variability of a real recording
+        html, avgs = reports.trending_report(bpm, self.app_info, self.session, hrv=hrv,
+                                             synthetic=not self.telemetry.bpm) # segment averages table
+        charts = {"trend": TrendChart(bpm, avgs), "egram": self._egram_strip()} # painted into the document
+        return "Trending", html, charts
+
+    def _episode_report(self): # (name, html, charts) of the Episode Report
+        from dialogs.report_charts import EgramStrip # vector report charts
+        log = self.telemetry.episodes
+        html, shown = reports.episode_report(log.episodes, self.app_info, self.session)
+        charts = {}
+        for i, ep in enumerate(shown): # egram around each episode, decoded from the compressed history
+            charts[f"episode{i}"] = EgramStrip(*self.telemetry.snippet(*ep.snippet), self.telemetry.annotations)
+        return "Episodes", html, charts
+
+    @traced("UIShell.open_rate_histogram_report")
+    def open_rate_histogram_report(self): # Make histogram tables
+        self._open_report(*self._histogram_report())
+
+    @traced("UIShell.open_trending_report")
+    def open_trending_report(self):
+        report = self._trending_report()
+        if report is None:
             QtWidgets.QMessageBox.information(self, "Trending", "No data available.")
             return
-        import math
-        buckets = 10 # number of buckets 
-        size = max(1, len(bpm)//buckets) # number of samples per bucket
-        avgs = [] # Create an empty list to store averages in
-        for i in range(buckets): # for each bucket
-            start = i * size # find the start of the bucket 
-            end = min((i+1) * size, len(bpm)) # find the ned of the bucket and clamp it to the ned of the array
-            chunk = bpm[start:end] # get the chunk of data
-            if not chunk: # check if the chunk is empty
-                break # if emoty then break out of the loop 
-            total = 0 # start a running total for each bucket
-            for value in chunk: # for each value in the chunk
-                total += value # add it to the total
-            average = total / len(chunk) # find the average for each bucket
-            avgs.append(average) # append the average to the array of averages
-        maxv = max(avgs) or 1 # get the maximum of the values
-        rows = [] # rows with blue bars showing the trend
-        for i, v in enumerate(avgs): # for each avg
-            w = int(400 * v / maxv)  # calculate the width
-            rows.append(
-                f"<tr><td>T{i+1}</td><td>{v:.1f} bpm</td>"
-                f"<td><div class='barblue' style='width:{w}px;'></div></td></tr>"
-            ) # Make the header of the table
-        table = (
-            "<h3>Trending (average BPM per time segment)</h3>"
-            "<p class='muted'>D1 synthetic data; will use real telemetry in D2.</p>"
-            "<table>"
-            "<tr><th>Segment</th><th>Average</th><th>Trend</th></tr>"
-            + "".join(rows) + "</table>"
-        ) # append the generated rows to the table
-        # Add HTML together by adding css, header with title, and table
-        html = self._report_css_simple() + self._report_header_html("Trending Report") + table + "</body></html>"
-        ReportPreview(html, self).exec() # Display html page
+        self._open_report(*report)
+
+    @traced("UIShell.open_episode_report")
+    def open_episode_report(self): # High-rate runs, pauses and rates below LRL found in the recording
+        self._open_report(*self._episode_report())
@@ -0,0 +1,263 @@
+import asyncio, threading, time, types # standard libraries
+import typing as t # for type hints
+from PySide6 import QtCore
+from core import frames # stream frame types
+from core.protocol import DeviceProtocol, CommandError # async device commands
+from core.link_quality import LinkQuality, TEXT # status pill state from the stream
+
+class DeviceFinder(QtCore.QObject): # Gets a link from the connection pool on a worker thread, so probing never blocks the GUI
+    # With process=True the pooled link only finds the port: it is closed again and an acquisition
+    # child is started on that port (spawn and handshake also on the worker thread), ready for a
+    # ProcessBridge. The pool's port cache still makes the next reconnect a single handshake.
+    found = QtCore.Signal(object) # core.transport.Link, or a started core.acquisition.Acquisition
+    missing = QtCore.Signal(str) # why no link came up
+
+    def __init__(self, pool, parent=None, process: bool = False, **acquisition_args):
+        super().__init__(parent)
+        self.pool = pool # core.transport.ConnectionPool
+        self.process = process
+        self.acquisition_args = acquisition_args
+        self._thread = None
+
+    @property
+    def busy(self) -> bool: return self._thread is not None and self._thread.is_alive()
+
+    def search(self, serial=None): # Reconnect to serial (cached port first) or find any pacemaker; one search at a time
+        if self.busy:
+            return
+        def run():
+            try:
+                link = self.pool.get(serial)
+                if link is None:
+                    tried = ", ".join(self.pool.ports()) or "none present"
+                    who = f"{serial} did not answer" if serial else "No pacemaker answered"
+                    self.missing.emit(f"{who} IDENT; serial ports tried: {tried}")
+                    return
+                if not self.process:
+                    self.found.emit(link)
+                    return
+                from core.acquisition import Acquisition
+                port, device = link.path, link.device
+                self.pool.drop(device.serial) # the child opens the port itself
+                acquisition = Acquisition(port, serial or device.serial, **self.acquisition_args)
+                acquisition.start()
+                acquisition.wait_ready()
+            except Exception as e:
+                self.missing.emit(str(e))
+                return
+            self.found.emit(acquisition)
+        self._thread = threading.Thread(target=run, name="dcm-discover", daemon=True)
+        self._thread.start()
+
+
+class DeviceBridge(QtCore.QObject): # Runs a DeviceProtocol on its own asyncio thread and reports back with signals
+    # Signals cross to the GUI thread as queued connections, so slots never see the asyncio thread.
+    finished = QtCore.Signal(str, object) # command name, ACK payload
+    failed = QtCore.Signal(str, str) # command name, error text
+    stream = QtCore.Signal(object) # EGRAM/MARKER frame
+    linkStatus = QtCore.Signal(str, str) # pill text, theme status; only sent when it changes
+    STATUS_PERIOD = 0.25 # seconds between link quality updates, so at most 4 pill changes a second
+
+    def __init__(self, link, parent=None, expected_serial=None, **protocol_args):
+        super().__init__(parent)
+        self.quality = LinkQuality(expected_serial or link.device.serial) # fed on the device thread
+        self.quality.on_device(link.device.serial)
+        self.protocol = DeviceProtocol(link, on_stream=self._on_stream, on_lost=self._lost, **protocol_args)
+        self._shown = None # last state sent to the GUI
+        self.lost = False # the link failed; a new bridge is needed
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="dcm-device", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.protocol.start(), self.loop).result()
+        self.loop.call_soon_threadsafe(self._status_tick)
+
+    @property
+    def live(self) -> bool: return not self.lost and self.protocol.link.alive
+
+    def call(self, name: str, *args): # Start protocol.<name>(*args); the answer arrives as finished/failed
+        return self.run(name, getattr(self.protocol, name)(*args))
+
+    def run(self, name: str, coro): # Run any coroutine on the device loop, reported under name
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        fut.add_done_callback(lambda f: self._done(name, f))
+        return fut
+
+    def _done(self, name, fut):
+        try:
+            result = fut.result()
+        except Exception as e:
+            self.failed.emit(name, str(e))
+            return
+        if name == "identify": # the device on the link may have been swapped
+            self.loop.call_soon_threadsafe(self.quality.on_device, result.get("serial"))
+        self.finished.emit(name, result)
+
+    def _lost(self, error: Exception): # device thread
+        self.lost = True
+        self.quality.on_closed()
+
+    def _on_stream(self, f): # device thread: measure the link, then hand the frame on
+        now = time.monotonic()
+        if f.type == frames.EGRAM:
+            _, rate, atrial, ventricular = frames.decode_egram(f.payload)
+            self.quality.on_egram(f.seq, atrial, ventricular, rate, now)
+        else:
+            self.quality.on_frame(f.seq, now)
+        self.stream.emit(f)
+
+    def _status_tick(self): # device thread, every STATUS_PERIOD
+        state = self.quality.update(time.monotonic(), self.protocol.decoder.crc_errors)
+        if state != self._shown:
+            self._shown = state
+            self.linkStatus.emit(TEXT[state], state)
+        self._tick = self.loop.call_later(self.STATUS_PERIOD, self._status_tick)
+
+    def close(self):
+        def stop():
+            self._tick.cancel()
+            self.protocol.close()
+            self.quality.on_closed()
+            self.linkStatus.emit(TEXT["disconnected"], "disconnected")
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(stop)
+        self._thread.join(timeout=1.0)
+
+
+class _RemoteProtocol: # DeviceProtocol stand-in: each command is sent to the acquisition process and awaited here
+    COMMANDS = ("identify", "get_params", "interrogate", "set_clock", "stream", "echo", "set_params", "batch")
+
+    def __init__(self, bridge: "ProcessBridge", device):
+        self._bridge = bridge
+        self.link = types.SimpleNamespace(device=device) # bridge.protocol.link.device, as with a DeviceBridge
+
+    def __getattr__(self, name: str):
+        if name not in self.COMMANDS:
+            raise AttributeError(name)
+        async def command(*args):
+            return await self._bridge._request(name, args)
+        return command
+
+
+class ProcessBridge(QtCore.QObject): # DeviceBridge whose link, decoding and filtering run in a child process
+    # Same call()/run()/finished/failed/linkStatus as DeviceBridge, but the samples don't come as
+    # stream frames: the child writes them to the shared-memory rings in self.rings and samplesReady
+    # tells the GUI when there is something new to read (Telemetry.attach/pull). The asyncio thread
+    # here only waits for command replies and supervises the child (core.acquisition.Acquisition).
+    finished = QtCore.Signal(str, object) # command name, ACK payload
+    failed = QtCore.Signal(str, str) # command name, error text
+    linkStatus = QtCore.Signal(str, str) # pill text, theme status
+    samplesReady = QtCore.Signal() # the rings moved since the last poll
+    restarted = QtCore.Signal(str, int) # why the previous child went down, restarts so far
+    POLL_MS = 40 # ring poll period on the GUI thread, 25 updates a second
+    SUPERVISE_PERIOD = 0.25 # seconds between child health checks
+
+    def __init__(self, port: t.Optional[str] = None, parent=None, expected_serial=None, timeout: float = 15.0,
+                 acquisition=None, **acquisition_args): # acquisition: one already started and ready (DeviceFinder)
+        super().__init__(parent)
+        if acquisition is None:
+            from core.acquisition import Acquisition # multiprocessing and shared memory, loaded with the first process link
+            acquisition = Acquisition(port, expected_serial, **acquisition_args)
+            acquisition.start()
+            acquisition.wait_ready(timeout)
+        self.acquisition = acquisition
+        self.rings = acquisition.rings
+        conn = acquisition.conn
+        self.protocol = _RemoteProtocol(self, acquisition.device)
+        self._requests = {} # request id -> future on self.loop
+        self._rid = 0
+        self._down = None # why the child went down, until its replacement runs
+        self._tick = None
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="dcm-device", daemon=True)
+        self._thread.start()
+        self._listen(conn)
+        self.loop.call_soon_threadsafe(self._supervise)
+        self._heads = None
+        self._poll = QtCore.QTimer(self)
+        self._poll.timeout.connect(self._check_rings)
+        self._poll.start(self.POLL_MS)
+
+    @property
+    def live(self) -> bool: return self.acquisition.process is not None and self._down is None # supervised and not down
+
+    def call(self, name: str, *args): # Start protocol.<name>(*args) in the child; the answer arrives as finished/failed
+        return self.run(name, getattr(self.protocol, name)(*args))
+
+    def run(self, name: str, coro): # Run any coroutine on the bridge loop (e.g. PendingOps.flush with self.protocol)
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        fut.add_done_callback(lambda f: self._done(name, f))
+        return fut
+
+    def _done(self, name, fut):
+        try:
+            result = fut.result()
+        except Exception as e:
+            self.failed.emit(name, str(e))
+            return
+        self.finished.emit(name, result)
+
+    async def _request(self, name: str, args: tuple): # bridge loop: one command round trip through the pipe
+        conn = self.acquisition.conn
+        if conn is None:
+            raise ConnectionError(f"Acquisition process {self._down or 'not running'}.")
+        self._rid += 1
+        fut = self.loop.create_future()
+        self._requests[self._rid] = fut
+        conn.send(("call", self._rid, name, args))
+        return await fut
+
+    def _listen(self, conn): # Read one child's messages on a thread until its pipe closes
+        def read():
+            while True:
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if msg[0] == "status":
+                    self.linkStatus.emit(msg[1], msg[2])
+                elif msg[0] == "device": # a restarted child identified the device again
+                    self.protocol.link.device = msg[1]
+                elif msg[0] == "reply":
+                    self.loop.call_soon_threadsafe(self._resolve, *msg[1:])
+        threading.Thread(target=read, name="dcm-acquisition-pipe", daemon=True).start()
+
+    def _resolve(self, rid: int, ok: bool, payload):
+        fut = self._requests.pop(rid, None)
+        if fut is None or fut.done():
+            return
+        if ok:
+            fut.set_result(payload)
+        else: # NAK or timeout in the child
+            fut.set_exception(CommandError(payload))
+
+    def _supervise(self): # bridge loop, every SUPERVISE_PERIOD
+        what = self.acquisition.check()
+        if what == "restarted":
+            self._listen(self.acquisition.conn)
+            self.restarted.emit(self._down, self.acquisition.restarts)
+            self._down = None
+        elif what: # the child died or hung; its commands won't be answered
+            self._down = what
+            for fut in self._requests.values():
+                if not fut.done():
+                    fut.set_exception(ConnectionError(f"Acquisition process {what}."))
+            self._requests.clear()
+            self.linkStatus.emit(TEXT["disconnected"], "disconnected")
+        self._tick = self.loop.call_later(self.SUPERVISE_PERIOD, self._supervise)
+
+    def _check_rings(self): # GUI thread
+        heads = tuple(ring.head for ring in self.rings.values())
+        if heads != self._heads:
+            self._heads = heads
+            self.samplesReady.emit()
+
+    def close(self): # Stop the child and free the rings; detach any Telemetry reading them first
+        self._poll.stop()
+        def stop():
+            if self._tick:
+                self._tick.cancel()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(stop)
+        self._thread.join(timeout=1.0)
+        self.acquisition.close()
+        self.linkStatus.emit(TEXT["disconnected"], "disconnected")
@@ -0,0 +1,131 @@
+import os, sys, gc, json, time, tracemalloc # standard libraries
+import typing as t # for type hints
+from PySide6 import QtCore, QtWidgets
+
+if __package__ in (None, ""): # python DCM/src/utility/memwatch.py
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utility import tracing # counters in the --trace file
+
+MEMORY_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "traces", "dcm_memory.jsonl") # one JSON line per sample
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..")) # allocations are charged to the first frame in here
+
+# Memory diagnostics for long sessions (main.py --memory). Every interval a sample records the Python
+# heap traced by tracemalloc, the process RSS, open file descriptors and the QObject count under each
+# page of the shell, and the tracemalloc diff against the previous sample grouped by call site: the
+# innermost frame of each allocation that is in the DCM sources, so growth is charged to the code
+# that asked for it rather than to json or Qt internals. Samples go to a JSON-lines file; the same
+# sample() is what bench/soak.py uses to check that repeated clinic cycles leave memory flat.
+
+
+def rss_kb() -> t.Optional[int]: # resident set size, None where /proc isn't available
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def open_fds() -> t.Optional[int]:
+    for d in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(d):
+            return len(os.listdir(d)) - 1 # minus the descriptor listdir itself opened
+    return None
+
+
+def qobject_counts(shell) -> t.Dict[str, int]: # QObjects under the shell, each built page and top-level widgets
+    counts = {"shell": len(shell.findChildren(QtCore.QObject))}
+    for name, page in getattr(shell, "_pages", {}).items():
+        counts[f"page:{name}"] = len(page.findChildren(QtCore.QObject))
+    counts["top_level_widgets"] = len(QtWidgets.QApplication.topLevelWidgets())
+    return counts
+
+
+def _site(traceback: tracemalloc.Traceback) -> str: # innermost frame in the DCM sources, else the innermost one
+    for frame in reversed(traceback): # oldest first, so walk back from the allocation
+        path = os.path.abspath(frame.filename) # sys.path entries like bench/../src
+        if path.startswith(SRC_DIR):
+            return f"{os.path.relpath(path, SRC_DIR)}:{frame.lineno}"
+    frame = traceback[-1]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def growth(new: tracemalloc.Snapshot, old: tracemalloc.Snapshot, top: int = 10) -> t.List[dict]:
+    # Largest net changes between two snapshots, grouped by call site
+    sites: t.Dict[str, t.List[int]] = {}
+    for stat in new.compare_to(old, "traceback"):
+        s = sites.setdefault(_site(stat.traceback), [0, 0])
+        s[0] += stat.size_diff
+        s[1] += stat.count_diff
+    ranked = sorted(sites.items(), key=lambda kv: abs(kv[1][0]), reverse=True)[:top]
+    return [{"site": site, "kb": round(size / 1024, 1), "blocks": count} for site, (size, count) in ranked if size]
+
+
+class MemoryWatch(QtCore.QObject): # Periodic memory samples of a running shell
+    def __init__(self, shell, interval_s: float = 60.0, path: t.Optional[str] = MEMORY_PATH, frames: int = 16,
+                 top: int = 10, parent=None):
+        super().__init__(parent)
+        self.shell = shell
+        self.path = os.path.abspath(path) if path else None # None keeps the samples in memory only
+        self.frames = frames # stack depth recorded per allocation
+        self.top = top # call sites per diff
+        self.samples: t.List[dict] = []
+        self._first: t.Optional[tracemalloc.Snapshot] = None
+        self._last: t.Optional[tracemalloc.Snapshot] = None
+        self._started = time.perf_counter()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(int(interval_s * 1000))
+        self._timer.timeout.connect(self.sample)
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        qobject_counts(self.shell) # PySide creates wrapper types on first sight, not the session's growth
+        self._first = self._last = self._snapshot()
+        self._timer.start()
+
+    def stop(self): # last sample, with the diff against the first one
+        self._timer.stop()
+        if self._first is not None:
+            self.sample(since_start=True)
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__), # the samples and snapshots of this watch
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def sample(self, since_start: bool = False) -> dict: # Take one sample now
+        gc.collect() # cycles (Qt wrappers with connected slots) aren't leaks until a collection misses them
+        snap = self._snapshot()
+        traced = sum(stat.size for stat in snap.statistics("filename"))
+        out = {"t": round(time.perf_counter() - self._started, 1), "traced_kb": traced // 1024,
+               "peak_kb": tracemalloc.get_traced_memory()[1] // 1024,
+               "rss_kb": rss_kb(), "fds": open_fds(), "qobjects": qobject_counts(self.shell),
+               "growth": growth(snap, self._first if since_start else self._last, self.top)}
+        self._last = snap
+        self.samples.append(out)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(out) + "\n")
+        if tracing.enabled():
+            tracing.counter("memory", traced_kb=out["traced_kb"], rss_kb=out["rss_kb"] or 0, fds=out["fds"] or 0,
+                            qobjects=out["qobjects"]["shell"])
+        return out
+
+
+def report(sample: dict) -> str: # Short text form of a sample, for stderr
+    lines = [f"t={sample['t']}s traced={sample['traced_kb']} KiB rss={sample['rss_kb']} KiB fds={sample['fds']} "
+             + " ".join(f"{k}={v}" for k, v in sample["qobjects"].items())]
+    lines += [f"  {g['kb']:+9.1f} KiB {g['blocks']:+7d} blocks  {g['site']}" for g in sample["growth"]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__": # python DCM/src/utility/memwatch.py traces/dcm_memory.jsonl: print a recorded file
+    with open(sys.argv[1] if len(sys.argv) > 1 else MEMORY_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            print(report(json.loads(line)))
@@ -0,0 +1,214 @@
+import asyncio, base64, json, os, tempfile, time # standard libraries
+from collections import deque # calls waiting for the GUI thread
+from dataclasses import asdict # archive rows as JSON
+import typing as t # for type hints
+from PySide6 import QtCore
+from core.service import Service, RpcError # HTTP/JSON-RPC server
+
+# The shell's operations as a local service (main.py --service). core.service.Service runs the
+# connections on its own thread; every call that touches the shell is queued here and run on the
+# GUI thread, because the archive's sqlite connection, the telemetry and the dashboard belong to it.
+# Calls are drained in slices of about SLICE_MS with as long a pause after each, so a swarm of
+# clients gets at most half of the GUI thread, as many short events between repaints rather than
+# one long one, and only the first call of a burst wakes the GUI.
+# While anyone is subscribed, the samples and beats recorded since the last tick are published to
+# /egram every PUBLISH_MS as one JSON line: encoded once, however many subscribers there are.
+#     {"t": first sample time s, "rate": Hz, "atrial": [mV], "ventricular": [mV], "bpm": [new beats]}
+
+PUBLISH_MS = 100 # egram line period
+SLICE_MS = 10 # GUI time spent on service calls before other events get a turn
+LINE_S = 2.0 # most egram seconds in one line; a subscriber that joins late starts from the newest
+REPORTS = {"brady": "_brady_report", "temporary": "_temporary_report", "histogram": "_histogram_report",
+           "trending": "_trending_report", "episodes": "_episode_report"} # kind -> UIShell builder
+
+
+def _settle(fut: asyncio.Future, result, error): # service loop
+    if fut.done(): # the client gave up
+        return
+    if error is None:
+        fut.set_result(result)
+    else:
+        fut.set_exception(error)
+
+
+class ShellService(QtCore.QObject): # core.service.Service bound to a UIShell
+    _wake = QtCore.Signal() # service thread -> GUI thread: calls are waiting
+
+    def __init__(self, shell, address: t.Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.shell = shell
+        self._jobs: deque = deque() # (fn, args, future, loop); appended on the service thread, run on the GUI thread
+        self._wake.connect(self._drain, QtCore.Qt.QueuedConnection)
+        self.service = Service({
+            "status": self.status,
+            "sessions.list": self.sessions_list,
+            "session.get": self.session_get,
+            "session.report": self.session_report,
+            "params.get": self.params_get,
+            "params.set": self.params_set,
+            "reports.generate": self.reports_generate,
+        }, self.authenticate, address)
+        self._sent = 0 # recording samples published so far
+        self._beats = 0 # beats published so far
+        self._publish = QtCore.QTimer(self)
+        self._publish.setInterval(PUBLISH_MS)
+        self._publish.timeout.connect(self._publish_egram)
+
+    def start(self) -> "ShellService":
+        self.service.start()
+        self._publish.start()
+        return self
+
+    def close(self):
+        self._publish.stop()
+        self.service.close()
+
+    # --- GUI thread calls -----------------------------------------------------
+
+    async def gui(self, fn: t.Callable, *args): # service loop: run fn(*args) on the GUI thread and wait for it
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._jobs.append((fn, args, fut, loop))
+        if len(self._jobs) == 1: # the GUI is (or is about to be) idle; later calls ride on this wake-up
+            self._wake.emit()
+        return await fut
+
+    def _drain(self): # GUI thread
+        deadline = time.perf_counter() + SLICE_MS / 1000.0
+        while self._jobs:
+            fn, args, fut, loop = self._jobs.popleft()
+            try:
+                result, error = fn(*args), None
+            except Exception as e:
+                result, error = None, e
+            loop.call_soon_threadsafe(_settle, fut, result, error)
+            if self._jobs and time.perf_counter() > deadline: # leave the next slice to paint, input and telemetry
+                QtCore.QTimer.singleShot(SLICE_MS, self._drain)
+                return
+
+    # --- methods (service loop) -----------------------------------------------
+
+    async def authenticate(self, username: str, password: str) -> bool:
+        def check():
+            ok = self.shell.user_store.check_credentials(username, password)
+            self.shell.audit.record("login", username, ok=ok, via="service")
+            return ok
+        return await self.gui(check)
+
+    async def status(self, user: str) -> dict:
+        def read():
+            s, tel = self.shell.session, self.shell.telemetry
+            return {"user": user, "operator": self.shell.username, "connected": s.connected,
+                    "device": asdict(s.device_id), "started": s.started_at, "samples": tel.samples,
+                    "rate": tel.egram.sampling_rate, "beats": len(tel.bpm), "episodes": len(tel.episodes)}
+        out = await self.gui(read)
+        out["service"] = dict(self.service.stats)
+        return out
+
+    async def sessions_list(self, user: str, device: str = None, operator: str = None, since: str = None,
+                            until: str = None, limit: int = 100, offset: int = 0) -> dict:
+        def read():
+            a = self.shell.archive
+            return {"total": a.count(device, operator, since, until),
+                    "sessions": [asdict(r) for r in a.sessions(device, operator, since, until, min(int(limit), 1000), int(offset))]}
+        return await self.gui(read)
+
+    async def session_get(self, user: str, id: int) -> dict:
+        def read():
+            s = self.shell.archive.open(int(id))
+            if s is None:
+                raise RpcError(f"No session {id}.")
+            return {**asdict(s.record), "params": [{"at": at, "mode": mode, "params": p} for at, mode, p in s.params],
+                    "reports": [{"at": at, "name": name} for at, name in s.reports]}
+        return await self.gui(read)
+
+    async def session_report(self, user: str, id: int, index: int) -> dict: # html of a report generated in an archived session
+        def read():
+            s = self.shell.archive.open(int(id))
+            if s is None or not 0 <= int(index) < len(s.reports):
+                raise RpcError(f"No report {index} in session {id}.")
+            return {"name": s.reports[int(index)][1], "html": s.report_html(int(index))}
+        return await self.gui(read)
+
+    async def params_get(self, user: str, mode: str = None, device: bool = False) -> dict:
+        from core import params
+        def read():
+            sh = self.shell
+            out = {"saved": sh.session.saved_params, "pending": sh.pending_ops.ops(sh._pending_serial()),
+                   "screen": sh.dashboard_page.current_mode() if "dashboard" in sh._pages else None}
+            if mode is not None:
+                if mode not in params.MODES:
+                    raise RpcError(f"Unknown mode {mode}.")
+                out["params"] = params.normalize(mode, sh.session.saved_params.get(mode, {}))
+            return out, sh._bridge if device else None
+        out, bridge = await self.gui(read)
+        if device: # what the pacemaker itself is running, asked over its link
+            if bridge is None:
+                raise RpcError("No device connected.")
+            out["device"] = await asyncio.wrap_future(bridge.call("get_params"))
+        return out
+
+    async def params_set(self, user: str, mode: str, params: dict) -> dict: # Save and queue for the device, as the dashboard does
+        from core import params as p # keys missing from params keep their last saved value
+        if not isinstance(params, dict):
+            raise RpcError("params must be an object.")
+        def save():
+            sh = self.shell
+            values = {**sh.session.saved_params.get(mode, {}), **params}
+            ok, msg = p.validate(mode, values)
+            if not ok:
+                raise RpcError(msg)
+            values = p.normalize(mode, values)
+            sh._on_params_saved(mode, values, user=user)
+            return {"mode": mode, "params": values, "queued": sh.pending_ops.edits(sh._pending_serial())}
+        return await self.gui(save)
+
+    async def reports_generate(self, user: str, kind: str, format: str = "html") -> dict:
+        if kind not in REPORTS:
+            raise RpcError(f"Unknown report {kind}; one of {', '.join(REPORTS)}.")
+        if format not in ("html", "pdf"):
+            raise RpcError("format is html or pdf.")
+        def build():
+            report = getattr(self.shell, REPORTS[kind])()
+            if report is None:
+                raise RpcError("No data available.")
+            name, html, charts = report
+            self.shell._archive_report(name, html, user=user)
+            out = {"name": name}
+            if format == "html":
+                out["html"] = html
+            else: # the same document the preview would save, charts painted in
+                from dialogs.report_preview import ReportPreview, write_pdf
+                preview = ReportPreview(html, None, charts)
+                fd, path = tempfile.mkstemp(suffix=".pdf")
+                os.close(fd)
+                try:
+                    write_pdf(preview.doc, path)
+                    with open(path, "rb") as f:
+                        out["pdf"] = base64.b64encode(f.read()).decode()
+                finally:
+                    os.unlink(path)
+                    preview.deleteLater()
+            return out
+        return await self.gui(build)
+
+    # --- egram subscription (GUI thread) ----------------------------------------
+
+    def _publish_egram(self):
+        tel = self.shell.telemetry
+        n = tel.samples
+        if not self.service.subscribed:
+            self._sent, self._beats = n, len(tel.bpm) # subscribers start from now
+            return
+        if n < self._sent or len(tel.bpm) < self._beats: # new patient
+            self._sent = self._beats = 0
+        if n == self._sent and len(tel.bpm) == self._beats:
+            return
+        rate = tel.egram.sampling_rate
+        i0 = max(self._sent, n - int(LINE_S * rate))
+        times, atrial, ventricular = tel.snippet(i0, n)
+        line = {"t": float(times[0]) if n > i0 else None, "rate": rate,
+                "atrial": [round(x, 2) for x in atrial.tolist()], "ventricular": [round(x, 2) for x in ventricular.tolist()],
+                "bpm": tel.bpm[self._beats:]}
+        self._sent, self._beats = n, len(tel.bpm)
+        self.service.publish(json.dumps(line, separators=(",", ":")).encode())
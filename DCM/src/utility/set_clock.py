@@ -4,6 +4,7 @@ from PySide6 import QtCore, QtWidgets, QtGui
 class SetClockDialog(QtWidgets.QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.setObjectName("setClockDialog") # styled by the application theme
         self.setWindowTitle("Set Device Clock") # title
         self.setModal(True) # Popup window
         self.selected: QtCore.QDateTime | None = None # The type of the selected variable can be either the QDateTime or None
@@ -17,9 +18,9 @@ class SetClockDialog(QtWidgets.QDialog):
         self.dt.setTimeSpec(QtCore.Qt.LocalTime) # Set the time to local time
 
         info = QtWidgets.QLabel("Choose the device’s local date and time.") # Information for the popup window
-        info.setStyleSheet("color: white;") # set the text color white
+        info.setObjectName("setClockInfo") # white text
         tip = QtWidgets.QLabel("Note: For D1 this is queued only; no device write yet.") # Put a note for deliverable 1 since we are not communicating to the pacemaker
-        tip.setStyleSheet("color: rgba(255,255,255,0.75); font-size: 12px;") # set the stylesheet of the tip
+        tip.setObjectName("setClockTip") # dimmed, smaller text
 
         # buttons
         ok = QtWidgets.QPushButton("OK") # okay button
@@ -47,28 +48,6 @@ class SetClockDialog(QtWidgets.QDialog):
         root.addSpacing(8)
         root.addLayout(btns) 
 
-        # light styling so it matches your theme
-        self.setStyleSheet("""
-            QDialog { background: rgba(0,0,0,0.25); }
-            QDateTimeEdit, QLineEdit {
-                background-color: rgba(255,255,255,0.18);
-                color: white;
-                border: 1px solid rgba(255,255,255,0.35);
-                border-radius: 8px;
-                padding: 6px 10px;
-            }
-            QPushButton {
-                font-weight: 600;
-                padding: 8px 16px;
-                border-radius: 10px;
-                color: white;
-                background-color: rgba(255,255,255,0.22);
-                border: 1px solid rgba(255,255,255,0.40);
-            }
-            QPushButton:hover { background-color: rgba(255,255,255,0.30); }
-            QPushButton:pressed { background-color: rgba(255,255,255,0.38); }
-        """)
-
     def _accept(self): # modified accept() function
         self.selected = self.dt.dateTime() # pick selected time
         self.accept() # close the window and accept that time as the time selected by the user
@@ -0,0 +1,58 @@
+import sys, time, builtins # standard libraries
+from contextlib import contextmanager # for span()
+
+class StartupTrace: # Records how long imports and component construction take until the first window shows
+    def __init__(self):
+        self.enabled = False # off unless main.py is started with --profile-startup
+        self.t0 = time.perf_counter() # reference point for every record
+        self.records = [] # (start, duration, depth, name)
+        self._depth = 0 # nesting level of the current span
+        self._orig_import = None # builtins.__import__ before we wrapped it
+
+    def enable(self): # Start recording, including every module import from now on
+        if self.enabled:
+            return
+        self.enabled = True
+        self.t0 = time.perf_counter()
+        self._orig_import = builtins.__import__
+        builtins.__import__ = self._timed_import # time first-time imports
+
+    def disable(self): # Stop recording and restore the normal import function
+        if self._orig_import:
+            builtins.__import__ = self._orig_import
+            self._orig_import = None
+        self.enabled = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules: # relative or already loaded: nothing to time
+            return self._orig_import(name, globals, locals, fromlist, level)
+        with self.span("import " + name):
+            return self._orig_import(name, globals, locals, fromlist, level)
+
+    @contextmanager
+    def span(self, name: str): # Time the body of a with-block as one component
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        depth = self._depth
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.records.append((start - self.t0, time.perf_counter() - start, depth, name))
+
+    def mark(self, name: str): # Zero length record, e.g. "first window"
+        if self.enabled:
+            self.records.append((time.perf_counter() - self.t0, 0.0, self._depth, name))
+
+    def report(self, min_ms: float = 1.0) -> str: # Table of records in start order, skipping the tiny ones
+        lines = [f"{'start ms':>9} {'took ms':>9}  component"]
+        for start, took, depth, name in sorted(self.records):
+            if took * 1e3 < min_ms and took: # keep marks, drop sub-threshold spans
+                continue
+            lines.append(f"{start * 1e3:9.1f} {took * 1e3:9.1f}  {'  ' * depth}{name}")
+        return "\n".join(lines)
+
+trace = StartupTrace() # shared instance, imported wherever a component is built
@@ -0,0 +1,191 @@
+from PySide6 import QtWidgets
+
+# One application-wide stylesheet. Widgets pick up their look from object names and dynamic
+# properties instead of carrying their own copy of the CSS, so Qt parses the sheet once and a
+# state change (like the status pill) is a property flip plus a re-polish of that one widget.
+#   role="page"        pages with the gradient background and white text
+#   variant="primary"  standard page button        variant="hero"  large welcome button
+#   variant="pill"     small rounded button        variant="ghost" transparent round button
+#   status="..."       status pill colour, see STATUS_COLORS
+
+GRADIENT = """
+    qlineargradient(
+        x1:0, y1:0, x2:1, y2:1,
+        stop:0 #e3868a,
+        stop:0.25 #e3baaf,
+        stop:0.5 #e3acd4,
+        stop:0.75 #91b1e6,
+        stop:1 #abcfe0
+    )
+"""
+
+STATUS_COLORS = { # status property value -> pill background
+    "connected":        "rgba(52, 199, 89, 0.2)",
+    "out-of-range":     "rgba(255, 59, 48, 0.2)",
+    "noise":            "rgba(255, 159, 10, 0.2)",
+    "different-device": "rgba(10, 132, 255, 0.2)",
+    "disconnected":     "rgba(142, 142, 147, 0.2)",
+}
+
+STYLESHEET = f"""
+#background-image {{ background: {GRADIENT}; }}
+
+/* Pages */
+QWidget[role="page"] QLabel {{ color: white; }}
+
+QWidget[role="page"] QLineEdit {{
+    background-color: rgba(255,255,255,0.18);
+    color: white;
+    border: 1px solid rgba(255,255,255,0.35);
+    border-radius: 10px;
+    padding: 10px 14px;
+    selection-background-color: rgba(255,255,255,0.35);
+    selection-color: #111;
+}}
+QWidget[role="page"] QLineEdit:focus {{
+    border: 1px solid rgba(255,255,255,0.65);
+    background-color: rgba(255,255,255,0.22);
+}}
+
+QWidget[role="page"] QSpinBox, QWidget[role="page"] QDoubleSpinBox {{
+    background-color: rgba(255,255,255,0.18);
+    color: white;
+    border: 1px solid rgba(255,255,255,0.35);
+    border-top-left-radius: 10px;
+    border-top-right-radius: 0px;
+    border-bottom-left-radius: 10px;
+    border-bottom-right-radius: 0px;
+    padding: 6px 10px;
+    selection-background-color: rgba(255,255,255,0.35);
+    selection-color: #111;
+}}
+QWidget[role="page"] QSpinBox:focus, QWidget[role="page"] QDoubleSpinBox:focus {{
+    border: 1px solid rgba(255,255,255,0.65);
+    background-color: rgba(255,255,255,0.22);
+}}
+
+/* Buttons */
+QPushButton[variant="primary"] {{
+    font-size: 16px; font-weight: 600;
+    padding: 10px 22px;
+    min-height: 42px;
+    border-radius: 10px;
+    color: white;
+    background-color: rgba(255,255,255,0.22);
+    border: 1px solid rgba(255,255,255,0.40);
+}}
+QPushButton[variant="primary"]:hover {{ background-color: rgba(255,255,255,0.30); }}
+QPushButton[variant="primary"]:pressed {{ background-color: rgba(255,255,255,0.38); }}
+
+QPushButton[variant="hero"] {{
+    font-size: 17px; font-weight: 500;
+    padding: 10px 26px;
+    border: 1px solid rgba(255, 255, 255, 100);
+    border-radius: 11px;
+    color: white;
+    background-color: rgba(255, 255, 255, 0.25);
+}}
+QPushButton[variant="hero"]:hover {{ background-color: rgba(255,255,255,0.35); }}
+QPushButton[variant="hero"]:pressed {{ background-color: rgba(255,255,255,0.5); }}
+
+QPushButton[variant="pill"] {{
+    font-size: 14px; font-weight: 600;
+    padding: 6px 14px;
+    border-radius: 14px;
+    color: white;
+    background-color: rgba(255,255,255,0.22);
+    border: 1px solid rgba(255,255,255,0.40);
+}}
+QPushButton[variant="pill"]:hover {{ background-color: rgba(255,255,255,0.30); }}
+QPushButton[variant="pill"]:pressed {{ background-color: rgba(255,255,255,0.38); }}
+
+QPushButton[variant="ghost"] {{
+    font-size: 16px; font-weight: 600;
+    padding: 10px 18px;
+    min-height: 24px;
+    border-radius: 20px;
+    color: white;
+    background-color: rgba(255,255,255,0.0);
+    border: 1px solid rgba(255,255,255,0.15);
+}}
+
+/* Toolbars */
+#userLabel {{ color: white; font-weight: 500; padding-left: 8px; font-size: 12px; }}
+#timerLabel {{ color: white; font-size: 12px; font-weight: 600; padding: 0 12px 0 12px; }}
+#hrvLabel {{ color: rgba(255,255,255,0.85); font-size: 12px; padding-left: 8px; }}
+
+#reportsBtn, #logoutBtn {{
+    padding: 6px 14px;
+    border-radius: 16px;
+    color: white;
+    background: rgba(255,255,255,0.22);
+    border: 1px solid rgba(255,255,255,0.35);
+    font-weight: 600;
+    font-size: 12px;
+}}
+#reportsBtn:hover, #logoutBtn:hover {{ background: rgba(255,255,255,0.30); }}
+#reportsBtn:pressed, #logoutBtn:pressed {{ background: rgba(255,255,255,0.38); }}
+
+#statusPill {{
+    padding: 4px 10px;
+    border-radius: 0px;
+    color: white;
+    background: rgba(255,255,255,0.22);
+    border: 1px solid rgba(255,255,255,0.35);
+}}
+""" + "".join(f'#statusPill[status="{k}"] {{ background: {v}; }}\n' for k, v in STATUS_COLORS.items()) + """
+/* Dialogs */
+#aboutDialog QLineEdit {
+    background: rgba(255,255,255,0.12); color: white;
+    border: 1px solid rgba(0,0,0,0.35); border-radius: 8px; padding: 6px 10px;
+}
+
+#setClockDialog { background: rgba(0,0,0,0.25); }
+#setClockDialog QLabel#setClockInfo { color: white; }
+#setClockDialog QLabel#setClockTip { color: rgba(255,255,255,0.75); font-size: 12px; }
+#setClockDialog QDateTimeEdit, #setClockDialog QLineEdit {
+    background-color: rgba(255,255,255,0.18);
+    color: white;
+    border: 1px solid rgba(255,255,255,0.35);
+    border-radius: 8px;
+    padding: 6px 10px;
+}
+#setClockDialog QPushButton {
+    font-weight: 600;
+    padding: 8px 16px;
+    border-radius: 10px;
+    color: white;
+    background-color: rgba(255,255,255,0.22);
+    border: 1px solid rgba(255,255,255,0.40);
+}
+#setClockDialog QPushButton:hover { background-color: rgba(255,255,255,0.30); }
+#setClockDialog QPushButton:pressed { background-color: rgba(255,255,255,0.38); }
+"""
+
+
+def apply(app: QtWidgets.QApplication): # Install the theme once for the whole application
+    app.setStyleSheet(STYLESHEET)
+
+
+def set_page(widget: QtWidgets.QWidget, background: bool = True): # White text, and the gradient unless the page sits on the window's
+    if background:
+        widget.setObjectName("background-image")
+    widget.setProperty("role", "page")
+
+
+def set_variant(widget: QtWidgets.QWidget, variant: str): # Pick a button look (set before the widget is shown)
+    widget.setProperty("variant", variant)
+
+
+def repolish(widget: QtWidgets.QWidget): # Re-evaluate property selectors for one widget after a change
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
+
+
+def set_status(label: QtWidgets.QWidget, status: str): # Switch the status pill colour, see STATUS_COLORS
+    if label.property("status") == status:
+        return # nothing to re-polish
+    label.setProperty("status", status)
+    repolish(label)
@@ -0,0 +1,123 @@
+import os, json, time, threading, functools # standard libraries
+from contextlib import contextmanager # for span()
+
+# Chrome trace-event output (load the file in chrome://tracing or https://ui.perfetto.dev).
+# Tracing is off until start() is called; span() and @traced then cost one global lookup.
+
+def now_us() -> int: # Trace timestamps are integer microseconds on the perf_counter clock
+    return time.perf_counter_ns() // 1000
+
+
+class TraceWriter: # Appends trace events to a JSON array file and rotates it by size
+    def __init__(self, path: str, max_bytes: int = 8 * 1024 * 1024, backups: int = 3):
+        self.path = os.path.abspath(path) # active trace file
+        self.max_bytes = max_bytes # rotate once the file grows past this
+        self.backups = backups # number of rotated files kept (path.1 is the newest)
+        self.pid = os.getpid()
+        self._lock = threading.Lock() # events arrive from the GUI and the watchdog thread
+        self._file = None
+        self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True) # ensure directory exists
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[\n") # trace viewers accept an unterminated array, so a crash still leaves a readable file
+        self._first = True
+
+    def _rotate(self):
+        self._file.write("\n]\n")
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1): # shift path.1 -> path.2 ...
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def write(self, event: dict): # Add one event, filling in pid/tid
+        event.setdefault("pid", self.pid)
+        event.setdefault("tid", threading.get_ident())
+        line = json.dumps(event, separators=(",", ":"), default=str)
+        with self._lock:
+            if self._file is None: # already closed
+                return
+            self._file.write(line if self._first else ",\n" + line)
+            self._first = False
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def flush(self):
+        with self._lock:
+            if self._file:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.write("\n]\n")
+                self._file.close()
+                self._file = None
+
+
+_writer: TraceWriter | None = None # active writer, None while tracing is off
+
+
+def start(path: str, **kwargs) -> TraceWriter: # Begin writing trace events to path
+    global _writer
+    stop()
+    _writer = TraceWriter(path, **kwargs)
+    _writer.write({"name": "thread_name", "ph": "M", "args": {"name": "GUI"}}) # label the main thread
+    return _writer
+
+
+def stop(): # Finish the trace file
+    global _writer
+    if _writer:
+        _writer.close()
+        _writer = None
+
+
+def enabled() -> bool:
+    return _writer is not None
+
+
+def emit(event: dict): # Write a raw event if tracing is on
+    if _writer:
+        _writer.write(event)
+
+
+def instant(name: str, **args): # Zero length marker
+    if _writer:
+        _writer.write({"name": name, "ph": "i", "s": "t", "ts": now_us(), "args": args})
+
+
+def counter(name: str, **values): # Counter track (e.g. event loop latency)
+    if _writer:
+        _writer.write({"name": name, "ph": "C", "ts": now_us(), "args": values})
+
+
+@contextmanager
+def span(name: str, **args): # Time the body of a with-block as one complete event
+    if _writer is None:
+        yield
+        return
+    start_us = now_us()
+    try:
+        yield
+    finally:
+        if _writer:
+            _writer.write({"name": name, "ph": "X", "ts": start_us, "dur": now_us() - start_us, "args": args})
+
+
+def traced(name: str | None = None): # Decorator form of span(), named after the function by default
+    def wrap(fn):
+        label = name or fn.__qualname__
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            if _writer is None: # fast path while tracing is off
+                return fn(*a, **kw)
+            with span(label):
+                return fn(*a, **kw)
+        return inner
+    return wrap
@@ -0,0 +1,75 @@
+import sys, time, threading, traceback # standard libraries
+from PySide6 import QtCore
+from utility import tracing # trace-event output
+
+class StallWatchdog(QtCore.QObject): # Detects a blocked Qt event loop and records what the GUI thread was doing
+    # A precise timer on the GUI thread stamps a heartbeat; a plain thread checks the stamp. If the
+    # heartbeat is older than the threshold, the event loop is stuck, so the watcher grabs the GUI
+    # thread's Python stack from sys._current_frames() while the stall is still in progress.
+
+    def __init__(self, interval_ms: int = 20, threshold_ms: int = 200, parent=None):
+        super().__init__(parent)
+        self.interval = interval_ms / 1000.0 # heartbeat period in seconds
+        self.threshold = threshold_ms / 1000.0 # how late the heartbeat may be before it counts as a stall
+        self.main_id = threading.get_ident() # created on the GUI thread
+        self.stalls = 0 # stalls seen so far
+        self.max_latency_ms = 0.0 # worst heartbeat lateness in the current reporting window
+
+        self._beat = time.perf_counter() # last heartbeat, written by the GUI thread only
+        self._stall_start = None # perf_counter when the current stall was detected
+        self._stall_stack = None # GUI stack captured during the current stall
+        self._lock = threading.Lock() # guards the stall fields shared with the watcher thread
+        self._stop = threading.Event()
+        self._last_counter = self._beat # last time the latency counter was written
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer) # millisecond accuracy
+        self._timer.timeout.connect(self._heartbeat)
+        self._watcher = threading.Thread(target=self._watch, name="dcm-stall-watchdog", daemon=True)
+
+    def start(self):
+        self._beat = time.perf_counter()
+        self._timer.start(int(self.interval * 1000))
+        self._watcher.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stop.set()
+
+    def _heartbeat(self): # GUI thread: measure how late this tick is and close any stall in progress
+        now = time.perf_counter()
+        late_ms = max(0.0, (now - self._beat - self.interval) * 1e3) # event loop latency
+        self._beat = now
+        self.max_latency_ms = max(self.max_latency_ms, late_ms)
+        if now - self._last_counter >= 1.0: # one counter sample per second keeps the trace small
+            tracing.counter("event loop latency", max_ms=round(self.max_latency_ms, 2))
+            self.max_latency_ms = 0.0
+            self._last_counter = now
+
+        with self._lock:
+            start, stack = self._stall_start, self._stall_stack
+            self._stall_start = self._stall_stack = None
+        if start is not None: # the loop is running again; record the whole stall
+            began = start - self.threshold # the heartbeat stopped before it was noticed
+            tracing.emit({"name": "stall", "ph": "X", "tid": self.main_id,
+                          "ts": int(began * 1e6), "dur": int((now - began) * 1e6),
+                          "args": {"ms": round((now - began) * 1e3, 1), "stack": stack}})
+            tracing.instant("stall end")
+
+    def _watch(self): # watcher thread
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            if now - self._beat < self.threshold:
+                continue
+            with self._lock:
+                if self._stall_start is not None: # already captured this stall
+                    continue
+                self._stall_start = now
+                self._stall_stack = self._main_stack()
+            self.stalls += 1
+
+    def _main_stack(self) -> list[str]: # Python stack of the GUI thread, innermost call last
+        frame = sys._current_frames().get(self.main_id)
+        if frame is None:
+            return []
+        return [f"{f.filename}:{f.lineno} {f.name}" for f in traceback.extract_stack(frame)]